@@ -0,0 +1,399 @@
+"""Консольный режим без графического интерфейса: те же движки и разбор вывода, что и во вкладках.
+
+    python cli.py ping 8.8.8.8 10.0.0.0/24 -c 3
+    python cli.py trace 8.8.8.8 --format csv
+    python cli.py routes
+    python cli.py routes --lookup 8.8.8.8 @destinations.txt
+    python cli.py arp -o arp.jsonl
+    python cli.py ifaces
+    python cli.py ping 8.8.8.8 -c 100 --record
+    python cli.py history 8.8.8.8 --hours 24 --summary
+    python cli.py batch changes.txt
+    python cli.py oui build oui.txt
+    python cli.py oui lookup 00:00:0c:12:34:56
+    python cli.py resolve 8.8.8.8 1.1.1.1
+    python cli.py arp --names
+    python cli.py discover 192.168.1.0/24 --method arp
+    python cli.py measure mtu 10.8.0.1
+    python cli.py measure load 10.8.0.1 --duration 10
+
+Каждая запись выводится отдельной строкой JSON (по умолчанию) или строкой CSV.
+Модули PyQt5 и библиотеки графов здесь не импортируются, поэтому режим работает на серверах без дисплея."""
+import argparse
+import csv
+import json
+import sys
+
+from src.Backend import get_backend
+
+
+class RecordWriter:
+    """Пишет словари в формате JSON Lines или CSV (заголовок берется из первой записи)"""
+
+    def __init__(self, stream, fmt="jsonl"):
+        self.stream = stream
+        self.fmt = fmt
+        self.csv_writer = None
+
+    def write(self, record, flush=False):
+        if self.fmt == "jsonl":
+            # Даты аренды DHCP и подобные значения выводятся строками
+            self.stream.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        else:
+            if self.csv_writer is None:
+                self.csv_writer = csv.DictWriter(self.stream, fieldnames=list(record), extrasaction="ignore")
+                self.csv_writer.writeheader()
+            self.csv_writer.writerow({key: "; ".join(map(str, value)) if isinstance(value, (list, tuple, set))
+                                      else value for key, value in record.items()})
+        if flush:
+            self.stream.flush()
+
+
+def stats_record(stats):
+    return {"target": stats.target, "address": stats.address, "sent": stats.sent, "received": stats.received,
+            "loss": stats.loss, "min": stats.min, "avg": stats.avg, "max": stats.max,
+            "jitter": stats.jitter if stats.received > 1 else None}
+
+
+def hop_record(hop):
+    return {"target": hop.target, "ttl": hop.ttl, "addresses": sorted(hop.addresses), "sent": hop.sent,
+            "received": hop.received, "loss": hop.loss, "last": hop.last_rtt, "avg": hop.avg, "min": hop.min,
+            "max": hop.max, "samples": list(hop.samples)}
+
+
+def run_ping(args, writer):
+    # Движки проб тянут asyncio; команды просмотра таблиц обходятся без него
+    import asyncio
+    from src.PingSweep import PingSweep, expand_targets
+    from src.ProbeEngine import ProbeEngine
+
+    engine = ProbeEngine(timeout=args.timeout, method=args.method, payload_size=args.size)
+    sweep = PingSweep(engine, concurrency=args.concurrency, rate=args.rate)
+    store = get_store(args)
+    # Результаты проб выводятся сразу, чтобы их можно было читать по мере поступления
+    def on_result(result):
+        if store is not None:
+            store.add_result(result)
+        if not args.summary:
+            writer.write(result._asdict(), flush=True)
+    try:
+        asyncio.run(sweep.run(expand_targets(" ".join(args.targets)), args.count, args.interval, on_result))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.close()
+    if args.summary:
+        for stats in sweep.stats.values():
+            writer.write(stats_record(stats))
+
+
+def run_trace(args, writer):
+    import asyncio
+    from src.PingSweep import expand_targets
+    from src.TraceEngine import TraceEngine
+
+    targets = list(expand_targets(" ".join(args.targets)))
+    if not TraceEngine.available():
+        # Без очереди ICMP-ошибок остается системный tracert/traceroute, выводятся разобранные хопы
+        backend = get_backend()
+        for target in targets:
+            for record in backend.collect(backend.trace(target)):
+                writer.write(dict({"target": target}, **record._asdict()))
+        return
+    engine = TraceEngine(max_hops=args.max_hops, timeout=args.timeout)
+    store = get_store(args)
+    on_update = None
+    if store is not None:
+        from src.TraceThread import hop_series
+
+        def on_update(hops):
+            for hop in hops:
+                if hop.samples:
+                    store.add(hop_series(hop.target, hop.ttl), hop.samples[-1])
+    for hops in asyncio.run(engine.trace_many(targets, args.rounds, args.interval, on_update)):
+        for hop in hops:
+            writer.write(hop_record(hop))
+
+
+def get_store(args):
+    """История замеров, если запись включена (--record)"""
+    if not getattr(args, "record", False):
+        return None
+    from src.SampleStore import get_sample_store
+    return get_sample_store()
+
+
+def run_history(args, writer):
+    import time
+    from src.SampleStore import get_sample_store, MINUTE, HOUR
+
+    store = get_sample_store()
+    end = time.time()
+    start = end - args.hours * 3600
+    names = args.series or store.series()
+    for name in names:
+        if args.summary:
+            summary = store.summary(name, start, end)
+            if summary is None:
+                continue
+            percentiles = store.percentiles(name, start, end)
+            writer.write(dict({"series": name}, **summary._asdict(),
+                              **{f"p{q}": value for q, value in percentiles.items()}))
+            continue
+        period = {"minute": MINUTE, "hour": HOUR}[args.period]
+        for rollup in store.rollups(name, start, end, period):
+            writer.write(dict({"series": name}, **rollup._asdict()))
+
+
+def run_batch(args, writer):
+    """Пакет изменений из файла: ошибки разбора выводятся до применения, а при них пакет не применяется"""
+    from src.BatchMutator import BatchMutator, parse_operations, format_operation
+
+    with open(args.file, encoding="utf-8") as file:
+        operations, errors = parse_operations(file)
+    for line, error in errors:
+        print(f"Строка {line}: {error}", file=sys.stderr)
+    if errors:
+        return 1
+    results, rolled_back = BatchMutator(get_backend()).apply(operations, not args.no_rollback)
+    for stage, records in (("apply", results), ("rollback", rolled_back)):
+        for result in records:
+            writer.write({"stage": stage, "line": result.operation.line,
+                          "operation": format_operation(result.operation), "ok": result.ok, "message": result.message})
+    return 0 if all(result.ok for result in results) else 2
+
+
+def run_oui(args, writer):
+    """Сборка базы производителей из oui.txt/oui.csv IEEE, manuf Wireshark или nmap-mac-prefixes и поиск по ней"""
+    from src.OuiDatabase import OuiDatabase, build_database, DEFAULT_PATH
+
+    path = args.database or DEFAULT_PATH
+    if args.action == "build":
+        writer.write({"database": path, "entries": build_database(args.values[0], path)})
+        return
+    database = OuiDatabase(path)
+    for mac, vendor in zip(args.values, database.lookup_many(args.values)):
+        writer.write({"mac": mac, "vendor": vendor})
+
+
+def get_resolver(args):
+    from src.HostResolver import HostResolver, get_host_resolver, DNS_PORT
+
+    if not getattr(args, "nameserver", None):
+        return get_host_resolver()
+    servers = []
+    for server in args.nameserver:
+        host, _, port = server.rpartition(":") if server.count(":") == 1 else (server, "", "")
+        servers.append((host, int(port)) if port else (server, DNS_PORT))
+    # Для указанного сервера теплый кэш не используется: ответы другого сервера могли бы его подменить
+    return HostResolver(path=None, nameservers=servers, timeout=args.timeout)
+
+
+def run_resolve(args, writer):
+    resolver = get_resolver(args)
+    try:
+        for address, name in resolver.resolve(args.addresses).items():
+            writer.write({"address": address, "name": name or None})
+    finally:
+        resolver.close()
+
+
+def run_listing(args, writer):
+    backend = get_backend()
+    spec = {"routes": backend.list_routes, "arp": backend.list_neighbors, "ifaces": backend.list_interfaces}[
+        args.command]()
+    records = backend.collect(spec)
+    if getattr(args, "lookup", None):
+        run_lookup(args, records, writer)
+        return
+    field = None
+    if getattr(args, "names", False):
+        # Имена всех адресов разрешаются одной пачкой, параллельно
+        field = "gateway" if args.command == "routes" else "ip"
+        names = get_resolver(args).resolve([getattr(record, field) for record in records])
+    for record in records:
+        row = record._asdict()
+        if field is not None:
+            row["name"] = names.get(getattr(record, field)) or None
+        writer.write(row)
+
+
+def run_lookup(args, records, writer):
+    """Маршрут для каждого адреса по самому длинному совпадающему префиксу; адреса из файла читаются потоком"""
+    from src.PingSweep import expand_targets
+    from src.Records import RouteRecord
+    from src.RouteIndex import RouteIndex
+
+    index = RouteIndex()
+    for record in records:
+        try:
+            index.add(record)
+        except (OSError, ValueError):
+            pass
+    for address, route in index.lookup_many(expand_targets(" ".join(args.lookup))):
+        row = {"address": address}
+        row.update(route._asdict() if route is not None else dict.fromkeys(RouteRecord._fields))
+        writer.write(row)
+
+
+def run_discover(args, writer):
+    """Активное обнаружение узлов; Ctrl+C сохраняет прогресс, повторный запуск продолжает с того же места"""
+    import asyncio
+    from src.DiscoveryScanner import DiscoveryScanner, format_progress
+    from src.PingSweep import expand_targets
+
+    scanner = DiscoveryScanner(get_backend(), args.method, timeout=args.timeout, retries=args.retries,
+                               rate=args.rate, max_rate=args.max_rate)
+    last = []
+
+    def on_hosts(records):
+        for record in records:
+            writer.write(record._asdict(), flush=True)
+    try:
+        asyncio.run(scanner.scan(list(expand_targets(" ".join(args.targets))), on_hosts, last.append,
+                                 not args.restart))
+    except KeyboardInterrupt:
+        print("Прервано: прогресс сохранен", file=sys.stderr)
+    if last:
+        print(format_progress(last[-1]), file=sys.stderr)
+
+
+def run_measure(args, writer):
+    """Замеры пути: MTU, пропускная способность по пачкам пакетов, задержка под нагрузкой"""
+    import asyncio
+    from src.PathMeter import PathMeter
+
+    options = {}
+    if args.mode == "mtu":
+        options["maximum"] = args.max_mtu
+    elif args.mode == "bandwidth":
+        options.update(trains=args.trains, train_length=args.train_length)
+    else:
+        options.update(duration=args.duration, load=args.load * 1e6 if args.load else None)
+    meter = PathMeter(timeout=args.timeout)
+    steps = (lambda line: print(line, file=sys.stderr)) if args.verbose else None
+    for target in args.targets:
+        try:
+            result = asyncio.run(meter.measure(args.mode, target, steps, **options))
+        except KeyboardInterrupt:
+            break
+        writer.write(result._asdict(), flush=True)
+
+
+def build_parser():
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument("--format", choices=("jsonl", "csv"), default="jsonl", help="формат вывода")
+    output.add_argument("-o", "--output", help="файл для вывода (по умолчанию stdout)")
+
+    parser = argparse.ArgumentParser(description="Сетевые утилиты без графического интерфейса")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ping = commands.add_parser("ping", parents=[output], help="опрос узлов и сетей")
+    ping.add_argument("targets", nargs="+", help="адреса, сети (10.0.0.0/24) или @файл")
+    ping.add_argument("-c", "--count", type=int, default=4, help="число проб на узел, 0 - бесконечно")
+    ping.add_argument("-i", "--interval", type=float, default=1.0, help="интервал между пробами, с")
+    ping.add_argument("-W", "--timeout", type=float, default=1.0, help="таймаут пробы, с")
+    ping.add_argument("-s", "--size", type=int, default=32, help="размер данных, байт")
+    ping.add_argument("--method", choices=("auto", "icmp", "udp", "tcp"), default="auto")
+    ping.add_argument("--concurrency", type=int, default=256, help="одновременно опрашиваемых узлов")
+    ping.add_argument("--rate", type=float, default=None, help="проб в секунду на узел")
+    ping.add_argument("--summary", action="store_true", help="выводить только итоговую статистику по узлам")
+    ping.add_argument("--record", action="store_true", help="записывать замеры в историю")
+
+    trace = commands.add_parser("trace", parents=[output], help="трассировка маршрута")
+    trace.add_argument("targets", nargs="+")
+    trace.add_argument("-m", "--max-hops", type=int, default=30)
+    trace.add_argument("-W", "--timeout", type=float, default=2.0)
+    trace.add_argument("-q", "--rounds", type=int, default=3, help="число раундов проб")
+    trace.add_argument("-i", "--interval", type=float, default=1.0)
+    trace.add_argument("--record", action="store_true", help="записывать замеры хопов в историю")
+
+    history = commands.add_parser("history", parents=[output], help="история замеров")
+    history.add_argument("series", nargs="*", help="узлы или хопы (\"цель #TTL\"), по умолчанию все")
+    history.add_argument("--hours", type=float, default=24.0, help="за сколько последних часов")
+    history.add_argument("--period", choices=("minute", "hour"), default="hour", help="шаг агрегатов")
+    history.add_argument("--summary", action="store_true", help="сводка и перцентили вместо агрегатов")
+
+    batch = commands.add_parser("batch", parents=[output], help="пакет изменений маршрутов и ARP из файла")
+    batch.add_argument("file", help="файл с операциями, по одной на строку")
+    batch.add_argument("--no-rollback", action="store_true", help="не откатывать выполненные операции при ошибке")
+
+    oui = commands.add_parser("oui", parents=[output], help="база производителей сетевых карт")
+    oui.add_argument("action", choices=("build", "lookup"), help="build ИСТОЧНИК или lookup MAC...")
+    oui.add_argument("values", nargs="+", help="файл-источник или MAC-адреса")
+    oui.add_argument("--database", default=None, help="файл базы (по умолчанию ~/.nat-lab/oui.bin)")
+
+    resolve = commands.add_parser("resolve", parents=[output], help="имена узлов по адресам (PTR)")
+    resolve.add_argument("addresses", nargs="+")
+    resolve.add_argument("--nameserver", action="append", help="сервер DNS (адрес[:порт]) вместо системного")
+    resolve.add_argument("-W", "--timeout", type=float, default=1.0, help="таймаут запроса, с")
+
+    discover = commands.add_parser("discover", parents=[output], help="активное обнаружение узлов сети")
+    discover.add_argument("targets", nargs="+", help="адреса, сети IPv4 (10.0.0.0/22) или @файл")
+    discover.add_argument("--method", choices=("auto", "arp", "icmp", "tcp"), default="auto")
+    discover.add_argument("-W", "--timeout", type=float, default=1.0, help="таймаут пробы, с")
+    discover.add_argument("--retries", type=int, default=1, help="повторных проб для молчащих адресов")
+    discover.add_argument("--rate", type=float, default=1000, help="начальный темп, проб/с")
+    discover.add_argument("--max-rate", type=float, default=20000, help="наибольший темп, проб/с")
+    discover.add_argument("--restart", action="store_true", help="начать заново, не продолжая прерванное")
+
+    measure = commands.add_parser("measure", parents=[output], help="MTU пути, пропускная способность, "
+                                                                    "задержка под нагрузкой")
+    measure.add_argument("mode", choices=("mtu", "bandwidth", "load"))
+    measure.add_argument("targets", nargs="+")
+    measure.add_argument("-W", "--timeout", type=float, default=1.0, help="таймаут пробы, с")
+    measure.add_argument("--max-mtu", type=int, default=None, help="верхняя граница поиска MTU")
+    measure.add_argument("--trains", type=int, default=8, help="число пачек пакетов")
+    measure.add_argument("--train-length", type=int, default=48, help="пакетов в пачке (2 - пары пакетов)")
+    measure.add_argument("--duration", type=float, default=5.0, help="длительность каждой фазы замера задержки, с")
+    measure.add_argument("--load", type=float, default=None,
+                         help="темп нагрузки, Мбит/с (по умолчанию - выше оценки пропускной способности)")
+    measure.add_argument("-v", "--verbose", action="store_true", help="выводить шаги замера в stderr")
+
+    names = argparse.ArgumentParser(add_help=False)
+    names.add_argument("--names", action="store_true", help="добавить имена узлов (PTR)")
+    routes = commands.add_parser("routes", parents=[output, names], help="таблица маршрутов")
+    routes.add_argument("--lookup", nargs="+", metavar="АДРЕС",
+                        help="вместо таблицы вывести маршрут для адресов, сетей или @файла")
+    commands.add_parser("arp", parents=[output, names], help="таблица соседей (ARP/NDP)")
+    commands.add_parser("ifaces", parents=[output], help="сетевые интерфейсы")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "ping" and args.count == 0:
+        args.count = None
+    stream = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    writer = RecordWriter(stream, args.format)
+    code = 0
+    try:
+        if args.command == "ping":
+            run_ping(args, writer)
+        elif args.command == "trace":
+            run_trace(args, writer)
+        elif args.command == "history":
+            run_history(args, writer)
+        elif args.command == "batch":
+            code = run_batch(args, writer)
+        elif args.command == "oui":
+            run_oui(args, writer)
+        elif args.command == "resolve":
+            run_resolve(args, writer)
+        elif args.command == "discover":
+            run_discover(args, writer)
+        elif args.command == "measure":
+            run_measure(args, writer)
+        else:
+            run_listing(args, writer)
+    except OSError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
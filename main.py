@@ -1,14 +1,20 @@
+import importlib
 import sys
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QTabWidget)
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QTabWidget, QWidget)
 from PyQt5 import QtGui
 
-from src.RouteTab import RouteTab
-from src.IpconfigTab import IpconfigTab
-from src.PingTab import PingTab
-from src.TracertTab import TracertTab
+from src.CommandExecutor import get_executor, RUNNING
+from src.ThreadReaper import get_thread_reaper
 
-import ctypes
-import sys
+# Вкладки: (заголовок, модуль, класс). Модуль импортируется и вкладка создается при первом выборе
+TABS = [
+    ("Ping", "src.PingTab", "PingTab"),
+    ("Tracert", "src.TracertTab", "TracertTab"),
+    ("Ipconfig", "src.IpconfigTab", "IpconfigTab"),
+    ("Route", "src.RouteTab", "RouteTab"),
+    ("ARP", "src.ArpTab", "ArpTab"),
+]
 
 
 class NetworkUtility(QMainWindow):
@@ -20,10 +26,45 @@ class NetworkUtility(QMainWindow):
         self.tabs = QTabWidget()
         self.setCentralWidget(self.tabs)
 
-        self.tabs.addTab(PingTab(), "Ping")
-        self.tabs.addTab(TracertTab(), "Tracert")
-        self.tabs.addTab(IpconfigTab(), "Ipconfig")
-        self.tabs.addTab(RouteTab(), "Route")
+        self.built_tabs = {}
+        for title, _, _ in TABS:
+            self.tabs.addTab(QWidget(), title)
+        self.tabs.currentChanged.connect(self.build_tab)
+        self.executor = get_executor()
+        self.executor.jobs_signal.connect(self.show_jobs)
+        # Первая вкладка создается после показа окна, чтобы окно появилось сразу
+        QTimer.singleShot(0, lambda: self.build_tab(self.tabs.currentIndex()))
+
+    def build_tab(self, index):
+        """Создает вкладку при первом выборе и подставляет ее вместо пустой заглушки"""
+        if index < 0 or index in self.built_tabs:
+            return
+        title, module, name = TABS[index]
+        tab = getattr(importlib.import_module(module), name)()
+        self.built_tabs[index] = tab
+        placeholder = self.tabs.widget(index)
+        self.tabs.blockSignals(True)
+        self.tabs.removeTab(index)
+        self.tabs.insertTab(index, tab, title)
+        self.tabs.setCurrentIndex(index)
+        self.tabs.blockSignals(False)
+        placeholder.deleteLater()
+
+    def show_jobs(self):
+        """Показывает в строке состояния число выполняющихся и ожидающих задач"""
+        jobs = self.executor.jobs()
+        running = sum(job.state == RUNNING for job in jobs)
+        self.statusBar().showMessage(f"Задач выполняется: {running}, в очереди: {len(jobs) - running}")
+
+    def closeEvent(self, event):
+        """Останавливает команды, наблюдение и расчет раскладки и дожидается их потоков"""
+        for tab in self.built_tabs.values():
+            for name in ("stop_watch", "stop_layout"):
+                if hasattr(tab, name):
+                    getattr(tab, name)()
+        self.executor.shutdown()
+        get_thread_reaper().shutdown()
+        super().closeEvent(event)
 
 
 def set_dark_palette(app):
@@ -50,13 +91,13 @@ def set_dark_palette(app):
         color: #ffffff;
     }
 
-    QLineEdit, QTextEdit {
+    QLineEdit, QTextEdit, QPlainTextEdit {
         background-color: #000000;
         color: #ffffff;
         border: 1px solid #666666;
     }
 
-    QTableWidget {
+    QTableWidget, QTableView {
         background-color: #000000;
         color: #ffffff;
         gridline-color: #444444;
@@ -1,9 +1,29 @@
-import networkx as nx
-import matplotlib.pyplot as plt
 from PyQt5.QtWidgets import (QWidget,
-                             QVBoxLayout, QPushButton, QTextEdit, QLineEdit, QLabel, QTableWidgetItem, QTableWidget,
-                             QDialog, QFormLayout)
+                             QVBoxLayout, QHBoxLayout, QPushButton, QPlainTextEdit, QLineEdit, QLabel,
+                             QDialog, QFormLayout, QDoubleSpinBox, QProgressBar, QComboBox, QCheckBox)
+from src.Backend import get_backend
+from src.Parsers import is_ip_address, is_mac_address, normalize_mac
 from src.CommandThread import CommandThread
+from src.BatchThread import BatchThread
+from src.BatchDialog import BatchDialog
+from src.CommandExecutor import get_executor, COMMAND_TIMEOUT, FINISHED
+from src.ResultTableModel import ResultTableModel
+from src.ResultTableView import ResultTableView
+from src.SnapshotWatcher import SnapshotWatcher
+from src.GraphView import GraphView
+from src.LayoutThread import LayoutThread
+from src.TopologyStore import get_topology
+from src.NeighborStore import NeighborStore, format_conflict
+from src.OuiDatabase import get_oui_database
+from src.HostResolver import get_host_resolver
+from src.DiscoveryThread import DiscoveryThread
+from src.DiscoveryScanner import format_progress
+from src.PingSweep import expand_targets
+from src.ThreadReaper import get_thread_reaper
+
+# Способы обнаружения узлов: подпись и метод сканера
+DISCOVERY_METHODS = (("Автоматически", "auto"), ("ARP (своя сеть, нужны права)", "arp"),
+                     ("ICMP echo", "icmp"), ("TCP connect", "tcp"))
 
 
 class InputDialog(QDialog):
@@ -42,155 +62,327 @@ class ArpTab(QWidget):
 
     def __init__(self):
         super().__init__()
+        self.backend = get_backend()
+        self.topology = get_topology()
+        # Данные таблицы: индексы по IP и MAC, конфликты и производители по базе OUI
+        self.neighbors = NeighborStore(get_oui_database())
         self.setup_ui()
-        self.command_thread = None
+        self.executor = get_executor()
+        self.reaper = get_thread_reaper()
+        self.watcher = None
+        self.discovery_job = None
+        self.graph_layout = None
+        self.layout_thread = None
 
     def setup_ui(self):
         layout = QVBoxLayout()
 
         self.arp_params = QLineEdit()
-        self.arp_params.setPlaceholderText("Введите параметры для arp (например, -a)")
+        self.arp_params.setPlaceholderText("Дополнительные параметры (например, -a)")
         self.arp_button = QPushButton("ARP")
         self.arp_button.clicked.connect(self.perform_arp)
 
-        self.arp_table = QTableWidget()
-        self.arp_table.setColumnCount(3)
-        self.arp_table.setHorizontalHeaderLabels(["Адрес в Интернете", "Физический адрес", "Тип"])
-        self.arp_table.setEditTriggers(QTableWidget.DoubleClicked)
+        self.watch_button = QPushButton("Следить за изменениями")
+        self.watch_button.setCheckable(True)
+        self.watch_button.toggled.connect(self.toggle_watch)
+        self.watch_interval = QDoubleSpinBox()
+        self.watch_interval.setRange(0.2, 3600.0)
+        self.watch_interval.setValue(1.0)
+        self.watch_interval.setSuffix(" с")
 
-        self.arp_output = QTextEdit()
+        self.arp_model = ResultTableModel(["Адрес в Интернете", "Физический адрес", "Тип", "Интерфейс",
+                                           "Производитель"],
+                                          key_column=0, editable=True, resolver=get_host_resolver())
+        self.arp_table = ResultTableView(self.arp_model)
+
+        self.arp_output = QPlainTextEdit()
         self.arp_output.setReadOnly(True)
+        self.arp_output.setMaximumBlockCount(10000)
 
         self.add_button = QPushButton("Добавить")
         self.add_button.clicked.connect(self.show_add_dialog)
         self.remove_button = QPushButton("Удалить")
         self.remove_button.clicked.connect(self.show_remove_dialog)
+        self.batch_button = QPushButton("Пакетное изменение...")
+        self.batch_button.clicked.connect(self.show_batch_dialog)
+
+        self.discovery_range = QLineEdit()
+        self.discovery_range.setPlaceholderText("Диапазон для обнаружения (например, 192.168.1.0/24)")
+        self.discovery_method = QComboBox()
+        for title, method in DISCOVERY_METHODS:
+            self.discovery_method.addItem(title, method)
+        self.discovery_resume = QCheckBox("Продолжить прерванное")
+        self.discovery_resume.setChecked(True)
+        self.discovery_button = QPushButton("Обнаружить узлы")
+        self.discovery_button.setCheckable(True)
+        self.discovery_button.toggled.connect(self.toggle_discovery)
+        self.discovery_progress = QProgressBar()
+        self.discovery_progress.setRange(0, 100)
 
         self.visualize_button = QPushButton("Визуализировать структуру сети")
         self.visualize_button.clicked.connect(self.visualize_network)
+        self.graph_view = GraphView()
+        self.graph_view.setMinimumHeight(200)
+        self.layout_progress = QProgressBar()
+        self.layout_progress.setRange(0, 100)
 
         layout.addWidget(QLabel("Параметры ARP:"))
         layout.addWidget(self.arp_params)
         layout.addWidget(self.arp_button)
+        watch_layout = QHBoxLayout()
+        watch_layout.addWidget(self.watch_button)
+        watch_layout.addWidget(QLabel("Интервал опроса:"))
+        watch_layout.addWidget(self.watch_interval)
+        layout.addLayout(watch_layout)
         layout.addWidget(self.arp_table)
         layout.addWidget(self.add_button)
         layout.addWidget(self.remove_button)
+        layout.addWidget(self.batch_button)
+        discovery_layout = QHBoxLayout()
+        discovery_layout.addWidget(self.discovery_range)
+        discovery_layout.addWidget(self.discovery_method)
+        discovery_layout.addWidget(self.discovery_resume)
+        discovery_layout.addWidget(self.discovery_button)
+        layout.addLayout(discovery_layout)
+        layout.addWidget(self.discovery_progress)
         layout.addWidget(self.visualize_button)
+        layout.addWidget(self.graph_view)
+        layout.addWidget(self.layout_progress)
         layout.addWidget(QLabel("Полный вывод ARP:"))
         layout.addWidget(self.arp_output)
 
         self.setLayout(layout)
 
     def perform_arp(self):
-        self.arp_table.clearContents()
-        self.arp_table.setRowCount(0)
+        self.watch_button.setChecked(False)
+        self.stop_command()
+        self.forget_neighbors()
         self.arp_output.clear()
-        params = self.arp_params.text().strip() or "-a"
-        command = ["arp"] + params.split()
-        self.start_command_thread(command)
-
-    def start_command_thread(self, command):
-        """Запускает команду в отдельном потоке"""
-        if self.command_thread is not None and self.command_thread.isRunning():
-            self.stop_command()
-
-        self.command_thread = CommandThread(command)
-        self.command_thread.output_signal.connect(self.handle_output)
-        self.command_thread.finished_signal.connect(lambda: self.arp_output.append("Команда завершена."))
-        self.command_thread.start()
-
-    def handle_output(self, output):
-        """Обрабатывает вывод"""
-        self.arp_output.append(output)
-
-        lines = output.strip().split("\n")
-        for line in lines:
-            if line.strip() and not line.startswith("Интерфейс:"):
-                parts = line.split()
-                internet_address = ""
-                physical_address = ""
-                entry_type = ""
-
-                if len(parts) > 0 and self.is_ip_address(parts[0]):
-                    internet_address = parts[0]
-
-                if len(parts) > 1 and self.is_mac_address(parts[1]):
-                    physical_address = parts[1]
-
-                if len(parts) > 2:
-                    entry_type = parts[2]
-
-                if len(parts) > 1 and not self.is_mac_address(parts[1]):
-                    entry_type = parts[1]
-
-                if internet_address or physical_address:
-                    self.add_table_row(internet_address, physical_address, entry_type)
-
-    def is_ip_address(self, address):
-        """Проверяет, является ли адрес IP-адресом (только числа)"""
-        return all(part.isdigit() for part in address.split('.')) if '.' in address else False
-
-    def is_mac_address(self, address):
-        """Проверяет, является ли адрес MAC-адресом (состоящий из чисел и букв)"""
-        return all(c in "0123456789abcdefABCDEF:-" for c in address)
-
-    def add_table_row(self, internet_address, physical_address, entry_type):
+        params = self.arp_params.text().strip() or None
+        self.start_command_thread(self.backend.list_neighbors(params))
+
+    def toggle_watch(self, enabled):
+        """Включает наблюдение: таблица обновляется только изменившимися записями"""
+        self.stop_watch()
+        if not enabled:
+            return
+        self.stop_command()
+        self.arp_output.clear()
+        self.forget_neighbors()
+        self.watcher = SnapshotWatcher(self.backend, self.backend.list_neighbors, lambda record: record.ip,
+                                       "neighbors", self.watch_interval.value())
+        self.watcher.diff_signal.connect(self.apply_neighbor_diff)
+        self.watcher.error_signal.connect(self.arp_output.appendPlainText)
+        self.watcher.start()
+        self.reaper.track(self.watcher)
+
+    def stop_watch(self):
+        """Отключает наблюдение; поток завершится в фоне, GUI его не ждет"""
+        if self.watcher is not None:
+            self.reaper.retire(self.watcher, self.watcher.diff_signal, self.watcher.error_signal)
+            self.watcher = None
+
+    def apply_neighbor_diff(self, added, removed, changed):
+        """Применяет разницу снимков к таблице"""
+        if self.sender() is not self.watcher:
+            # Разница от остановленного наблюдения, уже стоявшая в очереди событий
+            return
+        conflicts = self.neighbors.apply_diff(added, removed, changed)
+        # Строки с известным ключом обновляются на месте, так что измененные идут вместе с добавленными
+        records = added + [new for _, new in changed]
+        replaced = self.arp_model.apply_diff(self.neighbors.rows(records), removed, [])
+        self.update_topology(records, removed + replaced)
+        self.arp_output.appendPlainText(
+            f"ARP: добавлено {len(added)}, удалено {len(removed)}, изменено {len(changed)}")
+        self.report_conflicts(conflicts)
+
+    def start_command_thread(self, spec):
+        """Ставит команду бэкенда в очередь вкладки; команды вкладки выполняются по порядку"""
+        job = self.executor.submit(self, CommandThread.from_spec(spec, self.backend.encoding),
+                                   timeout=COMMAND_TIMEOUT)
+        job.lines_signal.connect(self.handle_output)
+        job.records_signal.connect(self.add_neighbors)
+        job.finished_signal.connect(lambda: self.arp_output.appendPlainText("Команда завершена."))
+        return job
+
+    def add_neighbors(self, records):
+        """Добавляет пачку разобранных записей в таблицу и общую топологию"""
+        conflicts = self.neighbors.add(records)
+        self.update_topology(records, self.arp_model.append_rows(self.neighbors.rows(records)))
+        self.report_conflicts(conflicts)
+
+    def update_topology(self, added, replaced):
+        """Топология держит ровно записи таблицы: замененные строки отпускаются после добавления новых,
+        чтобы общие узлы не удалялись и не создавались заново"""
+        self.topology.add_neighbors(added)
+        self.topology.remove_neighbors(replaced)
+
+    def report_conflicts(self, conflicts):
+        """Сообщает о возможной подмене ARP: один MAC у нескольких адресов или смена MAC у адреса"""
+        if conflicts:
+            self.arp_output.appendPlainText("\n".join(format_conflict(conflict) for conflict in conflicts))
+
+    def forget_neighbors(self):
+        """Убирает показанные записи из таблицы и общей топологии перед новым снимком"""
+        self.arp_model.flush()
+        self.topology.remove_neighbors(self.arp_model.rows())
+        self.arp_model.clear()
+        self.neighbors.clear()
+
+    def handle_output(self, lines):
+        """Обрабатывает пачку строк вывода"""
+        self.arp_output.appendPlainText("\n".join(lines))
+
+    def add_table_row(self, internet_address, physical_address, entry_type, interface=None):
         """Добавляет строку в таблицу"""
-        row_position = self.arp_table.rowCount()
-        self.arp_table.insertRow(row_position)
-        self.arp_table.setItem(row_position, 0, QTableWidgetItem(internet_address or ""))
-        self.arp_table.setItem(row_position, 1, QTableWidgetItem(physical_address or ""))
-        self.arp_table.setItem(row_position, 2, QTableWidgetItem(entry_type or ""))
+        row = (internet_address or "", physical_address or "", entry_type or "", interface)
+        self.report_conflicts(self.neighbors.add([row]))
+        self.update_topology([row], self.arp_model.append_rows(self.neighbors.rows([row])))
 
     def show_add_dialog(self):
         """Показывает диалоговое окно для добавления новой записи"""
         dialog = InputDialog("Добавить запись", is_add=True)
         if dialog.exec_() == QDialog.Accepted:
             ip, mac = dialog.get_data()
-            if ip and mac:
-                command = f"arp -S {ip} {mac}"
-                self.start_command_thread(command.split())
-                self.add_table_row(ip, mac, "Динамический")
+            ip, mac = ip.strip(), mac.strip()
+            if not is_ip_address(ip):
+                self.arp_output.appendPlainText(f"Ошибка: неверный IP-адрес: {ip!r}")
+            elif not is_mac_address(mac):
+                self.arp_output.appendPlainText(f"Ошибка: неверный MAC-адрес: {mac!r}")
+            else:
+                job = self.start_command_thread(self.backend.add_neighbor(ip, mac))
+                row = (ip, normalize_mac(mac), "static", None)
+                job.finished_signal.connect(lambda: self.apply_neighbor_change(job, add=row))
 
     def show_remove_dialog(self):
         """Показывает диалоговое окно для удаления записи"""
         dialog = InputDialog("Удалить запись", is_add=False)
         if dialog.exec_() == QDialog.Accepted:
             ip, _ = dialog.get_data()
+            ip = ip.strip()
             if ip:
-                command = f"arp -d {ip}"
-                self.start_command_thread(command.split())
-                self.remove_row_by_ip(ip)
+                job = self.start_command_thread(self.backend.delete_neighbor(ip))
+                job.finished_signal.connect(lambda: self.apply_neighbor_change(job, remove=ip))
+
+    def apply_neighbor_change(self, job, add=None, remove=None):
+        """Переносит изменение записи в таблицу и индекс соседей, только если команда завершилась успешно"""
+        if job.state != FINISHED or job.thread.returncode != 0:
+            self.arp_output.appendPlainText("Запись не изменена: команда завершилась с ошибкой")
+            return
+        if self.watcher is not None:
+            # При наблюдении изменение придет разницей снимков
+            return
+        if remove is not None:
+            self.remove_row_by_ip(remove)
+        if add is not None:
+            self.add_table_row(*add)
 
     def remove_row_by_ip(self, ip):
         """Удаляет строку по IP-адресу"""
-        for row in range(self.arp_table.rowCount()):
-            if self.arp_table.item(row, 0).text() == ip:
-                self.arp_table.removeRow(row)
-                break
+        self.topology.remove_neighbors(self.neighbors.remove([ip]))
+        self.arp_model.remove_key(ip)
+
+    def toggle_discovery(self, enabled):
+        """Запускает активное обнаружение узлов диапазона или останавливает его (с сохранением прогресса)"""
+        if not enabled:
+            if self.discovery_job is not None and self.discovery_job.active:
+                self.executor.cancel(self.discovery_job)
+                self.arp_output.appendPlainText("Обнаружение остановлено: прогресс сохранен для продолжения")
+            self.discovery_job = None
+            return
+        targets = [target for target in expand_targets(self.discovery_range.text())
+                   if is_ip_address(target) and ":" not in target]
+        if not targets:
+            self.arp_output.appendPlainText("Ошибка: укажите адреса или сеть IPv4 для обнаружения")
+            self.discovery_button.setChecked(False)
+            return
+        self.discovery_progress.setValue(0)
+        thread = DiscoveryThread(self.backend, targets, self.discovery_method.currentData(),
+                                 resume=self.discovery_resume.isChecked())
+        # Обход идет параллельно с командами вкладки и не ограничен их таймаутом
+        self.discovery_job = self.executor.submit(self, thread, serial=False)
+        self.discovery_job.records_signal.connect(self.add_discovered)
+        self.discovery_job.stats_signal.connect(self.show_discovery_progress)
+        self.discovery_job.error_signal.connect(self.arp_output.appendPlainText)
+        self.discovery_job.finished_signal.connect(self.discovery_finished)
+
+    def add_discovered(self, records):
+        """Добавляет найденные узлы; известный по таблице MAC не затирается пустым (ICMP и TCP его не дают)"""
+        merged = []
+        for record in records:
+            known = self.neighbors.get(record.ip)
+            if not record.mac and known is not None and known[1]:
+                record = record._replace(mac=known[1], interface=known[3] or record.interface)
+            merged.append(record)
+        conflicts = self.neighbors.add(merged)
+        self.update_topology(merged, self.arp_model.append_rows(self.neighbors.rows(merged)))
+        self.report_conflicts(conflicts)
+
+    def show_discovery_progress(self, progress):
+        self.discovery_progress.setValue(int(100 * progress.done / max(progress.total, 1)))
+        self.discovery_progress.setFormat(format_progress(progress))
+
+    def discovery_finished(self):
+        self.arp_output.appendPlainText(f"Обнаружение завершено: {self.discovery_progress.format()}")
+        self.discovery_job = None
+        self.discovery_button.blockSignals(True)
+        self.discovery_button.setChecked(False)
+        self.discovery_button.blockSignals(False)
 
     def visualize_network(self):
-        """Визуализирует структуру сети на основе данных ARP"""
-        G = nx.Graph()
-
-        for row in range(self.arp_table.rowCount()):
-            internet_address = self.arp_table.item(row, 0).text()
-            physical_address = self.arp_table.item(row, 1).text()
-            if internet_address and physical_address:
-                G.add_node(internet_address)
-                G.add_node(physical_address)
-                G.add_edge(internet_address, physical_address)
-
-        pos = nx.spring_layout(G, k=0.5, iterations=50)
-        plt.figure(figsize=(10, 6))
-        nx.draw(G, pos, with_labels=True, node_size=2000, node_color='lightblue', font_size=10, font_weight='bold',
-                edge_color='gray')
-        plt.title("Структура сети")
-        plt.show()
+        """Визуализирует структуру сети: соседи в своих сетях, интерфейсы, шлюзы и хопы из общей топологии"""
+        self.stop_layout()
+        self.arp_model.flush()
+        nodes, edges = self.topology.snapshot()
+        self.graph_view.set_graph(nodes, edges)
+        self.layout_progress.setValue(0)
+        if self.graph_layout is None:
+            # numpy загружается при первом показе графа, а не при запуске приложения
+            from src.GraphLayout import GraphLayout
+            self.graph_layout = GraphLayout()
+        self.layout_thread = LayoutThread(self.graph_layout, nodes, edges)
+        self.layout_thread.progress_signal.connect(self.layout_progress.setValue)
+        self.layout_thread.positions_signal.connect(self.show_positions)
+        self.layout_thread.error_signal.connect(self.arp_output.appendPlainText)
+        self.layout_thread.start()
+        self.reaper.track(self.layout_thread)
+
+    def show_positions(self, positions):
+        if self.sender() is self.layout_thread:
+            self.graph_view.set_positions(positions, scale=3 * self.graph_view.node_radius)
+
+    def stop_layout(self):
+        """Прерывает расчет раскладки; поток завершится в фоне, его результат будет отброшен"""
+        if self.layout_thread is not None:
+            self.reaper.retire(self.layout_thread, self.layout_thread.progress_signal,
+                               self.layout_thread.positions_signal, self.layout_thread.error_signal)
+            self.layout_thread = None
 
     def stop_command(self):
-        """Останавливает выполнение команды"""
-        if self.command_thread is not None:
-            self.command_thread.stop()
-            self.command_thread.wait()
-            self.command_thread = None
+        """Отменяет команды вкладки, не дожидаясь завершения потоков; обнаружение узлов продолжается"""
+        for job in self.executor.jobs(self):
+            if job is not self.discovery_job:
+                self.executor.cancel(job)
+
+    def show_batch_dialog(self):
+        """Показывает диалоговое окно для пакета изменений; пакет применяется целиком или откатывается"""
+        dialog = BatchDialog("Пакетное изменение ARP", "arp add 192.168.1.10 00-11-22-33-44-55\n"
+                                                       "arp delete 192.168.1.11")
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        operations, errors, rollback = dialog.get_data()
+        if errors:
+            self.arp_output.appendPlainText("\n".join(f"Строка {line}: {error}" for line, error in errors))
+            self.arp_output.appendPlainText("Пакет не применен: исправьте ошибки")
+            return
+        if not operations:
+            return
+        job = self.executor.submit(self, BatchThread(self.backend, operations, rollback), timeout=COMMAND_TIMEOUT)
+        job.lines_signal.connect(self.handle_output)
+        job.finished_signal.connect(self.refresh_neighbors)
+
+    def refresh_neighbors(self):
+        """Перечитывает таблицу после пакета; при наблюдении изменения придут сами"""
+        if self.watcher is None:
+            self.forget_neighbors()
+            self.start_command_thread(self.backend.list_neighbors())
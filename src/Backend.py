@@ -0,0 +1,309 @@
+import ipaddress
+import json
+import socket
+import subprocess
+import sys
+
+from src.KernelReader import KernelReader
+from src.Records import RouteRecord, NeighborRecord, InterfaceRecord, CommandSpec
+from src.Parsers import (parse_ping_line, parse_trace_line, parse_route_line, parse_ipconfig, NeighborParser,
+                         command_failed, BATCH_FAILED)
+
+def prefix_to_mask(prefix_len):
+    """Переводит длину префикса IPv4 в маску вида 255.255.255.0"""
+    return str(ipaddress.IPv4Network(f"0.0.0.0/{prefix_len}").netmask)
+
+
+class Backend:
+    """Команды и разбор их вывода для конкретной ОС.
+    Каждая операция возвращает CommandSpec, который вкладка передает в CommandThread"""
+
+    name = "base"
+    encoding = "utf-8"
+
+    def collect(self, spec):
+        """Выполняет команду синхронно и возвращает разобранные записи"""
+        if callable(spec.command):
+            return spec.command()
+        output = subprocess.run(spec.command, stdout=subprocess.PIPE, text=True, encoding=self.encoding,
+                                errors='replace', check=False).stdout
+        return self.parse_output(spec, output.splitlines())
+
+    def parse_output(self, spec, lines):
+        """Разбирает строки вывода команды парсерами CommandSpec (в том числе записанный вывод)"""
+        records = []
+        if spec.line_parser is not None:
+            records = [record for record in map(spec.line_parser, lines) if record is not None]
+        if spec.output_parser is not None:
+            records.extend(spec.output_parser(lines))
+        return records
+
+    def run(self, command, input=None):
+        """Выполняет команду и возвращает (код возврата, вывод вместе с ошибками)"""
+        result = subprocess.run(command, input=input, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                encoding=self.encoding, errors='replace', check=False)
+        return result.returncode, result.stdout
+
+    def operation_spec(self, operation):
+        """CommandSpec для одной операции пакета (Operation из BatchMutator)"""
+        if operation.kind == "route":
+            if operation.action == "delete":
+                return self.delete_route(operation.address, operation.mask)
+            method = self.add_route if operation.action == "add" else self.change_route
+            return method(operation.address, operation.mask, operation.gateway, operation.metric, operation.interface)
+        if operation.action == "delete":
+            return self.delete_neighbor(operation.address, operation.interface)
+        return self.add_neighbor(operation.address, operation.mac, operation.interface)
+
+    def apply_batch(self, operations, stop_event=None):
+        """Выполняет операции по порядку до первой ошибки, по процессу на операцию.
+        Возвращает [(успех, сообщение)] для выполненных операций"""
+        results = []
+        for operation in operations:
+            if stop_event is not None and stop_event.is_set():
+                break
+            try:
+                code, output = self.run(self.operation_spec(operation).command)
+            except OSError as e:
+                code, output = -1, str(e)
+            ok = code == 0 and not command_failed(output)
+            results.append((ok, output.strip()))
+            if not ok:
+                break
+        return results
+
+    def subscribe(self, kind):
+        """Возвращает сокет с уведомлениями ядра об изменениях ("routes", "neighbors")
+        или None, если их нет и остается только периодический опрос"""
+        return None
+
+    def list_routes(self):
+        raise NotImplementedError
+
+    def list_neighbors(self, params=None):
+        raise NotImplementedError
+
+    def list_interfaces(self, params=None):
+        raise NotImplementedError
+
+    def ping(self, target, params=None):
+        raise NotImplementedError
+
+    def trace(self, target, params=None):
+        raise NotImplementedError
+
+    def add_route(self, destination, mask, gateway, metric=None, interface=None):
+        raise NotImplementedError
+
+    def change_route(self, destination, mask, gateway, metric=None, interface=None):
+        raise NotImplementedError
+
+    def delete_route(self, destination, mask=None):
+        raise NotImplementedError
+
+    def add_neighbor(self, ip, mac, interface=None):
+        raise NotImplementedError
+
+    def delete_neighbor(self, ip, interface=None):
+        raise NotImplementedError
+
+
+class WindowsBackend(Backend):
+    """Стандартные утилиты Windows: route, arp, ipconfig, ping, tracert"""
+
+    name = "windows"
+    encoding = "cp866"
+
+    def list_routes(self):
+        return CommandSpec(["route", "print"], parse_route_line, None)
+
+    def list_neighbors(self, params=None):
+        # Заголовки "Интерфейс:" относятся к следующим строкам, поэтому у каждой команды свой парсер
+        return CommandSpec(["arp"] + (params or "-a").split(), NeighborParser(), None)
+
+    def list_interfaces(self, params=None):
+        return CommandSpec(["ipconfig"] + (params or "/all").split(), None, parse_ipconfig)
+
+    def ping(self, target, params=None):
+        return CommandSpec(["ping"] + (params or "").split() + [target], parse_ping_line, None)
+
+    def trace(self, target, params=None):
+        return CommandSpec(["tracert"] + (params or "").split() + [target], parse_trace_line, None)
+
+    def add_route(self, destination, mask, gateway, metric=None, interface=None):
+        command = ["route", "add", destination, "MASK", mask, gateway]
+        if metric:
+            command += ["METRIC", str(metric)]
+        if interface:
+            command += ["IF", str(interface)]
+        return CommandSpec(command, None, None)
+
+    def change_route(self, destination, mask, gateway, metric=None, interface=None):
+        command = ["route", "change", destination, "mask", mask, gateway]
+        if metric:
+            command += ["metric", str(metric)]
+        if interface:
+            command += ["if", str(interface)]
+        return CommandSpec(command, None, None)
+
+    def delete_route(self, destination, mask=None):
+        return CommandSpec(["route", "delete", destination], None, None)
+
+    def add_neighbor(self, ip, mac, interface=None):
+        return CommandSpec(["arp", "-S", ip, mac] + ([interface] if interface else []), None, None)
+
+    def delete_neighbor(self, ip, interface=None):
+        return CommandSpec(["arp", "-d", ip] + ([interface] if interface else []), None, None)
+
+
+class LinuxBackend(Backend):
+    """Данные ядра из procfs/sysfs/rtnetlink без запуска процессов; если нужны
+    дополнительные параметры, используется iproute2 с выводом в JSON"""
+
+    name = "linux"
+    encoding = "utf-8"
+
+    def __init__(self, reader=None):
+        self.reader = reader or KernelReader()
+
+    def list_routes(self):
+        if self.reader.available() or hasattr(socket, "AF_NETLINK"):
+            return CommandSpec(self.reader.read_all_routes, None, None)
+        return CommandSpec(["ip", "-json", "-4", "route", "show"], None, self.parse_routes)
+
+    def parse_routes(self, lines):
+        """Разбирает ip -json route; у IPv6 маска остается длиной префикса, как в KernelReader"""
+        records = []
+        for route in self.load_json(lines):
+            dst = route.get("dst", "")
+            ipv6 = ":" in dst or ":" in route.get("gateway", "")
+            if dst == "default":
+                dst = "::/0" if ipv6 else "0.0.0.0/0"
+            network, _, prefix = dst.partition("/")
+            if not prefix:
+                prefix = "128" if ipv6 else "32"
+            records.append(RouteRecord(network, prefix if ipv6 else prefix_to_mask(prefix),
+                                       route.get("gateway", "On-link"), route.get("dev", ""),
+                                       int(route.get("metric", 0))))
+        return records
+
+    def list_neighbors(self, params=None):
+        if not params and self.reader.available():
+            return CommandSpec(self.reader.read_neighbors, None, None)
+        return CommandSpec(["ip", "-json", "neigh", "show"] + (params or "").split(), None, self.parse_neighbors)
+
+    def parse_neighbors(self, lines):
+        records = []
+        for neighbor in self.load_json(lines):
+            state = neighbor.get("state", [])
+            records.append(NeighborRecord(neighbor.get("dst", ""), neighbor.get("lladdr", ""),
+                                          ",".join(state).lower() if isinstance(state, list) else str(state),
+                                          neighbor.get("dev")))
+        return records
+
+    def list_interfaces(self, params=None):
+        if not params and self.reader.available():
+            return CommandSpec(self.reader.read_interfaces, None, None)
+        return CommandSpec(["ip", "-json", "addr", "show"] + (params or "").split(), None, self.parse_interfaces)
+
+    def parse_interfaces(self, lines):
+        records = []
+        for link in self.load_json(lines):
+            addresses = [f"{info['local']}/{info['prefixlen']}" for info in link.get("addr_info", [])
+                         if "local" in info]
+            details = [f"Интерфейс: {link.get('ifname', '')}",
+                       f"Физический адрес: {link.get('address', '')}",
+                       f"MTU: {link.get('mtu', '')}",
+                       f"Состояние: {link.get('operstate', '')}"]
+            details += [f"Адрес: {address}" for address in addresses]
+            records.append(InterfaceRecord(link.get("ifname", ""), link.get("address"), addresses,
+                                           link.get("mtu"), link.get("operstate"), details))
+        return records
+
+    def ping(self, target, params=None):
+        return CommandSpec(["ping"] + (params or "-c 4").split() + [target], parse_ping_line, None)
+
+    def trace(self, target, params=None):
+        return CommandSpec(["traceroute"] + (params or "-n").split() + [target], parse_trace_line, None)
+
+    def _route_command(self, action, destination, mask, gateway, metric, interface):
+        mask = (mask or "").strip()
+        if not mask and action == "del":
+            # Без маски ip route del удалил бы маршрут узла /32, а не тот, что имел в виду пользователь
+            raise ValueError("для удаления маршрута укажите маску")
+        if ":" in destination:
+            prefix = int(mask) if mask else 128
+        else:
+            prefix = ipaddress.IPv4Network(f"0.0.0.0/{mask}").prefixlen if mask else 32
+        command = ["ip", "route", action, f"{destination}/{prefix}"]
+        if gateway:
+            command += ["via", gateway]
+        if metric:
+            command += ["metric", str(metric)]
+        if interface:
+            command += ["dev", interface]
+        return CommandSpec(command, None, None)
+
+    def add_route(self, destination, mask, gateway, metric=None, interface=None):
+        return self._route_command("add", destination, mask, gateway, metric, interface)
+
+    def change_route(self, destination, mask, gateway, metric=None, interface=None):
+        return self._route_command("replace", destination, mask, gateway, metric, interface)
+
+    def delete_route(self, destination, mask=None):
+        return self._route_command("del", destination, mask, None, None, None)
+
+    def add_neighbor(self, ip, mac, interface=None):
+        if interface is None:
+            # Без интерфейса iproute2 не примет запись, net-tools подберет его сам
+            return CommandSpec(["arp", "-s", ip, mac], None, None)
+        return CommandSpec(["ip", "neigh", "replace", ip, "lladdr", mac, "nud", "permanent", "dev", interface],
+                           None, None)
+
+    def delete_neighbor(self, ip, interface=None):
+        if interface is None:
+            return CommandSpec(["arp", "-d", ip], None, None)
+        return CommandSpec(["ip", "neigh", "del", ip, "dev", interface], None, None)
+
+    def apply_batch(self, operations, stop_event=None):
+        """Все операции одним процессом ip -batch: iproute2 выполняет строки по порядку
+        и останавливается на первой ошибке, сообщая ее номер"""
+        lines = []
+        for operation in operations:
+            command = self.operation_spec(operation).command
+            if command[0] != "ip":
+                # Запись ARP без интерфейса ставит net-tools, ее не выразить строкой ip -batch
+                return super().apply_batch(operations, stop_event)
+            lines.append(" ".join(command[1:]))
+        if not lines:
+            return []
+        try:
+            code, output = self.run(["ip", "-batch", "-"], "\n".join(lines) + "\n")
+        except OSError as e:
+            return [(False, str(e))]
+        if code == 0:
+            return [(True, "")] * len(lines)
+        match = BATCH_FAILED.search(output)
+        failed = min(int(match.group(1)), len(lines)) - 1 if match else 0
+        return [(True, "")] * failed + [(False, (output[:match.start()] if match else output).strip())]
+
+    def subscribe(self, kind):
+        try:
+            return self.reader.netlink_subscribe(kind)
+        except (OSError, AttributeError, KeyError):
+            return None
+
+    def load_json(self, lines):
+        text = "\n".join(lines).strip()
+        return json.loads(text) if text else []
+
+
+_backend = None
+
+
+def get_backend():
+    """Возвращает бэкенд для текущей платформы"""
+    global _backend
+    if _backend is None:
+        _backend = WindowsBackend() if sys.platform.startswith("win") else LinuxBackend()
+    return _backend
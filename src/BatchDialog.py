@@ -0,0 +1,44 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QPushButton, QCheckBox, QLabel,
+                             QFileDialog)
+
+from src.BatchMutator import SYNTAX, parse_operations
+
+
+class BatchDialog(QDialog):
+    """Диалоговое окно для ввода пакета изменений: по операции на строку"""
+
+    def __init__(self, title, example=""):
+        super().__init__()
+        self.setWindowTitle(title)
+        self.resize(600, 400)
+        self.text_input = QPlainTextEdit()
+        self.text_input.setPlaceholderText(example)
+        self.rollback_check = QCheckBox("Откатить при ошибке")
+        self.rollback_check.setChecked(True)
+
+        self.file_button = QPushButton("Из файла...")
+        self.file_button.clicked.connect(self.load_file)
+        self.submit_button = QPushButton("Применить")
+        self.submit_button.clicked.connect(self.accept)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(SYNTAX))
+        layout.addWidget(self.text_input)
+        layout.addWidget(self.rollback_check)
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.file_button)
+        buttons.addWidget(self.submit_button)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+
+    def load_file(self):
+        """Загружает пакет из текстового файла"""
+        path, _ = QFileDialog.getOpenFileName(self, "Пакет изменений", "", "Текстовые файлы (*.txt);;Все файлы (*)")
+        if path:
+            with open(path, encoding="utf-8") as file:
+                self.text_input.setPlainText(file.read())
+
+    def get_data(self):
+        """Возвращает (операции, ошибки разбора, откатывать ли при ошибке)"""
+        operations, errors = parse_operations(self.text_input.toPlainText().splitlines())
+        return operations, errors, self.rollback_check.isChecked()
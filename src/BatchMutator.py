@@ -0,0 +1,205 @@
+import collections
+
+from src.Parsers import is_ip_address, is_mac_address, normalize_mac
+from src.RouteIndex import RouteIndex, BITS, parse_address, parse_prefix
+
+# Операция пакета: kind - "route" или "arp", action - "add", "change" или "delete".
+# Для ARP address - IP соседа, для маршрута - сеть назначения; line - номер строки в исходном тексте
+Operation = collections.namedtuple("Operation", ["kind", "action", "address", "mask", "gateway", "mac", "metric",
+                                                 "interface", "line"],
+                                   defaults=(None, None, None, None, None, 0))
+# Результат операции: ok - True (выполнена), False (ошибка) или None (не выполнялась)
+OperationResult = collections.namedtuple("OperationResult", ["operation", "ok", "message"])
+
+SYNTAX = """Формат строк (пустые строки и комментарии # пропускаются):
+  route add|change СЕТЬ МАСКА ШЛЮЗ [metric N] [if ИНТЕРФЕЙС]
+  route delete СЕТЬ [МАСКА]
+  arp add IP MAC [if ИНТЕРФЕЙС]
+  arp delete IP [if ИНТЕРФЕЙС]"""
+
+ON_LINK = ("", "on-link")
+
+
+def parse_operation(text, line=0):
+    """Строка пакета -> Operation; при ошибке ValueError с описанием"""
+    words = text.split()
+    if len(words) < 3:
+        raise ValueError("слишком мало полей")
+    kind, action = words[0].lower(), words[1].lower()
+    if kind not in ("route", "arp") or action not in ("add", "change", "delete"):
+        raise ValueError(f"неизвестная операция: {words[0]} {words[1]}")
+    if kind == "arp" and action == "change":
+        raise ValueError("для ARP используйте add: запись заменяется")
+    positional = []
+    options = {}
+    rest = words[2:]
+    i = 0
+    while i < len(rest):
+        word = rest[i].lower()
+        if word in ("metric", "if") and i + 1 < len(rest):
+            options[word] = rest[i + 1]
+            i += 2
+        else:
+            positional.append(rest[i])
+            i += 1
+
+    address = positional[0]
+    if not is_ip_address(address):
+        raise ValueError(f"неверный IP-адрес: {address}")
+    interface = options.get("if")
+    if kind == "arp":
+        if action == "delete":
+            return Operation(kind, action, address, interface=interface, line=line)
+        if len(positional) < 2 or not is_mac_address(positional[1]):
+            raise ValueError(f"неверный MAC-адрес: {positional[1] if len(positional) > 1 else ''}")
+        return Operation(kind, action, address, mac=normalize_mac(positional[1]), interface=interface, line=line)
+
+    mask = positional[1] if len(positional) > 1 else "255.255.255.255"
+    try:
+        version, length, key = parse_prefix(address, mask)
+    except (OSError, ValueError):
+        raise ValueError(f"неверная маска: {mask}")
+    if key << (BITS[version] - length) != parse_address(address)[1]:
+        raise ValueError(f"адрес {address} не совпадает с началом сети по маске {mask}")
+    if action == "delete":
+        return Operation(kind, action, address, mask, line=line)
+    if len(positional) < 3 or not is_ip_address(positional[2]):
+        raise ValueError(f"неверный шлюз: {positional[2] if len(positional) > 2 else ''}")
+    try:
+        metric = int(options.get("metric", 0))
+    except ValueError:
+        raise ValueError(f"неверная метрика: {options['metric']}")
+    return Operation(kind, action, address, mask, positional[2], metric=metric, interface=interface, line=line)
+
+
+def parse_operations(lines):
+    """Разбирает и проверяет весь пакет заранее: (операции, [(номер строки, ошибка)])"""
+    operations = []
+    errors = []
+    for number, text in enumerate(lines, 1):
+        text = text.split("#", 1)[0].strip()
+        if not text:
+            continue
+        try:
+            operations.append(parse_operation(text, number))
+        except ValueError as e:
+            errors.append((number, str(e)))
+    return operations, errors
+
+
+class BatchMutator:
+    """Применяет пакет изменений маршрутов и записей ARP одним проходом.
+    Перед применением снимаются нужные таблицы: по ним для каждой операции заранее строится обратная,
+    и при ошибке выполненные операции откатываются в обратном порядке"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def snapshot(self, operations):
+        """Текущие маршруты и соседи - только те таблицы, которые затрагивает пакет"""
+        kinds = {operation.kind for operation in operations}
+        need_routes = "route" in kinds or (self.backend.name == "linux" and "arp" in kinds)
+        routes = self.backend.collect(self.backend.list_routes()) if need_routes else []
+        neighbors = self.backend.collect(self.backend.list_neighbors()) if "arp" in kinds else []
+        return routes, neighbors
+
+    def prepare(self, operations, routes):
+        """Дополняет операции ARP интерфейсом из таблицы маршрутов: iproute2 без него запись не примет,
+        а с ним весь пакет уходит одной командой ip -batch"""
+        if self.backend.name != "linux":
+            return operations
+        index = RouteIndex(routes)
+        prepared = []
+        for operation in operations:
+            if operation.kind == "arp" and not operation.interface:
+                route = index.lookup(operation.address)
+                if route is not None and route.interface:
+                    operation = operation._replace(interface=route.interface)
+            prepared.append(operation)
+        return prepared
+
+    def inverse(self, operation, routes, neighbors):
+        """Операции, возвращающие состояние до operation"""
+        if operation.kind == "arp":
+            previous = [neighbor for neighbor in neighbors if neighbor.ip == operation.address and neighbor.mac
+                        and operation.interface in (None, neighbor.interface)]
+            if previous:
+                neighbor = previous[0]
+                return [Operation("arp", "add", neighbor.ip, mac=neighbor.mac,
+                                  interface=neighbor.interface or operation.interface, line=operation.line)]
+            if operation.action == "add":
+                return [Operation("arp", "delete", operation.address, interface=operation.interface,
+                                  line=operation.line)]
+            return []
+
+        _, length, key = parse_prefix(operation.address, operation.mask)
+        previous = []
+        for route in routes:
+            try:
+                if parse_prefix(route.destination, route.mask)[1:] == (length, key):
+                    previous.append(route)
+            except (OSError, ValueError):
+                continue
+        restore = [Operation("route", "add", route.destination, route.mask,
+                             None if str(route.gateway).lower() in ON_LINK else route.gateway,
+                             metric=route.metric,
+                             # Интерфейс в выводе route print - это адрес, а не номер, поэтому его не передаем
+                             interface=route.interface if self.backend.name == "linux" else None,
+                             line=operation.line)
+                   for route in previous]
+        if operation.action == "add":
+            return [Operation("route", "delete", operation.address, operation.mask, line=operation.line)]
+        if operation.action == "change":
+            delete = Operation("route", "delete", operation.address, operation.mask, line=operation.line)
+            return [delete] + restore
+        return restore
+
+    def apply(self, operations, rollback=True, stop_event=None):
+        """Применяет операции; возвращает (результаты по операциям, результаты отката)"""
+        routes, neighbors = self.snapshot(operations)
+        operations = self.prepare(operations, routes)
+        inverses = [self.inverse(operation, routes, neighbors) for operation in operations]
+        outcome = self.backend.apply_batch(operations, stop_event)
+        results = [OperationResult(operation, ok, message)
+                   for operation, (ok, message) in zip(operations, outcome)]
+        results += [OperationResult(operation, None, "не выполнялась") for operation in operations[len(outcome):]]
+
+        rolled_back = []
+        if rollback and not all(result.ok for result in results):
+            # Откат идет с последней выполненной операции и не останавливается на ошибках:
+            # после сбойной операции пакет продолжается со следующей
+            undo = [operation for inverse, result in reversed(list(zip(inverses, results))) if result.ok
+                    for operation in inverse]
+            while undo:
+                outcome = self.backend.apply_batch(undo) or [(False, "не выполнялась")]
+                rolled_back += [OperationResult(operation, ok, message)
+                                for operation, (ok, message) in zip(undo, outcome)]
+                undo = undo[len(outcome):]
+        return results, rolled_back
+
+
+def format_operation(operation):
+    """Операция в виде строки пакета"""
+    words = [operation.kind, operation.action, operation.address]
+    if operation.kind == "arp":
+        words += [operation.mac] if operation.mac else []
+    else:
+        words += [operation.mask] + ([operation.gateway] if operation.gateway else [])
+        words += ["metric", str(operation.metric)] if operation.metric else []
+    words += ["if", operation.interface] if operation.interface else []
+    return " ".join(words)
+
+
+def format_results(results, rolled_back):
+    """Журнал применения пакета: строка на операцию и на каждую операцию отката"""
+    states = {True: "выполнено", False: "ошибка", None: "не выполнялась"}
+    lines = []
+    for result in results:
+        line = f"Строка {result.operation.line}: {format_operation(result.operation)} - {states[result.ok]}"
+        lines.append(f"{line}: {result.message}" if result.ok is False and result.message else line)
+    if rolled_back:
+        failed = sum(1 for result in rolled_back if not result.ok)
+        lines.append(f"Откат: {len(rolled_back)} операций" + (f", ошибок {failed}" if failed else ""))
+        lines += [f"  {format_operation(result.operation)}: {result.message or 'ошибка'}"
+                  for result in rolled_back if not result.ok]
+    return lines
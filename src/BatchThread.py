@@ -0,0 +1,38 @@
+import threading
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from src.BatchMutator import BatchMutator, format_results
+
+
+class BatchThread(QThread):
+    """Применяет пакет изменений маршрутов и ARP вне потока GUI.
+    records_signal передает результаты по операциям, lines_signal - журнал"""
+
+    lines_signal = pyqtSignal(list)
+    records_signal = pyqtSignal(list)
+    finished_signal = pyqtSignal()
+
+    def __init__(self, backend, operations, rollback=True):
+        super().__init__()
+        self.mutator = BatchMutator(backend)
+        self.operations = list(operations)
+        self.rollback = rollback
+        self.title = f"Пакет изменений ({len(self.operations)})"
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            results, rolled_back = self.mutator.apply(self.operations, self.rollback, self._stop_event)
+        except OSError as e:
+            self.lines_signal.emit([f"Ошибка: {e}"])
+        else:
+            self.records_signal.emit(results)
+            lines = format_results(results, rolled_back)
+            done = sum(1 for result in results if result.ok)
+            lines.append(f"Выполнено операций: {done} из {len(results)}")
+            self.lines_signal.emit(lines)
+        self.finished_signal.emit()
+
+    def stop(self):
+        """Невыполненные операции пакета пропускаются; запущенный процесс доработает сам"""
+        self._stop_event.set()
@@ -0,0 +1,193 @@
+import collections
+import itertools
+import time
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+# Состояния задачи
+QUEUED = "в очереди"
+RUNNING = "выполняется"
+FINISHED = "завершена"
+CANCELLED = "отменена"
+TIMED_OUT = "превышено время"
+
+# Таймаут для команд бэкенда (route, arp, ipconfig), с
+COMMAND_TIMEOUT = 120
+
+# Сигналы потоков, которые задача передает дальше (у каждого потока есть только часть из них)
+RELAYED_SIGNALS = ("lines_signal", "records_signal", "result_signal", "stats_signal", "hops_signal",
+                   "error_signal")
+
+
+class Job(QObject):
+    """Задача исполнителя: поток плюс состояние и время выполнения.
+    Вкладки подключаются к сигналам задачи, а не потока: после отмены пачки,
+    уже отправленные потоком, отбрасываются и не попадают в обновленную таблицу"""
+
+    lines_signal = pyqtSignal(list)
+    records_signal = pyqtSignal(list)
+    result_signal = pyqtSignal(object)
+    stats_signal = pyqtSignal(object)
+    hops_signal = pyqtSignal(list)
+    error_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal()
+
+    _ids = itertools.count(1)
+
+    def __init__(self, owner, thread, title="", timeout=None, serial=True):
+        super().__init__()
+        self.id = next(self._ids)
+        self.owner = owner
+        self.thread = thread
+        self.title = title or getattr(thread, "title", type(thread).__name__)
+        self.timeout = timeout
+        self.serial = serial
+        self.state = QUEUED
+        self.created = time.monotonic()
+        self.started = None
+        self.finished = None
+        for name in RELAYED_SIGNALS:
+            if hasattr(thread, name):
+                getattr(thread, name).connect(self._relay(name))
+
+    def _relay(self, name):
+        target = getattr(self, name)
+
+        def relay(*args):
+            if self.state in (QUEUED, RUNNING):
+                target.emit(*args)
+        return relay
+
+    @property
+    def active(self):
+        return self.state in (QUEUED, RUNNING)
+
+    @property
+    def duration(self):
+        """Время выполнения в секундах (для незавершенной задачи - на текущий момент)"""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def wait_time(self):
+        """Сколько задача простояла в очереди"""
+        return (self.started or time.monotonic()) - self.created
+
+
+class CommandExecutor(QObject):
+    """Общий исполнитель команд для всех вкладок.
+    У каждой вкладки своя очередь: обычные задачи вкладки выполняются по порядку (serial),
+    а независимые (пинги, трассировки) идут параллельно. Число одновременно работающих потоков
+    ограничено для всего приложения. Отмена и таймаут не ждут поток в потоке GUI:
+    поток получает команду остановиться (процесс убивается вместе с группой), а завершение
+    обрабатывается по его сигналу finished"""
+
+    jobs_signal = pyqtSignal()
+
+    HISTORY = 200
+
+    def __init__(self, max_running=8):
+        super().__init__()
+        self.max_running = max_running
+        self.queues = collections.OrderedDict()
+        self.running = []
+        self.history = collections.deque(maxlen=self.HISTORY)
+
+    def submit(self, owner, thread, title="", timeout=None, serial=True):
+        """Ставит поток в очередь вкладки owner и возвращает задачу.
+        Сигналы задачи доставляются через цикл событий, поэтому к ним можно подключиться сразу после вызова"""
+        job = Job(owner, thread, title, timeout, serial)
+        thread.finished.connect(lambda: self._on_finished(job))
+        self.queues.setdefault(owner, collections.deque()).append(job)
+        self.history.append(job)
+        self._schedule()
+        return job
+
+    def _schedule(self):
+        """Запускает задачи, пока есть свободные места; очереди вкладок обходятся по кругу"""
+        while len(self.running) < self.max_running:
+            job = self._next_job()
+            if job is None:
+                break
+            job.state = RUNNING
+            job.started = time.monotonic()
+            self.running.append(job)
+            if job.timeout:
+                QTimer.singleShot(int(job.timeout * 1000), lambda job=job: self._on_timeout(job))
+            job.thread.start()
+        self.jobs_signal.emit()
+
+    def _next_job(self):
+        busy = {job.owner for job in self.running if job.serial}
+        for owner in list(self.queues):
+            queue = self.queues[owner]
+            if not queue:
+                del self.queues[owner]
+                continue
+            if queue[0].serial and owner in busy:
+                continue
+            job = queue.popleft()
+            # Вкладка, получившая место, уходит в конец круга
+            self.queues.move_to_end(owner)
+            return job
+        return None
+
+    def _on_finished(self, job):
+        if job in self.running:
+            self.running.remove(job)
+        job.finished = time.monotonic()
+        if job.state == RUNNING:
+            job.state = FINISHED
+        if job.state in (FINISHED, TIMED_OUT):
+            job.finished_signal.emit()
+        self._schedule()
+
+    def _on_timeout(self, job):
+        if job.state != RUNNING:
+            return
+        job.state = TIMED_OUT
+        message = f"Команда прервана: превышено время выполнения ({job.timeout:g} с)"
+        if hasattr(job.thread, "error_signal"):
+            job.error_signal.emit(message)
+        else:
+            job.lines_signal.emit([message])
+        job.thread.stop()
+
+    def cancel(self, job):
+        """Отменяет задачу, не дожидаясь остановки потока"""
+        if job.state == QUEUED:
+            self.queues.get(job.owner, ()).remove(job)
+            job.state = CANCELLED
+            job.finished = time.monotonic()
+            self.jobs_signal.emit()
+        elif job.state == RUNNING:
+            job.state = CANCELLED
+            job.thread.stop()
+
+    def cancel_owner(self, owner):
+        """Отменяет все задачи вкладки"""
+        for job in list(self.queues.get(owner, ())) + [job for job in self.running if job.owner is owner]:
+            self.cancel(job)
+
+    def jobs(self, owner=None):
+        """Активные задачи (всех вкладок или одной)"""
+        queued = [job for queue in self.queues.values() for job in queue]
+        return [job for job in self.running + queued if owner is None or job.owner is owner]
+
+    def shutdown(self):
+        """Отменяет все задачи и дожидается потоков (при закрытии приложения)"""
+        for owner in list(self.queues) + [job.owner for job in self.running]:
+            self.cancel_owner(owner)
+        for job in list(self.running):
+            job.thread.wait()
+
+
+_executor = None
+
+
+def get_executor():
+    """Общий исполнитель команд приложения"""
+    global _executor
+    if _executor is None:
+        _executor = CommandExecutor()
+    return _executor
@@ -1,32 +1,148 @@
+import os
+import queue
+import signal
 import subprocess
+import sys
+import threading
+import time
 from PyQt5.QtCore import QThread, pyqtSignal
 
 
 class CommandThread(QThread):
-    output_signal = pyqtSignal(str)
+    lines_signal = pyqtSignal(list)
+    records_signal = pyqtSignal(list)
     finished_signal = pyqtSignal()
 
-    def __init__(self, command):
+    READER_BATCH = 10000
+
+    def __init__(self, command, parser=None, output_parser=None, flush_interval=0.05, flush_bytes=64 * 1024,
+                 encoding='cp866'):
         super().__init__()
         self.command = command
+        self.parser = parser
+        self.output_parser = output_parser
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.encoding = encoding
+        self.title = ""
+        self.process = None
+        self.returncode = None
         self._is_running = True
 
     def run(self):
-        """Выполняет команду и передает вывод через сигнал"""
+        """Выполняет команду и передает вывод пачками строк через сигнал"""
+        if callable(self.command):
+            self._run_reader()
+            return
+        lines = []
+        records = []
+        output = []
+        size = 0
         try:
-            process = subprocess.Popen(self.command, stdout=subprocess.PIPE, text=True, encoding='cp866')
-            for line in process.stdout:
+            # Своя группа процессов, чтобы при отмене завершить и дочерние процессы команды
+            if sys.platform == "win32":
+                group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+            else:
+                group = {"start_new_session": True}
+            process = self.process = subprocess.Popen(self.command, stdout=subprocess.PIPE, text=True,
+                                                      encoding=self.encoding, errors='replace', **group)
+            if not self._is_running:
+                self.kill()
+            pipe = queue.Queue()
+            reader = threading.Thread(target=self._read_lines, args=(process.stdout, pipe), daemon=True)
+            reader.start()
+
+            deadline = time.monotonic() + self.flush_interval
+            while True:
                 if not self._is_running:
-                    process.terminate()
                     break
-                self.output_signal.emit(line)
-            process.stdout.close()
-            process.wait()
+                try:
+                    line = pipe.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    line = ""
+                if line is None:
+                    break
+                if line:
+                    line = line.rstrip("\r\n")
+                    lines.append(line)
+                    size += len(line)
+                    if self.output_parser is not None:
+                        output.append(line)
+                    if self.parser is not None:
+                        record = self.parser(line)
+                        if record is not None:
+                            records.append(record)
+                # Пачка уходит по истечении интервала или при превышении объема
+                if size >= self.flush_bytes or time.monotonic() >= deadline:
+                    self._flush(lines, records)
+                    lines, records, size = [], [], 0
+                    deadline = time.monotonic() + self.flush_interval
+            self.returncode = process.wait()
+            if self.output_parser is not None and self._is_running:
+                # Вывод, который разбирается только целиком (например, JSON)
+                records.extend(self.output_parser(output))
         except Exception as e:
-            self.output_signal.emit(f"Ошибка: {e}")
+            lines.append(f"Ошибка: {e}")
         finally:
+            self._flush(lines, records)
             self.finished_signal.emit()
 
+    def _run_reader(self):
+        """Вызывает читатель данных ядра вместо процесса и отдает записи пачками"""
+        lines = []
+        try:
+            records = self.command()
+            for start in range(0, len(records), self.READER_BATCH):
+                if not self._is_running:
+                    break
+                self.records_signal.emit(records[start:start + self.READER_BATCH])
+            lines.append(f"Прочитано записей: {len(records)}")
+        except Exception as e:
+            lines.append(f"Ошибка: {e}")
+        finally:
+            self._flush(lines, [])
+            self.finished_signal.emit()
+
+    @classmethod
+    def from_spec(cls, spec, encoding):
+        """Создает поток для команды, описанной бэкендом"""
+        thread = cls(spec.command, parser=spec.line_parser, output_parser=spec.output_parser, encoding=encoding)
+        thread.title = getattr(spec.command, "__name__", None) or " ".join(spec.command)
+        return thread
+
+    def _read_lines(self, stream, pipe):
+        """Читает stdout в отдельном потоке, чтобы молчащий процесс не блокировал сброс пачек"""
+        try:
+            for line in stream:
+                pipe.put(line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            stream.close()
+            pipe.put(None)
+
+    def _flush(self, lines, records):
+        if lines:
+            self.lines_signal.emit(lines)
+        if records:
+            self.records_signal.emit(records)
+
+    def kill(self):
+        """Завершает процесс команды вместе с его группой"""
+        process = self.process
+        if process is None or process.poll() is not None:
+            return
+        try:
+            if sys.platform == "win32":
+                # taskkill завершает все дерево процессов; его не ждем, чтобы не блокировать вызывающий поток
+                subprocess.Popen(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            else:
+                os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
     def stop(self):
-        """Останавливает выполнение потока"""
-        self._is_running = False
\ No newline at end of file
+        """Останавливает выполнение потока, не дожидаясь его завершения"""
+        self._is_running = False
+        self.kill()
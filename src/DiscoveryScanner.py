@@ -0,0 +1,491 @@
+import asyncio
+import collections
+import errno
+import hashlib
+import ipaddress
+import json
+import os
+import socket
+import struct
+import sys
+import time
+
+from src.ProbeEngine import build_echo_request, ICMP_ECHO_REPLY
+from src.Records import NeighborRecord
+
+# Файл контрольной точки: прерванное обнаружение продолжается с места остановки
+DEFAULT_CHECKPOINT = os.path.join(os.path.expanduser("~"), ".nat-lab", "discovery.json")
+CHECKPOINT_INTERVAL = 1.0
+
+# Порты для TCP-connect: ответ SYN-ACK или RST означает, что узел есть
+COMMON_PORTS = (80, 443, 22, 445, 139, 3389)
+METHODS = ("auto", "arp", "icmp", "tcp")
+
+# Управление скоростью: рост в RATE_GROWTH раз за окно без потерь, уменьшение вдвое при потерях
+INITIAL_RATE = 1000
+MIN_RATE = 50
+MAX_RATE = 20000
+RATE_WINDOW = 0.25
+RATE_GROWTH = 1.25
+IN_FLIGHT = 2048
+# Одновременных соединений TCP: каждое - дескриптор, часть лимита процесса остается приложению
+TCP_SOCKETS = 4096
+
+# Буфер отправки ICMP-сокета (ядро ограничит его net.core.wmem_max)
+SEND_BUFFER = 4 * 1024 * 1024
+
+ETH_P_ARP = 0x0806
+BROADCAST_MAC = b"\xff" * 6
+# Ошибки отправки, означающие переполнение очереди, а не недоступность узла
+CONGESTION_ERRORS = (errno.ENOBUFS, errno.EAGAIN, errno.EWOULDBLOCK)
+
+DiscoveryProgress = collections.namedtuple("DiscoveryProgress", ["done", "total", "found", "rate", "method"])
+
+
+class RateController:
+    """Темп отправки проб с подстройкой по потерям: за окно без потерь темп растет,
+    а ответ на повторную пробу или переполнение очереди отправки вдвое его снижают"""
+
+    def __init__(self, rate=INITIAL_RATE, minimum=MIN_RATE, maximum=MAX_RATE, hold=1.0):
+        self.rate = float(rate)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.next_time = time.monotonic()
+        self.window_start = self.next_time
+        self.window_sent = 0
+        self.window_losses = 0
+        # О потере становится известно через таймаут пробы: столько же после снижения темпа
+        # потери относятся к пробам, отправленным еще со старым темпом, и не снижают его повторно
+        self.hold = hold
+        self.hold_until = 0.0
+
+    async def acquire(self):
+        """Ждет своей очереди на отправку"""
+        now = time.monotonic()
+        if self.next_time > now:
+            await asyncio.sleep(self.next_time - now)
+            now = time.monotonic()
+        # После пробуждения с опозданием допускается короткая пачка, чтобы выдержать средний темп
+        self.next_time = max(self.next_time, now - 0.01) + 1.0 / self.rate
+        self.window_sent += 1
+        self.adjust(now)
+
+    def loss(self):
+        if time.monotonic() >= self.hold_until:
+            self.window_losses += 1
+
+    def adjust(self, now):
+        if now - self.window_start < RATE_WINDOW:
+            return
+        if self.window_losses:
+            self.rate = max(self.minimum, self.rate / 2)
+            self.hold_until = now + self.hold
+        elif self.window_sent >= self.rate * (now - self.window_start) / 2:
+            # Темп растет, только если его действительно выбирали: при упоре в число проб в полете
+            # или в процессор он не уходит вверх без проверки потерями
+            self.rate = min(self.maximum, self.rate * RATE_GROWTH)
+        self.window_start = now
+        self.window_sent = 0
+        self.window_losses = 0
+
+
+class _IcmpProber:
+    """Эхо-запросы через общий ICMP-сокет: датаграммный (без прав root, если разрешает ping_group_range)
+    или сырой, если датаграммный запрещен, а права есть"""
+
+    method = "icmp"
+
+    def __init__(self, loop):
+        self.loop = loop
+        try:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            self.raw = False
+        except OSError:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+            self.raw = True
+        # Запросы к несуществующим адресам своей сети ждут ARP в буфере сокета до 3 с:
+        # без запаса буфер переполняется уже на /22
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER)
+        except OSError:
+            pass
+        self.sock.setblocking(False)
+        self.waiters = {}
+        self.seq = 0
+        self.loop.add_reader(self.sock.fileno(), self._on_readable)
+
+    def _on_readable(self):
+        while True:
+            try:
+                data, address = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                # Ошибка ICMP из очереди сокета: она снята, читаем дальше
+                continue
+            # Сырой сокет отдает пакет вместе с заголовком IP
+            offset = (data[0] & 0x0F) * 4 if self.raw and data else 0
+            if len(data) >= offset + 8 and data[offset] == ICMP_ECHO_REPLY:
+                future = self.waiters.get(address[0])
+                if future is not None and not future.done():
+                    future.set_result("")
+
+    def send(self, address, future):
+        self.seq = (self.seq + 1) & 0xFFFF
+        self.waiters[address] = future
+        self.sock.sendto(build_echo_request(self.seq, b""), (address, 0))
+
+    def forget(self, address):
+        self.waiters.pop(address, None)
+
+    def close(self):
+        self.loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+
+
+class _ArpProber:
+    """ARP-запросы в сырой сокет интерфейса (Linux, нужны права root или CAP_NET_RAW).
+    Ответ сразу содержит MAC, и находятся узлы, закрытые от ICMP и TCP"""
+
+    method = "arp"
+
+    def __init__(self, loop, interface, source_mac, source_ip):
+        self.loop = loop
+        self.interface = interface
+        self.source_mac = bytes.fromhex(source_mac.replace(":", ""))
+        self.source_ip = socket.inet_aton(source_ip)
+        self.sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ARP))
+        self.sock.bind((interface, ETH_P_ARP))
+        self.sock.setblocking(False)
+        self.waiters = {}
+        self.loop.add_reader(self.sock.fileno(), self._on_readable)
+
+    def _on_readable(self):
+        while True:
+            try:
+                frame = self.sock.recv(2048)
+            except OSError:
+                return
+            # Ethernet (14 байт) + ARP: ответ (op 2) с MAC и IP отправителя
+            if len(frame) < 42 or frame[12:14] != b"\x08\x06" or frame[20:22] != b"\x00\x02":
+                continue
+            future = self.waiters.get(socket.inet_ntoa(frame[28:32]))
+            if future is not None and not future.done():
+                future.set_result(":".join(f"{byte:02x}" for byte in frame[22:28]))
+
+    def send(self, address, future):
+        self.waiters[address] = future
+        arp = struct.pack("!HHBBH6s4s6s4s", 1, 0x0800, 6, 4, 1, self.source_mac, self.source_ip, bytes(6),
+                          socket.inet_aton(address))
+        # Кадр дополняется до минимальных 60 байт Ethernet
+        self.sock.send((BROADCAST_MAC + self.source_mac + b"\x08\x06" + arp).ljust(60, b"\x00"))
+
+    def forget(self, address):
+        self.waiters.pop(address, None)
+
+    def close(self):
+        self.loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+
+
+class _TcpProber:
+    """TCP-connect к распространенным портам: узел есть, если хоть один порт ответил SYN-ACK или RST"""
+
+    method = "tcp"
+
+    def __init__(self, loop, ports=COMMON_PORTS):
+        self.loop = loop
+        self.ports = ports
+        self.tasks = {}
+        self.sockets = asyncio.Semaphore(socket_limit())
+
+    def send(self, address, future):
+        self.tasks[address] = self.loop.create_task(self._connect_any(address, future))
+
+    async def _connect_any(self, address, future):
+        attempts = [self.loop.create_task(self._connect(address, port)) for port in self.ports]
+        try:
+            for attempt in asyncio.as_completed(attempts):
+                if await attempt:
+                    if not future.done():
+                        future.set_result("")
+                    return
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    async def _connect(self, address, port):
+        async with self.sockets:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            try:
+                await self.loop.sock_connect(sock, (address, port))
+            except ConnectionRefusedError:
+                return True
+            except OSError:
+                return False
+            finally:
+                sock.close()
+            return True
+
+    def forget(self, address):
+        task = self.tasks.pop(address, None)
+        if task is not None:
+            task.cancel()
+
+    def close(self):
+        for task in self.tasks.values():
+            task.cancel()
+        self.tasks.clear()
+
+
+def socket_limit():
+    try:
+        import resource
+        return max(64, min(TCP_SOCKETS, resource.getrlimit(resource.RLIMIT_NOFILE)[0] - 256))
+    except ImportError:
+        # Windows: цикл на select принимает не больше 512 сокетов
+        return 256
+
+
+def arp_interface(targets, interfaces):
+    """(интерфейс, MAC, свой адрес), если все цели лежат в одной сети IPv4 интерфейса; иначе None"""
+    try:
+        numbers = [int(ipaddress.IPv4Address(target)) for target in targets]
+    except ValueError:
+        return None
+    if not numbers:
+        return None
+    first, last = min(numbers), max(numbers)
+    for record in interfaces:
+        if not record.mac or record.mac == "00:00:00:00:00:00":
+            continue
+        for address in record.addresses:
+            try:
+                interface = ipaddress.ip_interface(address)
+            except ValueError:
+                continue
+            network = interface.network
+            if interface.version == 4 and int(network.network_address) <= first \
+                    and last <= int(network.broadcast_address):
+                return record.name, record.mac, str(interface.ip)
+    return None
+
+
+def checkpoint_key(targets, method):
+    digest = hashlib.sha1(method.encode())
+    for target in targets:
+        digest.update(target.encode() + b"\n")
+    return digest.hexdigest()
+
+
+class DiscoveryScanner:
+    """Обнаружение узлов диапазона: пробы идут с подстраиваемым темпом, найденные узлы сообщаются
+    по мере ответов. Узлы без ответа получают повторную пробу; ответ на повтор значит, что первая
+    проба потерялась, и темп снижается. Прогресс сохраняется в контрольной точке, так что
+    прерванный обход продолжается с первого незавершенного адреса"""
+
+    def __init__(self, backend=None, method="auto", timeout=1.0, retries=1, rate=INITIAL_RATE, max_rate=MAX_RATE,
+                 ports=COMMON_PORTS, checkpoint=DEFAULT_CHECKPOINT):
+        if method not in METHODS:
+            raise ValueError(f"Неизвестный метод обнаружения: {method}")
+        self.backend = backend
+        self.method = method
+        self.timeout = timeout
+        self.retries = retries
+        self.controller = RateController(rate, maximum=max_rate, hold=timeout)
+        self.ports = ports
+        self.checkpoint = checkpoint
+        self.found = {}
+
+    def interfaces(self):
+        if self.backend is None:
+            return []
+        try:
+            return self.backend.collect(self.backend.list_interfaces())
+        except (OSError, ValueError):
+            return []
+
+    def open_prober(self, loop, targets):
+        """Самый быстрый доступный способ: ARP в своей сети, затем ICMP, затем TCP-connect"""
+        errors = []
+        if self.method in ("auto", "arp") and sys.platform.startswith("linux"):
+            local = arp_interface(targets, self.interfaces())
+            if local is not None:
+                try:
+                    return _ArpProber(loop, *local)
+                except OSError as e:
+                    errors.append(f"arp: {e}")
+            else:
+                errors.append("arp: диапазон не лежит в сети одного интерфейса")
+        if self.method in ("auto", "icmp"):
+            try:
+                return _IcmpProber(loop)
+            except OSError as e:
+                errors.append(f"icmp: {e}")
+        if self.method in ("auto", "tcp"):
+            return _TcpProber(loop, self.ports)
+        raise OSError("Метод недоступен: " + "; ".join(errors))
+
+    async def scan(self, targets, on_hosts=None, on_progress=None, resume=True):
+        """Опрашивает адреса targets; on_hosts получает пачки NeighborRecord, on_progress - DiscoveryProgress.
+        Возвращает все найденные узлы"""
+        targets = list(targets)
+        loop = asyncio.get_running_loop()
+        prober = self.open_prober(loop, targets)
+        key = checkpoint_key(targets, prober.method)
+        done = bytearray(len(targets))
+        watermark = 0
+        self.found = {}
+        if resume:
+            watermark = self.load_checkpoint(key)
+            done[:watermark] = b"\x01" * watermark
+            if self.found and on_hosts is not None:
+                on_hosts(list(self.found.values()))
+
+        retry = collections.deque()
+        batch = []
+        # Свободные места для проб в полете
+        slots = asyncio.Semaphore(IN_FLIGHT)
+        interface = getattr(prober, "interface", None)
+
+        async def probe(index, attempt):
+            address = targets[index]
+            future = loop.create_future()
+            try:
+                try:
+                    prober.send(address, future)
+                except OSError as e:
+                    if e.errno in CONGESTION_ERRORS:
+                        # Очередь отправки переполнена: проба повторяется, темп снижается
+                        self.controller.loss()
+                        retry.append((index, attempt))
+                    else:
+                        done[index] = 1
+                    return
+                try:
+                    await asyncio.wait_for(future, self.timeout)
+                except asyncio.TimeoutError:
+                    if attempt < self.retries:
+                        retry.append((index, attempt + 1))
+                    else:
+                        done[index] = 1
+                    return
+                if attempt:
+                    self.controller.loss()
+                record = NeighborRecord(address, future.result(), f"найден: {prober.method}", interface)
+                self.found[address] = record
+                batch.append(record)
+                done[index] = 1
+            finally:
+                prober.forget(address)
+                slots.release()
+
+        def report():
+            nonlocal watermark, batch
+            while watermark < len(targets) and done[watermark]:
+                watermark += 1
+            if batch and on_hosts is not None:
+                on_hosts(batch)
+            batch = []
+            if on_progress is not None:
+                on_progress(DiscoveryProgress(done.count(1), len(targets), len(self.found),
+                                              round(self.controller.rate), prober.method))
+
+        tasks = set()
+        next_index = watermark
+        last_report = last_save = time.monotonic()
+        try:
+            while next_index < len(targets) or retry or tasks:
+                if next_index < len(targets) or retry:
+                    await slots.acquire()
+                    await self.controller.acquire()
+                    if retry:
+                        index, attempt = retry.popleft()
+                    else:
+                        index, attempt = next_index, 0
+                        next_index += 1
+                    task = loop.create_task(probe(index, attempt))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                else:
+                    # Ожидание завершения пробы (она может поставить повтор). Обратный вызов wait
+                    # срабатывает после tasks.discard, так что завершенная задача уже убрана из множества
+                    await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+
+                now = time.monotonic()
+                if now - last_report >= 0.1:
+                    report()
+                    last_report = now
+                if now - last_save >= CHECKPOINT_INTERVAL:
+                    self.save_checkpoint(key, watermark)
+                    last_save = now
+        except asyncio.CancelledError:
+            report()
+            self.save_checkpoint(key, watermark)
+            raise
+        finally:
+            for task in tasks:
+                task.cancel()
+            prober.close()
+        report()
+        self.clear_checkpoint()
+        self.fill_macs(on_hosts)
+        return list(self.found.values())
+
+    def fill_macs(self, on_hosts=None):
+        """Узлам, найденным по ICMP и TCP, MAC берется из таблицы соседей: после обмена записи в ней уже есть"""
+        missing = [ip for ip, record in self.found.items() if not record.mac]
+        if not missing or self.backend is None:
+            return
+        try:
+            neighbors = {record.ip: record for record in self.backend.collect(self.backend.list_neighbors())}
+        except (OSError, ValueError):
+            return
+        filled = []
+        for ip in missing:
+            neighbor = neighbors.get(ip)
+            if neighbor is not None and neighbor.mac:
+                record = self.found[ip] = self.found[ip]._replace(mac=neighbor.mac, interface=neighbor.interface)
+                filled.append(record)
+        if filled and on_hosts is not None:
+            on_hosts(filled)
+
+    def load_checkpoint(self, key):
+        """Найденные узлы и число завершенных адресов из контрольной точки того же обхода"""
+        if not self.checkpoint:
+            return 0
+        try:
+            with open(self.checkpoint, encoding="utf-8") as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return 0
+        if state.get("key") != key:
+            return 0
+        self.found = {record[0]: NeighborRecord(*record) for record in state.get("found", [])}
+        return int(state.get("watermark", 0))
+
+    def save_checkpoint(self, key, watermark):
+        if not self.checkpoint:
+            return
+        state = {"key": key, "watermark": watermark, "found": [list(record) for record in self.found.values()]}
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.checkpoint)), exist_ok=True)
+            temporary = self.checkpoint + ".tmp"
+            with open(temporary, "w", encoding="utf-8") as file:
+                json.dump(state, file)
+            os.replace(temporary, self.checkpoint)
+        except OSError:
+            pass
+
+    def clear_checkpoint(self):
+        if self.checkpoint:
+            try:
+                os.remove(self.checkpoint)
+            except OSError:
+                pass
+
+
+def format_progress(progress):
+    return (f"Обнаружение ({progress.method}): проверено {progress.done} из {progress.total}, "
+            f"найдено {progress.found}, темп {progress.rate} проб/с")
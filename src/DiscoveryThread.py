@@ -0,0 +1,57 @@
+import asyncio
+import threading
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from src.DiscoveryScanner import DiscoveryScanner
+
+
+class DiscoveryThread(QThread):
+    records_signal = pyqtSignal(list)
+    stats_signal = pyqtSignal(object)
+    error_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal()
+
+    def __init__(self, backend, targets, method="auto", timeout=1.0, retries=1, rate=None, resume=True):
+        super().__init__()
+        self.targets = targets
+        self.resume = resume
+        self.title = f"Обнаружение узлов ({len(targets)})"
+        options = {"rate": rate} if rate else {}
+        self.scanner = DiscoveryScanner(backend, method, timeout=timeout, retries=retries, **options)
+        self._loop = None
+        self._task = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        """Запускает обнаружение в своем цикле событий; найденные узлы и прогресс идут через сигналы"""
+        # Цикл на select и в Windows: сокетам проб нужен add_reader
+        loop = self._loop = asyncio.SelectorEventLoop()
+        try:
+            # stop() мог прийти до запуска потока или пока создается задача
+            if not self._stop_event.is_set():
+                self._task = loop.create_task(
+                    self.scanner.scan(self.targets, self.records_signal.emit, self.stats_signal.emit, self.resume))
+                if self._stop_event.is_set():
+                    self._task.cancel()
+                loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.error_signal.emit(f"Ошибка: {e}")
+        finally:
+            loop.close()
+            self._loop = None
+            self._task = None
+            self.finished_signal.emit()
+
+    def stop(self):
+        """Останавливает обнаружение; пройденная часть остается в контрольной точке"""
+        self._stop_event.set()
+        # Поток может в любой момент обнулить _loop, поэтому ссылки читаются один раз
+        loop, task = self._loop, self._task
+        if loop is not None and task is not None:
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                # Цикл событий уже закрыт
+                pass
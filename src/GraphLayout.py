@@ -0,0 +1,251 @@
+import math
+
+import numpy as np
+
+# Число узлов, которое обрабатывается за один шаг при расчете дальнего поля
+CHUNK = 4096
+# Ячейка с большим числом узлов дробится своей сеткой, как узел дерева Barnes-Hut
+LEAF_SIZE = 64
+MAX_DEPTH = 8
+# Пар узлов за один шаг точного расчета в ячейке: ограничивает память для плотных скоплений
+NEAR_BLOCK = 1 << 20
+
+
+def _index(nodes, edges):
+    """Переводит узлы и ребра в массивы индексов"""
+    ids = {node: i for i, node in enumerate(nodes)}
+    pairs = [(ids[a], ids[b]) for a, b in edges if a in ids and b in ids and a != b]
+    if not pairs:
+        return ids, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    pairs = np.array(pairs, dtype=np.int64)
+    return ids, pairs[:, 0], pairs[:, 1]
+
+
+def _repulsion(pos, k, active=None, depth=0):
+    """Отталкивание узлов active (индексы; по умолчанию всех) со сложностью ~n*sqrt(n).
+    Узлы раскладываются по сетке из ~sqrt(n) ячеек: остальные ячейки действуют как одна точка
+    в центре масс, а ячейка крупнее LEAF_SIZE так же дробится своей сеткой. Поэтому скопление
+    (например, звезда из шлюза и тысяч сетей) не дает квадратичного по памяти точного расчета"""
+    n = len(pos)
+    if active is None:
+        active = np.arange(n)
+    disp = np.zeros((len(active), 2))
+    side = max(1, int(math.sqrt(math.sqrt(n))))
+    low = pos.min(axis=0)
+    span = np.maximum(pos.max(axis=0) - low, 1e-9)
+    cell_xy = np.minimum((((pos - low) / span) * side).astype(np.int64), side - 1)
+    cell = cell_xy[:, 0] * side + cell_xy[:, 1]
+
+    mass = np.bincount(cell, minlength=side * side).astype(float)
+    occupied = np.nonzero(mass)[0]
+    centers = np.stack([np.bincount(cell, weights=pos[:, 0], minlength=side * side),
+                        np.bincount(cell, weights=pos[:, 1], minlength=side * side)], axis=1)[occupied]
+    centers /= mass[occupied, None]
+    mass = mass[occupied]
+    k2 = k * k
+
+    # Дальнее поле: каждый узел против центров масс чужих ячеек
+    if len(occupied) > 1:
+        for start in range(0, len(active), CHUNK):
+            chunk = active[start:start + CHUNK]
+            delta = pos[chunk, None, :] - centers[None, :, :]
+            dist2 = np.einsum("ijk,ijk->ij", delta, delta) + 1e-9
+            weight = k2 * mass[None, :] / dist2
+            weight[cell[chunk, None] == occupied[None, :]] = 0.0
+            disp[start:start + CHUNK] = np.einsum("ij,ijk->ik", weight, delta)
+
+    # Ближнее поле: внутри ячейки точно или, если узлов много, следующим уровнем сетки
+    order = np.argsort(cell, kind="stable")
+    sorted_cells = cell[order]
+    active_order = np.argsort(cell[active], kind="stable")
+    active_cells = cell[active][active_order]
+    for current in np.unique(active_cells):
+        begin, end = np.searchsorted(sorted_cells, [current, current + 1])
+        if end - begin < 2:
+            continue
+        members = order[begin:end]
+        a_begin, a_end = np.searchsorted(active_cells, [current, current + 1])
+        rows = active_order[a_begin:a_end]
+        # Если сетка не разделила узлы (совпадающие позиции), дробить дальше бесполезно
+        if end - begin > LEAF_SIZE and end - begin < n and depth < MAX_DEPTH:
+            # Индексы внутри ячейки идут по возрастанию, как и active
+            disp[rows] += _repulsion(pos[members], k, np.searchsorted(members, active[rows]), depth + 1)
+        else:
+            disp[rows] += _exact_repulsion(pos, active[rows], members, k2)
+    return disp
+
+
+def _exact_repulsion(pos, rows, members, k2):
+    """Точное отталкивание узлов rows от узлов members блоками не больше NEAR_BLOCK пар"""
+    disp = np.empty((len(rows), 2))
+    step = max(1, NEAR_BLOCK // len(members))
+    for start in range(0, len(rows), step):
+        delta = pos[rows[start:start + step], None, :] - pos[None, members, :]
+        dist2 = np.einsum("ijk,ijk->ij", delta, delta) + 1e-9
+        disp[start:start + step] = np.einsum("ij,ijk->ik", k2 / dist2, delta)
+    return disp
+
+
+def force_layout(pos, sources, targets, movable=None, iterations=50, temperature=None, progress=None,
+                 stop_event=None):
+    """Силовая раскладка Фрюхтермана-Рейнгольда над массивом позиций (n, 2).
+    Идеальная длина ребра равна 1. Двигаются только узлы из movable (булев массив), если он задан"""
+    n = len(pos)
+    if n < 2:
+        return pos
+    k = 1.0
+    if temperature is None:
+        temperature = math.sqrt(n) / 10 + 1.0
+    active = None if movable is None else np.nonzero(movable)[0]
+    for step in range(iterations):
+        if stop_event is not None and stop_event.is_set():
+            break
+        disp = np.zeros_like(pos)
+        if active is None:
+            disp[:] = _repulsion(pos, k)
+        else:
+            disp[active] = _repulsion(pos, k, active)
+        if len(sources):
+            delta = pos[sources] - pos[targets]
+            dist = np.sqrt(np.einsum("ij,ij->i", delta, delta)) + 1e-9
+            pull = delta * (dist / k)[:, None]
+            for axis in (0, 1):
+                disp[:, axis] -= np.bincount(sources, weights=pull[:, axis], minlength=n)
+                disp[:, axis] += np.bincount(targets, weights=pull[:, axis], minlength=n)
+        length = np.sqrt(np.einsum("ij,ij->i", disp, disp)) + 1e-9
+        t = temperature * (1.0 - step / iterations)
+        shift = disp * (np.minimum(length, t) / length)[:, None]
+        if movable is not None:
+            shift[~movable] = 0.0
+        pos += shift
+        if progress is not None:
+            progress(step + 1, iterations)
+    return pos
+
+
+def hierarchical_layout(nodes, edges):
+    """Раскладка деревом для графов шлюз -> сеть назначения.
+    Корни - узлы без входящих ребер; листья идут подряд, родитель стоит над серединой своих детей"""
+    ids, sources, targets = _index(nodes, edges)
+    n = len(ids)
+    nodes = list(ids)
+    children = [[] for _ in range(n)]
+    incoming = np.bincount(targets, minlength=n) if n else np.zeros(0)
+    for a, b in zip(sources.tolist(), targets.tolist()):
+        children[a].append(b)
+
+    x = np.zeros(n)
+    y = np.zeros(n)
+    seen = np.zeros(n, dtype=bool)
+    next_x = 0.0
+    roots = [i for i in range(n) if incoming[i] == 0]
+    # Узлы, до которых не дошли от корней (циклы), становятся корнями сами
+    for root in roots + list(range(n)):
+        if seen[root]:
+            continue
+        seen[root] = True
+        stack = [(root, 0, False)]
+        while stack:
+            node, depth, expanded = stack.pop()
+            if expanded:
+                placed = children[node]
+                if placed:
+                    x[node] = (x[placed[0]] + x[placed[-1]]) / 2
+                else:
+                    x[node] = next_x
+                    next_x += 1.0
+                continue
+            y[node] = depth
+            stack.append((node, depth, True))
+            fresh = [child for child in children[node] if not seen[child]]
+            for child in fresh:
+                seen[child] = True
+            children[node] = fresh
+            for child in reversed(fresh):
+                stack.append((child, depth + 1, False))
+    return {node: (x[i], y[i] * 2.0) for i, node in enumerate(nodes)}
+
+
+class GraphLayout:
+    """Раскладка графа с кэшем позиций по узлам.
+    Если граф изменился немного, новые узлы ставятся рядом с соседями и дорасчитываются
+    только они и их окрестность, остальная картинка остается на месте"""
+
+    def __init__(self, iterations=50, incremental_iterations=15, seed=42):
+        self.iterations = iterations
+        self.incremental_iterations = incremental_iterations
+        self.rng = np.random.default_rng(seed)
+        self.positions = {}
+        self.edges = set()
+
+    def layout(self, nodes, edges, mode="force", progress=None, stop_event=None):
+        """Возвращает {узел: (x, y)} для режима "force" или "hierarchical" """
+        nodes = list(nodes)
+        edges = list(edges)
+        if mode == "hierarchical":
+            positions = hierarchical_layout(nodes, edges)
+            if progress is not None:
+                progress(1, 1)
+            return positions
+
+        ids, sources, targets = _index(nodes, edges)
+        n = len(ids)
+        pos = np.empty((n, 2))
+        known = np.zeros(n, dtype=bool)
+        for node, i in ids.items():
+            cached = self.positions.get(node)
+            if cached is not None:
+                pos[i] = cached
+                known[i] = True
+
+        edge_set = set(edges)
+        changed = edge_set ^ self.edges
+        if known.all() and not changed:
+            if progress is not None:
+                progress(1, 1)
+            return {node: tuple(pos[i]) for node, i in ids.items()}
+
+        if not known.any():
+            pos[:] = self.rng.uniform(-1, 1, (n, 2)) * math.sqrt(n)
+            force_layout(pos, sources, targets, iterations=self.iterations, progress=progress,
+                         stop_event=stop_event)
+        else:
+            movable = ~known
+            for a, b in changed:
+                for node in (a, b):
+                    if node in ids:
+                        movable[ids[node]] = True
+            self.place_new(pos, known, sources, targets)
+            # Окрестность изменившихся узлов тоже подстраивается
+            near = movable[sources] | movable[targets]
+            movable[sources[near]] = True
+            movable[targets[near]] = True
+            force_layout(pos, sources, targets, movable=movable, iterations=self.incremental_iterations,
+                         temperature=1.0, progress=progress, stop_event=stop_event)
+
+        positions = {node: tuple(pos[i]) for node, i in ids.items()}
+        # Прерванный расчет не попадает в кэш, следующий запуск начнет с прежних позиций
+        if stop_event is None or not stop_event.is_set():
+            self.positions = positions
+            self.edges = edge_set
+        return positions
+
+    def place_new(self, pos, known, sources, targets):
+        """Ставит новые узлы в центр уже размещенных соседей с небольшим сдвигом"""
+        total = np.zeros_like(pos)
+        count = np.zeros(len(pos))
+        for a, b in ((sources, targets), (targets, sources)):
+            mask = known[b]
+            np.add.at(total, a[mask], pos[b[mask]])
+            np.add.at(count, a[mask], 1)
+        new = np.nonzero(~known)[0]
+        anchored = new[count[new] > 0]
+        pos[anchored] = total[anchored] / count[anchored, None]
+        lonely = new[count[new] == 0]
+        center = pos[known].mean(axis=0)
+        pos[lonely] = center
+        pos[new] += self.rng.uniform(-1, 1, (len(new), 2))
+
+    def clear(self):
+        self.positions = {}
+        self.edges = set()
@@ -0,0 +1,242 @@
+import time
+
+from PyQt5.QtCore import Qt, QTimer, QRectF, QPointF
+from PyQt5.QtGui import QPainter, QPen, QBrush, QColor, QStaticText, QFont
+from PyQt5.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsItem, QGraphicsEllipseItem
+
+NODE_COLOR = QColor(0, 137, 191)
+EDGE_COLOR = QColor(200, 200, 200)
+PACKET_COLOR = QColor(255, 84, 84)
+TEXT_COLOR = QColor(255, 255, 255)
+
+# Кадр анимации ~60 к/с; при медленном кадре пакеты сдвигаются по прошедшему времени, а не по числу кадров
+FRAME_INTERVAL = 16
+MAX_PACKETS = 200
+# Ниже этого масштаба подписи узлов не рисуются
+LABEL_MIN_SCALE = 0.4
+
+
+class NodeItem(QGraphicsItem):
+    """Узел графа. Подпись раскладывается один раз (QStaticText), а сам узел кэшируется в растр,
+    поэтому перерисовка при прокрутке и масштабировании не пересчитывает глифы"""
+
+    def __init__(self, node, label, radius):
+        super().__init__()
+        self.node = node
+        self.radius = radius
+        self.edges = []
+        self.label = QStaticText(label)
+        self.label.setTextFormat(Qt.PlainText)
+        self.label.prepare(font=QFont())
+        size = self.label.size()
+        width = max(2 * radius, size.width())
+        self.rect = QRectF(-width / 2, -radius, width, max(2 * radius, size.height()))
+        self.setFlag(QGraphicsItem.ItemSendsGeometryChanges)
+        self.setFlag(QGraphicsItem.ItemIsMovable)
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+        self.setZValue(1)
+        self.setToolTip(label)
+
+    def boundingRect(self):
+        return self.rect
+
+    def paint(self, painter, option, widget=None):
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(NODE_COLOR)
+        painter.drawEllipse(QPointF(0, 0), self.radius, self.radius)
+        if option.levelOfDetailFromTransform(painter.worldTransform()) >= LABEL_MIN_SCALE:
+            size = self.label.size()
+            painter.setPen(TEXT_COLOR)
+            painter.drawStaticText(QPointF(-size.width() / 2, -size.height() / 2), self.label)
+
+    def itemChange(self, change, value):
+        if change == QGraphicsItem.ItemPositionHasChanged:
+            for edge in self.edges:
+                edge.adjust()
+        return super().itemChange(change, value)
+
+
+class EdgeItem(QGraphicsItem):
+    """Ребро между двумя узлами; при перемещении узла обновляется только его область"""
+
+    def __init__(self, source, dest, label=None):
+        super().__init__()
+        self.source = source
+        self.dest = dest
+        self.pen = QPen(EDGE_COLOR, 2)
+        self.pen.setCosmetic(True)
+        self.line_rect = QRectF()
+        if label:
+            self.setToolTip(label)
+        source.edges.append(self)
+        dest.edges.append(self)
+        self.adjust()
+
+    def adjust(self):
+        self.prepareGeometryChange()
+        self.line_rect = QRectF(self.source.pos(), self.dest.pos()).normalized().adjusted(-2, -2, 2, 2)
+
+    def boundingRect(self):
+        return self.line_rect
+
+    def paint(self, painter, option, widget=None):
+        painter.setPen(self.pen)
+        painter.drawLine(self.source.pos(), self.dest.pos())
+
+    def detach(self):
+        for node in (self.source, self.dest):
+            if self in node.edges:
+                node.edges.remove(self)
+
+
+class GraphView(QGraphicsView):
+    """Встроенное представление графа на QGraphicsScene.
+    Узлы и ребра - отдельные элементы сцены, поэтому изменения перерисовывают только свои области,
+    а анимация пакетов идет по QTimer и не блокирует цикл событий"""
+
+    def __init__(self, node_radius=20, parent=None):
+        super().__init__(parent)
+        self.node_radius = node_radius
+        self.graph_scene = QGraphicsScene(self)
+        self.graph_scene.setBackgroundBrush(QBrush(QColor(0, 0, 0)))
+        # Раскладка двигает все узлы разом, а пакеты - каждый кадр: BSP-индекс пришлось бы перестраивать
+        # секундами на 10 тыс. узлов, линейный обход элементов при отрисовке дешевле
+        self.graph_scene.setItemIndexMethod(QGraphicsScene.NoIndex)
+        self.setScene(self.graph_scene)
+        self.setRenderHint(QPainter.Antialiasing)
+        self.setViewportUpdateMode(QGraphicsView.SmartViewportUpdate)
+        self.setOptimizationFlags(QGraphicsView.DontSavePainterState | QGraphicsView.DontAdjustForAntialiasing)
+        self.setDragMode(QGraphicsView.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
+
+        self.nodes = {}
+        self.edges = {}
+        self.packets = []
+        self.timer = QTimer(self)
+        self.timer.setInterval(FRAME_INTERVAL)
+        self.timer.timeout.connect(self.advance_packets)
+
+    def add_node(self, node, pos=None, label=None):
+        """Добавляет узел (или перемещает существующий) и возвращает его элемент"""
+        item = self.nodes.get(node)
+        if item is None:
+            item = NodeItem(node, str(node) if label is None else label, self.node_radius)
+            self.nodes[node] = item
+            self.graph_scene.addItem(item)
+        if pos is not None:
+            item.setPos(pos[0], pos[1])
+        return item
+
+    def add_edge(self, source, dest, label=None):
+        """Добавляет ребро, при необходимости создавая узлы"""
+        key = (source, dest)
+        if key in self.edges:
+            if label:
+                self.edges[key].setToolTip(label)
+            return self.edges[key]
+        known = source in self.nodes, dest in self.nodes
+        source_item, dest_item = self.add_node(source), self.add_node(dest)
+        # Новый узел ставится рядом с уже размещенным соседом, а не в начало координат
+        if known == (True, False):
+            offset = QPointF(3 * self.node_radius, len(source_item.edges) * self.node_radius)
+            dest_item.setPos(source_item.pos() + offset)
+        elif known == (False, True):
+            offset = QPointF(3 * self.node_radius, len(dest_item.edges) * self.node_radius)
+            source_item.setPos(dest_item.pos() - offset)
+        edge = EdgeItem(source_item, dest_item, label)
+        self.edges[key] = edge
+        self.graph_scene.addItem(edge)
+        return edge
+
+    def remove_edge(self, source, dest):
+        """Удаляет ребро; узлы, у которых не осталось ребер, удаляются вместе с ним"""
+        edge = self.edges.pop((source, dest), None)
+        if edge is None:
+            return
+        edge.detach()
+        self.graph_scene.removeItem(edge)
+        for item in (edge.source, edge.dest):
+            if not item.edges and self.nodes.get(item.node) is item:
+                del self.nodes[item.node]
+                self.graph_scene.removeItem(item)
+
+    def remove_node(self, node):
+        item = self.nodes.pop(node, None)
+        if item is None:
+            return
+        for edge in list(item.edges):
+            self.remove_edge(edge.source.node, edge.dest.node)
+        self.graph_scene.removeItem(item)
+
+    def set_graph(self, nodes, edges):
+        """Приводит сцену к заданным узлам и ребрам, не пересоздавая неизменившиеся элементы"""
+        edges = set(edges)
+        for key in [key for key in self.edges if key not in edges]:
+            self.remove_edge(*key)
+        for source, dest in edges:
+            self.add_edge(source, dest)
+        nodes = set(nodes)
+        for node in nodes:
+            self.add_node(node)
+        for node in [node for node in self.nodes if node not in nodes]:
+            self.remove_node(node)
+
+    def set_positions(self, positions, scale=1.0):
+        """Расставляет узлы по готовой раскладке {узел: (x, y)}"""
+        for node, (x, y) in positions.items():
+            item = self.nodes.get(node)
+            if item is not None:
+                item.setPos(x * scale, y * scale)
+        self.fit()
+
+    def fit(self):
+        """Подгоняет масштаб под весь граф"""
+        rect = self.graph_scene.itemsBoundingRect()
+        if rect.isNull():
+            return
+        rect = rect.adjusted(-self.node_radius, -self.node_radius, self.node_radius, self.node_radius)
+        self.graph_scene.setSceneRect(rect)
+        self.fitInView(rect, Qt.KeepAspectRatio)
+
+    def clear(self):
+        self.timer.stop()
+        self.packets = []
+        self.nodes = {}
+        self.edges = {}
+        self.graph_scene.clear()
+
+    def send_packet(self, source, dest, duration=1.0):
+        """Запускает анимацию пакета от source к dest"""
+        if source not in self.nodes or dest not in self.nodes or len(self.packets) >= MAX_PACKETS:
+            return
+        radius = self.node_radius / 2
+        item = QGraphicsEllipseItem(-radius, -radius, 2 * radius, 2 * radius)
+        item.setBrush(PACKET_COLOR)
+        item.setPen(QPen(Qt.NoPen))
+        item.setZValue(2)
+        item.setPos(self.nodes[source].pos())
+        self.graph_scene.addItem(item)
+        self.packets.append((item, self.nodes[source], self.nodes[dest], time.perf_counter(), duration))
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def advance_packets(self):
+        """Один кадр анимации; таймер останавливается, когда пакетов не осталось"""
+        now = time.perf_counter()
+        active = []
+        for packet in self.packets:
+            item, source, dest, started, duration = packet
+            t = (now - started) / duration
+            if t >= 1.0:
+                self.graph_scene.removeItem(item)
+                continue
+            start, end = source.pos(), dest.pos()
+            item.setPos(start + (end - start) * t)
+            active.append(packet)
+        self.packets = active
+        if not active:
+            self.timer.stop()
+
+    def wheelEvent(self, event):
+        factor = 1.15 if event.angleDelta().y() > 0 else 1 / 1.15
+        self.scale(factor, factor)
@@ -0,0 +1,391 @@
+import asyncio
+import atexit
+import collections
+import concurrent.futures
+import ipaddress
+import json
+import os
+import random
+import socket
+import struct
+import threading
+import time
+
+# Теплый кэш имен между запусками
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".nat-lab", "hostnames.json")
+RESOLV_CONF = "/etc/resolv.conf"
+
+# Сколько помнить найденное имя (не дольше TTL записи PTR) и отсутствие имени, с
+POSITIVE_TTL = 3600
+NEGATIVE_TTL = 300
+MIN_TTL = 30
+CACHE_SIZE = 65536
+# Одновременных запросов; ответов DNS ждем столько секунд на попытку
+CONCURRENCY = 64
+QUERY_TIMEOUT = 1.0
+QUERY_ATTEMPTS = 2
+# Найденные имена передаются подписчикам пачкой не чаще раза в NOTIFY_INTERVAL секунд
+NOTIFY_INTERVAL = 0.1
+
+DNS_PORT = 53
+TYPE_PTR = 12
+CLASS_IN = 1
+RCODE_NXDOMAIN = 3
+FLAG_TRUNCATED = 0x0200
+
+
+def read_nameservers(path=RESOLV_CONF):
+    """Серверы DNS из resolv.conf: [(адрес, порт)]; пусто, если файла нет (Windows)"""
+    servers = []
+    try:
+        with open(path, encoding="utf-8", errors="replace") as file:
+            for line in file:
+                words = line.split()
+                if len(words) >= 2 and words[0] == "nameserver":
+                    servers.append((words[1].split("%")[0], DNS_PORT))
+    except OSError:
+        pass
+    return servers
+
+
+def reverse_name(address):
+    """Имя для запроса PTR: 4.3.2.1.in-addr.arpa или полубайты ip6.arpa"""
+    return ipaddress.ip_address(address).reverse_pointer
+
+
+def build_query(query_id, name):
+    """Запрос PTR с флагом рекурсии"""
+    labels = b"".join(bytes([len(label)]) + label.encode("ascii") for label in name.split("."))
+    header = struct.pack("!HHHHHH", query_id, 0x0100, 1, 0, 0, 0)
+    return header + labels + b"\x00" + struct.pack("!HH", TYPE_PTR, CLASS_IN)
+
+
+def read_name(data, offset):
+    """Имя из сообщения DNS с учетом сжатия: (имя, смещение после имени)"""
+    labels = []
+    end = None
+    for _ in range(128):
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            continue
+        offset += 1
+        if not length:
+            return ".".join(labels), end if end is not None else offset
+        labels.append(data[offset:offset + length].decode("ascii", "replace"))
+        offset += length
+    raise ValueError("Зацикленное сжатие имени")
+
+
+def parse_response(data):
+    """Ответ DNS -> (id, имя запроса, код ответа, усечен ли, [(имя PTR, TTL)])"""
+    query_id, flags, questions, answers = struct.unpack_from("!HHHH", data)
+    offset = 12
+    question = ""
+    for _ in range(questions):
+        question, offset = read_name(data, offset)
+        offset += 4
+    records = []
+    for _ in range(answers):
+        _, offset = read_name(data, offset)
+        record_type, _, ttl, length = struct.unpack_from("!HHIH", data, offset)
+        offset += 10
+        if record_type == TYPE_PTR:
+            records.append((read_name(data, offset)[0], ttl))
+        offset += length
+    return query_id, question, flags & 0x0F, bool(flags & FLAG_TRUNCATED), records
+
+
+class _DnsSocket:
+    """UDP-сокет к одному серверу DNS, на котором одновременно ждут ответа все запросы"""
+
+    def __init__(self, loop, server):
+        self.loop = loop
+        family = socket.AF_INET6 if ":" in server[0] else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.sock.connect(server)
+        self.pending = {}
+        self.loop.add_reader(self.sock.fileno(), self._on_readable)
+
+    def _on_readable(self):
+        while True:
+            try:
+                data = self.sock.recv(4096)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                # Ошибка ICMP (сервер недоступен) - запросы дождутся таймаута и перейдут к следующему серверу
+                return
+            try:
+                query_id, question, rcode, truncated, records = parse_response(data)
+            except (ValueError, IndexError, struct.error):
+                continue
+            waiter = self.pending.get(query_id)
+            # Ответ принимается, только если совпадают и номер, и имя запроса
+            if waiter is not None and waiter[0] == question.lower() and not waiter[1].done():
+                waiter[1].set_result((rcode, truncated, records))
+
+    async def query(self, name, timeout):
+        query_id = random.randrange(0x10000)
+        while query_id in self.pending:
+            query_id = random.randrange(0x10000)
+        future = self.loop.create_future()
+        self.pending[query_id] = (name.lower(), future)
+        try:
+            self.sock.send(build_query(query_id, name))
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            del self.pending[query_id]
+
+    def close(self):
+        self.loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+
+
+class HostResolver:
+    """Обратное разрешение имен (PTR) для таблиц.
+    Запросы идут пачками в собственном цикле событий: напрямую к серверам DNS из resolv.conf,
+    а без них (Windows) - через socket.gethostbyaddr в пуле потоков. Одинаковые запросы в полете
+    объединяются, ответы (и отсутствие имени) хранятся в LRU-кэше с TTL, который переживает перезапуск.
+    Поток GUI не ждет: lookup() отвечает только из кэша, а найденные имена приходят подписчикам пачками"""
+
+    def __init__(self, path=DEFAULT_PATH, nameservers=None, cache_size=CACHE_SIZE, positive_ttl=POSITIVE_TTL,
+                 negative_ttl=NEGATIVE_TTL, concurrency=CONCURRENCY, timeout=QUERY_TIMEOUT):
+        self.path = path
+        self.nameservers = read_nameservers() if nameservers is None else list(nameservers)
+        self.cache_size = cache_size
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.cache = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.listeners = []
+        self.loop = None
+        self.thread = None
+        self.sockets = None
+        self.pool = None
+        self.semaphore = None
+        self.in_flight = {}
+        self.ready = {}
+
+    # Поток GUI и другие потоки
+
+    def start(self):
+        """Загружает теплый кэш и запускает цикл событий (при первом обращении)"""
+        with self.lock:
+            if self.loop is not None:
+                return
+            self._load()
+            # Цикл на select и в Windows: сокетам DNS нужен add_reader
+            self.loop = asyncio.SelectorEventLoop()
+            self.thread = threading.Thread(target=self.loop.run_forever, name="HostResolver", daemon=True)
+            self.thread.start()
+
+    def add_listener(self, callback):
+        """callback(dict адрес -> имя) вызывается из потока разрешения; пустое имя - имени нет"""
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def lookup(self, address):
+        """Имя из кэша: строка (пустая - имени нет) или None, если адрес еще не разрешен"""
+        if self.loop is None:
+            self.start()
+        with self.lock:
+            entry = self.cache.get(address)
+            if entry is not None and entry[1] >= time.time():
+                self.cache.move_to_end(address)
+                return entry[0]
+        return None if is_resolvable(address) else ""
+
+    def request(self, addresses):
+        """Ставит адреса в очередь разрешения, не дожидаясь ответа"""
+        addresses = [address for address in addresses if is_resolvable(address)]
+        if not addresses:
+            return
+        self.start()
+        self.loop.call_soon_threadsafe(self._request, addresses)
+
+    def resolve(self, addresses, timeout=None):
+        """Разрешает адреса и ждет ответа (для консольного режима): dict адрес -> имя"""
+        self.start()
+        addresses = [address for address in addresses if is_resolvable(address)]
+        future = asyncio.run_coroutine_threadsafe(self._resolve_all(addresses), self.loop)
+        return future.result(timeout)
+
+    def close(self):
+        """Останавливает цикл событий и сохраняет кэш"""
+        if self.loop is None:
+            return
+        if self.thread.is_alive():
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+        self.loop.close()
+        self.loop = None
+        self._save()
+
+    # Поток разрешения
+
+    def _request(self, addresses):
+        now = time.time()
+        for address in addresses:
+            if address in self.in_flight:
+                continue
+            with self.lock:
+                entry = self.cache.get(address)
+            if entry is not None and entry[1] >= now:
+                # Уже разрешен (например, другой таблицей): подписчик все равно получит ответ
+                self._deliver(address, entry[0])
+                continue
+            self.in_flight[address] = self.loop.create_task(self._resolve(address))
+
+    async def _resolve_all(self, addresses):
+        self._request(addresses)
+        names = {}
+        for address in dict.fromkeys(addresses):
+            task = self.in_flight.get(address)
+            if task is not None:
+                names[address] = await asyncio.shield(task)
+            else:
+                with self.lock:
+                    entry = self.cache.get(address)
+                names[address] = entry[0] if entry is not None else ""
+        return names
+
+    async def _resolve(self, address):
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            async with self.semaphore:
+                name, ttl = await self._query(address)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            name, ttl = "", self.negative_ttl
+        with self.lock:
+            self.cache[address] = (name, time.time() + ttl)
+            self.cache.move_to_end(address)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        del self.in_flight[address]
+        self._deliver(address, name)
+        return name
+
+    async def _query(self, address):
+        """(имя, TTL) через DNS; без серверов или при усеченном ответе - через системный резолвер"""
+        if self.nameservers:
+            if self.sockets is None:
+                self.sockets = [_DnsSocket(self.loop, server) for server in self.nameservers]
+            name = reverse_name(address)
+            for attempt in range(QUERY_ATTEMPTS * len(self.sockets)):
+                dns = self.sockets[attempt % len(self.sockets)]
+                try:
+                    rcode, truncated, records = await dns.query(name, self.timeout)
+                except asyncio.TimeoutError:
+                    continue
+                if truncated:
+                    break
+                if records:
+                    name, ttl = records[0]
+                    return name.rstrip("."), max(MIN_TTL, min(ttl, self.positive_ttl))
+                # NXDOMAIN и пустой ответ - имени нет; SERVFAIL и другие ошибки - спросить другой сервер
+                if rcode in (0, RCODE_NXDOMAIN):
+                    return "", self.negative_ttl
+            else:
+                return "", self.negative_ttl
+        if self.pool is None:
+            self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=min(self.concurrency, 32),
+                                                              thread_name_prefix="HostResolver")
+        return await self.loop.run_in_executor(self.pool, self._system_lookup, address)
+
+    def _system_lookup(self, address):
+        try:
+            return socket.gethostbyaddr(address)[0], self.positive_ttl
+        except (OSError, UnicodeError):
+            return "", self.negative_ttl
+
+    def _deliver(self, address, name):
+        if not self.ready:
+            self.loop.call_later(NOTIFY_INTERVAL, self._notify)
+        self.ready[address] = name
+
+    def _notify(self):
+        names, self.ready = self.ready, {}
+        for callback in list(self.listeners):
+            try:
+                callback(names)
+            except RuntimeError:
+                # Подписчик уже удален (закрытие окна)
+                self.remove_listener(callback)
+
+    async def _shutdown(self):
+        tasks = list(self.in_flight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.in_flight = {}
+        if self.sockets is not None:
+            for dns in self.sockets:
+                dns.close()
+            self.sockets = None
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
+            self.pool = None
+
+    # Теплый кэш
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for address, name, expires in entries[-self.cache_size:]:
+            if expires >= now:
+                self.cache[address] = (name, expires)
+
+    def _save(self):
+        if not self.path:
+            return
+        now = time.time()
+        with self.lock:
+            entries = [[address, name, expires] for address, (name, expires) in self.cache.items() if expires >= now]
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            temporary = self.path + ".tmp"
+            with open(temporary, "w", encoding="utf-8") as file:
+                json.dump(entries, file)
+            os.replace(temporary, self.path)
+        except OSError:
+            pass
+
+
+def is_resolvable(address):
+    """Адрес, для которого имеет смысл искать имя (не "*", не On-link и не сеть)"""
+    try:
+        ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return True
+
+
+_resolver = None
+
+
+def get_host_resolver():
+    """Общий резолвер имен; цикл событий запускается при первом обращении, кэш сохраняется при выходе"""
+    global _resolver
+    if _resolver is None:
+        _resolver = HostResolver()
+        atexit.register(_resolver.close)
+    return _resolver
@@ -1,25 +1,88 @@
-import re
+import datetime
+import ipaddress
+
 from PyQt5.QtWidgets import (QTabWidget, QWidget,
-                             QVBoxLayout, QPushButton, QTextEdit, QLineEdit, QLabel)
+                             QVBoxLayout, QPushButton, QTextEdit, QPlainTextEdit, QLineEdit, QLabel, QFormLayout)
 
+from src.Backend import get_backend
 from src.CommandThread import CommandThread
+from src.CommandExecutor import get_executor, COMMAND_TIMEOUT
+from src.TopologyStore import get_topology
+
+
+def format_address(address):
+    """Адрес с префиксом в виде "192.168.1.5, маска 255.255.255.0 (/24)" """
+    address = str(address)
+    if "/" not in address:
+        return address
+    try:
+        interface = ipaddress.ip_interface(address)
+    except ValueError:
+        return address
+    if interface.version == 4:
+        return f"{interface.ip}, маска {interface.netmask} (/{interface.network.prefixlen})"
+    return f"{interface.ip} /{interface.network.prefixlen}"
+
+
+def format_value(value):
+    if value is None or value == [] or value == ():
+        return "-"
+    if isinstance(value, bool):
+        return "да" if value else "нет"
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%d.%m.%Y %H:%M:%S")
+    if isinstance(value, (list, tuple)):
+        return "\n".join(str(item) for item in value)
+    return str(value)
+
+
+class InterfacePage(QWidget):
+    """Страница одного интерфейса: поля записи и исходный раздел вывода"""
+
+    def __init__(self, record):
+        super().__init__()
+        form = QFormLayout()
+        form.addRow("Описание:", QLabel(format_value(record.description)))
+        form.addRow("Физический адрес:", QLabel(format_value(record.mac)))
+        form.addRow("Состояние:", QLabel(format_value(record.state)))
+        form.addRow("MTU:", QLabel(format_value(record.mtu)))
+        form.addRow("Адреса:", QLabel(format_value([format_address(address) for address in record.addresses])))
+        form.addRow("Шлюзы:", QLabel(format_value(record.gateways)))
+        form.addRow("DNS-серверы:", QLabel(format_value(record.dns_servers)))
+        form.addRow("DHCP:", QLabel(format_value(record.dhcp)))
+        form.addRow("DHCP-сервер:", QLabel(format_value(record.dhcp_server)))
+        form.addRow("Аренда получена:", QLabel(format_value(record.lease_obtained)))
+        form.addRow("Аренда истекает:", QLabel(format_value(record.lease_expires)))
+
+        details = QTextEdit()
+        details.setReadOnly(True)
+        details.setPlainText("\n".join(record.details or ()))
+
+        layout = QVBoxLayout()
+        layout.addLayout(form)
+        layout.addWidget(details)
+        self.setLayout(layout)
 
 
 class IpconfigTab(QWidget):
     """Отображает и настраивает настройки протоколов TCP/IP"""
     def __init__(self):
         super().__init__()
+        self.backend = get_backend()
+        self.topology = get_topology()
+        self.executor = get_executor()
         self.setup_ui()
-        self.command_thread = None
-        self.output_buffer = []
+        self.interfaces = []
+        self.built_pages = set()
 
     def setup_ui(self):
         layout = QVBoxLayout()
 
         self.ipconfig_params = QLineEdit()
-        self.ipconfig_params.setPlaceholderText("Введите параметры для ipconfig (например, /all)")
-        self.ipconfig_output = QTextEdit()
+        self.ipconfig_params.setPlaceholderText("Дополнительные параметры (например, /all)")
+        self.ipconfig_output = QPlainTextEdit()
         self.ipconfig_output.setReadOnly(True)
+        self.ipconfig_output.setMaximumBlockCount(10000)
         self.ipconfig_button = QPushButton("Ipconfig")
         self.ipconfig_button.clicked.connect(self.perform_ipconfig)
 
@@ -29,57 +92,63 @@ class IpconfigTab(QWidget):
         layout.addWidget(self.ipconfig_output)
 
         self.interface_tabs = QTabWidget()
+        self.interface_tabs.currentChanged.connect(self.build_page)
         layout.addWidget(self.interface_tabs)
 
         self.setLayout(layout)
 
     def perform_ipconfig(self):
+        self.stop_command()
         self.ipconfig_output.clear()
-        self.output_buffer.clear()
-        self.interface_tabs.clear()
-        params = self.ipconfig_params.text().strip() or "/all"
-        command = ["ipconfig"] + params.split()
-        self.start_command_thread(command)
-
-    def start_command_thread(self, command):
-        """Запускает команду в отдельном потоке"""
-        if self.command_thread is not None and self.command_thread.isRunning():
-            self.stop_command()
-
-        self.command_thread = CommandThread(command)
-        self.command_thread.output_signal.connect(self.handle_output)
-        self.command_thread.finished_signal.connect(self.process_output)
-        self.command_thread.start()
-
-    def handle_output(self, output):
-        """Обрабатывает вывод, добавляет в буфер"""
-        self.ipconfig_output.append(output)
-        self.output_buffer.append(output)
+        self.interfaces = []
+        self.clear_pages()
+        params = self.ipconfig_params.text().strip() or None
+        self.start_command_thread(self.backend.list_interfaces(params))
+
+    def start_command_thread(self, spec):
+        """Ставит команду бэкенда в очередь вкладки"""
+        job = self.executor.submit(self, CommandThread.from_spec(spec, self.backend.encoding),
+                                   timeout=COMMAND_TIMEOUT)
+        job.lines_signal.connect(self.handle_output)
+        job.records_signal.connect(self.interfaces.extend)
+        job.finished_signal.connect(self.process_output)
+
+    def handle_output(self, lines):
+        """Обрабатывает пачку строк вывода"""
+        self.ipconfig_output.appendPlainText("\n".join(lines))
 
     def process_output(self):
-        """Обрабатывает вывод после завершения команды"""
-        for line in self.output_buffer:
-            if "адаптер" in line.lower():
-                adapter_name = re.search(r'адаптер (.*?):', line, re.IGNORECASE)
-                if adapter_name:
-                    tab_name = adapter_name.group(1).strip()
-                    content_widget = QTextEdit()
-                    content_widget.setReadOnly(True)
-
-                    adapter_content = [line]
-                    for next_line in self.output_buffer[self.output_buffer.index(line)+1:]:
-                        if "адаптер" in next_line.lower():
-                            break
-                        adapter_content.append(next_line)
-
-                    content_widget.setPlainText("\n".join(adapter_content))
-                    self.interface_tabs.addTab(content_widget, tab_name)
-
-        self.ipconfig_output.append("Команда завершена.")
+        """Добавляет вкладку для каждого интерфейса после завершения команды.
+        Страница интерфейса строится при первом выборе вкладки, так что сотни виртуальных адаптеров
+        не создают сотни форм сразу"""
+        self.interface_tabs.blockSignals(True)
+        for interface in self.interfaces:
+            self.interface_tabs.addTab(QWidget(), interface.name)
+        self.interface_tabs.blockSignals(False)
+        self.build_page(self.interface_tabs.currentIndex())
+        self.topology.add_interfaces(self.interfaces)
+
+        self.ipconfig_output.appendPlainText("Команда завершена.")
+
+    def build_page(self, index):
+        """Подставляет страницу интерфейса вместо пустой заглушки"""
+        if index < 0 or index in self.built_pages or index >= len(self.interfaces):
+            return
+        self.built_pages.add(index)
+        placeholder = self.interface_tabs.widget(index)
+        self.interface_tabs.blockSignals(True)
+        self.interface_tabs.removeTab(index)
+        self.interface_tabs.insertTab(index, InterfacePage(self.interfaces[index]), self.interfaces[index].name)
+        self.interface_tabs.setCurrentIndex(index)
+        self.interface_tabs.blockSignals(False)
+        placeholder.deleteLater()
+
+    def clear_pages(self):
+        self.interface_tabs.blockSignals(True)
+        self.interface_tabs.clear()
+        self.interface_tabs.blockSignals(False)
+        self.built_pages = set()
 
     def stop_command(self):
-        """Останавливает выполнение команды"""
-        if self.command_thread is not None:
-            self.command_thread.stop()
-            self.command_thread.wait()
-            self.command_thread = None
+        """Отменяет команды вкладки, не дожидаясь завершения потоков"""
+        self.executor.cancel_owner(self)
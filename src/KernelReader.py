@@ -0,0 +1,311 @@
+import ipaddress
+import os
+import socket
+import struct
+
+from src.Records import RouteRecord, NeighborRecord, InterfaceRecord
+
+# Константы rtnetlink (linux/rtnetlink.h)
+NETLINK_ROUTE = 0
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+RTM_NEWADDR = 20
+RTM_GETADDR = 22
+RTM_NEWROUTE = 24
+RTM_GETROUTE = 26
+RTA_DST = 1
+RTA_OIF = 4
+RTA_GATEWAY = 5
+RTA_PRIORITY = 6
+RTA_TABLE = 15
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+RT_TABLE_MAIN = 254
+RTMGRP_LINK = 0x1
+RTMGRP_NEIGH = 0x4
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+RTMGRP_IPV6_IFADDR = 0x100
+RTMGRP_IPV6_ROUTE = 0x400
+NETLINK_GROUPS = {
+    "routes": RTMGRP_IPV4_ROUTE | RTMGRP_IPV6_ROUTE,
+    "neighbors": RTMGRP_NEIGH,
+    "interfaces": RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR,
+}
+
+NLMSGHDR = struct.Struct("=LHHLL")
+RTATTR = struct.Struct("=HH")
+RTMSG = struct.Struct("=BBBBBBBBI")
+IFADDRMSG = struct.Struct("=BBBBI")
+
+ARP_FLAGS = {0x0: "incomplete", 0x2: "reachable", 0x6: "permanent"}
+
+# Флаги маршрутов /proc/net/ipv6_route (linux/ipv6_route.h): в файле смешаны все таблицы,
+# локальные адреса и заглушки reject относятся не к основной таблице
+RTF_REJECT = 0x0200
+RTF_LOCAL = 0x80000000
+MULTICAST_PREFIX6 = "ff000000000000000000000000000000"
+
+
+def hex_to_ipv4(value):
+    """Переводит адрес из /proc/net/route (hex, порядок байт хоста) в строку"""
+    return socket.inet_ntoa(bytes.fromhex(value)[::-1])
+
+
+def hex_to_ipv6(value):
+    """Переводит 32 hex-символа из /proc/net/ipv6_route в строку"""
+    return socket.inet_ntop(socket.AF_INET6, bytes.fromhex(value))
+
+
+def parse_rtattrs(data, offset):
+    """Разбирает атрибуты rtattr, начиная со смещения"""
+    attrs = {}
+    while offset + RTATTR.size <= len(data):
+        length, kind = RTATTR.unpack_from(data, offset)
+        if length < RTATTR.size:
+            break
+        attrs[kind] = data[offset + RTATTR.size:offset + length]
+        offset += (length + 3) & ~3
+    return attrs
+
+
+class KernelReader:
+    """Читает маршруты, соседей и интерфейсы прямо из procfs/sysfs или rtnetlink,
+    без запуска внешних команд. Корни файловых систем можно подменить на каталог
+    с записанными файлами; rtnetlink при этом стоит отключить, он всегда отвечает за живое ядро"""
+
+    def __init__(self, proc_root="/proc", sys_root="/sys", netlink=True):
+        self.proc_root = proc_root
+        self.sys_root = sys_root
+        self.netlink = netlink
+
+    def available(self):
+        return os.path.exists(os.path.join(self.proc_root, "net", "route"))
+
+    def _open(self, *parts):
+        return open(os.path.join(self.proc_root, *parts), encoding="ascii", errors="replace")
+
+    def read_routes(self):
+        """Читает таблицу маршрутов IPv4 из /proc/net/route"""
+        with self._open("net", "route") as f:
+            f.readline()
+            data = f.read()
+
+        records = []
+        # Шлюзов и масок обычно немного, поэтому их перевод кэшируется
+        gateways = {}
+        masks = {}
+        for line in data.splitlines():
+            fields = line.split("\t", 8)
+            if len(fields) < 8:
+                continue
+            gateway = fields[2]
+            gateway_text = gateways.get(gateway)
+            if gateway_text is None:
+                gateway_text = gateways[gateway] = hex_to_ipv4(gateway) if gateway != "00000000" else "On-link"
+            mask = fields[7]
+            mask_text = masks.get(mask)
+            if mask_text is None:
+                mask_text = masks[mask] = hex_to_ipv4(mask)
+            records.append(RouteRecord(hex_to_ipv4(fields[1]), mask_text, gateway_text, fields[0].strip(),
+                                       int(fields[6])))
+        return records
+
+    def read_all_routes(self):
+        """Маршруты IPv4 и IPv6 основной таблицы: из procfs, а без него - через rtnetlink"""
+        if not self.available():
+            if not self.netlink:
+                raise FileNotFoundError(os.path.join(self.proc_root, "net", "route"))
+            return self.netlink_routes(socket.AF_INET) + self.netlink_routes(socket.AF_INET6)
+        records = self.read_routes()
+        try:
+            records += self.read_routes6()
+        except FileNotFoundError:
+            # IPv6 отключен в ядре
+            pass
+        return records
+
+    def read_routes6(self):
+        """Читает таблицу маршрутов IPv6 из /proc/net/ipv6_route; маска задается длиной префикса.
+        Локальные адреса, multicast и заглушки reject пропускаются, как в выводе ip -6 route"""
+        records = []
+        with self._open("net", "ipv6_route") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 10:
+                    continue
+                if int(fields[8], 16) & (RTF_REJECT | RTF_LOCAL):
+                    continue
+                if fields[0] == MULTICAST_PREFIX6 and fields[1] == "08":
+                    continue
+                gateway = fields[4]
+                records.append(RouteRecord(hex_to_ipv6(fields[0]), str(int(fields[1], 16)),
+                                           hex_to_ipv6(gateway) if gateway.strip("0") else "On-link",
+                                           fields[9], int(fields[5], 16)))
+        return records
+
+    def read_neighbors(self):
+        """Читает ARP-таблицу из /proc/net/arp"""
+        records = []
+        with self._open("net", "arp") as f:
+            next(f, None)
+            for line in f:
+                fields = line.split()
+                if len(fields) < 6:
+                    continue
+                ip, _, flags, mac, _, device = fields[:6]
+                entry_type = ARP_FLAGS.get(int(flags, 16), flags)
+                records.append(NeighborRecord(ip, "" if mac == "00:00:00:00:00:00" else mac, entry_type, device))
+        return records
+
+    def read_interfaces(self):
+        """Читает интерфейсы из /sys/class/net, адреса берет из rtnetlink или /proc/net/if_inet6"""
+        addresses = None
+        if self.netlink:
+            try:
+                addresses = self.netlink_addresses()
+            except OSError:
+                pass
+        if addresses is None:
+            addresses = self.read_inet6_addresses()
+
+        # Шлюзы интерфейса - это шлюзы его маршрутов по умолчанию
+        gateways = {}
+        try:
+            for route in self.read_routes():
+                if route.destination == "0.0.0.0" and route.mask == "0.0.0.0" and route.gateway != "On-link":
+                    gateways.setdefault(route.interface, []).append(route.gateway)
+        except OSError:
+            pass
+
+        records = []
+        base = os.path.join(self.sys_root, "class", "net")
+        for name in sorted(os.listdir(base)):
+            mac = self._read_sys(base, name, "address")
+            mtu = self._read_sys(base, name, "mtu")
+            state = self._read_sys(base, name, "operstate")
+            iface_addresses = addresses.get(name, [])
+            details = [f"Интерфейс: {name}",
+                       f"Физический адрес: {mac or ''}",
+                       f"MTU: {mtu or ''}",
+                       f"Состояние: {state or ''}"]
+            details += [f"Адрес: {address}" for address in iface_addresses]
+            details += [f"Шлюз: {gateway}" for gateway in gateways.get(name, [])]
+            records.append(InterfaceRecord(name, mac, iface_addresses, int(mtu) if mtu else None, state, details,
+                                           gateways=gateways.get(name, [])))
+        return records
+
+    def _read_sys(self, base, name, attribute):
+        try:
+            with open(os.path.join(base, name, attribute), encoding="ascii") as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def read_inet6_addresses(self):
+        """Адреса IPv6 из /proc/net/if_inet6 (IPv4 в procfs не публикуются)"""
+        addresses = {}
+        try:
+            with self._open("net", "if_inet6") as f:
+                for line in f:
+                    fields = line.split()
+                    if len(fields) >= 6:
+                        addresses.setdefault(fields[5], []).append(
+                            f"{hex_to_ipv6(fields[0])}/{int(fields[2], 16)}")
+        except OSError:
+            pass
+        return addresses
+
+    def netlink_dump(self, msg_type, body):
+        """Выполняет дамп rtnetlink и возвращает пары (тип сообщения, данные сообщения)"""
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+        try:
+            sock.bind((0, 0))
+            sock.send(NLMSGHDR.pack(NLMSGHDR.size + len(body), msg_type, NLM_F_REQUEST | NLM_F_DUMP, 1, 0) + body)
+            messages = []
+            while True:
+                data = sock.recv(1 << 20)
+                offset = 0
+                while offset + NLMSGHDR.size <= len(data):
+                    length, kind, _, _, _ = NLMSGHDR.unpack_from(data, offset)
+                    if length < NLMSGHDR.size:
+                        return messages
+                    if kind == NLMSG_DONE:
+                        return messages
+                    if kind == NLMSG_ERROR:
+                        error = struct.unpack_from("=i", data, offset + NLMSGHDR.size)[0]
+                        if error:
+                            raise OSError(-error, os.strerror(-error))
+                        return messages
+                    messages.append((kind, data[offset + NLMSGHDR.size:offset + length]))
+                    offset += (length + 3) & ~3
+        finally:
+            sock.close()
+
+    def netlink_subscribe(self, kind):
+        """Открывает неблокирующий сокет rtnetlink, подписанный на изменения kind"""
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+        try:
+            sock.bind((0, NETLINK_GROUPS[kind]))
+        except (OSError, KeyError):
+            sock.close()
+            raise
+        sock.setblocking(False)
+        return sock
+
+    def netlink_routes(self, family=socket.AF_INET):
+        """Читает основную таблицу маршрутов через rtnetlink"""
+        records = []
+        names = {}
+        body = RTMSG.pack(family, 0, 0, 0, 0, 0, 0, 0, 0)
+        for kind, data in self.netlink_dump(RTM_GETROUTE, body):
+            if kind != RTM_NEWROUTE:
+                continue
+            rtm_family, dst_len, _, _, table, _, _, _, _ = RTMSG.unpack_from(data)
+            attrs = parse_rtattrs(data, RTMSG.size)
+            if RTA_TABLE in attrs:
+                table = struct.unpack("=I", attrs[RTA_TABLE])[0]
+            if table != RT_TABLE_MAIN:
+                continue
+            if RTA_DST in attrs:
+                destination = socket.inet_ntop(rtm_family, attrs[RTA_DST])
+            else:
+                destination = "0.0.0.0" if rtm_family == socket.AF_INET else "::"
+            gateway = socket.inet_ntop(rtm_family, attrs[RTA_GATEWAY]) if RTA_GATEWAY in attrs else "On-link"
+            iface = ""
+            if RTA_OIF in attrs:
+                index = struct.unpack("=I", attrs[RTA_OIF])[0]
+                if index not in names:
+                    try:
+                        names[index] = socket.if_indextoname(index)
+                    except OSError:
+                        names[index] = str(index)
+                iface = names[index]
+            metric = struct.unpack("=I", attrs[RTA_PRIORITY])[0] if RTA_PRIORITY in attrs else 0
+            if rtm_family == socket.AF_INET:
+                mask = str(ipaddress.IPv4Network(f"0.0.0.0/{dst_len}").netmask)
+            else:
+                mask = str(dst_len)
+            records.append(RouteRecord(destination, mask, gateway, iface, metric))
+        return records
+
+    def netlink_addresses(self):
+        """Возвращает адреса интерфейсов через rtnetlink: {имя: ["адрес/префикс", ...]}"""
+        addresses = {}
+        body = IFADDRMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+        for kind, data in self.netlink_dump(RTM_GETADDR, body):
+            if kind != RTM_NEWADDR:
+                continue
+            family, prefix_len, _, _, index = IFADDRMSG.unpack_from(data)
+            attrs = parse_rtattrs(data, IFADDRMSG.size)
+            raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+            if raw is None:
+                continue
+            try:
+                name = socket.if_indextoname(index)
+            except OSError:
+                name = str(index)
+            addresses.setdefault(name, []).append(f"{socket.inet_ntop(family, raw)}/{prefix_len}")
+        return addresses
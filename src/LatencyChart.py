@@ -0,0 +1,218 @@
+import math
+import threading
+import time
+
+from PyQt5.QtCore import Qt, QTimer, QPointF, QRectF
+from PyQt5.QtGui import QPainter, QPen, QColor, QPolygonF, QPalette
+from PyQt5.QtWidgets import QWidget
+
+RTT_COLOR = QColor(0, 137, 191)
+LOSS_COLOR = QColor(255, 84, 84)
+# Фон и подписи берутся из палитры приложения, сетка - в тон линиям таблиц темной темы
+GRID_COLOR = QColor(68, 68, 68)
+
+# Окна графика: (подпись, секунды)
+CHART_SPANS = (("1 мин", 60), ("5 мин", 300), ("15 мин", 900), ("1 ч", 3600))
+# Перерисовка не чаще 10 раз в секунду, сколько бы замеров ни приходило
+FRAME_INTERVAL = 100
+# Наибольшая частота замеров одного узла, для которой кольцо вмещает самое длинное окно;
+# при более частых пробах в окне остаются последние RING_CAPACITY замеров
+MAX_SAMPLE_RATE = 10
+RING_CAPACITY = max(seconds for _, seconds in CHART_SPANS) * MAX_SAMPLE_RATE
+# Начальный размер кольца; буфер растет удвоением, так что опрос /16 по 4 пробы не занимает гигабайты
+RING_INITIAL = 16
+MARGIN = 40
+
+
+class SampleRing:
+    """Кольцевой буфер замеров (время, RTT) фиксированного размера; потеря хранится как NaN"""
+
+    def __init__(self, capacity=RING_CAPACITY):
+        # numpy загружается с первым замером в потоке проб, а не при запуске приложения
+        import numpy as np
+        self.capacity = capacity
+        size = min(RING_INITIAL, capacity)
+        self.times = np.empty(size)
+        self.values = np.empty(size, dtype=np.float32)
+        self.count = 0
+
+    def append(self, timestamp, rtt):
+        size = len(self.times)
+        if self.count == size and size < self.capacity:
+            import numpy as np
+            size = min(size * 2, self.capacity)
+            self.times = np.resize(self.times, size)
+            self.values = np.resize(self.values, size)
+        index = self.count % size
+        self.times[index] = timestamp
+        self.values[index] = math.nan if rtt is None else rtt
+        self.count += 1
+
+    def window(self, start, end):
+        """Копии замеров за [start, end] в порядке времени"""
+        import numpy as np
+        size = len(self.times)
+        if self.count <= size:
+            times = self.times[:self.count]
+            values = self.values[:self.count]
+        else:
+            head = self.count % size
+            times = np.concatenate((self.times[head:], self.times[:head]))
+            values = np.concatenate((self.values[head:], self.values[:head]))
+        first, last = np.searchsorted(times, (start, end), side="right")
+        return times[first:last].copy(), values[first:last].copy()
+
+    def last(self):
+        if not self.count:
+            return None
+        return float(self.values[(self.count - 1) % len(self.values)])
+
+
+class LatencyHistory:
+    """Кольцевые буферы замеров по узлам. Потоки проб пишут сюда напрямую, а график
+    читает окно по своему таймеру, так что отдельный сигнал на каждый замер не нужен"""
+
+    def __init__(self, capacity=RING_CAPACITY):
+        self.capacity = capacity
+        self.rings = {}
+        self.lock = threading.Lock()
+
+    def add(self, target, rtt, timestamp=None):
+        with self.lock:
+            ring = self.rings.get(target)
+            if ring is None:
+                ring = self.rings[target] = SampleRing(self.capacity)
+            ring.append(time.monotonic() if timestamp is None else timestamp, rtt)
+
+    def add_result(self, result):
+        self.add(result.target, result.rtt)
+
+    def window(self, target, start, end):
+        with self.lock:
+            ring = self.rings.get(target)
+            if ring is None:
+                import numpy as np
+                return np.empty(0), np.empty(0, dtype=np.float32)
+            return ring.window(start, end)
+
+    def last(self, target):
+        with self.lock:
+            ring = self.rings.get(target)
+            return None if ring is None else ring.last()
+
+    def clear(self):
+        with self.lock:
+            self.rings.clear()
+
+
+def decimate(times, values, start, end, width):
+    """Прореживание min/max по пикселям: (x, min, max) для столбцов с ответами и x столбцов с потерями.
+    Результат не больше width точек, сколько бы замеров ни попало в окно"""
+    import numpy as np
+    columns = np.clip(((times - start) * (width / (end - start))).astype(np.int64), 0, width - 1)
+    lost = np.isnan(values)
+    lost_columns = np.unique(columns[lost])
+    columns = columns[~lost]
+    values = values[~lost]
+    if not len(values):
+        return columns, values, values, lost_columns
+    # Время растет, значит номера столбцов идут подряд и границы групп находятся одним diff
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(columns)) + 1))
+    return (columns[starts], np.minimum.reduceat(values, starts), np.maximum.reduceat(values, starts),
+            lost_columns)
+
+
+def nice_ceiling(value):
+    """Ближайшее сверху число вида 1, 2, 5 * 10^k для шкалы"""
+    if value <= 0:
+        return 1.0
+    power = 10 ** math.floor(math.log10(value))
+    for step in (1, 2, 5, 10):
+        if value <= step * power:
+            return step * power
+    return 10 * power
+
+
+class LatencyChart(QWidget):
+    """Живой график RTT и потерь одного узла за последние span секунд"""
+
+    def __init__(self, history, span=60):
+        super().__init__()
+        self.history = history
+        self.span = span
+        self.target = None
+        self.setMinimumHeight(150)
+        self.timer = QTimer(self)
+        self.timer.setInterval(FRAME_INTERVAL)
+        self.timer.timeout.connect(self.update)
+
+    def set_target(self, target):
+        self.target = target
+        self.update()
+
+    def set_span(self, seconds):
+        self.span = seconds
+        self.update()
+
+    def showEvent(self, event):
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        # Скрытый график не перерисовывается
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.palette().color(QPalette.Base))
+        text_color = self.palette().color(QPalette.Text)
+        plot = QRectF(MARGIN, 20, self.width() - MARGIN - 10, self.height() - 40)
+        width = int(plot.width())
+        if self.target is None or width < 2 or plot.height() < 10:
+            painter.setPen(text_color)
+            painter.drawText(self.rect(), Qt.AlignCenter, "Нет данных")
+            return
+
+        import numpy as np
+
+        end = time.monotonic()
+        start = end - self.span
+        times, values = self.history.window(self.target, start, end)
+        xs, mins, maxs, lost = decimate(times, values, start, end, width)
+        top = nice_ceiling(float(maxs.max()) * 1.1 if len(maxs) else 1.0)
+        scale = plot.height() / top
+
+        # Сетка по RTT: четыре деления с подписями в мс
+        for i in range(5):
+            y = plot.bottom() - plot.height() * i / 4
+            painter.setPen(QPen(GRID_COLOR, 1))
+            painter.drawLine(QPointF(plot.left(), y), QPointF(plot.right(), y))
+            painter.setPen(text_color)
+            painter.drawText(QRectF(0, y - 8, MARGIN - 4, 16), Qt.AlignRight | Qt.AlignVCenter, f"{top * i / 4:g}")
+        axis = QRectF(plot.left(), plot.bottom() + 2, plot.width(), 16)
+        painter.drawText(axis, Qt.AlignLeft, f"-{self.span} с")
+        painter.drawText(axis, Qt.AlignRight, "0 с")
+
+        # Потери - красные отметки у нижней границы
+        painter.setPen(QPen(LOSS_COLOR, 1))
+        for x in (plot.left() + lost).tolist():
+            painter.drawLine(QPointF(x, plot.bottom()), QPointF(x, plot.bottom() - 8))
+
+        # Для каждого столбца линия идет от минимума к максимуму, так что выбросы не теряются
+        if len(xs):
+            points = np.empty((2 * len(xs), 2))
+            points[0::2, 0] = points[1::2, 0] = plot.left() + xs
+            points[0::2, 1] = plot.bottom() - mins * scale
+            points[1::2, 1] = plot.bottom() - maxs * scale
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setPen(QPen(RTT_COLOR, 1.5))
+            painter.drawPolyline(QPolygonF([QPointF(x, y) for x, y in points.tolist()]))
+
+        received = len(values) - int(np.isnan(values).sum())
+        loss = 100.0 * (len(values) - received) / len(values) if len(values) else 0.0
+        last = self.history.last(self.target)
+        last = "*" if last is None or math.isnan(last) else f"{last:.2f} мс"
+        painter.setPen(text_color)
+        painter.drawText(QRectF(plot.left(), 0, plot.width(), 18), Qt.AlignLeft | Qt.AlignVCenter,
+                         f"{self.target}: RTT, мс; последний {last}, потери {loss:.0f}% за окно")
@@ -0,0 +1,35 @@
+import threading
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class LayoutThread(QThread):
+    """Считает раскладку графа вне потока GUI и сообщает о прогрессе"""
+
+    progress_signal = pyqtSignal(int)
+    positions_signal = pyqtSignal(dict)
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, layout, nodes, edges, mode="force"):
+        super().__init__()
+        self.layout = layout
+        self.nodes = list(nodes)
+        self.edges = list(edges)
+        self.mode = mode
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            positions = self.layout.layout(self.nodes, self.edges, self.mode, self.report_progress,
+                                           self._stop_event)
+        except Exception as e:
+            self.error_signal.emit(f"Ошибка раскладки: {e}")
+            return
+        if not self._stop_event.is_set():
+            self.positions_signal.emit(positions)
+
+    def report_progress(self, done, total):
+        self.progress_signal.emit(int(100 * done / total))
+
+    def stop(self):
+        """Прерывает расчет после текущей итерации"""
+        self._stop_event.set()
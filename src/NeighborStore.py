@@ -0,0 +1,147 @@
+import collections
+
+from src.Records import NeighborRecord
+
+# Вид конфликта: один MAC у нескольких адресов или адрес, сменивший MAC за время наблюдения.
+# Оба - признаки подмены ARP (или прокси-ARP и смены сетевой карты, если они ожидаемы)
+MAC_CONFLICT = "mac"
+IP_CONFLICT = "ip"
+Conflict = collections.namedtuple("Conflict", ["kind", "key", "values"])
+
+# Вторая шестнадцатеричная цифра MAC с установленным младшим битом - групповой адрес
+GROUP_DIGITS = frozenset("13579bdf")
+
+
+def mac_key(mac):
+    """MAC для индекса: aa:bb:cc:dd:ee:ff или None для незаполненных, широковещательных и групповых"""
+    if not mac:
+        return None
+    mac = mac.lower().replace("-", ":")
+    if len(mac) != 17 or mac[1] in GROUP_DIGITS or mac == "00:00:00:00:00:00":
+        return None
+    return mac
+
+
+class NeighborStore:
+    """Таблица соседей с индексами по IP и по MAC.
+    Вкладка показывает строки отсюда: поиск и удаление по IP - O(1), адреса одного MAC
+    находятся без просмотра таблицы, а конфликты проверяются только для изменившихся записей"""
+
+    def __init__(self, oui=None):
+        self.oui = oui
+        self.by_ip = {}
+        self.by_mac = {}
+        # MAC -> адрес или множество адресов; IP -> MAC или кортеж MAC, которые адрес имел за время
+        # наблюдения (таблица перечитывается, а история остается)
+        self.history = {}
+
+    def __len__(self):
+        return len(self.by_ip)
+
+    def __contains__(self, ip):
+        return ip in self.by_ip
+
+    def get(self, ip):
+        return self.by_ip.get(ip)
+
+    def records(self):
+        return [NeighborRecord(*record) for record in self.by_ip.values()]
+
+    def ips_for_mac(self, mac):
+        """Адреса с этим MAC"""
+        ips = self.by_mac.get(mac_key(mac), ())
+        return [ips] if type(ips) is str else sorted(ips)
+
+    def add(self, records):
+        """Добавляет или заменяет записи (ip, mac, тип, интерфейс).
+        Возвращает конфликты, которых коснулись эти записи"""
+        shared_macs = []
+        changed_ips = []
+        by_ip = self.by_ip
+        by_mac = self.by_mac
+        history = self.history
+        for record in records:
+            ip = record[0]
+            if not ip:
+                continue
+            previous = by_ip.get(ip)
+            if previous is not None:
+                self._unlink(previous)
+            by_ip[ip] = record
+            mac = mac_key(record[1])
+            if mac is None:
+                continue
+            # У большинства MAC один адрес, а у адреса один MAC: множество и кортеж заводятся только
+            # при втором значении, так что /16 соседей не тратит по объекту на запись
+            ips = by_mac.get(mac)
+            if ips is None:
+                by_mac[mac] = ip
+            elif ips != ip:
+                if type(ips) is str:
+                    ips = by_mac[mac] = {ips}
+                ips.add(ip)
+                shared_macs.append(mac)
+            seen = history.get(ip)
+            if seen is None:
+                history[ip] = mac
+            elif seen != mac and mac not in seen:
+                history[ip] = (seen, mac) if type(seen) is str else seen + (mac,)
+                changed_ips.append(ip)
+        conflicts = [Conflict(MAC_CONFLICT, mac, self.ips_for_mac(mac)) for mac in dict.fromkeys(shared_macs)]
+        return conflicts + [Conflict(IP_CONFLICT, ip, list(history[ip])) for ip in dict.fromkeys(changed_ips)]
+
+    def remove(self, ips):
+        """Удаляет записи по IP; возвращает удаленные записи"""
+        removed = []
+        for ip in ips:
+            record = self.by_ip.pop(ip, None)
+            if record is not None:
+                self._unlink(record)
+                removed.append(record)
+        return removed
+
+    def _unlink(self, record):
+        if record is None:
+            return
+        mac = mac_key(record[1])
+        ips = self.by_mac.get(mac)
+        if ips == record[0]:
+            del self.by_mac[mac]
+        elif ips is not None and type(ips) is not str:
+            ips.discard(record[0])
+            if len(ips) == 1:
+                self.by_mac[mac] = ips.pop()
+
+    def apply_diff(self, added, removed, changed):
+        """Применяет разницу снимков; возвращает появившиеся конфликты"""
+        self.remove(record[0] for record in removed)
+        return self.add(added + [new for _, new in changed])
+
+    def conflicts(self):
+        """Все текущие конфликты"""
+        result = [Conflict(MAC_CONFLICT, mac, sorted(ips)) for mac, ips in self.by_mac.items() if type(ips) is not str]
+        result += [Conflict(IP_CONFLICT, ip, list(macs)) for ip, macs in self.history.items() if type(macs) is not str]
+        return result
+
+    def clear(self, history=False):
+        self.by_ip = {}
+        self.by_mac = {}
+        if history:
+            self.history = {}
+
+    def vendors(self, records):
+        """Производители для записей (None, если базы OUI нет)"""
+        if self.oui is None:
+            return [None] * len(records)
+        return self.oui.lookup_many([record[1] or "" for record in records])
+
+    def rows(self, records):
+        """Строки таблицы: запись и производитель"""
+        records = list(records)
+        return [tuple(record) + (vendor,) for record, vendor in zip(records, self.vendors(records))]
+
+
+def format_conflict(conflict):
+    if conflict.kind == MAC_CONFLICT:
+        return f"Внимание: MAC {conflict.key} у нескольких адресов: {', '.join(conflict.values)}"
+    return f"Внимание: адрес {conflict.key} сменил MAC: {' -> '.join(conflict.values)}"
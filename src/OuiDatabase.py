@@ -0,0 +1,211 @@
+import array
+import bisect
+import itertools
+import mmap
+import operator
+import os
+import re
+import struct
+import sys
+
+# Скомпилированная база производителей по умолчанию (собирается командой cli.py oui build)
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".nat-lab", "oui.bin")
+
+# Формат файла: заголовок (сигнатура, число записей), отсортированные OUI (uint32),
+# смещения названий (uint32) и сами названия - байт длины и UTF-8. Повторяющиеся названия хранятся один раз
+MAGIC = b"OUI1"
+HEADER = struct.Struct("<4sI")
+NAME_LIMIT = 255
+# Первые 8 символов MAC (aa:bb:cc) - по ним выбирается производитель
+PREFIX = operator.itemgetter(slice(0, 8))
+
+# Строка с OUI в начале: oui.txt IEEE ("00-00-0C   (hex)  Cisco"), manuf Wireshark ("00:00:0C<TAB>Cisco<TAB>...")
+# и nmap-mac-prefixes ("00000C Cisco"). Блоки MA-M/MA-S (00:1B:C5:00:00:00/36) в базу не входят
+SOURCE_LINE = re.compile(r"^([0-9A-Fa-f]{2})[-:]?([0-9A-Fa-f]{2})[-:]?([0-9A-Fa-f]{2})\s+"
+                         r"(?:\((?:hex|base 16)\)\s+)?(\S.*)$")
+
+
+def parse_source(lines):
+    """Пары (OUI числом, производитель) из oui.txt/oui.csv IEEE, manuf Wireshark или nmap-mac-prefixes"""
+    lines = iter(lines)
+    first = next(lines, "")
+    if first.startswith("Registry,"):
+        # csv нужен только при сборке базы, при запуске приложения он не загружается
+        import csv
+        for row in csv.reader(lines):
+            if len(row) >= 3 and row[0] == "MA-L":
+                try:
+                    yield int(row[1], 16), row[2].strip()
+                except ValueError:
+                    continue
+        return
+    for line in itertools.chain([first], lines):
+        match = SOURCE_LINE.match(line)
+        if match:
+            # В manuf последнее поле - полное название, первое - сокращенное
+            name = match.group(4).split("\t")[-1].strip()
+            if name:
+                yield int(match.group(1) + match.group(2) + match.group(3), 16), name
+
+
+def build_database(source, path=DEFAULT_PATH):
+    """Собирает базу из текстового источника; возвращает число записей"""
+    entries = {}
+    with open(source, encoding="utf-8", errors="replace") as file:
+        for oui, name in parse_source(file):
+            entries.setdefault(oui, name)
+
+    keys = array.array("I", sorted(entries))
+    offsets = array.array("I")
+    names = bytearray()
+    name_offsets = {}
+    for key in keys:
+        name = entries[key].encode("utf-8")[:NAME_LIMIT]
+        offset = name_offsets.get(name)
+        if offset is None:
+            offset = name_offsets[name] = len(names)
+            names.append(len(name))
+            names += name
+        offsets.append(offset)
+    if sys.byteorder != "little":
+        keys.byteswap()
+        offsets.byteswap()
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(keys)))
+        file.write(keys.tobytes())
+        file.write(offsets.tobytes())
+        file.write(names)
+    # Замена файла атомарна: открытая база продолжает читать старую копию
+    os.replace(temporary, path)
+    return len(keys)
+
+
+def mac_oui(mac):
+    """Первые три байта MAC числом или None для локально администрируемых адресов (случайные MAC)"""
+    if len(mac) >= 8 and mac[2] in ":-" and mac[5] in ":-":
+        digits = mac[0:2] + mac[3:5] + mac[6:8]
+    else:
+        digits = re.sub(r"[^0-9A-Fa-f]", "", mac)[:6]
+    try:
+        value = int(digits, 16)
+    except ValueError:
+        return None
+    if len(digits) != 6 or value & 0x020000:
+        return None
+    return value
+
+
+class OuiDatabase:
+    """Производитель по MAC-адресу из скомпилированной базы OUI.
+    Файл отображается в память при первом поиске, поэтому запуск приложения он не замедляет;
+    поиск - двоичный по отсортированному массиву, найденные названия кэшируются по OUI"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.file = None
+        self.map = None
+        self.keys = ()
+        self.offsets = ()
+        self.names_start = 0
+        self.opened = False
+        self.cache = {}
+
+    def open(self):
+        self.opened = True
+        try:
+            self.file = open(self.path, "rb")
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Базы нет или файл пуст: производители просто не показываются
+            self.close()
+            return
+        # Обрезанный или поврежденный файл - как отсутствующий: поиск не должен падать у вызывающих
+        if len(self.map) < HEADER.size:
+            self.close()
+            return
+        magic, count = HEADER.unpack_from(self.map)
+        if magic != MAGIC or len(self.map) < HEADER.size + 8 * count:
+            self.close()
+            return
+        view = memoryview(self.map)
+        start = HEADER.size
+        self.keys = view[start:start + 4 * count].cast("I")
+        self.offsets = view[start + 4 * count:start + 8 * count].cast("I")
+        if sys.byteorder != "little":
+            self.keys = array.array("I", self.keys)
+            self.keys.byteswap()
+            self.offsets = array.array("I", self.offsets)
+            self.offsets.byteswap()
+        self.names_start = start + 8 * count
+
+    def close(self):
+        # Представления памяти держат отображение, их нужно отпустить до закрытия
+        if isinstance(self.keys, memoryview):
+            self.keys.release()
+            self.offsets.release()
+        self.keys = self.offsets = ()
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.cache = {}
+
+    def reload(self):
+        """Перечитывает базу после пересборки"""
+        self.close()
+        self.open()
+
+    def __len__(self):
+        if not self.opened:
+            self.open()
+        return len(self.keys)
+
+    def find(self, oui):
+        """Производитель по OUI (числу) или None"""
+        if not self.opened:
+            self.open()
+        i = bisect.bisect_left(self.keys, oui)
+        if i == len(self.keys) or self.keys[i] != oui:
+            return None
+        position = self.names_start + self.offsets[i]
+        if position >= len(self.map):
+            return None
+        return self.map[position + 1:position + 1 + self.map[position]].decode("utf-8", "replace")
+
+    def lookup(self, mac):
+        """Производитель по MAC-адресу или None"""
+        if not mac:
+            return None
+        oui = mac_oui(mac)
+        if oui is None:
+            return None
+        try:
+            return self.cache[oui]
+        except KeyError:
+            vendor = self.cache[oui] = self.find(oui)
+            return vendor
+
+    def lookup_many(self, macs):
+        """Производители для списка MAC (строк, пустая - без MAC). Первые 8 символов MAC однозначно задают OUI, поэтому
+        поиск идет один раз на префикс, а не на каждого соседа"""
+        prefixes = list(map(PREFIX, macs))
+        vendors = dict.fromkeys(prefixes)
+        for prefix in vendors:
+            vendors[prefix] = self.lookup(prefix)
+        return list(map(vendors.__getitem__, prefixes))
+
+
+_database = None
+
+
+def get_oui_database():
+    """Общая база производителей; файл открывается при первом поиске"""
+    global _database
+    if _database is None:
+        _database = OuiDatabase()
+    return _database
@@ -0,0 +1,368 @@
+"""Разбор текстового вывода ping, tracert/traceroute, arp, route и ipconfig.
+
+Слова, которыми утилиты различаются в разных локалях, собраны в таблицу LOCALES; грамматики строятся
+из нее один раз при импорте, и каждая принимает сразу все локали, так что язык вывода не нужно определять
+заранее. Поддерживаются Windows (русская и английская локали) и Linux (iputils, traceroute, net-tools, iproute2)."""
+import datetime
+import ipaddress
+import re
+
+from src.Records import RouteRecord, NeighborRecord, InterfaceRecord, PingRecord, TraceRecord
+
+LOCALES = {
+    "en": {
+        "reply_from": ["Reply from"],
+        "bytes": ["bytes"],
+        "bytes_from": ["bytes from"],
+        "time": ["time"],
+        "ms": ["ms", "msec"],
+        "interface": ["Interface"],
+        "adapter": ["adapter"],
+        # Тип адаптера в английской локали стоит перед словом adapter и в имя не попадает
+        "adapter_kind": [],
+        "dynamic": ["dynamic"],
+        "static": ["static"],
+        "on_link": ["On-link"],
+        "physical_address": ["Physical Address"],
+        "ipv4_address": ["IPv4 Address", "IP Address", "Autoconfiguration IPv4 Address"],
+        "ipv6_address": ["IPv6 Address", "Link-local IPv6 Address", "Temporary IPv6 Address"],
+        "subnet_mask": ["Subnet Mask"],
+        "media_state": ["Media State"],
+        "media_disconnected": ["Media disconnected"],
+        "description": ["Description"],
+        "default_gateway": ["Default Gateway"],
+        "dns_servers": ["DNS Servers"],
+        "dhcp_enabled": ["DHCP Enabled"],
+        "dhcp_server": ["DHCP Server"],
+        "lease_obtained": ["Lease Obtained"],
+        "lease_expires": ["Lease Expires"],
+        "yes": ["Yes"],
+        "failed": ["failed", "Bad argument", "not found"],
+        "months": ["January", "February", "March", "April", "May", "June", "July", "August", "September",
+                   "October", "November", "December"],
+    },
+    "ru": {
+        "reply_from": ["Ответ от"],
+        "bytes": ["число байт"],
+        "bytes_from": ["байт от", "байтов от"],
+        "time": ["время"],
+        "ms": ["мс", "мсек"],
+        "interface": ["Интерфейс"],
+        "adapter": ["адаптер"],
+        # "Адаптер Ethernet Ethernet 2:" - тип идет после слова "Адаптер", перед именем
+        "adapter_kind": ["Ethernet", "беспроводной локальной сети", "PPP", "Bluetooth"],
+        "dynamic": ["динамический"],
+        "static": ["статический"],
+        "on_link": ["On-link", "Подключено", "Присоединенный"],
+        "physical_address": ["Физический адрес"],
+        "ipv4_address": ["IPv4-адрес", "IP-адрес", "Автонастройка IPv4-адреса"],
+        "ipv6_address": ["IPv6-адрес", "Локальный IPv6-адрес канала", "Временный IPv6-адрес"],
+        "subnet_mask": ["Маска подсети"],
+        "media_state": ["Состояние среды"],
+        "media_disconnected": ["Среда передачи недоступна"],
+        "description": ["Описание"],
+        "default_gateway": ["Основной шлюз"],
+        "dns_servers": ["DNS-серверы"],
+        "dhcp_enabled": ["DHCP включен"],
+        "dhcp_server": ["DHCP-сервер"],
+        "lease_obtained": ["Аренда получена"],
+        "lease_expires": ["Срок аренды истекает"],
+        "yes": ["Да"],
+        "failed": ["ошибка", "Сбой", "не удалось", "Неверный аргумент", "не найден"],
+        "months": ["января", "февраля", "марта", "апреля", "мая", "июня", "июля", "августа", "сентября",
+                   "октября", "ноября", "декабря"],
+    },
+}
+
+
+def words(key):
+    """Все написания слова key во всех локалях"""
+    return [word for locale in LOCALES.values() for word in locale[key]]
+
+
+def alternatives(key):
+    """Группа регулярного выражения из всех написаний; длинные варианты идут первыми"""
+    return "(?:" + "|".join(re.escape(word) for word in sorted(words(key), key=len, reverse=True)) + ")"
+
+
+def lookup(key):
+    """Словарь написание (в нижнем регистре) -> key"""
+    return {word.lower(): key for word in words(key)}
+
+
+OCTET = r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+IPV4 = rf"{OCTET}(?:\.{OCTET}){{3}}"
+IPV6 = r"[0-9A-Fa-f]{0,4}(?::[0-9A-Fa-f]{0,4}){2,7}"
+NUMBER = r"\d+(?:[.,]\d+)?"
+
+IPV4_ADDRESS = re.compile(rf"^{IPV4}$")
+MAC_ADDRESS = re.compile(r"^(?:[0-9A-Fa-f]{2}([:-])(?:[0-9A-Fa-f]{2}\1){4}[0-9A-Fa-f]{2}|"
+                         r"[0-9A-Fa-f]{4}\.[0-9A-Fa-f]{4}\.[0-9A-Fa-f]{4})$")
+
+PING_WINDOWS = re.compile(
+    rf"{alternatives('reply_from')} \[?({IPV4}|{IPV6})\]?:"
+    rf"(?: {alternatives('bytes')}=(\d+))? {alternatives('time')}[<>=]({NUMBER}) ?{alternatives('ms')}"
+    rf"(?: TTL=(\d+))?")
+PING_LINUX = re.compile(
+    rf"(\d+) {alternatives('bytes_from')} (?:\S+ \()?({IPV4}|{IPV6})\)?: .*?ttl=(\d+) "
+    rf"{alternatives('time')}=({NUMBER}) ?{alternatives('ms')}")
+
+TRACE_LINE = re.compile(r"^\s*(\d+)\s+(\S.*)$")
+TRACE_RTT = re.compile(rf"<?({NUMBER})\s*{alternatives('ms')}(?!\w)")
+# Замер или потерянная проба "*" - в том порядке, в котором они стоят в строке
+TRACE_PROBE = re.compile(rf"{TRACE_RTT.pattern}|(?<!\S)\*(?!\S)")
+TRACE_ADDRESS = re.compile(rf"(?<![\w.:])({IPV4}|{IPV6})(?![\w.:])")
+
+ARP_INTERFACE = re.compile(rf"^{alternatives('interface')}:\s*({IPV4})")
+ARP_WINDOWS = re.compile(r"^\s+(\S+)\s+(\S+)\s+(\S+)\s*$")
+# net-tools: ? (192.168.1.1) at aa:bb:cc:dd:ee:ff [ether] on eth0
+ARP_LINUX = re.compile(rf"^\S+ \(({IPV4}|{IPV6})\) at (\S+)(?: \[\w+\])?(?: (PERM|PUB))?(?: on (\S+))?")
+# iproute2: 192.168.1.1 dev eth0 lladdr aa:bb:cc:dd:ee:ff REACHABLE
+NEIGH_LINUX = re.compile(rf"^({IPV4}|{IPV6}) dev (\S+)(?: lladdr (\S+))?(?: router)?(?: proxy)?\s+(\w+)\s*$")
+NEIGHBOR_TYPES = {**lookup("dynamic"), **lookup("static")}
+
+ROUTE_WINDOWS = re.compile(rf"^\s+({IPV4})\s+({IPV4})\s+({IPV4}|{alternatives('on_link')})\s+({IPV4})\s+(\d+)\s*$")
+# net-tools: route -n
+ROUTE_NET_TOOLS = re.compile(rf"^({IPV4})\s+({IPV4})\s+({IPV4})\s+[A-Z!]+\s+(\d+)\s+\d+\s+\d+\s+(\S+)\s*$")
+# iproute2: default via 192.168.1.1 dev eth0 metric 100
+ROUTE_IPROUTE = re.compile(rf"^(default|{IPV4}(?:/\d+)?)(?: via ({IPV4}))?(?: dev (\S+))?.*?(?: metric (\d+))?\s*$")
+
+ADAPTER_HEADER = re.compile(rf"^(?:{alternatives('adapter')}\s+{alternatives('adapter_kind')}\s+|"
+                            rf"(?:.*?\s)?{alternatives('adapter')}\s+)(.+?):\s*$", re.IGNORECASE)
+IPCONFIG_KEYS = {word.lower(): key for key in ("physical_address", "ipv4_address", "ipv6_address", "subnet_mask",
+                                                "media_state", "description", "default_gateway", "dns_servers",
+                                                "dhcp_enabled", "dhcp_server", "lease_obtained", "lease_expires")
+                 for word in words(key)}
+YES = set(word.lower() for word in words("yes"))
+# Номер месяца по названию в любой локали
+MONTHS = {month.lower(): i % 12 + 1 for locale in LOCALES.values() for i, month in enumerate(locale["months"])}
+LEASE_TIME = re.compile(r"(\d{1,2}):(\d{2}):(\d{2})(?:\s*([AaPp][Mm]))?")
+LEASE_TOKEN = re.compile(r"\d+|[^\W\d]+")
+MASK_PREFIXES = {}
+# route/arp в Windows могут вернуть код 0 и при ошибке, поэтому проверяется и текст вывода
+COMMAND_FAILED = re.compile(alternatives("failed"), re.IGNORECASE)
+# ip -batch: номер строки, на которой пакет остановился
+BATCH_FAILED = re.compile(r"Command failed -:(\d+)")
+MEDIA_DISCONNECTED = re.compile(alternatives("media_disconnected"), re.IGNORECASE)
+# Пометки вида "(Основной)"/"(Preferred)" и номер зоны "%11"
+ADDRESS_SUFFIX = re.compile(r"(?:%\d+)?(?:\(.*\))?$")
+ON_LINK = set(word.lower() for word in words("on_link"))
+
+
+def is_ip_address(address):
+    """Проверяет, является ли строка адресом IPv4 (четыре числа от 0 до 255)"""
+    return bool(address) and IPV4_ADDRESS.match(address) is not None
+
+
+def is_mac_address(address):
+    """Проверяет, является ли строка MAC-адресом: 6 пар через ':' или '-', либо три группы через '.'"""
+    return bool(address) and MAC_ADDRESS.match(address) is not None
+
+
+def normalize_mac(mac):
+    """MAC в виде aa:bb:cc:dd:ee:ff"""
+    digits = re.sub(r"[^0-9A-Fa-f]", "", mac).lower()
+    return ":".join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+def command_failed(output):
+    """Сообщает ли вывод route/arp об ошибке (любая локаль)"""
+    return COMMAND_FAILED.search(output) is not None
+
+
+def parse_number(text):
+    return float(text.replace(",", "."))
+
+
+def parse_ping_line(line):
+    """Строка ответа ping (Windows или Linux, любая локаль) -> PingRecord или None"""
+    match = PING_WINDOWS.search(line)
+    if match is not None:
+        ip, size, rtt, ttl = match.groups()
+        return PingRecord(ip, int(size) if size else None, parse_number(rtt), int(ttl) if ttl else None)
+    match = PING_LINUX.search(line)
+    if match is not None:
+        size, ip, ttl, rtt = match.groups()
+        return PingRecord(ip, int(size), parse_number(rtt), int(ttl))
+    return None
+
+
+def parse_trace_line(line):
+    """Строка хопа tracert/traceroute -> TraceRecord(ttl, адреса, замеры) или None.
+    Потерянная проба ("*") дает None на своем месте среди замеров: "* 12 ms 13 ms" -> [None, 12, 13]"""
+    match = TRACE_LINE.match(line)
+    if match is None:
+        return None
+    ttl, rest = match.groups()
+    rtts = [parse_number(value) if value else None for value in TRACE_PROBE.findall(rest)]
+    addresses = list(dict.fromkeys(TRACE_ADDRESS.findall(TRACE_RTT.sub(" ", rest))))
+    if not rtts and not addresses:
+        return None
+    return TraceRecord(int(ttl), addresses, rtts)
+
+
+class NeighborParser:
+    """Разбор таблицы соседей построчно. Windows печатает интерфейс заголовком перед своими записями,
+    поэтому парсер помнит последний заголовок; для каждой команды нужен свой экземпляр"""
+
+    def __init__(self):
+        self.interface = None
+
+    def __call__(self, line):
+        match = ARP_INTERFACE.match(line)
+        if match is not None:
+            self.interface = match.group(1)
+            return None
+        match = ARP_WINDOWS.match(line)
+        if match is not None and is_ip_address(match.group(1)) and is_mac_address(match.group(2)):
+            ip, mac, entry_type = match.groups()
+            return NeighborRecord(ip, normalize_mac(mac), NEIGHBOR_TYPES.get(entry_type.lower(), entry_type),
+                                  self.interface)
+        match = ARP_LINUX.match(line)
+        if match is not None and is_mac_address(match.group(2)):
+            ip, mac, flag, interface = match.groups()
+            return NeighborRecord(ip, normalize_mac(mac), "permanent" if flag == "PERM" else "dynamic", interface)
+        match = NEIGH_LINUX.match(line)
+        if match is not None:
+            ip, interface, mac, state = match.groups()
+            return NeighborRecord(ip, normalize_mac(mac) if mac and is_mac_address(mac) else "", state.lower(),
+                                  interface)
+        return None
+
+
+def parse_neighbor_line(line):
+    """Одна строка без учета заголовков интерфейсов; для потока строк используйте NeighborParser"""
+    return NeighborParser()(line)
+
+
+def parse_route_line(line):
+    """Строка таблицы маршрутов (route print, route -n или ip route) -> RouteRecord или None"""
+    match = ROUTE_WINDOWS.match(line)
+    if match is not None:
+        destination, mask, gateway, interface, metric = match.groups()
+        if gateway.lower() in ON_LINK:
+            gateway = "On-link"
+        return RouteRecord(destination, mask, gateway, interface, int(metric))
+    match = ROUTE_NET_TOOLS.match(line)
+    if match is not None:
+        destination, gateway, mask, metric, interface = match.groups()
+        return RouteRecord(destination, mask, "On-link" if gateway == "0.0.0.0" else gateway, interface,
+                           int(metric))
+    match = ROUTE_IPROUTE.match(line)
+    if match is not None and (match.group(2) or match.group(3)):
+        destination, gateway, interface, metric = match.groups()
+        if destination == "default":
+            destination = "0.0.0.0/0"
+        network = ipaddress.IPv4Network(destination if "/" in destination else destination + "/32", strict=False)
+        return RouteRecord(str(network.network_address), str(network.netmask), gateway or "On-link",
+                           interface or "", int(metric or 0))
+    return None
+
+
+def parse_lease(text):
+    """Дата аренды DHCP из ipconfig ("18 октября 2026 г. 10:15:30", "Sunday, October 18, 2026 10:15:30 AM")
+    -> datetime; если дату разобрать не удалось, возвращается исходная строка"""
+    clock = LEASE_TIME.search(text)
+    if clock is None:
+        return text
+    month = day = year = None
+    for token in LEASE_TOKEN.findall(text[:clock.start()]):
+        if token.isdigit():
+            if len(token) == 4:
+                year = int(token)
+            elif day is None:
+                day = int(token)
+        elif month is None:
+            month = MONTHS.get(token.lower())
+    hour, minute, second, half = clock.groups()
+    hour = int(hour)
+    if half is not None:
+        hour = hour % 12 + (12 if half.lower() == "pm" else 0)
+    try:
+        return datetime.datetime(year, month, day, hour, int(minute), int(second))
+    except (TypeError, ValueError):
+        return text
+
+
+def mask_to_prefix(mask):
+    """Длина префикса по маске 255.255.255.0; маски повторяются, поэтому результат кэшируется"""
+    prefix = MASK_PREFIXES.get(mask)
+    if prefix is None:
+        try:
+            prefix = MASK_PREFIXES[mask] = ipaddress.IPv4Network(f"0.0.0.0/{mask}").prefixlen
+        except ValueError:
+            return None
+    return prefix
+
+
+def interface_record(name, section, values):
+    """InterfaceRecord из значений одного раздела ipconfig"""
+    addresses = []
+    masks = values.get("subnet_mask", [])
+    for i, address in enumerate(values.get("ipv4_address", [])):
+        prefix = mask_to_prefix(masks[i]) if i < len(masks) else None
+        addresses.append(address if prefix is None else f"{address}/{prefix}")
+    addresses += values.get("ipv6_address", [])
+    mac = values.get("physical_address", [None])[0]
+    media = values.get("media_state", [""])[0]
+    dhcp = values.get("dhcp_enabled")
+    lease_obtained = values.get("lease_obtained")
+    lease_expires = values.get("lease_expires")
+    return InterfaceRecord(name, normalize_mac(mac) if mac and is_mac_address(mac) else None, addresses, None,
+                           "down" if MEDIA_DISCONNECTED.search(media) else "up", section,
+                           values.get("description", [None])[0], values.get("default_gateway", []),
+                           values.get("dns_servers", []), None if dhcp is None else dhcp[0].lower() in YES,
+                           values.get("dhcp_server", [None])[0],
+                           parse_lease(lease_obtained[0]) if lease_obtained else None,
+                           parse_lease(lease_expires[0]) if lease_expires else None)
+
+
+# Значения, которые ipconfig продолжает на следующих строках без ключа
+CONTINUED_KEYS = ("default_gateway", "dns_servers")
+ADDRESS_KEYS = ("ipv4_address", "ipv6_address", "default_gateway", "dns_servers", "dhcp_server")
+
+
+def parse_ipconfig(lines):
+    """Вывод ipconfig (любая локаль) -> записи InterfaceRecord за один проход: раздел адаптера
+    заканчивается на следующем заголовке, строки не ищутся повторно, так что одинаковые строки
+    и сотни виртуальных адаптеров обрабатываются за линейное время. Раздел целиком попадает в details"""
+    records = []
+    name = None
+    section = []
+    values = {}
+    key = None
+
+    for line in lines:
+        if line and not line[0].isspace():
+            match = ADAPTER_HEADER.match(line)
+            if match is not None:
+                if name is not None:
+                    records.append(interface_record(name, section, values))
+                name = match.group(1).strip()
+                section = [line]
+                values = {}
+                key = None
+            continue
+        if name is None:
+            continue
+        section.append(line)
+        # Ключ, точки-заполнители и значение: "   Маска подсети . . . . . . : 255.255.255.0";
+        # в значениях IPv6 двоеточие не бывает перед пробелом, поэтому разделитель однозначен
+        head, separator, value = line.partition(": ")
+        if not separator:
+            stripped = line.rstrip()
+            if stripped.endswith(":"):
+                # Ключ без значения, значения могут идти на следующих строках
+                head, separator, value = stripped[:-1], ":", ""
+            elif key in CONTINUED_KEYS and stripped:
+                values.setdefault(key, []).append(ADDRESS_SUFFIX.sub("", stripped.strip()))
+                continue
+            else:
+                continue
+        key = IPCONFIG_KEYS.get(head.rstrip(" .").strip().lower())
+        value = value.strip()
+        if key is not None and value:
+            values.setdefault(key, []).append(ADDRESS_SUFFIX.sub("", value) if key in ADDRESS_KEYS else value)
+    if name is not None:
+        records.append(interface_record(name, section, values))
+    return records
@@ -0,0 +1,418 @@
+import asyncio
+import collections
+import errno
+import socket
+import statistics
+import struct
+import sys
+import time
+
+from src.ProbeEngine import build_echo_request, ICMP_ECHO_REPLY, ICMPV6_ECHO_REPLY
+
+# Параметры сокета Linux (в модуле socket их нет): запрет фрагментации, MTU пути и время приема из ядра
+IP_MTU_DISCOVER = 10
+IP_PMTUDISC_DO = 2
+IP_MTU = 14
+IPV6_MTU_DISCOVER = 23
+IPV6_PMTUDISC_DO = 2
+IPV6_MTU = 24
+SO_TIMESTAMPNS = 35
+# Windows: бит DF задается отдельным параметром, MTU пути ядро не сообщает
+IP_DONTFRAGMENT = 14
+IPV6_DONTFRAG = 14
+
+# Заголовки IP и ICMP: проба размера MTU несет MTU - HEADERS байт данных
+HEADERS = {socket.AF_INET: 20 + 8, socket.AF_INET6: 40 + 8}
+MIN_MTU = {socket.AF_INET: 68, socket.AF_INET6: 1280}
+DEFAULT_MTU = 1500
+RECEIVE_BUFFER = 4 * 1024 * 1024
+# Нагрузка по умолчанию - с запасом выше оценки пропускной способности, чтобы очередь узкого места заполнилась
+LOAD_FACTOR = 1.2
+
+MtuResult = collections.namedtuple("MtuResult", ["target", "address", "mtu", "probes", "error"])
+# Пропускная способность в бит/с: медиана оценок по пачкам и их разброс
+BandwidthResult = collections.namedtuple("BandwidthResult", ["target", "address", "bandwidth", "low", "high",
+                                                             "trains", "packet_size", "loss", "error"])
+# Задержки в мс: медиана и 95-й перцентиль без нагрузки и под нагрузкой; load - темп нагрузки, бит/с
+LoadResult = collections.namedtuple("LoadResult", ["target", "address", "idle_rtt", "idle_p95", "loaded_rtt",
+                                                   "loaded_p95", "idle_loss", "loaded_loss", "load", "error"])
+
+MODES = ("mtu", "bandwidth", "load")
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class _MeterSocket:
+    """ICMP-сокет, связанный с одним узлом: датаграммный или сырой (если датаграммный запрещен, а права есть).
+    Ответы сопоставляются с запросами по номеру, время приема берется из ядра (SO_TIMESTAMPNS),
+    если оно его дает: на время ответа не влияет задержка цикла событий"""
+
+    def __init__(self, loop, family, address):
+        self.loop = loop
+        self.family = family
+        self.ipv6 = family == socket.AF_INET6
+        proto = socket.IPPROTO_ICMPV6 if self.ipv6 else socket.IPPROTO_ICMP
+        try:
+            self.sock = socket.socket(family, socket.SOCK_DGRAM, proto)
+            self.raw = False
+        except OSError:
+            self.sock = socket.socket(family, socket.SOCK_RAW, proto)
+            self.raw = True
+        self.sock.setblocking(False)
+        self.sock.connect((address, 0))
+        for level, option, value in ((socket.SOL_SOCKET, SO_TIMESTAMPNS, 1),
+                                     (socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)):
+            try:
+                self.sock.setsockopt(level, option, value)
+            except OSError:
+                pass
+        self.pending = {}
+        self.loop.add_reader(self.sock.fileno(), self._on_readable)
+
+    def set_dont_fragment(self):
+        """Запрещает фрагментацию: пакет больше MTU пути не проходит, а ядро сообщает MTU пути"""
+        if sys.platform.startswith("linux"):
+            level, option = ((socket.IPPROTO_IPV6, IPV6_MTU_DISCOVER) if self.ipv6
+                             else (socket.IPPROTO_IP, IP_MTU_DISCOVER))
+            self.sock.setsockopt(level, option, IPV6_PMTUDISC_DO if self.ipv6 else IP_PMTUDISC_DO)
+        else:
+            level, option = ((socket.IPPROTO_IPV6, IPV6_DONTFRAG) if self.ipv6
+                             else (socket.IPPROTO_IP, IP_DONTFRAGMENT))
+            self.sock.setsockopt(level, option, 1)
+
+    def path_mtu(self):
+        """MTU пути по данным ядра (маршрут и полученные ICMP «нужна фрагментация») или None"""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            if self.ipv6:
+                return self.sock.getsockopt(socket.IPPROTO_IPV6, IPV6_MTU)
+            return self.sock.getsockopt(socket.IPPROTO_IP, IP_MTU)
+        except OSError:
+            return None
+
+    def _on_readable(self):
+        while True:
+            try:
+                data, ancdata, _, _ = self.sock.recvmsg(65535, socket.CMSG_SPACE(16))
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                # Ошибка ICMP снята с сокета, читаем дальше. «Нужна фрагментация» сразу завершает пробы,
+                # больше нового MTU пути, а не оставляет их ждать таймаута
+                if e.errno == errno.EMSGSIZE:
+                    self.reject_oversized()
+                continue
+            received = None
+            for level, kind, value in ancdata:
+                if level == socket.SOL_SOCKET and kind == SO_TIMESTAMPNS and len(value) >= 16:
+                    seconds, nanoseconds = struct.unpack("qq", value[:16])
+                    received = seconds + nanoseconds / 1e9
+            if received is None:
+                received = time.time()
+            # Сырой сокет IPv4 отдает пакет вместе с заголовком IP
+            offset = (data[0] & 0x0F) * 4 if self.raw and not self.ipv6 and data else 0
+            if len(data) < offset + 8:
+                continue
+            icmp_type, _, _, _, seq = struct.unpack_from("!BBHHH", data, offset)
+            if icmp_type != (ICMPV6_ECHO_REPLY if self.ipv6 else ICMP_ECHO_REPLY):
+                continue
+            # Номера нагрузочного потока повторяются, поэтому ответ сверяется и по размеру
+            waiter = self.pending.get(seq)
+            if waiter is not None and waiter[1] == len(data) - offset - 8:
+                del self.pending[seq]
+                if not waiter[0].done():
+                    waiter[0].set_result(received)
+
+    def reject_oversized(self):
+        mtu = self.path_mtu()
+        if mtu is None:
+            return
+        for seq, (future, size) in list(self.pending.items()):
+            if size + HEADERS[self.family] > mtu:
+                del self.pending[seq]
+                if not future.done():
+                    future.set_exception(OSError(errno.EMSGSIZE, "Message too long"))
+
+    def send(self, seq, size, wait=True):
+        """Отправляет эхо-запрос с size байт данных; возвращает (время отправки, future со временем ответа
+        или None)"""
+        future = None
+        if wait:
+            future = self.loop.create_future()
+            self.pending[seq] = (future, size)
+        sent = time.time()
+        try:
+            self.sock.send(build_echo_request(seq, bytes(size), self.ipv6))
+        except OSError:
+            self.pending.pop(seq, None)
+            raise
+        return sent, future
+
+    def forget(self, seq):
+        self.pending.pop(seq, None)
+
+    def close(self):
+        self.loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+        for future, _ in self.pending.values():
+            if not future.done():
+                future.cancel()
+        self.pending.clear()
+
+
+class PathMeter:
+    """Замеры пути до узла эхо-запросами ICMP: MTU пути двоичным поиском с запретом фрагментации,
+    пропускная способность по расплыванию пачек пакетов и задержка под нагрузкой.
+    Ответ проходит обратный путь, поэтому пропускная способность - меньшая из двух направлений"""
+
+    def __init__(self, timeout=1.0, retries=2):
+        self.timeout = timeout
+        self.retries = retries
+        self._seq = 0
+
+    def _next_seq(self):
+        self._seq = (self._seq + 1) & 0xFFFF
+        return self._seq
+
+    async def open(self, target):
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(target, None, type=socket.SOCK_DGRAM)
+        family, _, _, _, sockaddr = infos[0]
+        return _MeterSocket(loop, family, sockaddr[0]), sockaddr[0]
+
+    async def echo(self, icmp, size, timeout=None):
+        """Одна проба: RTT в мс или None без ответа"""
+        seq = self._next_seq()
+        sent, future = icmp.send(seq, size)
+        try:
+            received = await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            icmp.forget(seq)
+            return None
+        return (received - sent) * 1000.0
+
+    async def path_mtu(self, target, maximum=None, on_step=None):
+        """Двоичный поиск наибольшего пакета, проходящего без фрагментации: около log2(диапазона) проб.
+        Пакет, который ядро отвергло (EMSGSIZE) или на который пришел ICMP «нужна фрагментация»,
+        сразу сужает диапазон до MTU пути, известного ядру"""
+        try:
+            icmp, address = await self.open(target)
+        except OSError as e:
+            return MtuResult(target, None, None, 0, str(e))
+        probes = 0
+        try:
+            icmp.set_dont_fragment()
+            headers = HEADERS[icmp.family]
+            low = MIN_MTU[icmp.family]
+            high = maximum or icmp.path_mtu() or DEFAULT_MTU
+            passed = None
+            first = True
+            while low <= high:
+                # Сначала - наибольший пакет (обычно он и проходит), затем середина диапазона
+                size = high if first else (low + high + 1) // 2
+                first = False
+                ok = False
+                limit = size - 1
+                for _ in range(self.retries + 1):
+                    probes += 1
+                    try:
+                        rtt = await self.echo(icmp, size - headers)
+                    except OSError as e:
+                        if e.errno != errno.EMSGSIZE:
+                            raise
+                        rtt = None
+                    if rtt is not None:
+                        ok = True
+                        break
+                    known = icmp.path_mtu()
+                    if known is not None and known < size:
+                        # Ядро уже знает меньший MTU: повторять пробу этого размера бессмысленно
+                        limit = known
+                        break
+                if on_step is not None:
+                    on_step(f"MTU {size}: {'проходит' if ok else 'не проходит'}")
+                if ok:
+                    passed = size
+                    low = size + 1
+                else:
+                    high = min(limit, size - 1)
+                    # MTU, сообщенный путем, скорее всего и есть ответ: он проверяется следующим
+                    first = limit < size - 1
+            if passed is None:
+                return MtuResult(target, address, None, probes, "нет ответа даже на пакет минимального размера")
+            return MtuResult(target, address, passed, probes, None)
+        except OSError as e:
+            return MtuResult(target, address, None, probes, str(e))
+        finally:
+            icmp.close()
+
+    async def bandwidth(self, target, trains=8, train_length=48, packet_size=None, on_step=None):
+        """Оценка пропускной способности по пачкам: train_length пакетов уходят подряд, и узкое место
+        растягивает их; размер пакета / промежуток между ответами. train_length=2 - метод пар пакетов.
+        Пакеты - размера MTU пути (не больше 1500), если размер не задан"""
+        try:
+            icmp, address = await self.open(target)
+        except OSError as e:
+            return BandwidthResult(target, None, None, None, None, 0, None, None, str(e))
+        try:
+            headers = HEADERS[icmp.family]
+            size = packet_size or min(icmp.path_mtu() or DEFAULT_MTU, DEFAULT_MTU)
+            payload = size - headers
+            estimates = []
+            sent_total = received_total = 0
+            train = 0
+            while train < trains:
+                futures = []
+                for _ in range(train_length):
+                    seq = self._next_seq()
+                    try:
+                        futures.append((seq, icmp.send(seq, payload)[1]))
+                    except OSError as e:
+                        if e.errno not in (errno.ENOBUFS, errno.EAGAIN):
+                            raise
+                sent_total += len(futures)
+                if not futures:
+                    # Очередь отправки переполнена на всю пачку: пачка засчитывается без оценки,
+                    # иначе цикл крутился бы без ожидания и его нельзя было бы отменить
+                    train += 1
+                    await asyncio.sleep(0.05)
+                    continue
+                done, _ = await asyncio.wait([future for _, future in futures], timeout=self.timeout)
+                for seq, future in futures:
+                    if not future.done():
+                        icmp.forget(seq)
+                        future.cancel()
+                rejected = [future for future in done if not future.cancelled() and future.exception()]
+                mtu = icmp.path_mtu()
+                if rejected and mtu is not None and mtu < size:
+                    # Путь сообщил меньший MTU: пачка повторяется пакетами этого размера
+                    sent_total -= len(futures)
+                    size, payload = mtu, mtu - headers
+                    continue
+                times = sorted(future.result() for future in done if not future.cancelled() and future not in rejected)
+                received_total += len(times)
+                train += 1
+                # Медиана промежутков между ответами, а не время всей пачки: начало пачки, прошедшее
+                # в запас ограничителя (token bucket), и задержки планировщика оценку не завышают
+                gap = statistics.median(map(float.__sub__, times[1:], times)) if len(times) >= 2 else 0
+                if gap > 0:
+                    estimates.append(size * 8 / gap)
+                    if on_step is not None:
+                        on_step(f"Пачка {train}: {format_rate(estimates[-1])}")
+                # Пауза, чтобы очереди пути опустели перед следующей пачкой
+                await asyncio.sleep(0.05)
+            loss = 100.0 * (sent_total - received_total) / sent_total if sent_total else None
+            if not estimates:
+                return BandwidthResult(target, address, None, None, None, trains, size, loss, "нет ответов")
+            return BandwidthResult(target, address, statistics.median(estimates), min(estimates), max(estimates),
+                                   trains, size, loss, None)
+        except OSError as e:
+            return BandwidthResult(target, address, None, None, None, trains, None, None, str(e))
+        finally:
+            icmp.close()
+
+    async def latency_under_load(self, target, duration=5.0, interval=0.02, load=None, on_step=None):
+        """Задержка малых проб без нагрузки и при потоке больших пакетов к тому же узлу (рост задержки -
+        признак переполненных буферов на пути). Темп нагрузки в бит/с; по умолчанию - чуть выше
+        пропускной способности, оцененной по пачкам"""
+        if load is None:
+            estimate = await self.bandwidth(target, trains=4)
+            if estimate.bandwidth is None:
+                return LoadResult(target, estimate.address, None, None, None, None, None, None, None,
+                                  f"оценка пропускной способности: {estimate.error}")
+            load = estimate.bandwidth * LOAD_FACTOR
+        try:
+            icmp, address = await self.open(target)
+        except OSError as e:
+            return LoadResult(target, None, None, None, None, None, None, None, load, str(e))
+        try:
+            if on_step is not None:
+                on_step("Замер без нагрузки")
+            idle, idle_loss = await self._sample(icmp, duration, interval)
+            if on_step is not None:
+                on_step(f"Замер под нагрузкой {format_rate(load)}")
+            loader = asyncio.ensure_future(self._load(icmp, load))
+            try:
+                loaded, loaded_loss = await self._sample(icmp, duration, interval)
+            finally:
+                loader.cancel()
+                await asyncio.wait([loader])
+            # Нагрузка остановилась с ошибкой (не переполнением очереди): замер под нагрузкой недействителен
+            if not loader.cancelled() and loader.exception() is not None:
+                raise loader.exception()
+            return LoadResult(target, address, statistics.median(idle) if idle else None, percentile(idle, 0.95),
+                              statistics.median(loaded) if loaded else None, percentile(loaded, 0.95),
+                              idle_loss, loaded_loss, load, None)
+        except OSError as e:
+            return LoadResult(target, address, None, None, None, None, None, None, load, str(e))
+        finally:
+            icmp.close()
+
+    async def _sample(self, icmp, duration, interval):
+        """Малые пробы с интервалом interval в течение duration: (RTT в мс, потери в %)"""
+        tasks = []
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            tasks.append(asyncio.ensure_future(self.echo(icmp, 0)))
+            await asyncio.sleep(interval)
+        rtts = await asyncio.gather(*tasks)
+        replies = [rtt for rtt in rtts if rtt is not None]
+        return replies, 100.0 * (len(rtts) - len(replies)) / len(rtts) if rtts else None
+
+    async def _load(self, icmp, rate):
+        """Поток пакетов размера MTU с темпом rate бит/с; ответы на них не ожидаются"""
+        size = min(icmp.path_mtu() or DEFAULT_MTU, DEFAULT_MTU)
+        payload = size - HEADERS[icmp.family]
+        started = time.monotonic()
+        sent = 0
+        while True:
+            due = int((time.monotonic() - started) * rate / (size * 8))
+            for _ in range(due - sent):
+                try:
+                    icmp.send(self._next_seq(), payload, wait=False)
+                except OSError as e:
+                    if e.errno not in (errno.ENOBUFS, errno.EAGAIN):
+                        raise
+            sent = max(sent, due)
+            await asyncio.sleep(0.002)
+
+    async def measure(self, mode, target, on_step=None, **options):
+        if mode == "mtu":
+            return await self.path_mtu(target, on_step=on_step, **options)
+        if mode == "bandwidth":
+            return await self.bandwidth(target, on_step=on_step, **options)
+        if mode == "load":
+            return await self.latency_under_load(target, on_step=on_step, **options)
+        raise ValueError(f"Неизвестный замер: {mode}")
+
+
+def format_rate(bits):
+    for unit, scale in (("Гбит/с", 1e9), ("Мбит/с", 1e6), ("кбит/с", 1e3)):
+        if bits >= scale:
+            return f"{bits / scale:.1f} {unit}"
+    return f"{bits:.0f} бит/с"
+
+
+def format_measurement(result):
+    """(замер, итог, подробности) для таблицы и журнала"""
+    if isinstance(result, MtuResult):
+        value = f"{result.mtu} байт" if result.mtu else "-"
+        return "MTU пути", value, result.error or f"проб: {result.probes}"
+    if isinstance(result, BandwidthResult):
+        if result.bandwidth is None:
+            return "Пропускная способность", "-", result.error
+        details = (f"от {format_rate(result.low)} до {format_rate(result.high)}, пачек {result.trains}, "
+                   f"пакет {result.packet_size} байт, потери {result.loss:.0f}%")
+        return "Пропускная способность", format_rate(result.bandwidth), details
+    if result.loaded_rtt is None or result.idle_rtt is None:
+        return "Задержка под нагрузкой", "-", result.error or "нет ответов"
+    details = (f"без нагрузки {result.idle_rtt:.2f} мс (95%: {result.idle_p95:.2f}), "
+               f"под нагрузкой {format_rate(result.load)} {result.loaded_rtt:.2f} мс "
+               f"(95%: {result.loaded_p95:.2f}), потери {result.idle_loss:.0f}% / {result.loaded_loss:.0f}%")
+    return "Задержка под нагрузкой", f"{result.loaded_rtt - result.idle_rtt:+.2f} мс", details
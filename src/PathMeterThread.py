@@ -0,0 +1,58 @@
+import asyncio
+import threading
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from src.PathMeter import PathMeter
+
+
+class PathMeterThread(QThread):
+    result_signal = pyqtSignal(object)
+    lines_signal = pyqtSignal(list)
+    error_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal()
+
+    def __init__(self, mode, target, timeout=1.0, **options):
+        super().__init__()
+        self.mode = mode
+        self.target = target
+        self.options = options
+        self.title = f"Замер {mode}: {target}"
+        self.meter = PathMeter(timeout=timeout)
+        self._loop = None
+        self._task = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        """Выполняет замер в своем цикле событий; шаги и итог передаются через сигналы"""
+        # Цикл на select и в Windows: сокету замеров нужен add_reader
+        loop = self._loop = asyncio.SelectorEventLoop()
+        try:
+            # stop() мог прийти до запуска потока или пока создается задача
+            if not self._stop_event.is_set():
+                self._task = loop.create_task(
+                    self.meter.measure(self.mode, self.target, lambda line: self.lines_signal.emit([line]),
+                                       **self.options))
+                if self._stop_event.is_set():
+                    self._task.cancel()
+                self.result_signal.emit(loop.run_until_complete(self._task))
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.error_signal.emit(f"Ошибка: {e}")
+        finally:
+            loop.close()
+            self._loop = None
+            self._task = None
+            self.finished_signal.emit()
+
+    def stop(self):
+        """Прерывает замер"""
+        self._stop_event.set()
+        # Поток может в любой момент обнулить _loop, поэтому ссылки читаются один раз
+        loop, task = self._loop, self._task
+        if loop is not None and task is not None:
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                # Цикл событий уже закрыт
+                pass
@@ -0,0 +1,141 @@
+import asyncio
+import heapq
+import ipaddress
+import itertools
+import os
+import re
+import time
+
+from src.ProbeEngine import ProbeEngine
+
+TARGET_SEPARATORS = re.compile(r"[\s,;]+")
+
+
+def expand_targets(text):
+    """Разворачивает строку с адресами, CIDR-сетями и файлами (@путь) в поток узлов"""
+    for token in TARGET_SEPARATORS.split(text.strip()):
+        if not token or token.startswith("#"):
+            continue
+        if token.startswith("@") or os.path.isfile(token):
+            yield from expand_file(token.lstrip("@"))
+            continue
+        if "/" in token:
+            try:
+                network = ipaddress.ip_network(token, strict=False)
+            except ValueError:
+                yield token
+                continue
+            if network.num_addresses == 1:
+                yield str(network.network_address)
+            else:
+                for host in network.hosts():
+                    yield str(host)
+            continue
+        yield token
+
+
+def expand_file(path):
+    """Читает узлы из файла: по одному выражению в строке, # начинает комментарий"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                yield from expand_targets(line)
+
+
+class HostStats:
+    """Накопленная статистика по одному узлу"""
+    __slots__ = ("target", "address", "sent", "received", "min", "max", "total", "jitter", "last_rtt")
+
+    def __init__(self, target):
+        self.target = target
+        self.address = None
+        self.sent = 0
+        self.received = 0
+        self.min = None
+        self.max = None
+        self.total = 0.0
+        self.jitter = 0.0
+        self.last_rtt = None
+
+    def add(self, result):
+        """Учитывает результат одной пробы"""
+        self.sent += 1
+        if result.address is not None:
+            self.address = result.address
+        if result.rtt is None:
+            return
+        rtt = result.rtt
+        self.received += 1
+        self.total += rtt
+        self.min = rtt if self.min is None else min(self.min, rtt)
+        self.max = rtt if self.max is None else max(self.max, rtt)
+        if self.last_rtt is not None:
+            # Сглаженная оценка джиттера как в RFC 3550
+            self.jitter += (abs(rtt - self.last_rtt) - self.jitter) / 16.0
+        self.last_rtt = rtt
+
+    @property
+    def avg(self):
+        return self.total / self.received if self.received else None
+
+    @property
+    def loss(self):
+        return 100.0 * (self.sent - self.received) / self.sent if self.sent else 0.0
+
+
+class PingSweep:
+    """Опрос множества узлов пулом воркеров ограниченного размера"""
+
+    def __init__(self, engine=None, concurrency=256, rate=1.0):
+        self.engine = engine or ProbeEngine()
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.stats = {}
+
+    async def run(self, targets, count=1, interval=1.0, on_result=None, on_stats=None):
+        """Опрашивает узлы по кругу. Узел, которому пора повторить пробу, возвращается
+        в общую очередь, и его берет любой свободный воркер; новые узлы берутся из итератора
+        лениво, поэтому даже /16 не порождает десятки тысяч задач сразу, а в непрерывном
+        режиме (count=None) опрашиваются все узлы, а не только первые concurrency"""
+        if self.rate:
+            interval = max(interval, 1.0 / self.rate)
+        iterator = iter(targets)
+        # Очередь повторов: (время следующей пробы, порядковый номер, узел, отправлено проб)
+        due = []
+        order = itertools.count()
+        # Имя узла разрешается один раз за опрос, а не перед каждой пробой
+        resolve = self.engine.resolver()
+
+        def next_target():
+            """Узел, которому уже пора, иначе новый узел, иначе ближайший по времени повтор"""
+            if due and due[0][0] <= time.perf_counter():
+                return heapq.heappop(due)
+            for target in iterator:
+                return 0.0, 0, target, 0
+            if due:
+                return heapq.heappop(due)
+            return None
+
+        async def worker():
+            while True:
+                entry = next_target()
+                if entry is None:
+                    # Оставшиеся узлы сейчас опрашивают другие воркеры, они и вернут их в очередь
+                    return
+                when, _, target, sent = entry
+                await asyncio.sleep(max(0.0, when - time.perf_counter()))
+                stats = self.stats.setdefault(target, HostStats(target))
+                started = time.perf_counter()
+                result = await self.engine.probe(target, resolve=resolve)
+                sent += 1
+                stats.add(result)
+                if on_result is not None:
+                    on_result(result)
+                if on_stats is not None:
+                    on_stats(stats)
+                if count is None or sent < count:
+                    heapq.heappush(due, (started + interval, next(order), target, sent))
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        return self.stats
@@ -1,146 +1,239 @@
-import re
-import networkx as nx
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QPushButton, QTextEdit, QLineEdit, QLabel,
-                             QTableWidget, QTableWidgetItem, QHeaderView)
-from src.CommandThread import CommandThread
-import pygame
-import sys
+import itertools
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QPlainTextEdit, QLineEdit, QLabel,
+                             QSpinBox, QDoubleSpinBox, QFileDialog, QComboBox)
+from src.ProbeThread import ProbeThread
+from src.ResultTableModel import ResultTableModel
+from src.ResultTableView import ResultTableView
+from src.PingSweep import expand_targets
+from src.LatencyChart import LatencyChart, LatencyHistory, CHART_SPANS
+from src.CommandExecutor import get_executor
+from src.SampleStore import get_sample_store
+from src.HostResolver import get_host_resolver
+from src.PathMeterThread import PathMeterThread
+from src.PathMeter import format_measurement
+
+
+# Замеры пути: подпись и режим
+MEASUREMENTS = (("MTU пути", "mtu"), ("Пропускная способность", "bandwidth"),
+                ("Задержка под нагрузкой", "load"))
+
+
+def format_rtt(value):
+    return f"{value:.2f}мс"
 
 
 class PingTab(QWidget):
     """Тестирует сетевое соединение путем посылки пакетов"""
     def __init__(self):
         super().__init__()
+        self.executor = get_executor()
+        self.history = LatencyHistory()
         self.setup_ui()
-        self.command_thread = None
-        self.G = nx.Graph()
-        self.current_node = "127.0.0.1"
-        self.target_node = None
-        self.animation = None
 
     def setup_ui(self):
         layout = QVBoxLayout()
 
         self.ping_input = QLineEdit()
-        self.ping_input.setPlaceholderText("Введите адрес для ping")
+        self.ping_input.setPlaceholderText("Введите адрес, список адресов, сеть (10.0.0.0/24) или @файл")
+        self.file_button = QPushButton("Файл...")
+        self.file_button.clicked.connect(self.choose_targets_file)
         self.ping_params = QLineEdit()
-        self.ping_params.setPlaceholderText("Введите параметры (например, -n 4 -l 32)")
-        self.ping_output = QTextEdit()
+        self.ping_params.setPlaceholderText("Введите параметры (например, -n 4 -l 32 -w 1000)")
+        self.ping_output = QPlainTextEdit()
         self.ping_output.setReadOnly(True)
-        self.ping_table = QTableWidget(0, 4)
-        self.ping_table.setHorizontalHeaderLabels(["IP", "Байты", "Время", "TTL"])
-        self.ping_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.ping_output.setMaximumBlockCount(10000)
+        self.ping_model = ResultTableModel(["IP", "Байты", "Время", "TTL"], formatters={2: format_rtt},
+                                           resolver=get_host_resolver(), typecodes={1: "q", 2: "d", 3: "q"})
+        self.ping_table = ResultTableView(self.ping_model)
+        self.sweep_model = ResultTableModel(["Узел", "Отправлено", "Получено", "Потери",
+                                             "Мин", "Сред", "Макс", "Джиттер"],
+                                            formatters={3: "{:.0f}%".format, 4: format_rtt, 5: format_rtt,
+                                                        6: format_rtt, 7: format_rtt},
+                                            key_column=0, resolver=get_host_resolver(),
+                                            typecodes={1: "q", 2: "q", 3: "d", 4: "d", 5: "d", 6: "d", 7: "d"})
+        self.sweep_table = ResultTableView(self.sweep_model)
+        self.sweep_table.view.clicked.connect(self.select_chart_target)
+        self.chart = LatencyChart(self.history)
+        self.chart_span = QComboBox()
+        for title, seconds in CHART_SPANS:
+            self.chart_span.addItem(title, seconds)
+        self.chart_span.currentIndexChanged.connect(
+            lambda index: self.chart.set_span(self.chart_span.itemData(index)))
+        self.concurrency_input = QSpinBox()
+        self.concurrency_input.setRange(1, 10000)
+        self.concurrency_input.setValue(256)
+        self.rate_input = QDoubleSpinBox()
+        self.rate_input.setRange(0.0, 1000.0)
+        self.rate_input.setValue(1.0)
+        self.rate_input.setSpecialValueText("без ограничения")
+        self.measure_mode = QComboBox()
+        for title, mode in MEASUREMENTS:
+            self.measure_mode.addItem(title, mode)
+        self.measure_button = QPushButton("Измерить")
+        self.measure_button.clicked.connect(self.perform_measurement)
+        self.measure_model = ResultTableModel(["Узел", "Замер", "Результат", "Подробности"])
+        self.measure_table = ResultTableView(self.measure_model)
         self.ping_button = QPushButton("Ping")
         self.ping_button.clicked.connect(self.perform_ping)
         self.stop_button = QPushButton("Остановить")
         self.stop_button.clicked.connect(self.stop_command)
 
         layout.addWidget(QLabel("Адрес для Ping:"))
-        layout.addWidget(self.ping_input)
+        target_layout = QHBoxLayout()
+        target_layout.addWidget(self.ping_input)
+        target_layout.addWidget(self.file_button)
+        layout.addLayout(target_layout)
         layout.addWidget(QLabel("Параметры:"))
         layout.addWidget(self.ping_params)
+        sweep_layout = QHBoxLayout()
+        sweep_layout.addWidget(QLabel("Одновременно узлов:"))
+        sweep_layout.addWidget(self.concurrency_input)
+        sweep_layout.addWidget(QLabel("Проб/с на узел:"))
+        sweep_layout.addWidget(self.rate_input)
+        layout.addLayout(sweep_layout)
         layout.addWidget(self.ping_button)
+        measure_layout = QHBoxLayout()
+        measure_layout.addWidget(QLabel("Замер пути до первого узла:"))
+        measure_layout.addWidget(self.measure_mode)
+        measure_layout.addWidget(self.measure_button)
+        layout.addLayout(measure_layout)
         layout.addWidget(self.stop_button)
         layout.addWidget(self.ping_output)
         layout.addWidget(self.ping_table)
+        layout.addWidget(self.sweep_table)
+        layout.addWidget(self.measure_table)
+        chart_layout = QHBoxLayout()
+        chart_layout.addWidget(QLabel("Окно графика (узел выбирается в сводной таблице):"))
+        chart_layout.addWidget(self.chart_span)
+        chart_layout.addStretch()
+        layout.addLayout(chart_layout)
+        layout.addWidget(self.chart)
 
         self.setLayout(layout)
 
-    def perform_ping(self):
-        self.ping_output.clear()
-        self.ping_table.setRowCount(0)
-        target = self.ping_input.text() or "8.8.8.8"
-        params = self.ping_params.text().strip()
-        command = ["ping"] + params.split() + [target]
-        self.target_node = target
-        self.start_command_thread(command)
-        self.visualize_packet_movement()
-
-    def start_command_thread(self, command):
-        """Запускает команду в отдельном потоке"""
-        if self.command_thread is not None and self.command_thread.isRunning():
-            self.stop_command()
-
-        self.command_thread = CommandThread(command)
-        self.command_thread.output_signal.connect(self.handle_output)
-        self.command_thread.finished_signal.connect(lambda: self.finished_signal())
-        self.command_thread.start()
+    def choose_targets_file(self):
+        """Выбирает файл со списком узлов"""
+        path, _ = QFileDialog.getOpenFileName(self, "Файл со списком узлов")
+        if path:
+            self.ping_input.setText("@" + path)
 
-    def finished_signal(self):
-        self.ping_output.append("Команда завершена.")
-        self.command_thread = None
-
-    def handle_output(self, output):
-        """Обрабатывает вывод и добавляет данные в таблицу"""
-        self.ping_output.append(output)
-
-        match = re.search(r"Ответ от (\d+\.\d+\.\d+\.\d+): число байт=(\d+) время[<>=](\d+мс) TTL=(\d+)", output)
-        if match:
-            ip, bytes_, time_, ttl = match.groups()
-            row_position = self.ping_table.rowCount()
-            self.ping_table.insertRow(row_position)
-            self.ping_table.setItem(row_position, 0, QTableWidgetItem(ip))
-            self.ping_table.setItem(row_position, 1, QTableWidgetItem(bytes_))
-            self.ping_table.setItem(row_position, 2, QTableWidgetItem(time_))
-            self.ping_table.setItem(row_position, 3, QTableWidgetItem(ttl))
-
-    def visualize_packet_movement(self):
-        """Визуализирует перемещение пакетов между узлами"""
-        if not self.target_node:
-            self.ping_output.append("Не указан целевой узел для ping.")
+    def perform_ping(self):
+        # Несколько опросов могут идти одновременно; результаты очищаются, только если вкладка свободна
+        if not self.executor.jobs(self):
+            self.ping_output.clear()
+            self.ping_model.clear()
+            self.sweep_model.clear()
+            self.history.clear()
+        options = self.parse_params(self.ping_params.text().strip())
+        options["concurrency"] = self.concurrency_input.value()
+        options["rate"] = self.rate_input.value() or None
+        try:
+            targets = expand_targets(self.ping_input.text() or "8.8.8.8")
+            head = list(itertools.islice(targets, 2))
+        except (OSError, UnicodeDecodeError) as e:
+            self.ping_output.appendPlainText(f"Ошибка: {e}")
+            return
+        if not head:
+            self.ping_output.appendPlainText("Не указан целевой узел для ping.")
             return
 
-        pygame.init()
-        screen = pygame.display.set_mode((600, 400))
-        pygame.display.set_caption("Визуализация пакета")
-
-        # Построение графа
-        self.G.clear()
-        self.G.add_node(self.current_node, pos=(100, 200), label=self.current_node)
-        self.G.add_node(self.target_node, pos=(500, 200), label=self.target_node)
-        self.G.add_edge(self.current_node, self.target_node)
-
-        # Координаты узлов
-        pos = nx.get_node_attributes(self.G, 'pos')
-        running = True
-        packet_x = pos[self.current_node][0]
-        target_x = pos[self.target_node][0]
-
-        # Основной цикл анимации
-        while running:
-            screen.fill((0, 0, 0))
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-
-            # Отрисовка графа
-            for edge in self.G.edges():
-                pygame.draw.line(screen, (200, 200, 200), pos[edge[0]], pos[edge[1]], 3)
-
-            # Анимация пакета
-            if packet_x < target_x:
-                packet_x += 2  # Скорость перемещения пакета
-            
-            pygame.draw.circle(screen, (255, 84, 84), (packet_x, pos[self.current_node][1]), 10)
-
-            for node, (x, y) in pos.items():
-                pygame.draw.circle(screen, (0, 137, 191), (x, y), 35)
-                font = pygame.font.SysFont(None, 24)
-                text = font.render(node, True, (255, 255, 255))
-                screen.blit(text, (x - text.get_width() // 2, y - text.get_height() // 2))
-
+        self.chart.set_target(head[0])
+        if len(head) == 1:
+            self.start_probe_thread(head, verbose=True, **options)
+        else:
+            # Режим опроса: построчный вывод отключен, результаты идут в сводную таблицу
+            self.start_probe_thread(itertools.chain(head, targets), **options)
+
+    def parse_params(self, params):
+        """Переводит параметры в стиле ping (Windows и Linux) в настройки движка проб"""
+        options = {"count": 4, "interval": 1.0, "timeout": 1.0, "payload_size": 32}
+        args = params.split()
+        i = 0
+        while i < len(args):
+            flag = args[i]
+            value = args[i + 1] if i + 1 < len(args) else None
+            try:
+                if flag == "-t":
+                    options["count"] = None
+                    i += 1
+                    continue
+                if flag in ("-n", "-c") and value is not None:
+                    options["count"] = int(value)
+                elif flag in ("-l", "-s") and value is not None:
+                    options["payload_size"] = int(value)
+                elif flag == "-w" and value is not None:
+                    options["timeout"] = int(value) / 1000.0
+                elif flag == "-W" and value is not None:
+                    options["timeout"] = float(value)
+                elif flag == "-i" and value is not None:
+                    options["interval"] = float(value)
+                else:
+                    self.ping_output.appendPlainText(f"Неизвестный параметр: {flag}")
+                    i += 1
+                    continue
+            except ValueError:
+                self.ping_output.appendPlainText(f"Неверное значение параметра {flag}: {value}")
+            i += 2
+        return options
+
+    def start_probe_thread(self, targets, verbose=False, **options):
+        """Запускает пробы через общий исполнитель; опросы вкладки идут параллельно друг другу"""
+        thread = ProbeThread(targets, store=get_sample_store(), history=self.history, **options)
+        job = self.executor.submit(self, thread, serial=False)
+        if verbose:
+            job.result_signal.connect(self.handle_result)
+        job.stats_signal.connect(self.handle_stats)
+        job.error_signal.connect(self.ping_output.appendPlainText)
+        job.finished_signal.connect(self.finished_signal)
+
+    def perform_measurement(self):
+        """Замер пути до первого указанного узла: MTU, пропускная способность или задержка под нагрузкой
+        вместо подбора -l и -f вручную"""
+        try:
+            target = next(iter(expand_targets(self.ping_input.text() or "8.8.8.8")), None)
+        except (OSError, UnicodeDecodeError) as e:
+            self.ping_output.appendPlainText(f"Ошибка: {e}")
+            return
+        if target is None:
+            self.ping_output.appendPlainText("Не указан целевой узел для замера.")
+            return
+        timeout = self.parse_params(self.ping_params.text().strip())["timeout"]
+        thread = PathMeterThread(self.measure_mode.currentData(), target, timeout=timeout)
+        # Замеры нагружают путь, поэтому замеры вкладки идут по одному
+        job = self.executor.submit(self, thread)
+        job.lines_signal.connect(lambda lines: self.ping_output.appendPlainText("\n".join(lines)))
+        job.result_signal.connect(self.handle_measurement)
+        job.error_signal.connect(self.ping_output.appendPlainText)
+
+    def handle_measurement(self, result):
+        kind, value, details = format_measurement(result)
+        self.ping_output.appendPlainText(f"{result.target}: {kind} {value} ({details})")
+        self.measure_model.queue_row((result.target, kind, value, details))
 
+    def finished_signal(self):
+        self.ping_output.appendPlainText("Команда завершена.")
+
+    def handle_stats(self, stats):
+        """Обновляет строку узла в сводной таблице"""
+        self.sweep_model.upsert_row((stats.target, stats.sent, stats.received, stats.loss,
+                                     stats.min, stats.avg, stats.max,
+                                     stats.jitter if stats.received > 1 else None))
+
+    def handle_result(self, result):
+        """Выводит результат пробы и добавляет его в таблицу"""
+        if result.error is not None:
+            self.ping_output.appendPlainText(f"{result.target}: seq={result.seq} ошибка ({result.error})")
+            return
 
-            pygame.display.flip()
-            pygame.time.delay(20)
+        self.ping_output.appendPlainText(f"Ответ от {result.address}: число байт={result.size} "
+                                f"время={result.rtt:.2f}мс TTL={result.ttl or '-'} ({result.method})")
+        self.ping_model.queue_row((result.address, result.size, result.rtt, result.ttl))
 
-        pygame.quit()
+    def select_chart_target(self, index):
+        """Показывает на графике узел, выбранный в сводной таблице"""
+        row = self.sweep_table.proxy.mapToSource(index).row()
+        self.chart.set_target(self.sweep_model.row(row)[0])
 
     def stop_command(self):
-        """Останавливает выполнение команды"""
-        if self.command_thread is not None:
-            self.command_thread.stop()
-            self.command_thread.wait()
-            self.command_thread = None
+        """Останавливает все опросы вкладки, не дожидаясь завершения потоков"""
+        self.executor.cancel_owner(self)
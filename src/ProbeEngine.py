@@ -0,0 +1,297 @@
+import asyncio
+import ipaddress
+import itertools
+import os
+import socket
+import struct
+import time
+from collections import namedtuple
+
+# Константы Linux, которых может не быть в модуле socket
+IP_RECVTTL = getattr(socket, "IP_RECVTTL", 12)
+IPV6_RECVHOPLIMIT = getattr(socket, "IPV6_RECVHOPLIMIT", 51)
+IPV6_HOPLIMIT = getattr(socket, "IPV6_HOPLIMIT", 52)
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMPV6_ECHO_REQUEST = 128
+ICMPV6_ECHO_REPLY = 129
+
+ProbeResult = namedtuple("ProbeResult", ["target", "address", "seq", "rtt", "ttl", "size", "method", "error"])
+
+
+def icmp_checksum(data):
+    """Вычисляет контрольную сумму ICMP"""
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack("!%dH" % (len(data) // 2), data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def literal_family(target):
+    """Семейство адреса, записанного строкой, или None, если target - имя узла"""
+    try:
+        return socket.AF_INET6 if ipaddress.ip_address(target).version == 6 else socket.AF_INET
+    except ValueError:
+        return None
+
+
+def build_echo_request(seq, payload, ipv6=False):
+    """Собирает пакет эхо-запроса (идентификатор подставляет ядро)"""
+    icmp_type = ICMPV6_ECHO_REQUEST if ipv6 else ICMP_ECHO_REQUEST
+    header = struct.pack("!BBHHH", icmp_type, 0, 0, 0, seq)
+    checksum = 0 if ipv6 else icmp_checksum(header + payload)
+    return struct.pack("!BBHHH", icmp_type, 0, checksum, 0, seq) + payload
+
+
+class _IcmpSocket:
+    """Общий датаграммный ICMP-сокет, на котором одновременно ожидают ответа все пробы"""
+
+    def __init__(self, loop, family):
+        self.loop = loop
+        self.family = family
+        self.ipv6 = family == socket.AF_INET6
+        proto = socket.IPPROTO_ICMPV6 if self.ipv6 else socket.IPPROTO_ICMP
+        self.sock = socket.socket(family, socket.SOCK_DGRAM, proto)
+        self.sock.setblocking(False)
+        try:
+            if self.ipv6:
+                self.sock.setsockopt(socket.IPPROTO_IPV6, IPV6_RECVHOPLIMIT, 1)
+            else:
+                self.sock.setsockopt(socket.IPPROTO_IP, IP_RECVTTL, 1)
+        except OSError:
+            pass
+        self.pending = {}
+        self.loop.add_reader(self.sock.fileno(), self._on_readable)
+
+    def _on_readable(self):
+        while True:
+            try:
+                data, ancdata, _, address = self.sock.recvmsg(65535, socket.CMSG_SPACE(4))
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            received = time.perf_counter()
+            if len(data) < 8:
+                continue
+            icmp_type, _, _, _, seq = struct.unpack("!BBHHH", data[:8])
+            if icmp_type != (ICMPV6_ECHO_REPLY if self.ipv6 else ICMP_ECHO_REPLY):
+                continue
+            ttl = None
+            for level, kind, value in ancdata:
+                if kind in (socket.IP_TTL, IPV6_HOPLIMIT) and len(value) >= 4:
+                    ttl = struct.unpack("i", value[:4])[0]
+            future = self.pending.pop((address[0], seq), None)
+            if future is not None and not future.done():
+                future.set_result((received, ttl, len(data) - 8))
+
+    def send(self, address, seq, payload):
+        """Отправляет эхо-запрос и возвращает future с ответом"""
+        future = self.loop.create_future()
+        self.pending[(address, seq)] = future
+        packet = build_echo_request(seq, payload, self.ipv6)
+        try:
+            self.sock.sendto(packet, (address, 0))
+        except OSError:
+            self.pending.pop((address, seq), None)
+            raise
+        return future
+
+    def forget(self, address, seq):
+        self.pending.pop((address, seq), None)
+
+    def close(self):
+        self.loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+        for future in self.pending.values():
+            if not future.done():
+                future.cancel()
+        self.pending.clear()
+
+
+class _UdpProbeProtocol(asyncio.DatagramProtocol):
+    """Ждёт ICMP port unreachable (ECONNREFUSED) или ответную датаграмму"""
+
+    def __init__(self, future):
+        self.future = future
+
+    def datagram_received(self, data, addr):
+        if not self.future.done():
+            self.future.set_result(time.perf_counter())
+
+    def error_received(self, exc):
+        if isinstance(exc, ConnectionRefusedError) and not self.future.done():
+            self.future.set_result(time.perf_counter())
+
+
+class ProbeEngine:
+    """Асинхронный движок эхо-запросов: ICMP без привилегий, иначе UDP или TCP-connect.
+    Все пробы работают в одном цикле событий, поэтому одновременно могут
+    выполняться тысячи запросов"""
+
+    METHODS = ("auto", "icmp", "udp", "tcp")
+
+    def __init__(self, timeout=1.0, method="auto", payload_size=32, udp_port=33434, tcp_port=80):
+        if method not in self.METHODS:
+            raise ValueError(f"Неизвестный метод проверки: {method}")
+        self.timeout = timeout
+        self.method = method
+        self.payload_size = payload_size
+        self.udp_port = udp_port
+        self.tcp_port = tcp_port
+        self._icmp = {}
+        self._icmp_denied = set()
+        self._seq = itertools.count(os.getpid() & 0xFFFF)
+
+    def _next_seq(self):
+        return next(self._seq) & 0xFFFF
+
+    def _icmp_socket(self, family):
+        """Возвращает общий ICMP-сокет или None, если ядро его не разрешает"""
+        if family in self._icmp_denied:
+            return None
+        if family not in self._icmp:
+            try:
+                self._icmp[family] = _IcmpSocket(asyncio.get_running_loop(), family)
+            except OSError:
+                self._icmp_denied.add(family)
+                return None
+        return self._icmp[family]
+
+    def icmp_available(self, family=socket.AF_INET):
+        """Проверяет, можно ли открыть датаграммный ICMP-сокет"""
+        proto = socket.IPPROTO_ICMPV6 if family == socket.AF_INET6 else socket.IPPROTO_ICMP
+        try:
+            socket.socket(family, socket.SOCK_DGRAM, proto).close()
+            return True
+        except OSError:
+            return False
+
+    async def resolve(self, target):
+        """Разрешает имя узла в (семейство, адрес); адрес возвращается сразу, без обращения к резолверу"""
+        family = literal_family(target)
+        if family is not None:
+            return family, target
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(target, None, type=socket.SOCK_DGRAM)
+        family, _, _, _, sockaddr = infos[0]
+        return family, sockaddr[0]
+
+    def resolver(self):
+        """Разрешение имен на время одного опроса: каждое имя разрешается один раз,
+        одновременные пробы одного узла ждут общий запрос, адреса в кэш не попадают"""
+        names = {}
+
+        async def resolve(target):
+            family = literal_family(target)
+            if family is not None:
+                return family, target
+            task = names.get(target)
+            if task is None:
+                task = names[target] = asyncio.ensure_future(self.resolve(target))
+            return await asyncio.shield(task)
+        return resolve
+
+    async def probe(self, target, seq=None, timeout=None, resolve=None):
+        """Посылает одну пробу и возвращает ProbeResult; resolve - разрешение имен опроса из resolver()"""
+        timeout = self.timeout if timeout is None else timeout
+        seq = self._next_seq() if seq is None else seq & 0xFFFF
+        try:
+            family, address = await (resolve or self.resolve)(target)
+        except OSError as e:
+            return ProbeResult(target, None, seq, None, None, 0, None, f"resolve: {e}")
+
+        method = self.method
+        if method in ("auto", "icmp"):
+            icmp = self._icmp_socket(family)
+            if icmp is not None:
+                return await self._probe_icmp(icmp, target, address, seq, timeout)
+            if method == "icmp":
+                return ProbeResult(target, address, seq, None, None, 0, "icmp", "icmp: нет доступа")
+            method = "udp"
+        if method == "udp":
+            return await self._probe_udp(family, target, address, seq, timeout)
+        return await self._probe_tcp(family, target, address, seq, timeout)
+
+    async def _probe_icmp(self, icmp, target, address, seq, timeout):
+        payload = bytes(self.payload_size)
+        sent = time.perf_counter()
+        try:
+            future = icmp.send(address, seq, payload)
+        except OSError as e:
+            return ProbeResult(target, address, seq, None, None, 0, "icmp", str(e))
+        try:
+            received, ttl, size = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            icmp.forget(address, seq)
+            return ProbeResult(target, address, seq, None, None, 0, "icmp", "timeout")
+        return ProbeResult(target, address, seq, (received - sent) * 1000.0, ttl, size, "icmp", None)
+
+    async def _probe_udp(self, family, target, address, seq, timeout):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        try:
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: _UdpProbeProtocol(future), remote_addr=(address, self.udp_port), family=family)
+        except OSError as e:
+            return ProbeResult(target, address, seq, None, None, 0, "udp", str(e))
+        try:
+            sent = time.perf_counter()
+            transport.sendto(bytes(self.payload_size))
+            received = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return ProbeResult(target, address, seq, None, None, 0, "udp", "timeout")
+        finally:
+            transport.close()
+        return ProbeResult(target, address, seq, (received - sent) * 1000.0, None, self.payload_size, "udp", None)
+
+    async def _probe_tcp(self, family, target, address, seq, timeout):
+        loop = asyncio.get_running_loop()
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        sent = time.perf_counter()
+        try:
+            await asyncio.wait_for(loop.sock_connect(sock, (address, self.tcp_port)), timeout)
+        except ConnectionRefusedError:
+            # RST тоже означает, что узел ответил
+            pass
+        except asyncio.TimeoutError:
+            return ProbeResult(target, address, seq, None, None, 0, "tcp", "timeout")
+        except OSError as e:
+            return ProbeResult(target, address, seq, None, None, 0, "tcp", str(e))
+        finally:
+            sock.close()
+        return ProbeResult(target, address, seq, (time.perf_counter() - sent) * 1000.0, None, 0, "tcp", None)
+
+    async def ping(self, target, count=4, interval=1.0, callback=None, resolve=None):
+        """Посылает count проб с интервалом; count=None означает бесконечный режим,
+        в нем результаты только передаются в callback и не накапливаются"""
+        resolve = resolve or self.resolver()
+        results = []
+        for i in itertools.count():
+            if count is not None and i >= count:
+                break
+            started = time.perf_counter()
+            result = await self.probe(target, resolve=resolve)
+            if count is not None:
+                results.append(result)
+            if callback is not None:
+                callback(result)
+            if count is None or i + 1 < count:
+                await asyncio.sleep(max(0.0, interval - (time.perf_counter() - started)))
+        return results
+
+    async def ping_many(self, targets, count=1, interval=1.0, callback=None):
+        """Опрашивает несколько узлов одновременно в одном цикле событий"""
+        resolve = self.resolver()
+        jobs = [self.ping(target, count, interval, callback, resolve) for target in targets]
+        return await asyncio.gather(*jobs)
+
+    def close(self):
+        """Закрывает общие сокеты"""
+        for icmp in self._icmp.values():
+            icmp.close()
+        self._icmp.clear()
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from src.ProbeEngine import ProbeEngine
+from src.PingSweep import PingSweep
+
+
+class ProbeThread(QThread):
+    result_signal = pyqtSignal(object)
+    stats_signal = pyqtSignal(object)
+    error_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal()
+
+    def __init__(self, targets, count=4, interval=1.0, timeout=1.0, payload_size=32, method="auto",
+                 concurrency=256, rate=None, store=None, history=None):
+        super().__init__()
+        self.targets = targets
+        self.count = count
+        self.interval = interval
+        self.engine = ProbeEngine(timeout=timeout, method=method, payload_size=payload_size)
+        self.sweep = PingSweep(self.engine, concurrency=concurrency, rate=rate)
+        self.store = store
+        self.history = history
+        self._loop = None
+        self._task = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        """Запускает цикл событий с пробами и передает результаты через сигнал"""
+        loop = self._loop = asyncio.new_event_loop()
+        try:
+            # stop() мог прийти до запуска потока или пока создается задача
+            if not self._stop_event.is_set():
+                self._task = loop.create_task(
+                    self.sweep.run(self.targets, self.count, self.interval,
+                                   self.handle_result, self.stats_signal.emit))
+                if self._stop_event.is_set():
+                    self._task.cancel()
+                loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.error_signal.emit(f"Ошибка: {e}")
+        finally:
+            self.engine.close()
+            loop.close()
+            self._loop = None
+            self._task = None
+            self.finished_signal.emit()
+
+    def handle_result(self, result):
+        """Записывает замер в историю (запись идет пачками в потоке хранилища) и в буферы графика,
+        затем передает его в GUI"""
+        if self.store is not None:
+            self.store.add_result(result)
+        if self.history is not None:
+            self.history.add_result(result)
+        self.result_signal.emit(result)
+
+    def stop(self):
+        """Останавливает выполнение потока"""
+        self._stop_event.set()
+        # Поток может в любой момент обнулить _loop, поэтому ссылки читаются один раз
+        loop, task = self._loop, self._task
+        if loop is not None and task is not None:
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                # Цикл событий уже закрыт
+                pass
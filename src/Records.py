@@ -0,0 +1,30 @@
+from collections import namedtuple
+
+# Разобранные записи, которыми обмениваются бэкенды, движки и вкладки
+RouteRecord = namedtuple("RouteRecord", ["destination", "mask", "gateway", "interface", "metric"])
+NeighborRecord = namedtuple("NeighborRecord", ["ip", "mac", "type", "interface"])
+# addresses - адреса с длиной префикса (192.168.1.5/24), из нее же получается маска;
+# lease_obtained/lease_expires - datetime или исходная строка, если дату разобрать не удалось
+InterfaceRecord = namedtuple("InterfaceRecord", ["name", "mac", "addresses", "mtu", "state", "details",
+                                                 "description", "gateways", "dns_servers", "dhcp", "dhcp_server",
+                                                 "lease_obtained", "lease_expires"],
+                             defaults=(None, (), (), None, None, None, None))
+PingRecord = namedtuple("PingRecord", ["address", "size", "rtt", "ttl"])
+TraceRecord = namedtuple("TraceRecord", ["ttl", "addresses", "rtts"])
+
+# Команда и способ разбора ее вывода: построчно или целиком после завершения
+CommandSpec = namedtuple("CommandSpec", ["command", "line_parser", "output_parser"])
+
+
+def route_key(record):
+    """Ключ маршрута для сравнения снимков. Интерфейс и метрика входят в ключ: маршруты on-link одного префикса
+    на разных интерфейсах и равноценные маршруты (ECMP) с разными метриками - разные записи"""
+    return (record.destination, record.mask, record.gateway, record.interface, record.metric)
+
+
+def diff_snapshots(old, new):
+    """Сравнивает два снимка {ключ: запись}: (добавленные, удаленные, измененные пары (старая, новая))"""
+    added = [record for key, record in new.items() if key not in old]
+    removed = [record for key, record in old.items() if key not in new]
+    changed = [(old[key], record) for key, record in new.items() if key in old and old[key] != record]
+    return added, removed, changed
@@ -0,0 +1,338 @@
+from array import array
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer, pyqtSignal
+
+# Отсутствующее значение в целочисленном столбце-массиве; в вещественном это NaN
+MISSING_INT = -2 ** 63
+
+
+class ResultTableModel(QAbstractTableModel):
+    """Табличная модель с хранением по столбцам.
+    Значения хранятся как есть и форматируются только при отрисовке, строки
+    добавляются пачками через beginInsertRows. Числовые столбцы из typecodes ({столбец: "q" или "d"})
+    хранятся в array.array по 8 байт на значение, None в них хранится как MISSING_INT или NaN;
+    остальные столбцы - списки ссылок на значения.
+    С резолвером в конце добавляется столбец имен узлов для адресов из address_column: его значения
+    не хранятся, а берутся из кэша резолвера, и запрашиваются только для отрисованных строк"""
+
+    SortRole = Qt.UserRole
+    # Текст для фильтра прокси-модели: как при отображении, но без запросов имен для всех строк
+    FilterRole = Qt.UserRole + 1
+
+    names_signal = pyqtSignal(dict)
+
+    def __init__(self, headers, formatters=None, key_column=None, key=None, editable=False, flush_interval=50,
+                 resolver=None, address_column=0, typecodes=None):
+        super().__init__()
+        self.headers = list(headers)
+        self.formatters = formatters or {}
+        # Ключ строки: номер столбца или функция от кортежа значений
+        if key is None and key_column is not None:
+            key = lambda row: row[key_column]
+        self.key = key
+        self.key_column = key_column
+        self.editable = editable
+        self.typecodes = typecodes or {}
+        self.packers = [self.packer(self.typecodes.get(i)) for i in range(len(self.headers))]
+        self.columns = self.new_columns()
+        self.index_by_key = {}
+        self.pending = []
+        self.pending_index = {}
+        self.dirty = None
+        self.flush_timer = QTimer()
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(flush_interval)
+        self.flush_timer.timeout.connect(self.flush)
+
+        self.resolver = resolver
+        self.address_column = address_column
+        self.name_column = None
+        if resolver is not None:
+            self.name_column = len(self.headers)
+            self.headers.append("Имя узла")
+            # Адреса, которые ждут ответа резолвера; новые запросы уходят одной пачкой
+            self.requested = set()
+            self.wanted = []
+            self.request_timer = QTimer()
+            self.request_timer.setSingleShot(True)
+            self.request_timer.setInterval(0)
+            self.request_timer.timeout.connect(self.send_requests)
+            # Резолвер вызывает подписчика из своего потока, сигнал переносит ответ в поток GUI
+            self.names_signal.connect(self.names_resolved)
+            resolver.add_listener(self.names_signal.emit)
+
+    def new_columns(self):
+        return [array(self.typecodes[i]) if i in self.typecodes else [] for i in range(len(self.packers))]
+
+    @staticmethod
+    def packer(typecode):
+        """Преобразование значения для хранения в столбце-массиве (None - для столбца-списка)"""
+        if typecode == "d":
+            return lambda value: float("nan") if value is None else value
+        if typecode is not None:
+            return lambda value: MISSING_INT if value is None else value
+        return None
+
+    def cell(self, column, row):
+        """Исходное значение ячейки"""
+        value = self.columns[column][row]
+        typecode = self.typecodes.get(column)
+        if typecode is None:
+            return value
+        if typecode == "d":
+            return None if value != value else value
+        return None if value == MISSING_INT else value
+
+    def column_values(self, column):
+        if column not in self.typecodes:
+            return self.columns[column]
+        return (self.cell(column, row) for row in range(len(self.columns[column])))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns[0])
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if index.column() == self.name_column:
+            return self.host_name(index.row(), role)
+        value = self.cell(index.column(), index.row())
+        if role in (Qt.DisplayRole, Qt.EditRole, self.FilterRole):
+            if value is None:
+                return ""
+            formatter = self.formatters.get(index.column())
+            return formatter(value) if formatter else str(value)
+        if role == self.SortRole:
+            # Числа сравниваются как числа, а не как строки
+            return value
+        return None
+
+    def host_name(self, row, role):
+        """Имена узлов для адресов строки (у хопа их может быть несколько через запятую)"""
+        if role not in (Qt.DisplayRole, self.SortRole, self.FilterRole):
+            return None
+        value = self.cell(self.address_column, row)
+        if not value:
+            return ""
+        names = []
+        for address in str(value).split(", "):
+            name = self.resolver.lookup(address)
+            if name is None and role == Qt.DisplayRole:
+                self.request_name(address)
+            if name:
+                names.append(name)
+        return ", ".join(names)
+
+    def request_name(self, address):
+        if address not in self.requested:
+            self.requested.add(address)
+            self.wanted.append(address)
+            if not self.request_timer.isActive():
+                self.request_timer.start()
+
+    def send_requests(self):
+        wanted, self.wanted = self.wanted, []
+        self.resolver.request(wanted)
+
+    def names_resolved(self, names):
+        """Перерисовывает столбец имен, если пришли ответы на запросы этой таблицы"""
+        answered = self.requested.intersection(names)
+        if not answered:
+            return
+        self.requested -= answered
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0, self.name_column),
+                                  self.index(self.rowCount() - 1, self.name_column))
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.column() in (self.name_column, self.key_column):
+            return flags
+        return flags | Qt.ItemIsEditable if self.editable else flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not self.editable or role != Qt.EditRole or not index.isValid() or index.column() == self.name_column:
+            return False
+        row = self.row(index.row())
+        if self.key is not None:
+            values = list(row)
+            values[index.column()] = value
+            # Правка, меняющая ключ, разошлась бы с index_by_key и данными владельца таблицы
+            if self.key(tuple(values)) != self.key(row):
+                return False
+        pack = self.packers[index.column()]
+        try:
+            self.columns[index.column()][index.row()] = pack(value) if pack else value
+        except (TypeError, OverflowError):
+            return False
+        self.dataChanged.emit(index, index)
+        return True
+
+    def row(self, row):
+        """Возвращает строку в виде кортежа исходных значений"""
+        return tuple(self.cell(column, row) for column in range(len(self.columns)))
+
+    def rows(self):
+        """Итерирует по всем строкам"""
+        return zip(*(self.column_values(column) for column in range(len(self.columns))))
+
+    def find(self, key):
+        """Возвращает номер строки по ключу или None"""
+        return self.index_by_key.get(key)
+
+    def append_rows(self, rows):
+        """Добавляет пачку строк одним уведомлением. Строка с уже известным ключом (в таблице, в очереди
+        или раньше в той же пачке) заменяет прежнюю на месте, а не добавляется второй строкой.
+        Возвращает замененные строки, чтобы владелец таблицы мог отпустить связанные с ними данные"""
+        rows = list(rows)
+        replaced = []
+        if self.key is not None:
+            fresh = []
+            fresh_index = {}
+            for row in rows:
+                key = self.key(row)
+                index = self.index_by_key.get(key)
+                if index is not None:
+                    replaced.append(self.row(index))
+                    self.set_row(index, row)
+                elif key in self.pending_index:
+                    index = self.pending_index[key]
+                    replaced.append(self.pending[index])
+                    self.pending[index] = row
+                elif key in fresh_index:
+                    index = fresh_index[key]
+                    replaced.append(fresh[index])
+                    fresh[index] = row
+                else:
+                    fresh_index[key] = len(fresh)
+                    fresh.append(row)
+            rows = fresh
+        if not rows:
+            return replaced
+        first = len(self.columns[0])
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        for row in rows:
+            for column, pack, value in zip(self.columns, self.packers, row):
+                column.append(pack(value) if pack else value)
+        if self.key is not None:
+            for i, row in enumerate(rows, first):
+                self.index_by_key[self.key(row)] = i
+        self.endInsertRows()
+        return replaced
+
+    def append_row(self, row):
+        return self.append_rows([row])
+
+    def queue_row(self, row):
+        """Ставит строку в очередь; очередь сбрасывается таймером одной пачкой"""
+        if self.key is not None:
+            self.pending_index[self.key(row)] = len(self.pending)
+        self.pending.append(row)
+        self.schedule_flush()
+
+    def schedule_flush(self):
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush(self):
+        """Сбрасывает накопленные строки и изменения в модель"""
+        self.flush_timer.stop()
+        rows, self.pending = self.pending, []
+        self.pending_index = {}
+        self.append_rows(rows)
+        if self.dirty is not None:
+            first, last = self.dirty
+            self.dirty = None
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(self.headers) - 1))
+
+    def set_row(self, row, values):
+        """Заменяет значения строки; уведомление об изменении отправляется при сбросе"""
+        for column, pack, value in zip(self.columns, self.packers, values):
+            column[row] = pack(value) if pack else value
+        if self.dirty is None:
+            self.dirty = (row, row)
+        else:
+            self.dirty = (min(self.dirty[0], row), max(self.dirty[1], row))
+        self.schedule_flush()
+
+    def upsert_row(self, values):
+        """Обновляет строку с тем же ключом или ставит новую в очередь; возвращает замененную строку или None"""
+        key = self.key(values)
+        row = self.index_by_key.get(key)
+        if row is not None:
+            previous = self.row(row)
+            self.set_row(row, values)
+            return previous
+        if key in self.pending_index:
+            index = self.pending_index[key]
+            previous = self.pending[index]
+            self.pending[index] = values
+            return previous
+        self.queue_row(values)
+        return None
+
+    def remove_row(self, row):
+        """Удаляет строку по номеру"""
+        self.flush()
+        self.beginRemoveRows(QModelIndex(), row, row)
+        for column in self.columns:
+            del column[row]
+        self.endRemoveRows()
+        if self.key is not None:
+            self.rebuild_index()
+
+    def remove_key(self, key):
+        """Удаляет строку по ключу"""
+        return self.remove_keys([key]) == 1
+
+    def remove_keys(self, keys):
+        """Удаляет строки по ключам за O(1) на строку: на место удаленной строки
+        переносится последняя, порядок строк задает прокси-модель"""
+        self.flush()
+        removed = 0
+        for key in keys:
+            row = self.index_by_key.pop(key, None)
+            if row is None:
+                continue
+            last = len(self.columns[0]) - 1
+            if row != last:
+                for column in self.columns:
+                    column[row] = column[last]
+                self.index_by_key[self.key(self.row(row))] = row
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.headers) - 1))
+            self.beginRemoveRows(QModelIndex(), last, last)
+            for column in self.columns:
+                column.pop()
+            self.endRemoveRows()
+            removed += 1
+        return removed
+
+    def apply_diff(self, added, removed, changed):
+        """Применяет разницу снимков: удаляет, обновляет и добавляет только изменившиеся строки.
+        Возвращает строки, которые были в таблице и заменены новыми значениями"""
+        self.remove_keys(self.key(row) for row in removed)
+        replaced = [self.upsert_row(row) for _, row in changed]
+        replaced += [self.upsert_row(row) for row in added]
+        return [row for row in replaced if row is not None]
+
+    def rebuild_index(self):
+        self.index_by_key = {self.key(row): i for i, row in enumerate(self.rows())}
+
+    def clear(self):
+        """Удаляет все строки"""
+        self.flush_timer.stop()
+        self.pending = []
+        self.pending_index = {}
+        self.dirty = None
+        self.beginResetModel()
+        self.columns = self.new_columns()
+        self.index_by_key = {}
+        self.endResetModel()
@@ -0,0 +1,43 @@
+from PyQt5.QtCore import Qt, QSortFilterProxyModel
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLineEdit, QTableView, QHeaderView
+
+from src.ResultTableModel import ResultTableModel
+
+
+class ResultTableView(QWidget):
+    """Таблица результатов с сортировкой и фильтром через прокси-модель"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+        self.proxy = QSortFilterProxyModel()
+        self.proxy.setSourceModel(model)
+        self.proxy.setSortRole(ResultTableModel.SortRole)
+        self.proxy.setFilterRole(ResultTableModel.FilterRole)
+        self.proxy.setFilterKeyColumn(-1)
+        self.proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Фильтр")
+        self.filter_input.textChanged.connect(self.proxy.setFilterFixedString)
+
+        self.view = QTableView()
+        self.view.setModel(self.proxy)
+        self.view.setSortingEnabled(True)
+        self.view.sortByColumn(-1, Qt.AscendingOrder)
+        self.view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.view.verticalHeader().setDefaultSectionSize(22)
+        if not model.editable:
+            self.view.setEditTriggers(QTableView.NoEditTriggers)
+        else:
+            self.view.setEditTriggers(QTableView.DoubleClicked)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.filter_input)
+        layout.addWidget(self.view)
+        self.setLayout(layout)
+
+    def selected_rows(self):
+        """Возвращает номера выделенных строк в исходной модели"""
+        return sorted({self.proxy.mapToSource(index).row() for index in self.view.selectionModel().selectedRows()})
@@ -0,0 +1,130 @@
+import socket
+
+from src.Records import RouteRecord, route_key, diff_snapshots
+
+BITS = {4: 32, 6: 128}
+
+
+def parse_address(address):
+    """Возвращает (версия, адрес как целое число)"""
+    if ":" in address:
+        return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, address), "big")
+    return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, address), "big")
+
+
+def parse_prefix(destination, mask):
+    """Возвращает (версия, длина префикса, ключ сети) для маршрута.
+    Маска IPv4 задается как 255.255.255.0 или длиной, для IPv6 - только длиной"""
+    version, value = parse_address(destination)
+    mask = str(mask).strip()
+    if "." in mask:
+        mask_value = parse_address(mask)[1]
+        length = bin(mask_value).count("1")
+        if mask_value != ((1 << 32) - 1) ^ ((1 << (32 - length)) - 1):
+            raise ValueError(f"Несмежная маска: {mask}")
+    else:
+        length = int(mask) if mask else BITS[version]
+    if not 0 <= length <= BITS[version]:
+        raise ValueError(f"Неверная длина префикса: {mask}")
+    return version, length, value >> (BITS[version] - length)
+
+
+class RouteIndex:
+    """Индекс маршрутов для поиска по самому длинному совпадающему префиксу.
+    Для каждой длины префикса хранится словарь сеть -> маршруты, поэтому поиск
+    делает не больше одного обращения к словарю на каждую присутствующую длину,
+    а добавление и удаление маршрута меняют только одну запись"""
+
+    def __init__(self, records=()):
+        self.tables = {4: {}, 6: {}}
+        self.lengths = {4: [], 6: []}
+        self.count = 0
+        for record in records:
+            self.add(record)
+
+    def __len__(self):
+        return self.count
+
+    def add(self, record):
+        """Добавляет маршрут"""
+        version, length, key = parse_prefix(record.destination, record.mask)
+        table = self.tables[version].get(length)
+        if table is None:
+            table = self.tables[version][length] = {}
+            self.lengths[version] = sorted(self.tables[version], reverse=True)
+        table.setdefault(key, []).append(record)
+        self.count += 1
+
+    def remove(self, record):
+        """Удаляет конкретный маршрут; возвращает True, если он был в индексе"""
+        version, length, key = parse_prefix(record.destination, record.mask)
+        routes = self.tables[version].get(length, {}).get(key)
+        if not routes or record not in routes:
+            return False
+        routes.remove(record)
+        self._cleanup(version, length, key)
+        self.count -= 1
+        return True
+
+    def remove_prefix(self, destination, mask, gateway=None):
+        """Удаляет все маршруты префикса (или только через указанный шлюз)"""
+        version, length, key = parse_prefix(destination, mask)
+        routes = self.tables[version].get(length, {}).get(key)
+        if not routes:
+            return []
+        removed = [route for route in routes if gateway in (None, route.gateway)]
+        routes[:] = [route for route in routes if route not in removed]
+        self._cleanup(version, length, key)
+        self.count -= len(removed)
+        return removed
+
+    def _cleanup(self, version, length, key):
+        table = self.tables[version][length]
+        if not table[key]:
+            del table[key]
+        if not table:
+            del self.tables[version][length]
+            self.lengths[version] = sorted(self.tables[version], reverse=True)
+
+    def lookup(self, address):
+        """Возвращает маршрут, по которому уйдет пакет на address, или None.
+        При одинаковом префиксе выбирается маршрут с меньшей метрикой"""
+        version, value = parse_address(address)
+        bits = BITS[version]
+        tables = self.tables[version]
+        for length in self.lengths[version]:
+            routes = tables[length].get(value >> (bits - length))
+            if routes:
+                return min(routes, key=lambda route: route.metric)
+        return None
+
+    def lookup_many(self, addresses):
+        """Ищет маршруты для потока адресов, возвращает пары (адрес, маршрут)"""
+        for address in addresses:
+            address = address.strip()
+            if not address:
+                continue
+            try:
+                yield address, self.lookup(address)
+            except (OSError, ValueError):
+                yield address, None
+
+    def routes(self):
+        """Итерирует по всем маршрутам индекса"""
+        for version_tables in self.tables.values():
+            for table in version_tables.values():
+                for routes in table.values():
+                    yield from routes
+
+    def diff(self, other):
+        """Сравнивает с другим снимком: (добавленные, удаленные, измененные).
+        Все поля маршрута входят в ключ route_key, поэтому смена интерфейса или метрики - удаление и добавление"""
+        return diff_snapshots({route_key(route): route for route in self.routes()},
+                              {route_key(route): route for route in other.routes()})
+
+
+def route_from_input(destination, mask, gateway, metric):
+    """Собирает запись маршрута из полей ввода вкладки"""
+    if not mask:
+        mask = "128" if ":" in destination else "255.255.255.255"
+    return RouteRecord(destination, mask, gateway or "On-link", "", int(metric or 0))
@@ -1,35 +1,77 @@
-import re
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QPushButton, QTextEdit, QLineEdit, QLabel, QTableWidget, 
-    QTableWidgetItem, QHeaderView
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QPlainTextEdit, QLineEdit, QLabel, QDoubleSpinBox, QComboBox,
+    QProgressBar, QDialog
 )
+from src.Backend import get_backend
 from src.CommandThread import CommandThread  # Предполагается, что CommandThread уже реализован аналогично примеру
-import pygame
-import sys
-import networkx as nx
+from src.CommandExecutor import get_executor, COMMAND_TIMEOUT, FINISHED
+from src.BatchThread import BatchThread
+from src.BatchDialog import BatchDialog
+from src.ResultTableModel import ResultTableModel
+from src.ResultTableView import ResultTableView
+from src.Records import RouteRecord, route_key
+from src.RouteIndex import RouteIndex, route_from_input
+from src.SnapshotWatcher import SnapshotWatcher
+from src.GraphView import GraphView
+from src.LayoutThread import LayoutThread
+from src.TopologyStore import get_topology
+from src.HostResolver import get_host_resolver
+from src.ThreadReaper import get_thread_reaper
+
+# Пауза после последней разницы снимков, после которой пересчитывается раскладка (мс)
+RELAYOUT_DELAY = 300
 
 class RouteTab(QWidget):
     """Виджет для отображения и управления таблицей маршрутов"""
     def __init__(self):
         super().__init__()
+        self.backend = get_backend()
+        self.topology = get_topology()
         self.setup_ui()
-        self.command_thread = None
-        self.G = nx.DiGraph()
+        self.executor = get_executor()
+        self.reaper = get_thread_reaper()
+        self.route_index = RouteIndex()
+        self.watcher = None
+        self.graph_layout = None
+        self.layout_thread = None
+        # Пачка изменений маршрутов дает одну раскладку, а не раскладку на каждую разницу
+        self.relayout_timer = QTimer(self)
+        self.relayout_timer.setSingleShot(True)
+        self.relayout_timer.setInterval(RELAYOUT_DELAY)
+        self.relayout_timer.timeout.connect(self.display_graph)
 
     def setup_ui(self):
         layout = QVBoxLayout()
 
-        self.command_text = ""
-        self.route_output = QTextEdit()
+        self.route_output = QPlainTextEdit()
         self.route_output.setReadOnly(True)
-
-        self.route_table = QTableWidget(0, 5)
-        self.route_table.setHorizontalHeaderLabels(["Сеть назначения", "Маска", "Шлюз", "Интерфейс", "Метрика"])
-        self.route_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.route_output.setMaximumBlockCount(10000)
+
+        self.route_model = ResultTableModel(["Сеть назначения", "Маска", "Шлюз", "Интерфейс", "Метрика"],
+                                            key=route_key, resolver=get_host_resolver(), address_column=2,
+                                            typecodes={4: "q"})
+        self.route_table = ResultTableView(self.route_model)
+        self.graph_view = GraphView()
+        self.graph_view.setMinimumHeight(200)
+        self.layout_mode = QComboBox()
+        self.layout_mode.addItem("Силовая", "force")
+        self.layout_mode.addItem("Дерево шлюзов", "hierarchical")
+        self.layout_mode.currentIndexChanged.connect(self.display_graph)
+        self.layout_progress = QProgressBar()
+        self.layout_progress.setRange(0, 100)
 
         self.view_button = QPushButton("Показать маршруты")
         self.view_button.clicked.connect(self.view_routes)
 
+        self.watch_button = QPushButton("Следить за изменениями")
+        self.watch_button.setCheckable(True)
+        self.watch_button.toggled.connect(self.toggle_watch)
+        self.watch_interval = QDoubleSpinBox()
+        self.watch_interval.setRange(0.2, 3600.0)
+        self.watch_interval.setValue(1.0)
+        self.watch_interval.setSuffix(" с")
+
         self.add_button = QPushButton("Добавить маршрут")
         self.add_button.clicked.connect(self.add_route)
 
@@ -39,6 +81,9 @@ class RouteTab(QWidget):
         self.delete_button = QPushButton("Удалить маршрут")
         self.delete_button.clicked.connect(self.delete_route)
 
+        self.batch_button = QPushButton("Пакетное изменение...")
+        self.batch_button.clicked.connect(self.show_batch_dialog)
+
         # Поля для ввода параметров
         self.destination_input = QLineEdit()
         self.destination_input.setPlaceholderText("Сеть назначения (например, 192.168.1.0)")
@@ -49,10 +94,29 @@ class RouteTab(QWidget):
         self.metric_input = QLineEdit()
         self.metric_input.setPlaceholderText("Метрика (например, 1)")
 
+        self.lookup_input = QLineEdit()
+        self.lookup_input.setPlaceholderText("Адрес назначения (например, 8.8.8.8)")
+        self.lookup_button = QPushButton("Найти маршрут")
+        self.lookup_button.clicked.connect(self.lookup_route)
+
         layout.addWidget(QLabel("Текущие маршруты:"))
         layout.addWidget(self.route_output)
         layout.addWidget(self.route_table)
+        layout.addWidget(self.graph_view)
+        graph_layout = QHBoxLayout()
+        graph_layout.addWidget(QLabel("Раскладка:"))
+        graph_layout.addWidget(self.layout_mode)
+        graph_layout.addWidget(self.layout_progress)
+        layout.addLayout(graph_layout)
         layout.addWidget(self.view_button)
+        watch_layout = QHBoxLayout()
+        watch_layout.addWidget(self.watch_button)
+        watch_layout.addWidget(QLabel("Интервал опроса:"))
+        watch_layout.addWidget(self.watch_interval)
+        layout.addLayout(watch_layout)
+        layout.addWidget(QLabel("Какой маршрут выберет пакет:"))
+        layout.addWidget(self.lookup_input)
+        layout.addWidget(self.lookup_button)
         layout.addWidget(QLabel("Добавить/Изменить маршрут:"))
         layout.addWidget(self.destination_input)
         layout.addWidget(self.mask_input)
@@ -61,130 +125,225 @@ class RouteTab(QWidget):
         layout.addWidget(self.add_button)
         layout.addWidget(self.modify_button)
         layout.addWidget(self.delete_button)
+        layout.addWidget(self.batch_button)
 
         self.setLayout(layout)
 
     def view_routes(self):
         """Отображает текущие маршруты"""
+        self.watch_button.setChecked(False)
+        self.stop_command()
+        self.route_output.clear()
+        self.start_command_thread(self.backend.list_routes(), viewing_routes=True)
+
+    def toggle_watch(self, enabled):
+        """Включает наблюдение: таблица обновляется только изменившимися маршрутами"""
+        self.stop_watch()
+        if not enabled:
+            return
+        self.stop_command()
         self.route_output.clear()
-        command = ["route", "print"]
-        self.start_command_thread(command)
+        self.forget_routes()
+        self.watcher = SnapshotWatcher(self.backend, self.backend.list_routes, route_key, "routes",
+                                       self.watch_interval.value())
+        self.watcher.diff_signal.connect(self.apply_route_diff)
+        self.watcher.error_signal.connect(self.route_output.appendPlainText)
+        self.watcher.start()
+        self.reaper.track(self.watcher)
+
+    def stop_watch(self):
+        """Отключает наблюдение; поток завершится в фоне, GUI его не ждет"""
+        self.relayout_timer.stop()
+        if self.watcher is not None:
+            self.reaper.retire(self.watcher, self.watcher.diff_signal, self.watcher.error_signal)
+            self.watcher = None
+
+    def apply_route_diff(self, added, removed, changed):
+        """Применяет разницу снимков к таблице, индексу и графу"""
+        if self.sender() is not self.watcher:
+            # Разница от остановленного наблюдения, уже стоявшая в очереди событий
+            return
+        replaced = self.route_model.apply_diff(added, removed, changed)
+        self.route_output.appendPlainText(
+            f"Маршруты: добавлено {len(added)}, удалено {len(removed)}, изменено {len(changed)}")
+        self.update_routes(added + [new for _, new in changed], removed + replaced)
+        # Раскладка дорасчитывает только окрестность изменившихся маршрутов
+        self.relayout_timer.start()
+
+    def lookup_route(self):
+        """Показывает маршрут с самым длинным совпадающим префиксом"""
+        address = self.lookup_input.text().strip()
+        try:
+            route = self.route_index.lookup(address)
+        except (OSError, ValueError):
+            self.route_output.appendPlainText(f"Неверный адрес: {address}")
+            return
+        if route is None:
+            self.route_output.appendPlainText(f"{address}: подходящего маршрута нет")
+        else:
+            self.route_output.appendPlainText(
+                f"{address}: {route.destination} {route.mask} через {route.gateway} "
+                f"({route.interface}, метрика {route.metric})")
+
+    def input_route(self):
+        """Маршрут из полей ввода или None, если поля заполнены неверно"""
+        try:
+            return route_from_input(self.destination_input.text().strip(), self.mask_input.text().strip(),
+                                    self.gateway_input.text().strip(), self.metric_input.text().strip())
+        except (OSError, ValueError):
+            return None
+
+    def apply_route_change(self, job, route, remove=False, add=False):
+        """Переносит изменение маршрута в таблицу, индекс и граф, только если команда завершилась успешно"""
+        if job.state != FINISHED or job.thread.returncode != 0:
+            self.route_output.appendPlainText("Маршрут не изменен: команда завершилась с ошибкой")
+            return
+        if route is None or self.watcher is not None:
+            # При наблюдении изменение придет разницей снимков
+            return
+        try:
+            if remove:
+                removed = self.route_index.remove_prefix(route.destination, route.mask)
+                self.route_model.remove_keys(route_key(record) for record in removed)
+                self.topology.remove_routes(removed)
+            if add:
+                self.update_routes([route], self.route_model.append_rows([route]))
+        except (OSError, ValueError) as e:
+            self.route_output.appendPlainText(f"Ошибка: {e}")
 
     def add_route(self):
         """Добавляет маршрут"""
-        command = [
-            "route", "add", self.destination_input.text(),
-            "MASK", self.mask_input.text(), self.gateway_input.text(),
-            "METRIC", self.metric_input.text(), 
-            #"IF", self.interface_input.text()
-        ]
-        self.start_command_thread(command)
+        self.change_routes(lambda: self.backend.add_route(
+            self.destination_input.text(), self.mask_input.text(), self.gateway_input.text(),
+            self.metric_input.text()), add=True)
 
     def modify_route(self):
         """Изменяет существующий маршрут"""
-        command = [
-            "route", "change", self.destination_input.text(),
-            "mask", self.mask_input.text(), self.gateway_input.text(),
-            "metric", self.metric_input.text()
-        ]
-        self.start_command_thread(command)
+        self.change_routes(lambda: self.backend.change_route(
+            self.destination_input.text(), self.mask_input.text(), self.gateway_input.text(),
+            self.metric_input.text()), remove=True, add=True)
 
     def delete_route(self):
         """Удаляет маршрут"""
-        command = ["route", "delete", self.destination_input.text()]
-        self.start_command_thread(command)
-
-    def start_command_thread(self, command):
-        self.command_text = ""
-        self.route_output.setText(self.command_text)
-
-        """Запускает команду в отдельном потоке"""
-        if self.command_thread is not None and self.command_thread.isRunning():
-            self.stop_command()
-
-        self.command_thread = CommandThread(command)
-        self.command_thread.output_signal.connect(self.handle_output)
-        self.command_thread.finished_signal.connect(lambda: self.finished_signal())
-        self.command_thread.start()
-
-    def handle_output(self, output):
-        """Обрабатывает вывод команды"""
-        self.command_text += output
-
-    def parse_route_output(self, output):
-        """Парсит и заполняет таблицу маршрутов"""
-        self.route_table.setRowCount(0)
-        self.G.clear()  
-
-        for line in output.splitlines():
-            match = re.match(r'\s+(\d+\.\d+\.\d+\.\d+)\s+(\d+\.\d+\.\d+\.\d+)\s+(\S+)\s+(\d+\.\d+\.\d+\.\d+)\s+(\d+)', line)
-            if match:
-                destination, mask, gateway, interface, metric = match.groups()
-                row_position = self.route_table.rowCount()
-                self.route_table.insertRow(row_position)
-                self.route_table.setItem(row_position, 0, QTableWidgetItem(destination))
-                self.route_table.setItem(row_position, 1, QTableWidgetItem(mask))
-                self.route_table.setItem(row_position, 2, QTableWidgetItem(gateway))
-                self.route_table.setItem(row_position, 3, QTableWidgetItem(interface))
-                self.route_table.setItem(row_position, 4, QTableWidgetItem(metric))
-
-                self.G.add_node(destination)
-                self.G.add_node(gateway)
-                self.G.add_edge(gateway, destination, label=f"Metric: {metric}")
-
-        self.display_graph()
+        self.change_routes(lambda: self.backend.delete_route(self.destination_input.text(), self.mask_input.text()),
+                           remove=True)
+
+    def change_routes(self, make_spec, remove=False, add=False):
+        """Запускает команду изменения маршрута; неверные поля ввода сообщаются без запуска команды"""
+        try:
+            spec = make_spec()
+        except ValueError as e:
+            self.route_output.appendPlainText(f"Ошибка: {e}")
+            return
+        # Поля ввода читаются сейчас: к завершению команды их могут изменить
+        route = self.input_route()
+        job = self.start_command_thread(spec)
+        job.finished_signal.connect(lambda: self.apply_route_change(job, route, remove=remove, add=add))
+
+    def show_batch_dialog(self):
+        """Показывает диалоговое окно для пакета изменений; пакет применяется целиком или откатывается"""
+        dialog = BatchDialog("Пакетное изменение маршрутов", "route add 10.1.0.0 255.255.0.0 192.168.1.1 metric 10\n"
+                                                             "route delete 10.2.0.0 255.255.0.0")
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        operations, errors, rollback = dialog.get_data()
+        self.route_output.clear()
+        if errors:
+            self.route_output.appendPlainText("\n".join(f"Строка {line}: {error}" for line, error in errors))
+            self.route_output.appendPlainText("Пакет не применен: исправьте ошибки")
+            return
+        if not operations:
+            return
+        job = self.executor.submit(self, BatchThread(self.backend, operations, rollback), timeout=COMMAND_TIMEOUT)
+        job.lines_signal.connect(self.handle_output)
+        # После пакета таблица и граф перечитываются целиком, журнал пакета остается в выводе
+        if self.watcher is None:
+            job.finished_signal.connect(
+                lambda: self.start_command_thread(self.backend.list_routes(), viewing_routes=True, clear=False))
+
+    def start_command_thread(self, spec, viewing_routes=False, clear=True):
+        """Ставит команду бэкенда в очередь вкладки: изменения маршрутов и просмотр выполняются по порядку"""
+        if clear:
+            self.route_output.clear()
+
+        if viewing_routes:
+            self.forget_routes()
+        job = self.executor.submit(self, CommandThread.from_spec(spec, self.backend.encoding),
+                                   timeout=COMMAND_TIMEOUT)
+        job.lines_signal.connect(self.handle_output)
+        if viewing_routes:
+            job.records_signal.connect(self.add_routes)
+        job.finished_signal.connect(lambda: self.finished_signal(viewing_routes))
+        return job
+
+    def handle_output(self, lines):
+        """Обрабатывает пачку строк вывода команды"""
+        self.route_output.appendPlainText("\n".join(lines))
+
+    def add_routes(self, records):
+        """Добавляет пачку разобранных маршрутов в таблицу и топологию по мере поступления"""
+        self.update_routes(records, self.route_model.append_rows(records))
+
+    def update_routes(self, added, removed):
+        """Индекс и топология держат ровно маршруты таблицы: убранные и замененные строки отпускаются
+        после добавления новых, чтобы общие узлы не удалялись и не создавались заново"""
+        removed = [RouteRecord(*row) for row in removed]
+        self.topology.add_routes(added)
+        self.topology.remove_routes(removed)
+        for record in added:
+            try:
+                self.route_index.add(record)
+            except (OSError, ValueError):
+                pass
+        for record in removed:
+            try:
+                self.route_index.remove(record)
+            except (OSError, ValueError):
+                pass
 
     def display_graph(self):
-        """Создает окно PyGame для визуализации графа"""
-        pygame.init()
-        sx, sy = 800, 600
-        ox = sx / 2
-        oy = sy / 2
-        k = 0.8
-        screen = pygame.display.set_mode((sx, sy))
-        pygame.display.set_caption("Network Routes Graph")
-
-        pos = nx.spring_layout(self.G, seed=42)  # Позиции узлов
-        running = True
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-
-            screen.fill((0, 0, 0))
-
-            # Отображение ребер
-            for edge in self.G.edges(data=True):
-                src, dest, label = edge
-                pygame.draw.line(screen, (200, 200, 200), 
-                                 (int(pos[src][0] * (sx/2)*k + sx/2), int(pos[src][1] * (sy/2)*k + (sy/2))),
-                                 (int(pos[dest][0] * (sx/2)*k + sx/2), int(pos[dest][1] * (sy/2)*k + (sy/2))), 2)
-
-            # Отображение узлов и меток
-            for node, (x, y) in pos.items():
-                pygame.draw.circle(screen, (0, 137, 191), (int(x * (sx/2)*k + (sx/2)), int(y * (sy/2)*k + (sy/2))), 20)
-                font = pygame.font.Font(None, 24)
-                text = font.render(node, True, (255, 255, 255))
-                screen.blit(text, (int(x * (sx/2)*k + (sx/2)), int(y * (sy/2)*k + (sy/2))))
-
-            pygame.display.flip()
-
-        pygame.quit()
-
-    def finished_signal(self):
-        self.command_text += "Команда завершена."
-        self.route_output.append(self.command_text)
-
-        # Обновляем таблицу маршрутов после просмотра командой route print
-        if "route print" in ' '.join(self.command_thread.command):
-            self.parse_route_output(self.command_text)
-
-        self.command_text = ""
-        self.command_thread = None
+        """Показывает общую топологию и запускает расчет раскладки в отдельном потоке"""
+        self.relayout_timer.stop()
+        self.stop_layout()
+        nodes, edges = self.topology.snapshot()
+        self.graph_view.set_graph(nodes, edges)
+        self.layout_progress.setValue(0)
+        if self.graph_layout is None:
+            # numpy загружается при первом показе графа, а не при запуске приложения
+            from src.GraphLayout import GraphLayout
+            self.graph_layout = GraphLayout()
+        self.layout_thread = LayoutThread(self.graph_layout, nodes, edges, self.layout_mode.currentData())
+        self.layout_thread.progress_signal.connect(self.layout_progress.setValue)
+        self.layout_thread.positions_signal.connect(self.show_positions)
+        self.layout_thread.error_signal.connect(self.route_output.appendPlainText)
+        self.layout_thread.start()
+        self.reaper.track(self.layout_thread)
+
+    def show_positions(self, positions):
+        if self.sender() is self.layout_thread:
+            self.graph_view.set_positions(positions, scale=3 * self.graph_view.node_radius)
+
+    def stop_layout(self):
+        """Прерывает расчет раскладки; поток завершится в фоне, его результат будет отброшен"""
+        if self.layout_thread is not None:
+            self.reaper.retire(self.layout_thread, self.layout_thread.progress_signal,
+                               self.layout_thread.positions_signal, self.layout_thread.error_signal)
+            self.layout_thread = None
+
+    def forget_routes(self):
+        """Убирает показанные маршруты из таблицы, индекса и общей топологии перед новым снимком"""
+        self.route_model.flush()
+        self.topology.remove_routes(RouteRecord(*row) for row in self.route_model.rows())
+        self.route_model.clear()
+        self.route_index = RouteIndex()
+
+    def finished_signal(self, viewing_routes=False):
+        self.route_output.appendPlainText("Команда завершена.")
+
+        # Таблица уже заполнена по мере вывода, остается показать граф
+        if viewing_routes:
+            self.display_graph()
 
     def stop_command(self):
-        """Останавливает выполнение команды"""
-        if self.command_thread is not None:
-            self.command_thread.stop()
-            self.command_thread.wait()
-            self.command_thread = None
+        """Отменяет команды вкладки, не дожидаясь завершения потоков"""
+        self.executor.cancel_owner(self)
@@ -0,0 +1,440 @@
+import array
+import atexit
+import collections
+import math
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+# Файл истории по умолчанию
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".nat-lab", "history.sqlite3")
+
+# Пачка записи: сколько замеров копится и как долго они могут ждать записи
+BATCH_SIZE = 5000
+FLUSH_INTERVAL = 1.0
+
+# Агрегаты: минутные и часовые
+MINUTE = 60
+HOUR = 3600
+PERIODS = (MINUTE, HOUR)
+
+# Сколько хранятся сырые замеры и агрегаты, с
+RETENTION = {None: 7 * 86400, MINUTE: 30 * 86400, HOUR: 365 * 86400}
+PRUNE_INTERVAL = 3600
+# Предел размера файла: при превышении сначала удаляются самые старые сырые замеры
+MAX_BYTES = 512 * 1024 * 1024
+
+# Логарифмическая гистограмма RTT для перцентилей по агрегатам: шаг 5% от 0.01 мс
+HISTOGRAM_MIN = 0.01
+HISTOGRAM_RATIO = 1.05
+_LOG_RATIO = math.log(HISTOGRAM_RATIO)
+# До скольких сырых замеров перцентили считаются точно
+EXACT_LIMIT = 100000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS samples (
+    series INTEGER NOT NULL, ts INTEGER NOT NULL, rtt REAL,
+    PRIMARY KEY (series, ts)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollups (
+    series INTEGER NOT NULL, period INTEGER NOT NULL, bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL, lost INTEGER NOT NULL, total REAL NOT NULL, min REAL, max REAL, histogram BLOB,
+    PRIMARY KEY (series, period, bucket)) WITHOUT ROWID;
+"""
+
+Rollup = collections.namedtuple("Rollup", ["time", "count", "lost", "avg", "min", "max"])
+Summary = collections.namedtuple("Summary", ["count", "lost", "loss", "min", "avg", "max"])
+
+
+def histogram_index(rtt):
+    return max(0, int(math.log(max(rtt, HISTOGRAM_MIN) / HISTOGRAM_MIN) / _LOG_RATIO))
+
+
+def histogram_value(index):
+    """Середина корзины гистограммы (в геометрическом смысле)"""
+    return HISTOGRAM_MIN * HISTOGRAM_RATIO ** (index + 0.5)
+
+
+def encode_histogram(counts):
+    """Гистограмма хранится разреженно: пары (корзина, число) - у пинга заняты единицы корзин"""
+    packed = array.array("I")
+    for index in sorted(counts):
+        packed.extend((index, counts[index]))
+    return packed.tobytes()
+
+
+def decode_histogram(blob, counts):
+    packed = array.array("I")
+    packed.frombytes(blob or b"")
+    for i in range(0, len(packed), 2):
+        counts[packed[i]] += packed[i + 1]
+    return counts
+
+
+class _Aggregate:
+    """Накапливаемый агрегат одной корзины"""
+    __slots__ = ("count", "lost", "total", "min", "max", "histogram")
+
+    def __init__(self, row=None):
+        self.histogram = collections.Counter()
+        if row is None:
+            self.count = self.lost = 0
+            self.total = 0.0
+            self.min = self.max = None
+        else:
+            self.count, self.lost, self.total, self.min, self.max, blob = row
+            decode_histogram(blob, self.histogram)
+
+    def add(self, rtt):
+        self.count += 1
+        if rtt is None:
+            self.lost += 1
+            return
+        self.total += rtt
+        self.min = rtt if self.min is None else min(self.min, rtt)
+        self.max = rtt if self.max is None else max(self.max, rtt)
+        self.histogram[histogram_index(rtt)] += 1
+
+
+def percentile(sorted_values, q):
+    """Перцентиль с линейной интерполяцией по отсортированному списку"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q / 100.0
+    low = int(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def histogram_percentile(counts, q, low=None, high=None):
+    """Перцентиль по гистограмме; значение ограничивается реальными min/max"""
+    total = sum(counts.values())
+    if not total:
+        return None
+    rank = (total - 1) * q / 100.0
+    seen = 0
+    for index in sorted(counts):
+        seen += counts[index]
+        if seen > rank:
+            value = histogram_value(index)
+            break
+    if low is not None:
+        value = max(value, low)
+    if high is not None:
+        value = min(value, high)
+    return value
+
+
+class SampleStore:
+    """История замеров RTT в SQLite (режим WAL).
+    Замеры пишутся пачками из отдельного потока: add() только кладет замер в очередь.
+    Вместе с сырыми замерами ведутся минутные и часовые агрегаты с гистограммой RTT,
+    поэтому сводки и перцентили за любой период читают сотни строк, а не миллионы замеров.
+    Ряд (series) - это узел пинга или хоп трассировки. Время - секунды Unix"""
+
+    def __init__(self, path=DEFAULT_PATH, retention=None, max_bytes=MAX_BYTES):
+        self.path = path
+        # Ключи сроков - None и периоды, поэтому не **retention
+        self.retention = dict(RETENTION)
+        self.retention.update(retention or {})
+        self.max_bytes = max_bytes
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        self._flushed = threading.Condition()
+        self._pending = 0
+        # Замеры принимаются, пока работает писатель; последняя ошибка записи - для сообщений
+        self._accepting = True
+        self.error = None
+        self._series = {}
+        self._open = {}
+        self._last_prune = 0.0
+        # Схема создается до запуска писателя, чтобы читатели сразу видели таблицы
+        connection = self._connect()
+        connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        connection.executescript(SCHEMA)
+        self._writer = threading.Thread(target=self._write_loop, name="SampleStore", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @property
+    def connection(self):
+        """Соединение для чтения, свое в каждом потоке"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def add(self, series, rtt, timestamp=None):
+        """Ставит замер в очередь записи; rtt=None означает потерю. После остановки писателя замер
+        отбрасывается, иначе очередь росла бы без предела"""
+        with self._flushed:
+            if not self._accepting:
+                return
+            self._pending += 1
+        self._queue.put((series, rtt, time.time() if timestamp is None else timestamp))
+
+    def add_result(self, result):
+        """Замер из ProbeResult пинга"""
+        self.add(result.target, result.rtt)
+
+    def flush(self, timeout=None):
+        """Ждет, пока все поставленные замеры будут записаны"""
+        with self._flushed:
+            return self._flushed.wait_for(lambda: not self._pending, timeout)
+
+    def close(self):
+        with self._flushed:
+            self._accepting = False
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+    def _report(self, error):
+        self.error = f"История замеров: {error}"
+        print(self.error, file=sys.stderr)
+
+    def _write_loop(self):
+        connection = None
+        try:
+            connection = self._connect()
+            self._prune_safely(connection)
+            running = True
+            while running:
+                try:
+                    item = self._queue.get(timeout=FLUSH_INTERVAL)
+                except queue.Empty:
+                    item = False
+                batch = []
+                deadline = time.monotonic() + FLUSH_INTERVAL
+                # Замеры копятся до размера пачки или до истечения интервала
+                while item is not None:
+                    if item:
+                        batch.append(item)
+                    if len(batch) >= BATCH_SIZE or time.monotonic() >= deadline:
+                        break
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                if item is None:
+                    running = False
+                if batch:
+                    try:
+                        self._write(connection, batch)
+                    except sqlite3.Error as e:
+                        # Пачка теряется (диск заполнен, база занята дольше таймаута), писатель продолжает работу.
+                        # Транзакция откачена: кэши рядов и открытых агрегатов могут опережать базу
+                        self._report(e)
+                        self._series.clear()
+                        self._open.clear()
+                    finally:
+                        with self._flushed:
+                            self._pending -= len(batch)
+                            self._flushed.notify_all()
+                if time.time() - self._last_prune >= PRUNE_INTERVAL:
+                    self._prune_safely(connection)
+        except (sqlite3.Error, OSError) as e:
+            self._report(e)
+        finally:
+            # Писатель остановлен: новые замеры не принимаются, а flush() не ждет оставшихся в очереди
+            with self._flushed:
+                self._accepting = False
+                self._pending = 0
+                self._flushed.notify_all()
+            if connection is not None:
+                connection.close()
+
+    def _prune_safely(self, connection):
+        try:
+            self._prune(connection)
+        except sqlite3.Error as e:
+            self._report(e)
+
+    def _series_id(self, connection, name):
+        series_id = self._series.get(name)
+        if series_id is None:
+            connection.execute("INSERT OR IGNORE INTO series (name) VALUES (?)", (name,))
+            series_id = connection.execute("SELECT id FROM series WHERE name = ?", (name,)).fetchone()[0]
+            self._series[name] = series_id
+        return series_id
+
+    def _write(self, connection, batch):
+        with connection:
+            rows = []
+            touched = {}
+            for name, rtt, timestamp in batch:
+                series_id = self._series_id(connection, name)
+                rows.append((series_id, int(timestamp * 1000000), rtt))
+                for period in PERIODS:
+                    bucket = int(timestamp) // period * period
+                    aggregate = touched.get((series_id, period, bucket))
+                    if aggregate is None:
+                        aggregate = touched[series_id, period, bucket] = self._aggregate(
+                            connection, series_id, period, bucket)
+                    aggregate.add(rtt)
+            connection.executemany("INSERT OR IGNORE INTO samples VALUES (?, ?, ?)", rows)
+            connection.executemany(
+                "INSERT OR REPLACE INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(series_id, period, bucket, a.count, a.lost, a.total, a.min, a.max,
+                  encode_histogram(a.histogram)) for (series_id, period, bucket), a in touched.items()])
+
+    def _aggregate(self, connection, series_id, period, bucket):
+        """Агрегат корзины: текущая корзина ряда держится в памяти, иначе читается из базы"""
+        cached = self._open.get((series_id, period))
+        if cached is not None and cached[0] == bucket:
+            return cached[1]
+        row = connection.execute(
+            "SELECT count, lost, total, min, max, histogram FROM rollups "
+            "WHERE series = ? AND period = ? AND bucket = ?", (series_id, period, bucket)).fetchone()
+        aggregate = _Aggregate(row)
+        if cached is None or cached[0] < bucket:
+            self._open[series_id, period] = (bucket, aggregate)
+        return aggregate
+
+    def _prune(self, connection):
+        """Удаляет данные старше срока хранения и держит размер файла в пределах max_bytes"""
+        self._last_prune = time.time()
+        now = time.time()
+        series_ids = [row[0] for row in connection.execute("SELECT id FROM series")]
+        with connection:
+            # Удаление по каждому ряду идет по первичному ключу, без полного просмотра таблицы
+            for series_id in series_ids:
+                connection.execute("DELETE FROM samples WHERE series = ? AND ts < ?",
+                                   (series_id, int((now - self.retention[None]) * 1000000)))
+                for period in PERIODS:
+                    connection.execute("DELETE FROM rollups WHERE series = ? AND period = ? AND bucket < ?",
+                                       (series_id, period, int(now - self.retention[period])))
+        while self._size(connection) > self.max_bytes:
+            oldest = connection.execute("SELECT MIN(ts) FROM samples").fetchone()[0]
+            if oldest is None:
+                break
+            # Отбрасывается старшая половина оставшейся истории сырых замеров
+            cutoff = oldest + (int(now * 1000000) - oldest) // 2
+            with connection:
+                for series_id in series_ids:
+                    connection.execute("DELETE FROM samples WHERE series = ? AND ts < ?", (series_id, cutoff))
+            connection.execute("PRAGMA incremental_vacuum")
+            if cutoff >= int(now * 1000000) - 1000000:
+                break
+        connection.execute("PRAGMA incremental_vacuum")
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def _size(self, connection):
+        page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+        free = connection.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - free) * connection.execute("PRAGMA page_size").fetchone()[0]
+
+    def _lookup(self, name):
+        row = self.connection.execute("SELECT id FROM series WHERE name = ?", (name,)).fetchone()
+        return None if row is None else row[0]
+
+    def series(self):
+        """Имена всех рядов"""
+        return [row[0] for row in self.connection.execute("SELECT name FROM series ORDER BY name")]
+
+    def samples(self, name, start, end):
+        """Сырые замеры [(время, rtt)] за период"""
+        series_id = self._lookup(name)
+        if series_id is None:
+            return []
+        return [(ts / 1000000.0, rtt) for ts, rtt in self.connection.execute(
+            "SELECT ts, rtt FROM samples WHERE series = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (series_id, int(start * 1000000), int(end * 1000000)))]
+
+    def rollups(self, name, start, end, period=MINUTE):
+        """Агрегаты Rollup за период с шагом period (MINUTE или HOUR)"""
+        series_id = self._lookup(name)
+        if series_id is None:
+            return []
+        return [Rollup(bucket, count, lost, total / (count - lost) if count > lost else None, low, high)
+                for bucket, count, lost, total, low, high in self.connection.execute(
+                    "SELECT bucket, count, lost, total, min, max FROM rollups "
+                    "WHERE series = ? AND period = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+                    (series_id, period, int(start) // period * period, end))]
+
+    def resolution(self, start, end, max_points=2000):
+        """Шаг, при котором период укладывается в max_points точек: None (сырые замеры), MINUTE или HOUR"""
+        if start >= time.time() - self.retention[None] and (end - start) <= max_points:
+            return None
+        return MINUTE if (end - start) / MINUTE <= max_points else HOUR
+
+    def summary(self, name, start, end):
+        """Summary за период по агрегатам"""
+        series_id = self._lookup(name)
+        if series_id is None:
+            return None
+        count = lost = 0
+        total = 0.0
+        low = high = None
+        for row_count, row_lost, row_total, row_min, row_max in self._aggregates(
+                series_id, start, end, "count, lost, total, min, max"):
+            count += row_count
+            lost += row_lost
+            total += row_total
+            if row_min is not None:
+                low = row_min if low is None else min(low, row_min)
+                high = row_max if high is None else max(high, row_max)
+        if not count:
+            return None
+        return Summary(count, lost, 100.0 * lost / count, low,
+                       total / (count - lost) if count > lost else None, high)
+
+    def percentiles(self, name, start, end, quantiles=(50, 90, 99)):
+        """{q: RTT} за период. Пока сырые замеры хранятся и их не больше EXACT_LIMIT, значения точные,
+        иначе считаются по гистограммам агрегатов с точностью около 2.5%"""
+        series_id = self._lookup(name)
+        if series_id is None:
+            return {q: None for q in quantiles}
+        if start >= time.time() - self.retention[None]:
+            # Число замеров оценивается по агрегатам, чтобы не считать миллионы строк
+            summary = self.summary(name, start, end)
+            if summary is None or summary.count - summary.lost <= EXACT_LIMIT:
+                values = [row[0] for row in self.connection.execute(
+                    "SELECT rtt FROM samples WHERE series = ? AND ts >= ? AND ts < ? AND rtt IS NOT NULL "
+                    "ORDER BY rtt", (series_id, int(start * 1000000), int(end * 1000000)))]
+                return {q: percentile(values, q) for q in quantiles}
+        counts = collections.Counter()
+        low = high = None
+        for blob, bucket_min, bucket_max in self._aggregates(series_id, start, end, "histogram, min, max"):
+            decode_histogram(blob, counts)
+            if bucket_min is not None:
+                low = bucket_min if low is None else min(low, bucket_min)
+                high = bucket_max if high is None else max(high, bucket_max)
+        return {q: histogram_percentile(counts, q, low, high) for q in quantiles}
+
+    def _aggregates(self, series_id, start, end, columns):
+        """Строки агрегатов, покрывающие период: целые часы берутся из часовых агрегатов,
+        края - из минутных (пока они хранятся), так что даже за год читается порядка 10 тысяч строк"""
+        query = f"SELECT {columns} FROM rollups WHERE series = ? AND period = ? AND bucket >= ? AND bucket < ?"
+        if start < time.time() - self.retention[MINUTE]:
+            yield from self.connection.execute(query, (series_id, HOUR, int(start) // HOUR * HOUR, end))
+            return
+        first_hour = -(-int(start) // HOUR) * HOUR
+        last_hour = int(end) // HOUR * HOUR
+        if first_hour >= last_hour:
+            yield from self.connection.execute(query, (series_id, MINUTE, int(start) // MINUTE * MINUTE, end))
+            return
+        yield from self.connection.execute(query, (series_id, MINUTE, int(start) // MINUTE * MINUTE, first_hour))
+        yield from self.connection.execute(query, (series_id, HOUR, first_hour, last_hour))
+        yield from self.connection.execute(query, (series_id, MINUTE, last_hour, end))
+
+_store = None
+
+
+def get_sample_store():
+    """Общая история замеров; при выходе оставшиеся в очереди замеры дописываются"""
+    global _store
+    if _store is None:
+        _store = SampleStore()
+        atexit.register(_store.close)
+    return _store
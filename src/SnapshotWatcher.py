@@ -0,0 +1,81 @@
+import select
+import threading
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from src.Records import diff_snapshots
+
+
+class SnapshotWatcher(QThread):
+    """Периодически снимает таблицу через бэкенд и отправляет только разницу с предыдущим снимком.
+    Если ядро присылает уведомления (rtnetlink), снимок делается сразу после изменения,
+    а интервал опроса остается запасным вариантом"""
+
+    diff_signal = pyqtSignal(list, list, list)
+    error_signal = pyqtSignal(str)
+
+    DEBOUNCE = 0.1
+
+    def __init__(self, backend, spec_factory, key, kind, interval=1.0):
+        super().__init__()
+        self.backend = backend
+        self.spec_factory = spec_factory
+        self.key = key
+        self.kind = kind
+        self.interval = interval
+        self.snapshot = {}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        """Снимает таблицу, вычисляет разницу в этом потоке и ждет следующего изменения"""
+        events = self.backend.subscribe(self.kind)
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    records = self.backend.collect(self.spec_factory())
+                except Exception as e:
+                    self.error_signal.emit(f"Ошибка: {e}")
+                    records = None
+                if records is not None:
+                    snapshot = {self.key(record): record for record in records}
+                    added, removed, changed = diff_snapshots(self.snapshot, snapshot)
+                    self.snapshot = snapshot
+                    if added or removed or changed:
+                        self.diff_signal.emit(added, removed, changed)
+                self.wait_for_change(events)
+        finally:
+            if events is not None:
+                events.close()
+
+    def wait_for_change(self, events):
+        """Ждет уведомления ядра или истечения интервала"""
+        if events is None:
+            self._stop_event.wait(self.interval)
+            return
+        deadline = time.monotonic() + self.interval
+        while not self._stop_event.is_set():
+            # Короткий таймаут, чтобы остановка не ждала целый интервал
+            timeout = min(0.2, max(0.0, deadline - time.monotonic()))
+            readable, _, _ = select.select([events], [], [], timeout)
+            if readable:
+                self.drain(events)
+                # Изменения обычно идут пачкой, даем им накопиться
+                self._stop_event.wait(self.DEBOUNCE)
+                self.drain(events)
+                return
+            if time.monotonic() >= deadline:
+                return
+
+    def drain(self, events):
+        while True:
+            try:
+                if not events.recv(1 << 16):
+                    return
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+
+    def stop(self):
+        """Останавливает наблюдение"""
+        self._stop_event.set()
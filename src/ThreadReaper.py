@@ -0,0 +1,54 @@
+from PyQt5.QtCore import QObject
+
+
+class ThreadReaper(QObject):
+    """Держит ссылки на фоновые потоки вкладок (наблюдение, раскладка), пока они не завершатся.
+    Остановленный поток GUI не ждет: его сигналы отключаются, а сам поток доживает в фоне
+    и удаляется через deleteLater после finished. При закрытии приложения оставшиеся
+    потоки останавливаются и дожидаются"""
+
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def track(self, thread):
+        """Запоминает запущенный поток до его завершения"""
+        self.threads.add(thread)
+        thread.finished.connect(lambda: self._release(thread))
+
+    def retire(self, thread, *signals):
+        """Отключает сигналы устаревшего потока и просит его остановиться, не дожидаясь"""
+        for signal in signals:
+            try:
+                signal.disconnect()
+            except TypeError:
+                # Сигнал ни к чему не подключен
+                pass
+        thread.stop()
+        if not thread.isRunning():
+            self._release(thread)
+
+    def _release(self, thread):
+        if thread in self.threads:
+            self.threads.discard(thread)
+            thread.deleteLater()
+
+    def shutdown(self):
+        """Останавливает все потоки и дожидается их (при закрытии приложения)"""
+        threads = list(self.threads)
+        for thread in threads:
+            thread.stop()
+        for thread in threads:
+            thread.wait()
+        self.threads.clear()
+
+
+_reaper = None
+
+
+def get_thread_reaper():
+    """Общий реестр фоновых потоков приложения"""
+    global _reaper
+    if _reaper is None:
+        _reaper = ThreadReaper()
+    return _reaper
@@ -0,0 +1,340 @@
+import array
+import socket
+
+from src.RouteIndex import BITS, parse_address, parse_prefix
+
+# Виды узлов
+LOCAL, INTERFACE, NETWORK, ADDRESS = range(4)
+# Виды ребер: канальная связь, маршрут через шлюз, хоп трассировки
+LINK, ROUTE, HOP = range(3)
+# Ключ ребра: (a << 32 | b) << KIND_BITS | вид; чтобы ключ умещался в uint64, номеров узлов меньше 2^30
+KIND_BITS = 2
+
+LOCAL_NODE = "Этот компьютер"
+ON_LINK = ("", "on-link", "0.0.0.0", "::")
+# Широковещательные и групповые MAC не являются соседями
+SKIP_MACS = ("ff:ff:ff:ff:ff:ff", "01:00:5e", "33:33")
+
+
+def format_network(version, length, key):
+    """Ключ сети из parse_prefix обратно в строку вида 10.0.0.0/24"""
+    bits = BITS[version]
+    value = (key << (bits - length)) if length else 0
+    family = socket.AF_INET6 if version == 6 else socket.AF_INET
+    return f"{socket.inet_ntop(family, value.to_bytes(bits // 8, 'big'))}/{length}"
+
+
+def edge_key(a, b, kind):
+    # Канальные связи не имеют направления
+    if kind == LINK and a > b:
+        a, b = b, a
+    return (a << 32 | b) << KIND_BITS | kind
+
+
+def interface_node(name):
+    return f"[{name}]"
+
+
+def mac_to_int(mac):
+    """MAC хранится числом: так он занимает меньше памяти, чем строка"""
+    try:
+        return int(mac.replace(":", "").replace("-", ""), 16)
+    except ValueError:
+        return None
+
+
+def int_to_mac(value):
+    return ":".join(f"{value:012x}"[i:i + 2] for i in range(0, 12, 2))
+
+
+class TopologyStore:
+    """Общая топология сети: соседи, маршруты, интерфейсы и хопы трассировки в одном графе без дублей.
+    Узлы получают компактные целые номера (освободившиеся номера переиспользуются), ребра хранятся
+    в словаре "упакованные номера и вид -> число ссылок", а массивы смежности строятся по запросу.
+    Ребро, общее для нескольких записей (связь интерфейса со шлюзом многих маршрутов), живет, пока
+    его не отпустит последняя запись; узел без ребер удаляется.
+    На узел приходятся строка ключа, байт вида, счетчик степени и MAC числом - около 300 байт на соседа
+    вместе с ребром, так что /16 соседей укладывается в два десятка МБ"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.ids = {}
+        self.keys = []
+        self.kinds = array.array("B")
+        self.degrees = array.array("I")
+        self.free = []
+        self.edges = {}
+        self.macs = {}
+        self.interface_networks = {}
+        self.version = 0
+        self._adjacency = None
+        self.node(LOCAL_NODE, LOCAL)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def node(self, key, kind):
+        """Номер узла; узел создается при первом обращении"""
+        node_id = self.ids.get(key)
+        if node_id is not None:
+            return node_id
+        if self.free:
+            node_id = self.free.pop()
+            self.keys[node_id] = key
+            self.kinds[node_id] = kind
+            self.degrees[node_id] = 0
+        else:
+            node_id = len(self.keys)
+            self.keys.append(key)
+            self.kinds.append(kind)
+            self.degrees.append(0)
+        self.ids[key] = node_id
+        return node_id
+
+    def find(self, key):
+        return self.ids.get(key)
+
+    def connect(self, a, b, kind):
+        """Добавляет ссылку на ребро a-b (номера узлов); возвращает False для петли a == b"""
+        if a == b:
+            self.collect(a)
+            return False
+        key = edge_key(a, b, kind)
+        count = self.edges.get(key)
+        if count is not None:
+            self.edges[key] = count + 1
+            return True
+        self.edges[key] = 1
+        self.degrees[a] += 1
+        self.degrees[b] += 1
+        self._changed()
+        return True
+
+    def disconnect(self, a, b, kind):
+        """Отпускает ссылку на ребро; ребро без ссылок удаляется вместе с узлами, у которых не осталось
+        связей. Возвращает True, если ссылка была"""
+        if a is None or b is None or a == b:
+            return False
+        key = edge_key(a, b, kind)
+        count = self.edges.get(key)
+        if count is None:
+            return False
+        if count > 1:
+            self.edges[key] = count - 1
+            return True
+        del self.edges[key]
+        for node_id in (a, b):
+            self.degrees[node_id] -= 1
+            self.collect(node_id)
+        self._changed()
+        return True
+
+    def collect(self, node_id):
+        """Удаляет узел, если у него не осталось ребер"""
+        if not self.degrees[node_id] and self.kinds[node_id] != LOCAL and self.keys[node_id] is not None:
+            self.release(node_id)
+
+    def release(self, node_id):
+        del self.ids[self.keys[node_id]]
+        self.keys[node_id] = None
+        self.macs.pop(node_id, None)
+        self.free.append(node_id)
+
+    def _changed(self):
+        self.version += 1
+        self._adjacency = None
+
+    def interface(self, name):
+        """Узел интерфейса, подключенный к этому компьютеру; каждый вызов добавляет ссылку на эту связь"""
+        node_id = self.node(interface_node(name), INTERFACE)
+        self.connect(self.ids[LOCAL_NODE], node_id, LINK)
+        return node_id
+
+    def attachment(self, address, interface, create=True):
+        """Куда подключить соседа: к сети интерфейса, в которую он попадает, иначе к самому интерфейсу"""
+        if not interface:
+            return self.ids[LOCAL_NODE]
+        try:
+            version, value = parse_address(address)
+        except (OSError, ValueError):
+            value = version = None
+        for net_version, length, key, network in self.interface_networks.get(interface, ()):
+            if net_version == version and value >> (BITS[version] - length) == key:
+                return self.node(network, NETWORK) if create else self.ids.get(network)
+        return self.interface(interface) if create else self.ids.get(interface_node(interface))
+
+    def add_interfaces(self, records):
+        """Интерфейсы и их сети (адреса в виде 192.168.1.5/24); повторное добавление заменяет прежние сети"""
+        for record in records:
+            previous = self.interface_networks.pop(record.name, None)
+            node_id = self.interface(record.name)
+            if record.mac and mac_to_int(record.mac) is not None:
+                self.macs[node_id] = mac_to_int(record.mac)
+            networks = []
+            for address in record.addresses or ():
+                address, _, length = str(address).partition("/")
+                try:
+                    version, length, key = parse_prefix(address, length)
+                except (OSError, ValueError):
+                    continue
+                if length == BITS[version]:
+                    continue
+                network = format_network(version, length, key)
+                networks.append((version, length, key, network))
+                self.connect(node_id, self.node(network, NETWORK), LINK)
+            self.interface_networks[record.name] = networks
+            if previous is not None:
+                # Ссылки прежнего описания отпускаются после новых, чтобы общие узлы не пересоздавались
+                for _, _, _, network in previous:
+                    self.disconnect(node_id, self.ids.get(network), LINK)
+                self.disconnect(self.ids[LOCAL_NODE], node_id, LINK)
+
+    def add_neighbors(self, records):
+        """Соседи из ARP/NDP: (ip, mac, тип, интерфейс, ...); строки таблицы могут нести еще столбцы"""
+        for ip, mac, _, interface, *_ in records:
+            if not ip or not mac:
+                continue
+            normalized = mac.lower().replace("-", ":")
+            if normalized.startswith(SKIP_MACS):
+                continue
+            node_id = self.node(ip, ADDRESS)
+            value = mac_to_int(normalized)
+            if value is not None:
+                self.macs[node_id] = value
+            self.connect(self.attachment(ip, interface), node_id, LINK)
+
+    def remove_neighbors(self, records):
+        for ip, _, _, interface, *_ in records:
+            node_id = self.ids.get(ip)
+            if node_id is None:
+                continue
+            attached = self.attachment(ip, interface, create=False)
+            # Сосед вне сетей интерфейса держал и связь интерфейса с этим компьютером
+            via_interface = attached is not None and self.kinds[attached] == INTERFACE
+            if self.disconnect(attached, node_id, LINK) and via_interface:
+                self.disconnect(self.ids[LOCAL_NODE], attached, LINK)
+
+    def route_nodes(self, record, create=True):
+        """(интерфейс, шлюз, назначение) маршрута; интерфейса и шлюза может не быть.
+        При create=True узлы создаются, а интерфейс получает ссылку на связь с этим компьютером"""
+        try:
+            version, length, key = parse_prefix(record.destination, record.mask)
+        except (OSError, ValueError):
+            return None, None, None
+        # Маршрут к одному узлу ведет к адресу, а не к отдельной сети
+        network = record.destination if length == BITS[version] else format_network(version, length, key)
+        lookup = self.node if create else (lambda key, kind: self.ids.get(key))
+        dest = lookup(network, ADDRESS if length == BITS[version] else NETWORK)
+        interface = None
+        if record.interface:
+            interface = self.interface(record.interface) if create else self.ids.get(interface_node(record.interface))
+        gateway = str(record.gateway).strip()
+        gateway_id = lookup(gateway, ADDRESS) if gateway.lower() not in ON_LINK else None
+        return interface, gateway_id, dest
+
+    def add_routes(self, records):
+        """Маршрут дает ребро шлюз -> сеть (или интерфейс -> сеть для On-link) и связь интерфейса со шлюзом"""
+        local = self.ids[LOCAL_NODE]
+        for record in records:
+            interface, gateway, dest = self.route_nodes(record)
+            if dest is None:
+                continue
+            source = local if interface is None else interface
+            if gateway is not None:
+                self.connect(source, gateway, LINK)
+                source = gateway
+            self.connect(source, dest, ROUTE)
+
+    def remove_routes(self, records):
+        """Отпускает все ребра, добавленные маршрутом; узлы без ребер удаляются"""
+        local = self.ids[LOCAL_NODE]
+        for record in records:
+            interface, gateway, dest = self.route_nodes(record, create=False)
+            if dest is None or (record.interface and interface is None):
+                continue
+            if gateway is None and str(record.gateway).strip().lower() not in ON_LINK:
+                continue
+            source = local if interface is None else interface
+            target = source if gateway is None else gateway
+            # Петля (шлюз совпал с назначением) ребра маршрута не создавала
+            if target != dest and not self.disconnect(target, dest, ROUTE):
+                continue
+            if gateway is not None:
+                self.disconnect(source, gateway, LINK)
+            if interface is not None:
+                self.disconnect(local, interface, LINK)
+
+    def add_trace(self, target, hops):
+        """Путь трассировки: hops - адреса, ответившие на каждом TTL по порядку (пустые хопы пропускаются)"""
+        previous = [self.ids[LOCAL_NODE]]
+        for addresses in hops:
+            addresses = [address for address in addresses if address]
+            if not addresses:
+                continue
+            # Первый хоп, уже известный как сосед, не дублируется отдельным ребром от этого компьютера
+            if previous[0] == self.ids[LOCAL_NODE]:
+                previous = [previous[0]] if all(address not in self.ids for address in addresses) else []
+            current = [self.node(address, ADDRESS) for address in addresses]
+            for a in previous:
+                for b in current:
+                    self.connect(a, b, HOP)
+            previous = current
+
+    def snapshot(self, kinds=None):
+        """(узлы, ребра) по ключам для отображения; kinds ограничивает виды ребер"""
+        keys = self.keys
+        # Пара узлов с ребрами разных видов показывается одним ребром
+        pairs = dict.fromkeys(key >> KIND_BITS for key in self.edges
+                              if kinds is None or key & ((1 << KIND_BITS) - 1) in kinds)
+        edges = [(keys[pair >> 32], keys[pair & 0xFFFFFFFF]) for pair in pairs]
+        if kinds is None:
+            nodes = list(self.ids)
+        else:
+            nodes = list(dict.fromkeys(key for edge in edges for key in edge))
+        return nodes, edges
+
+    def adjacency(self):
+        """Массивы смежности (offsets, targets): соседи узла i - targets[offsets[i]:offsets[i + 1]]"""
+        if self._adjacency is not None:
+            return self._adjacency
+        # numpy нужен только запросам к графу, вкладки без графа его не загружают
+        import numpy as np
+        packed = np.fromiter(self.edges, dtype=np.uint64, count=len(self.edges)) >> np.uint64(KIND_BITS)
+        a = (packed >> np.uint64(32)).astype(np.int64)
+        b = (packed & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        # Ребра разных видов и направлений между одной парой дают одного соседа
+        pairs = np.unique(np.minimum(a, b) << 32 | np.maximum(a, b))
+        a, b = pairs >> 32, pairs & 0xFFFFFFFF
+        sources = np.concatenate([a, b])
+        targets = np.concatenate([b, a])
+        order = np.argsort(sources, kind="stable")
+        offsets = np.zeros(len(self.keys) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(self.keys)), out=offsets[1:])
+        self._adjacency = offsets, targets[order]
+        return self._adjacency
+
+    def neighbors(self, key):
+        """Ключи соседей узла"""
+        node_id = self.ids.get(key)
+        if node_id is None:
+            return []
+        offsets, targets = self.adjacency()
+        return [self.keys[i] for i in targets[offsets[node_id]:offsets[node_id + 1]]]
+
+    def mac(self, key):
+        node_id = self.ids.get(key)
+        value = None if node_id is None else self.macs.get(node_id)
+        return None if value is None else int_to_mac(value)
+
+
+_topology = None
+
+
+def get_topology():
+    """Общее хранилище топологии для всех вкладок"""
+    global _topology
+    if _topology is None:
+        _topology = TopologyStore()
+    return _topology
@@ -0,0 +1,215 @@
+import asyncio
+import collections
+import socket
+import struct
+import sys
+import time
+
+from src.PingSweep import HostStats
+from src.ProbeEngine import ProbeResult
+
+# Константы Linux для получения ICMP-ошибок через очередь ошибок сокета
+IP_RECVERR = getattr(socket, "IP_RECVERR", 11)
+IPV6_RECVERR = getattr(socket, "IPV6_RECVERR", 25)
+MSG_ERRQUEUE = getattr(socket, "MSG_ERRQUEUE", 0x2000)
+SO_EE_ORIGIN_ICMP = 2
+SO_EE_ORIGIN_ICMP6 = 3
+ICMP_TIME_EXCEEDED = 11
+ICMPV6_TIME_EXCEEDED = 3
+SOCK_EXTENDED_ERR = struct.Struct("=IBBBBII")
+
+
+class TraceHop(HostStats):
+    """Статистика одного хопа: к общей статистике добавляются последние замеры и все ответившие адреса"""
+    __slots__ = ("ttl", "samples", "addresses", "asn", "reached")
+
+    def __init__(self, target, ttl, sample_count=10):
+        super().__init__(target)
+        self.ttl = ttl
+        self.samples = collections.deque(maxlen=sample_count)
+        self.addresses = set()
+        self.asn = None
+        self.reached = False
+
+    def add(self, result):
+        super().add(result)
+        self.samples.append(result.rtt)
+        if result.address is not None:
+            self.addresses.add(result.address)
+
+
+# Данные пробы: метка, номер раунда и TTL. Маршрутизатор возвращает их в ICMP-ошибке (RFC 1812 требует
+# цитировать столько исходного пакета, сколько помещается), и по ним ошибка сопоставляется со своей пробой
+PROBE_MAGIC = b"NL"
+PROBE_ID = struct.Struct("!2sHB")
+
+
+def probe_payload(seq, ttl, size):
+    return PROBE_ID.pack(PROBE_MAGIC, seq & 0xFFFF, ttl).ljust(size, b"\x00")
+
+
+def parse_probe_payload(data):
+    """(номер раунда, TTL) из процитированных данных пробы или None, если цитата обрезана или чужая"""
+    if len(data) < PROBE_ID.size:
+        return None
+    magic, seq, ttl = PROBE_ID.unpack_from(data)
+    return (seq, ttl) if magic == PROBE_MAGIC else None
+
+
+class _TraceSocket:
+    """Один UDP-сокет на цель: все TTL идут с одного 5-tuple (как у tracepath, без привилегий), поэтому
+    балансировка ECMP ведет все пробы одним путем. TTL задается перед каждой отправкой, ответы
+    маршрутизаторов приходят в очередь ошибок (IP_RECVERR) и сопоставляются с пробой по процитированным
+    данным; ошибки без нашей метки (ответ на пробу прошлого раунда, обрезанная цитата) отбрасываются"""
+
+    def __init__(self, loop, family, address, port):
+        self.loop = loop
+        self.family = family
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        if family == socket.AF_INET6:
+            self.ttl_option = (socket.IPPROTO_IPV6, socket.IPV6_UNICAST_HOPS)
+            self.sock.setsockopt(socket.IPPROTO_IPV6, IPV6_RECVERR, 1)
+        else:
+            self.ttl_option = (socket.IPPROTO_IP, socket.IP_TTL)
+            self.sock.setsockopt(socket.IPPROTO_IP, IP_RECVERR, 1)
+        self.sock.connect((address, port))
+        self.target = address
+        # (номер раунда, TTL) -> (future, время отправки)
+        self.pending = {}
+        loop.add_reader(self.sock.fileno(), self._on_error)
+
+    def send(self, seq, ttl, size):
+        """Отправляет пробу с заданным TTL; возвращает (время отправки, future ответа)"""
+        key = (seq & 0xFFFF, ttl)
+        future = self.loop.create_future()
+        self.sock.setsockopt(*self.ttl_option, ttl)
+        payload = probe_payload(seq, ttl, size)
+        sent = time.perf_counter()
+        try:
+            self.sock.send(payload)
+        except OSError:
+            # Ошибка предыдущей пробы (ECONNREFUSED) могла остаться в сокете; повторяем один раз
+            self.sock.send(payload)
+        self.pending[key] = future
+        return sent, future
+
+    def forget(self, seq, ttl):
+        self.pending.pop((seq & 0xFFFF, ttl), None)
+
+    def _on_error(self):
+        while True:
+            try:
+                data, ancdata, _, _ = self.sock.recvmsg(512, 512, MSG_ERRQUEUE)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                break
+            received = time.perf_counter()
+            for level, kind, value in ancdata:
+                if kind not in (IP_RECVERR, IPV6_RECVERR) or len(value) < SOCK_EXTENDED_ERR.size:
+                    continue
+                _, origin, icmp_type, _, _, _, _ = SOCK_EXTENDED_ERR.unpack_from(value)
+                if origin not in (SO_EE_ORIGIN_ICMP, SO_EE_ORIGIN_ICMP6):
+                    continue
+                self.dispatch(data, self._offender(value[SOCK_EXTENDED_ERR.size:]), icmp_type, received)
+        # Ответ самой цели (если порт кто-то слушает) не цитирует пробу: его не с чем сопоставить
+        while True:
+            try:
+                self.sock.recv(512)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                # ECONNREFUSED и подобные уже разобраны через очередь ошибок
+                break
+
+    def dispatch(self, quoted, offender, icmp_type, received):
+        """Передает ICMP-ошибку пробе, чьи данные она цитирует"""
+        key = parse_probe_payload(quoted)
+        future = self.pending.pop(key, None) if key is not None else None
+        if future is None or future.done():
+            return False
+        reached = icmp_type not in (ICMP_TIME_EXCEEDED, ICMPV6_TIME_EXCEEDED) or offender == self.target
+        future.set_result((received, offender, reached))
+        return True
+
+    def _offender(self, data):
+        """Адрес узла, приславшего ICMP (sockaddr после sock_extended_err)"""
+        try:
+            if self.family == socket.AF_INET6:
+                return socket.inet_ntop(socket.AF_INET6, data[8:24])
+            return socket.inet_ntoa(data[4:8])
+        except (OSError, ValueError):
+            return None
+
+    def close(self):
+        self.loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+        for future in self.pending.values():
+            if not future.done():
+                future.cancel()
+        self.pending.clear()
+
+
+class TraceEngine:
+    """Трассировка, в которой пробы всех TTL отправляются одновременно.
+    Один раунд длится не дольше таймаута, а не TTL x таймаут, как у последовательной трассировки"""
+
+    def __init__(self, max_hops=30, timeout=2.0, port=33434, payload_size=32, sample_count=10):
+        self.max_hops = max_hops
+        self.timeout = timeout
+        self.port = port
+        self.payload_size = payload_size
+        self.sample_count = sample_count
+
+    @staticmethod
+    def available():
+        """Очередь ICMP-ошибок без привилегий есть только в Linux"""
+        return sys.platform.startswith("linux")
+
+    async def trace(self, target, rounds=1, interval=1.0, on_update=None):
+        """Трассирует target; rounds=None означает непрерывный режим (как mtr).
+        on_update(hops) вызывается после каждого раунда со статистикой хопов до цели"""
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(target, None, type=socket.SOCK_DGRAM)
+        family, _, _, _, sockaddr = infos[0]
+        address = sockaddr[0]
+
+        probe = _TraceSocket(loop, family, address, self.port)
+        hops = [TraceHop(target, ttl, self.sample_count) for ttl in range(1, self.max_hops + 1)]
+        last_hop = self.max_hops
+        try:
+            seq = 0
+            while rounds is None or seq < rounds:
+                started = time.perf_counter()
+                waits = [self._wait(probe, seq, ttl) for ttl in range(1, last_hop + 1)]
+                for hop, (result, reached) in zip(hops, await asyncio.gather(*waits)):
+                    hop.add(result)
+                    if reached:
+                        hop.reached = True
+                        last_hop = min(last_hop, hop.ttl)
+                if on_update is not None:
+                    on_update(hops[:last_hop])
+                seq += 1
+                if rounds is None or seq < rounds:
+                    await asyncio.sleep(max(0.0, interval - (time.perf_counter() - started)))
+        finally:
+            probe.close()
+        return hops[:last_hop]
+
+    async def _wait(self, probe, seq, ttl):
+        try:
+            sent, future = probe.send(seq, ttl, self.payload_size)
+        except OSError as e:
+            return ProbeResult(probe.target, None, seq, None, ttl, 0, "udp", str(e)), False
+        try:
+            received, offender, reached = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            probe.forget(seq, ttl)
+            return ProbeResult(probe.target, None, seq, None, ttl, 0, "udp", "timeout"), False
+        rtt = (received - sent) * 1000.0
+        return ProbeResult(probe.target, offender, seq, rtt, ttl, self.payload_size, "udp", None), reached
+
+    async def trace_many(self, targets, rounds=1, interval=1.0, on_update=None):
+        """Трассирует несколько целей одновременно"""
+        return await asyncio.gather(*(self.trace(target, rounds, interval, on_update) for target in targets))
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from src.TraceEngine import TraceEngine
+
+
+def hop_series(target, ttl):
+    """Имя ряда истории для хопа трассировки"""
+    return f"{target} #{ttl}"
+
+
+class TraceThread(QThread):
+    hops_signal = pyqtSignal(list)
+    error_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal()
+
+    def __init__(self, targets, rounds=3, interval=1.0, max_hops=30, timeout=2.0, store=None):
+        super().__init__()
+        self.targets = list(targets)
+        self.rounds = rounds
+        self.interval = interval
+        self.engine = TraceEngine(max_hops=max_hops, timeout=timeout)
+        self.store = store
+        self._loop = None
+        self._task = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        """Запускает трассировку всех целей и передает строки хопов после каждого раунда"""
+        loop = self._loop = asyncio.new_event_loop()
+        try:
+            # stop() мог прийти до запуска потока или пока создается задача
+            if not self._stop_event.is_set():
+                self._task = loop.create_task(
+                    self.engine.trace_many(self.targets, self.rounds, self.interval, self.emit_hops))
+                if self._stop_event.is_set():
+                    self._task.cancel()
+                loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.error_signal.emit(f"Ошибка: {e}")
+        finally:
+            loop.close()
+            self._loop = None
+            self._task = None
+            self.finished_signal.emit()
+
+    def emit_hops(self, hops):
+        """Снимает значения хопов в этом потоке, чтобы GUI не читал изменяемые объекты"""
+        if self.store is not None:
+            # Каждый раунд добавляет хопу один замер - он и пишется в историю ряда "цель #TTL"
+            for hop in hops:
+                if hop.samples:
+                    self.store.add(hop_series(hop.target, hop.ttl), hop.samples[-1])
+        self.hops_signal.emit([(hop.target, hop.ttl, ", ".join(sorted(hop.addresses)) or "*",
+                                hop.sent, hop.loss, hop.last_rtt, hop.avg, hop.min, hop.max,
+                                " ".join("*" if rtt is None else f"{rtt:.1f}" for rtt in hop.samples),
+                                hop.asn) for hop in hops])
+
+    def stop(self):
+        """Останавливает выполнение потока"""
+        self._stop_event.set()
+        # Поток может в любой момент обнулить _loop, поэтому ссылки читаются один раз
+        loop, task = self._loop, self._task
+        if loop is not None and task is not None:
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                # Цикл событий уже закрыт
+                pass
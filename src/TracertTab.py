@@ -1,6 +1,21 @@
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QPushButton, QTextEdit, QLineEdit, QLabel)
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QPlainTextEdit, QLineEdit, QLabel,
+                             QCheckBox)
 
+from src.Backend import get_backend
 from src.CommandThread import CommandThread
+from src.CommandExecutor import get_executor, COMMAND_TIMEOUT
+from src.PingSweep import expand_targets
+from src.ResultTableModel import ResultTableModel
+from src.ResultTableView import ResultTableView
+from src.SampleStore import get_sample_store
+from src.HostResolver import get_host_resolver
+from src.TraceEngine import TraceEngine
+from src.TraceThread import TraceThread
+from src.TopologyStore import get_topology
+
+
+def format_rtt(value):
+    return f"{value:.1f}мс"
 
 
 class TracertTab(QWidget):
@@ -8,54 +23,132 @@ class TracertTab(QWidget):
     характеристики для каждого промежуточного маршрутизатора на этом пути"""
     def __init__(self):
         super().__init__()
+        self.backend = get_backend()
+        self.topology = get_topology()
+        self.executor = get_executor()
         self.setup_ui()
-        self.command_thread = None
 
     def setup_ui(self):
         layout = QVBoxLayout()
 
         self.tracert_input = QLineEdit()
-        self.tracert_input.setPlaceholderText("Введите адрес для tracert")
+        self.tracert_input.setPlaceholderText("Введите адрес для tracert (можно несколько через пробел)")
         self.tracert_params = QLineEdit()
-        self.tracert_params.setPlaceholderText("Введите параметры (например, -h 30)")
-        self.tracert_output = QTextEdit()
+        self.tracert_params.setPlaceholderText("Введите параметры (например, -h 30 -w 2000)")
+        self.tracert_output = QPlainTextEdit()
         self.tracert_output.setReadOnly(True)
+        self.tracert_output.setMaximumBlockCount(10000)
         self.tracert_button = QPushButton("Tracert")
         self.tracert_button.clicked.connect(self.perform_tracert)
+        self.stop_button = QPushButton("Остановить")
+        self.stop_button.clicked.connect(self.stop_command)
+        self.continuous_check = QCheckBox("Непрерывно (MTR)")
+
+        self.hop_model = ResultTableModel(["Цель", "Хоп", "Адрес", "Отправлено", "Потери", "Посл.", "Сред",
+                                           "Лучш.", "Худш.", "Замеры", "ASN"],
+                                          formatters={4: "{:.0f}%".format, 5: format_rtt, 6: format_rtt,
+                                                      7: format_rtt, 8: format_rtt},
+                                          key=lambda row: (row[0], row[1]), resolver=get_host_resolver(),
+                                          address_column=2,
+                                          typecodes={1: "q", 3: "q", 4: "d", 5: "d", 6: "d", 7: "d", 8: "d"})
+        self.hop_table = ResultTableView(self.hop_model)
 
         layout.addWidget(QLabel("Адрес для Tracert:"))
         layout.addWidget(self.tracert_input)
         layout.addWidget(QLabel("Параметры:"))
         layout.addWidget(self.tracert_params)
-        layout.addWidget(self.tracert_button)
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addWidget(self.tracert_button)
+        buttons_layout.addWidget(self.stop_button)
+        buttons_layout.addWidget(self.continuous_check)
+        layout.addLayout(buttons_layout)
+        layout.addWidget(self.hop_table)
         layout.addWidget(self.tracert_output)
 
         self.setLayout(layout)
 
     def perform_tracert(self):
-        self.tracert_output.clear()
+        # Трассировки идут параллельно; результаты очищаются, только если вкладка свободна
+        if not self.executor.jobs(self):
+            self.tracert_output.clear()
+            self.hop_model.clear()
         target = self.tracert_input.text() or "8.8.8.8"
-        params = self.tracert_params.text().strip()
-        command = ["tracert"] + params.split() + [target]
-        self.start_command_thread(command)
+        params = self.tracert_params.text().strip() or None
+        options = self.parse_params(params)
+        if TraceEngine.available() and options is not None:
+            try:
+                targets = list(expand_targets(target))
+            except (OSError, UnicodeDecodeError) as e:
+                self.tracert_output.appendPlainText(f"Ошибка: {e}")
+                return
+            self.start_trace_thread(targets, **options)
+        else:
+            self.start_command_thread(self.backend.trace(target, params))
+
+    def parse_params(self, params):
+        """Переводит параметры tracert/traceroute в настройки движка; None, если нужен внешний tracert"""
+        options = {"max_hops": 30, "timeout": 2.0, "rounds": 3}
+        args = (params or "").split()
+        if len(args) % 2:
+            return None
+        for flag, value in zip(args[::2], args[1::2]):
+            try:
+                if flag in ("-h", "-m"):
+                    options["max_hops"] = int(value)
+                elif flag == "-w":
+                    options["timeout"] = int(value) / 1000.0
+                elif flag == "-q":
+                    options["rounds"] = int(value)
+                else:
+                    return None
+            except ValueError:
+                return None
+        if self.continuous_check.isChecked():
+            options["rounds"] = None
+        return options
+
+    def start_trace_thread(self, targets, **options):
+        """Запускает встроенную трассировку через общий исполнитель"""
+        job = self.executor.submit(self, TraceThread(targets, store=get_sample_store(), **options), serial=False)
+        job.hops_signal.connect(self.handle_hops)
+        job.error_signal.connect(self.tracert_output.appendPlainText)
+        job.finished_signal.connect(lambda: self.tracert_output.appendPlainText("Команда завершена."))
+
+    def handle_hops(self, rows):
+        """Обновляет строки хопов после очередного раунда и путь в общей топологии"""
+        paths = {}
+        for row in rows:
+            self.hop_model.upsert_row(row)
+            target, ttl, addresses = row[:3]
+            paths.setdefault(target, []).append((ttl, [] if addresses == "*" else addresses.split(", ")))
+        for target, hops in paths.items():
+            self.topology.add_trace(target, [addresses for _, addresses in sorted(hops)])
 
-    def start_command_thread(self, command):
-        """Запускает команду в отдельном потоке"""
-        if self.command_thread is not None and self.command_thread.isRunning():
-            self.stop_command()
+    def start_command_thread(self, spec):
+        """Запускает команду бэкенда через общий исполнитель"""
+        job = self.executor.submit(self, CommandThread.from_spec(spec, self.backend.encoding),
+                                   timeout=COMMAND_TIMEOUT, serial=False)
+        job.lines_signal.connect(self.handle_output)
+        job.records_signal.connect(lambda records: self.handle_trace_records(spec.command[-1], records))
+        job.finished_signal.connect(lambda: self.tracert_output.appendPlainText("Команда завершена."))
 
-        self.command_thread = CommandThread(command)
-        self.command_thread.output_signal.connect(self.handle_output)
-        self.command_thread.finished_signal.connect(lambda: self.tracert_output.append("Команда завершена."))
-        self.command_thread.start()
+    def handle_trace_records(self, target, records):
+        """Хопы, разобранные из вывода tracert/traceroute, попадают в ту же таблицу, что и у встроенной трассировки"""
+        rows = []
+        for record in records:
+            rtts = [rtt for rtt in record.rtts if rtt is not None]
+            sent = len(record.rtts)
+            rows.append((target, record.ttl, ", ".join(record.addresses) or "*", sent,
+                         100.0 * (sent - len(rtts)) / sent if sent else 0.0,
+                         rtts[-1] if rtts else None, sum(rtts) / len(rtts) if rtts else None,
+                         min(rtts, default=None), max(rtts, default=None),
+                         " ".join("*" if rtt is None else f"{rtt:.1f}" for rtt in record.rtts), None))
+        self.handle_hops(rows)
 
-    def handle_output(self, output):
-        """Обрабатывает вывод"""
-        self.tracert_output.append(output)
+    def handle_output(self, lines):
+        """Обрабатывает пачку строк вывода"""
+        self.tracert_output.appendPlainText("\n".join(lines))
 
     def stop_command(self):
-        """Останавливает выполнение команды"""
-        if self.command_thread is not None:
-            self.command_thread.stop()
-            self.command_thread.wait()
-            self.command_thread = None
+        """Отменяет трассировки вкладки, не дожидаясь завершения потоков"""
+        self.executor.cancel_owner(self)
@@ -0,0 +1,52 @@
+"""Пропускная способность пакетных изменений маршрутов: один процесс ip -batch против процесса на операцию.
+
+Маршруты ставятся во временном сетевом пространстве имен, поэтому нужны root и iproute2.
+
+Запуск: python -m tests.bench_batch_routes [--routes N]"""
+import argparse
+import json
+
+from tests.netns import NetnsBed, netns_available
+
+INSIDE = """
+import json, sys, time
+from src.Backend import Backend, LinuxBackend
+from src.BatchMutator import Operation
+
+count = int(sys.argv[1])
+backend = LinuxBackend()
+add = [Operation("route", "add", f"10.{i >> 8 & 255}.{i & 255}.0", "24", "192.0.2.1") for i in range(count)]
+delete = [operation._replace(action="delete", gateway=None) for operation in add]
+timings = {}
+# Backend.apply_batch - общий путь с процессом на операцию, LinuxBackend переопределяет его через ip -batch
+paths = (("ip -batch", backend.apply_batch), ("по процессу", lambda batch: Backend.apply_batch(backend, batch)))
+for title, apply in paths:
+    started = time.perf_counter()
+    results = apply(add)
+    timings[title] = time.perf_counter() - started
+    assert len(results) == count and all(ok for ok, _ in results), results[-1]
+    backend.apply_batch(delete)
+print(json.dumps(timings))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--routes", type=int, default=1000, help="маршрутов в пакете")
+    args = parser.parse_args()
+    if not netns_available():
+        parser.exit(1, "нужны root и ip netns\n")
+    with NetnsBed("nlbb") as bed:
+        namespace = bed.namespace("bench")
+        bed.ip("link", "add", "lan0", "type", "veth", "peer", "name", "lan1", namespace=namespace)
+        bed.ip("addr", "add", "192.0.2.2/24", "dev", "lan0", namespace=namespace)
+        for link in ("lan0", "lan1"):
+            bed.ip("link", "set", link, "up", namespace=namespace)
+        timings = json.loads(bed.python(namespace, INSIDE, str(args.routes)))
+    print(f"{'путь':<12} {'время, с':>9} {'операций/с':>11}")
+    for title, elapsed in timings.items():
+        print(f"{title:<12} {elapsed:>9.2f} {args.routes / elapsed:>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Задержка цикла событий GUI под потоком вывода команды: пачки строк против сигнала на каждую строку.
+
+Синтетическая команда печатает строки с заданной скоростью (по умолчанию 100 тыс. строк/с), таймер
+цикла событий срабатывает каждые 10 мс и записывает, насколько он опоздал.
+
+Запуск: python -m tests.bench_command_output [--rate N] [--seconds N]"""
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication, QPlainTextEdit, QTextEdit
+
+from src.CommandThread import CommandThread
+
+TICK_MS = 10
+
+PRODUCER = """
+import sys, time
+rate, seconds = int(sys.argv[1]), float(sys.argv[2])
+step = max(1, rate // 100)
+started = time.monotonic()
+sent = 0
+while sent < rate * seconds:
+    sys.stdout.write("".join(f"Ответ от 192.0.2.{sent % 250}: число байт=32 время=1мс TTL=64 #{sent + i}\\n"
+                             for i in range(step)))
+    sys.stdout.flush()
+    sent += step
+    time.sleep(max(0.0, started + sent / rate - time.monotonic()))
+"""
+
+
+def run(app, rate, seconds, batched):
+    """Возвращает (опоздания таймера в мс, получено строк, время до последней строки в с)"""
+    if batched:
+        output = QPlainTextEdit()
+        output.setMaximumBlockCount(10000)
+        thread = CommandThread([sys.executable, "-c", PRODUCER, str(rate), str(seconds)], encoding="utf-8")
+        thread.lines_signal.connect(lambda lines: output.appendPlainText("\n".join(lines)))
+    else:
+        # Прежний путь: сигнал и QTextEdit.append на каждую строку
+        output = QTextEdit()
+        thread = CommandThread([sys.executable, "-c", PRODUCER, str(rate), str(seconds)], flush_interval=0,
+                               flush_bytes=1, encoding="utf-8")
+        thread.lines_signal.connect(lambda lines: [output.append(line) for line in lines])
+    output.show()
+    received = [0]
+    thread.lines_signal.connect(lambda lines: received.__setitem__(0, received[0] + len(lines)))
+
+    lateness = []
+    last = [time.perf_counter()]
+
+    def tick():
+        now = time.perf_counter()
+        lateness.append(max(0.0, (now - last[0]) * 1000 - TICK_MS))
+        last[0] = now
+    timer = QTimer()
+    timer.timeout.connect(tick)
+    timer.start(TICK_MS)
+
+    started = time.perf_counter()
+    done = [None]
+
+    def finished():
+        done[0] = time.perf_counter() - started
+        app.quit()
+    thread.finished_signal.connect(finished)
+    thread.start()
+    app.exec_()
+    timer.stop()
+    thread.wait()
+    output.close()
+    return sorted(lateness), received[0], done[0]
+
+
+def percentile(values, share):
+    return values[min(len(values) - 1, int(len(values) * share))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=int, default=100000, help="строк в секунду")
+    parser.add_argument("--seconds", type=float, default=3.0, help="длительность вывода")
+    args = parser.parse_args()
+    app = QApplication.instance() or QApplication([])
+    print(f"{'режим':<12} {'p50, мс':>8} {'p99, мс':>8} {'макс, мс':>9} {'строк':>9} {'время, с':>9}")
+    for batched, title in ((True, "пачки"), (False, "построчно")):
+        lateness, received, elapsed = run(app, args.rate, args.seconds, batched)
+        print(f"{title:<12} {percentile(lateness, 0.5):>8.1f} {percentile(lateness, 0.99):>8.1f} "
+              f"{lateness[-1] if lateness else 0.0:>9.1f} {received:>9,} {elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Время обнаружения узлов сегмента каждым методом (цель - /22 быстрее 10 с).
+
+Сканер и узлы - во временных сетевых пространствах имен, соединенных veth-парой; узлы - адреса
+интерфейса на другой стороне. Нужны root и iproute2.
+
+Запуск: python -m tests.bench_discovery [--prefix 22] [--hosts 40] [--methods arp icmp tcp]"""
+import argparse
+import ipaddress
+import json
+
+from tests.netns import NetnsBed, netns_available
+from tests.test_discovery_scanner import SCAN_SCRIPT
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--prefix", type=int, default=22, help="длина префикса сегмента")
+    parser.add_argument("--hosts", type=int, default=40, help="отвечающих узлов")
+    parser.add_argument("--methods", nargs="+", default=["arp", "icmp", "tcp"], help="методы обнаружения")
+    args = parser.parse_args()
+    if not netns_available():
+        parser.exit(1, "нужны root и ip netns\n")
+    segment = ipaddress.ip_network(f"10.9.0.0/{args.prefix}")
+    addresses = list(segment.hosts())
+    step = max(1, (len(addresses) - 1) // args.hosts)
+    hosts = addresses[:-1:step][:args.hosts]
+    with NetnsBed("nlbd") as bed:
+        scanner, other = bed.namespace("scanner"), bed.namespace("hosts")
+        _, right = bed.link(scanner, f"{addresses[-1]}/{args.prefix}", other, f"{hosts[0]}/{args.prefix}")
+        for address in hosts[1:]:
+            bed.ip("addr", "add", f"{address}/{args.prefix}", "dev", right, namespace=other)
+        bed.sysctl(scanner, "net.ipv4.ping_group_range=0 2147483647")
+        print(f"сегмент {segment}: {len(addresses)} адресов, {len(hosts)} узлов")
+        print(f"{'метод':<6} {'время, с':>9} {'адресов/с':>10} {'найдено':>8}")
+        for method in args.methods:
+            outcome = json.loads(bed.python(scanner, SCAN_SCRIPT, method, str(segment)))
+            print(f"{outcome['method']:<6} {outcome['elapsed']:>9.2f} {outcome['done'] / outcome['elapsed']:>10,.0f} "
+                  f"{len(outcome['found']):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Время силовой раскладки на графах из 1k/10k/100k узлов: полный расчет и дорасчет после изменения.
+
+Запуск: python -m tests.bench_graph_layout [--sizes 1000 10000 100000] [--iterations N]"""
+import argparse
+import time
+
+import numpy as np
+
+from src.GraphLayout import GraphLayout
+
+
+def route_graph(n, rng):
+    """Граф как у вкладки маршрутов: несколько шлюзов, у каждого звезда сетей; половина сетей у первого шлюза"""
+    gateways = [f"gw{i}" for i in range(max(1, n // 1000))]
+    nodes = ["local"] + gateways
+    edges = [("local", gateway) for gateway in gateways]
+    for i in range(n - len(nodes)):
+        gateway = gateways[0] if i % 2 or len(gateways) == 1 else gateways[rng.integers(len(gateways))]
+        nodes.append(f"net{i}")
+        edges.append((gateway, f"net{i}"))
+    return nodes, edges
+
+
+def measure(layout, nodes, edges):
+    started = time.perf_counter()
+    layout.layout(nodes, edges)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="число узлов")
+    parser.add_argument("--iterations", type=int, default=50, help="итераций полного расчета")
+    args = parser.parse_args()
+    rng = np.random.default_rng(1)
+    for n in args.sizes:
+        nodes, edges = route_graph(n, rng)
+        layout = GraphLayout(iterations=args.iterations)
+        full = measure(layout, nodes, edges)
+        # Несколько новых маршрутов: двигаются только они и их окрестность
+        added = [f"new{i}" for i in range(10)]
+        incremental = measure(layout, nodes + added, edges + [("gw0", node) for node in added])
+        print(f"{n:>8,} узлов  полный {full:8.2f} с ({full / args.iterations * 1000:7.1f} мс/итер.)  "
+              f"дорасчет {incremental:6.2f} с")
+
+
+if __name__ == "__main__":
+    main()
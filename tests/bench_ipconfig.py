@@ -0,0 +1,49 @@
+"""Разбор ipconfig /all с сотнями и тысячами адаптеров: однопроходный parse_ipconfig против прежнего
+поиска раздела через list.index и повторного просмотра буфера.
+
+Запуск: python -m tests.bench_ipconfig [--adapters 100 1000 5000]"""
+import argparse
+import re
+import time
+
+from src.Parsers import parse_ipconfig
+from tests.test_backend import many_adapters
+
+
+def old_sections(buffer):
+    """Прежний IpconfigTab.process_output без виджетов: раздел ищется по index от каждого заголовка"""
+    sections = []
+    for line in buffer:
+        if "адаптер" in line.lower():
+            adapter_name = re.search(r'адаптер (.*?):', line, re.IGNORECASE)
+            if adapter_name:
+                content = [line]
+                for next_line in buffer[buffer.index(line) + 1:]:
+                    if "адаптер" in next_line.lower():
+                        break
+                    content.append(next_line)
+                sections.append((adapter_name.group(1).strip(), content))
+    return sections
+
+
+def timed(function, lines):
+    started = time.perf_counter()
+    count = len(function(lines))
+    return time.perf_counter() - started, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--adapters", type=int, nargs="+", default=[100, 1000, 5000], help="число адаптеров")
+    args = parser.parse_args()
+    print(f"{'адаптеров':>10} {'parse_ipconfig, мс':>19} {'прежний, мс':>12}")
+    for count in args.adapters:
+        lines = many_adapters(count, "ru")
+        new, parsed = timed(parse_ipconfig, lines)
+        old, found = timed(old_sections, lines)
+        assert parsed == found == count
+        print(f"{count:>10,} {new * 1000:>19.1f} {old * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
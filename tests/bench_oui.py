@@ -0,0 +1,65 @@
+"""Поиск производителей для 100 тыс. соседей по скомпилированной базе OUI.
+
+База собирается во временном каталоге из синтетического источника размера реестра IEEE (около 38 тыс. OUI).
+Замеряются открытие базы (отображение в память), lookup_many по таблице соседей и поиск без кэша
+по каждому MAC. Для сравнения - словарь, построенный разбором текстового источника при запуске.
+
+Запуск: python -m tests.bench_oui [--neighbors N] [--ouis N]"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from src.OuiDatabase import OuiDatabase, build_database, mac_oui, parse_source
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--neighbors", type=int, default=100000, help="соседей в таблице")
+    parser.add_argument("--ouis", type=int, default=38000, help="записей в базе")
+    args = parser.parse_args()
+    generator = random.Random(1)
+    # Глобально администрируемые индивидуальные OUI: младшие два бита первого байта сброшены
+    ouis = sorted((value >> 16) << 18 | value & 0xFFFF for value in generator.sample(range(1 << 22), args.ouis))
+    # В сети соседи делят немногие OUI: сотня производителей на всю таблицу
+    common = generator.sample(ouis, 100)
+    macs = [f"{generator.choice(common):06x}{generator.getrandbits(24):06x}" for _ in range(args.neighbors)]
+    macs = [":".join(mac[i:i + 2] for i in range(0, 12, 2)) for mac in macs]
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "nmap-mac-prefixes")
+        with open(source, "w", encoding="utf-8") as file:
+            for oui in ouis:
+                file.write(f"{oui:06X} Vendor {oui % 5000}\n")
+        path = os.path.join(directory, "oui.bin")
+        build_database(source, path)
+        database = OuiDatabase(path)
+        opened, _ = timed(database.open)
+        many, vendors = timed(database.lookup_many, macs)
+        assert all(vendors)
+        database.cache.clear()
+        single, _ = timed(lambda: [database.find(mac_oui(mac)) for mac in macs])
+        database.close()
+
+        def parse_text():
+            with open(source, encoding="utf-8") as file:
+                return dict(parse_source(file))
+        parsed, table = timed(parse_text)
+        assert len(table) == args.ouis
+        text_size = os.path.getsize(source)
+    print(f"база: {args.ouis:,} OUI, {text_size / 1024:.0f} КБ текста; соседей {args.neighbors:,}")
+    print(f"{'операция':<40} {'мс':>8}")
+    for title, elapsed in (("открытие базы (mmap)", opened), ("lookup_many по таблице соседей", many),
+                           ("find по каждому MAC без кэша", single),
+                           ("разбор текстового источника в словарь", parsed)):
+        print(f"{title:<40} {elapsed * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Скорость построчных парсеров на корпусе записанного вывода, строк в секунду.
+
+Запуск: python -m tests.bench_parsers [--lines N]"""
+import argparse
+import os
+import time
+
+from tests.test_parsers import CORPUS, line_parser, read_corpus
+
+
+def bench(name, total):
+    """Прогоняет файл корпуса по кругу, пока не наберется total строк; возвращает строк в секунду"""
+    lines = read_corpus(name)
+    repeats = max(1, total // len(lines))
+    parser = line_parser(name)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for line in lines:
+            parser(line)
+    return repeats * len(lines) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200000, help="строк на файл корпуса")
+    args = parser.parse_args()
+    for name in sorted(CORPUS):
+        print(f"{os.path.splitext(name)[0]:<20} {bench(name, args.lines):>12,.0f} строк/с")
+
+
+if __name__ == "__main__":
+    main()
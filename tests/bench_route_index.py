@@ -0,0 +1,60 @@
+"""Поиск по самому длинному префиксу: построение индекса и пакетный поиск, адресов в секунду.
+
+Запуск: python -m tests.bench_route_index [--routes N] [--lookups N]"""
+import argparse
+import random
+import socket
+import time
+
+from src.Records import RouteRecord
+from src.RouteIndex import RouteIndex
+
+
+def random_routes(count, rng):
+    """Таблица вида полной BGP: префиксы /8-/32 IPv4 и /32-/64 IPv6 плюс маршруты по умолчанию"""
+    routes = [RouteRecord("0.0.0.0", "0", "192.0.2.1", "eth0", 0), RouteRecord("::", "0", "fd00::1", "eth0", 0)]
+    for i in range(count):
+        if i % 5:
+            length = rng.randint(8, 32)
+            value = rng.getrandbits(32) >> (32 - length) << (32 - length)
+            routes.append(RouteRecord(socket.inet_ntop(socket.AF_INET, value.to_bytes(4, "big")), str(length),
+                                      "192.0.2.1", "eth0", rng.randint(0, 100)))
+        else:
+            length = rng.randint(32, 64)
+            value = rng.getrandbits(128) >> (128 - length) << (128 - length)
+            routes.append(RouteRecord(socket.inet_ntop(socket.AF_INET6, value.to_bytes(16, "big")), str(length),
+                                      "fd00::1", "eth0", rng.randint(0, 100)))
+    return routes
+
+
+def random_addresses(count, rng):
+    for i in range(count):
+        if i % 5:
+            yield socket.inet_ntop(socket.AF_INET, rng.getrandbits(32).to_bytes(4, "big"))
+        else:
+            yield socket.inet_ntop(socket.AF_INET6, rng.getrandbits(128).to_bytes(16, "big"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--routes", type=int, default=100000, help="маршрутов в таблице")
+    parser.add_argument("--lookups", type=int, default=1000000, help="адресов для поиска")
+    args = parser.parse_args()
+    rng = random.Random(1)
+    routes = random_routes(args.routes, rng)
+    addresses = list(random_addresses(args.lookups, rng))
+
+    started = time.perf_counter()
+    index = RouteIndex(routes)
+    built = time.perf_counter() - started
+    print(f"построение   {len(index):>10,} маршрутов за {built:.2f} с")
+
+    started = time.perf_counter()
+    found = sum(route is not None for _, route in index.lookup_many(addresses))
+    elapsed = time.perf_counter() - started
+    print(f"поиск        {len(addresses):>10,} адресов за {elapsed:.2f} с, {len(addresses) / elapsed:,.0f} адресов/с "
+          f"(найдено {found:,})")
+
+
+if __name__ == "__main__":
+    main()
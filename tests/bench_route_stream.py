@@ -0,0 +1,118 @@
+"""Таблица маршрутов из 500 тыс. строк: пиковая память и время до первой строки таблицы.
+
+Сравниваются прежний путь (вывод копится строкой через +=, разбор регулярным выражением после
+завершения команды) и потоковый разбор parse_route_line с передачей записей пачками, как в CommandThread.
+Вывод синтетического route print отдает отдельный процесс, память считается tracemalloc.
+
+Запуск: python -m tests.bench_route_stream [--routes N]"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from src.Parsers import parse_route_line
+
+FLUSH_INTERVAL = 0.05
+FLUSH_BYTES = 64 * 1024
+
+# Выражение прежней RouteTab.parse_route_output
+OLD_ROUTE = re.compile(r'\s+(\d+\.\d+\.\d+\.\d+)\s+(\d+\.\d+\.\d+\.\d+)\s+(\S+)\s+(\d+\.\d+\.\d+\.\d+)\s+(\d+)')
+
+CAT = "import shutil, sys; shutil.copyfileobj(open(sys.argv[1], 'rb'), sys.stdout.buffer)"
+
+
+def write_dump(path, count):
+    """Синтетический вывод route print с count маршрутами"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("=" * 75 + "\nIPv4 Route Table\n" + "=" * 75 + "\nActive Routes:\n"
+                "Network Destination        Netmask          Gateway       Interface  Metric\n")
+        for i in range(count):
+            destination = f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+            gateway = "On-link" if i % 3 == 0 else f"192.168.{i % 4}.1"
+            f.write(f"{destination:>17} {'255.255.255.255':>16} {gateway:>16} {'192.168.1.10':>15} {i % 500:>6}\n")
+        f.write("=" * 75 + "\n")
+
+
+def command_output(path):
+    process = subprocess.Popen([sys.executable, "-c", CAT, path], stdout=subprocess.PIPE, text=True,
+                               encoding="utf-8")
+    return process, process.stdout
+
+
+def old_path(path):
+    """Вывод копится целиком, таблица заполняется после завершения команды"""
+    started = time.perf_counter()
+    process, stream = command_output(path)
+    text = ""
+    for line in stream:
+        text += line
+    process.wait()
+    rows = []
+    first = None
+    for line in text.splitlines():
+        match = OLD_ROUTE.match(line)
+        if match:
+            rows.append(match.groups())
+            if first is None:
+                first = time.perf_counter() - started
+    return first, len(rows)
+
+
+def streaming_path(path):
+    """Каждая строка разбирается сразу, записи уходят в столбцы таблицы пачками по времени и объему"""
+    started = time.perf_counter()
+    process, stream = command_output(path)
+    columns = [[] for _ in range(5)]
+    first = None
+    records = []
+    size = 0
+    deadline = time.perf_counter() + FLUSH_INTERVAL
+    for line in stream:
+        size += len(line)
+        record = parse_route_line(line.rstrip("\n"))
+        if record is not None:
+            records.append(record)
+        if size >= FLUSH_BYTES or time.perf_counter() >= deadline:
+            if records and first is None:
+                first = time.perf_counter() - started
+            for column, values in zip(columns, zip(*records)):
+                column.extend(values)
+            records, size = [], 0
+            deadline = time.perf_counter() + FLUSH_INTERVAL
+    for column, values in zip(columns, zip(*records)):
+        column.extend(values)
+    process.wait()
+    return first, len(columns[0])
+
+
+def measure(function, path):
+    """Время считается отдельным прогоном: tracemalloc сильно замедляет выделение памяти"""
+    started = time.perf_counter()
+    first, rows = function(path)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    function(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first, elapsed, peak, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--routes", type=int, default=500000, help="маршрутов в выводе")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "route.txt")
+        write_dump(path, args.routes)
+        print(f"{'путь':<10} {'первая строка, с':>17} {'всего, с':>9} {'пик памяти, МБ':>15} {'строк':>9}")
+        for title, function in (("прежний", old_path), ("потоковый", streaming_path)):
+            first, elapsed, peak, rows = measure(function, path)
+            print(f"{title:<10} {first:>17.3f} {elapsed:>9.2f} {peak / 2 ** 20:>15.1f} {rows:>9,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Время запуска и пиковая память консольного режима против графического.
+
+Каждый вариант запускается в отдельном интерпретаторе несколько раз; время - медиана по запускам,
+память - пиковый RSS процесса (ru_maxrss из wait4). Графическая половина (импорт PyQt5 и main,
+создание окна с первой вкладкой) пропускается, если PyQt5 не установлен.
+
+Запуск: python -m tests.bench_startup [--repeat N] [--target 127.0.0.1]"""
+import argparse
+import importlib.util
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WINDOW = """
+import sys
+from PyQt5.QtWidgets import QApplication
+import main
+
+app = QApplication(sys.argv)
+window = main.NetworkUtility()
+window.show()
+# Первая вкладка создается из цикла событий, после показа окна
+app.processEvents()
+app.processEvents()
+"""
+
+
+def run(command):
+    """Запускает команду, возвращает время до завершения и пиковый RSS в КБ"""
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - started
+    process.returncode = os.waitstatus_to_exitcode(status)
+    error = process.stderr.read().decode(errors="replace")
+    process.stderr.close()
+    if process.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)}: код {process.returncode}\n{error}")
+    return elapsed, usage.ru_maxrss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="запусков каждого варианта")
+    parser.add_argument("--target", default="127.0.0.1", help="узел для ping")
+    args = parser.parse_args()
+    python = sys.executable
+    cases = [
+        ("интерпретатор без импортов", [python, "-c", "pass"]),
+        ("cli.py routes", [python, "cli.py", "routes"]),
+        (f"cli.py ping {args.target} -c 1", [python, "cli.py", "ping", args.target, "-c", "1", "-W", "0.5"]),
+    ]
+    if importlib.util.find_spec("PyQt5") is not None:
+        cases += [
+            ("import PyQt5.QtWidgets", [python, "-c", "import PyQt5.QtWidgets"]),
+            ("import main", [python, "-c", "import main"]),
+            ("окно main с первой вкладкой", [python, "-c", WINDOW]),
+        ]
+    else:
+        print("PyQt5 не установлен: графическая половина пропущена")
+    print(f"{'вариант':<36} {'медиана, мс':>12} {'мин, мс':>9} {'пик RSS, МБ':>12}")
+    for title, command in cases:
+        times, peaks = [], []
+        for _ in range(args.repeat):
+            elapsed, peak = run(command)
+            times.append(elapsed)
+            peaks.append(peak)
+        print(f"{title:<36} {statistics.median(times) * 1000:>12.1f} {min(times) * 1000:>9.1f} "
+              f"{max(peaks) / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Испытательные сети в сетевых пространствах имен Linux (ip netns): нужны права root и iproute2.
+Без них тесты, использующие стенд, пропускаются"""
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+
+def netns_available():
+    if not sys.platform.startswith("linux") or os.geteuid() != 0 or shutil.which("ip") is None:
+        return False
+    name = f"nl-probe-{os.getpid()}"
+    if subprocess.run(["ip", "netns", "add", name], capture_output=True).returncode != 0:
+        return False
+    subprocess.run(["ip", "netns", "del", name], capture_output=True)
+    return True
+
+
+requires_netns = pytest.mark.skipif(not netns_available(), reason="нужны root и ip netns")
+
+
+class NetnsBed:
+    """Пространства имен и veth-пары, удаляемые при закрытии стенда"""
+
+    def __init__(self, prefix):
+        self.prefix = f"{prefix}{os.getpid() % 10000}"
+        self.namespaces = []
+        self.host_links = []
+
+    def ip(self, *args, namespace=None):
+        command = ["ip"] + (["-n", namespace] if namespace else []) + list(args)
+        subprocess.run(command, check=True, capture_output=True)
+
+    def sysctl(self, namespace, setting):
+        subprocess.run(["ip", "netns", "exec", namespace, "sysctl", "-qw", setting], check=True,
+                       capture_output=True)
+
+    def python(self, namespace, code, *args):
+        """Выполняет код Python в пространстве имен из корня репозитория и возвращает его stdout"""
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return subprocess.run(["ip", "netns", "exec", namespace, sys.executable, "-c", code] + list(args), cwd=root,
+                              check=True, capture_output=True, text=True).stdout
+
+    def namespace(self, name):
+        name = f"{self.prefix}-{name}"
+        self.ip("netns", "add", name)
+        self.namespaces.append(name)
+        self.ip("link", "set", "lo", "up", namespace=name)
+        # Маршрутизаторы стенда отвечают ICMP без ограничения частоты
+        self.sysctl(name, "net.ipv4.icmp_ratelimit=0")
+        return name
+
+    def link(self, left, left_address, right, right_address, mtu=None):
+        """veth-пара между пространствами имен (None - основное пространство)"""
+        index = len(self.host_links) + len(self.namespaces)
+        left_name, right_name = f"{self.prefix}a{index}", f"{self.prefix}b{index}"
+        self.ip("link", "add", left_name, "type", "veth", "peer", "name", right_name)
+        if left is None:
+            self.host_links.append(left_name)
+        for namespace, name, address in ((left, left_name, left_address), (right, right_name, right_address)):
+            if namespace is not None:
+                self.ip("link", "set", name, "netns", namespace)
+            if mtu:
+                self.ip("link", "set", name, "mtu", str(mtu), namespace=namespace)
+            self.ip("addr", "add", address, "dev", name, namespace=namespace)
+            self.ip("link", "set", name, "up", namespace=namespace)
+        return left_name, right_name
+
+    def close(self):
+        for name in self.host_links:
+            subprocess.run(["ip", "link", "del", name], capture_output=True)
+        for name in self.namespaces:
+            subprocess.run(["ip", "netns", "del", name], capture_output=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
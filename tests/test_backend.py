@@ -0,0 +1,164 @@
+import datetime
+import os
+
+import pytest
+
+from src.Backend import LinuxBackend, WindowsBackend
+from src.BatchMutator import Operation
+from src.Records import RouteRecord, NeighborRecord
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def read_lines(*parts):
+    with open(os.path.join(FIXTURES, *parts), encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+class NoKernel:
+    """KernelReader без procfs: бэкенд переходит на iproute2"""
+
+    def available(self):
+        return False
+
+
+@pytest.fixture
+def linux():
+    return LinuxBackend(NoKernel())
+
+
+def test_ip_json_routes(linux):
+    assert linux.parse_routes(read_lines("backend", "ip_route.json")) == [
+        RouteRecord("0.0.0.0", "0.0.0.0", "192.0.2.1", "eth0", 100),
+        RouteRecord("192.0.2.0", "255.255.255.0", "On-link", "eth0", 0),
+        RouteRecord("198.51.100.7", "255.255.255.255", "192.0.2.254", "eth0", 0),
+    ]
+
+
+def test_ip_json_routes6(linux):
+    # Маска IPv6 остается длиной префикса, как в KernelReader.read_routes6
+    assert linux.parse_routes(read_lines("backend", "ip_route6.json")) == [
+        RouteRecord("fd00::", "64", "On-link", "eth0", 256),
+        RouteRecord("::", "0", "fd00::1", "eth0", 1024),
+    ]
+
+
+def test_ip_json_neighbors(linux):
+    spec = linux.list_neighbors("-4")
+    assert spec.command[:3] == ["ip", "-json", "neigh"]
+    assert linux.parse_output(spec, read_lines("backend", "ip_neigh.json")) == [
+        NeighborRecord("192.0.2.1", "02:fc:00:00:00:05", "reachable", "eth0"),
+        NeighborRecord("192.0.2.9", "", "failed", "eth0"),
+        NeighborRecord("fe80::1", "02:fc:00:00:00:05", "stale", "eth0"),
+    ]
+
+
+def test_ip_json_interfaces(linux):
+    records = linux.parse_output(linux.list_interfaces(), read_lines("backend", "ip_addr.json"))
+    assert [(record.name, record.addresses, record.mtu, record.state) for record in records] == [
+        ("lo", ["127.0.0.1/8", "::1/128"], 65536, "UNKNOWN"),
+        ("eth0", ["192.0.2.2/24", "fd00::2/64"], 1400, "UP"),
+        ("wlan0", [], 1500, "DOWN"),
+    ]
+    assert "Адрес: 192.0.2.2/24" in records[1].details
+
+
+def test_empty_json_output(linux):
+    assert linux.parse_routes([]) == []
+
+
+@pytest.mark.parametrize("locale", ["en", "ru"])
+def test_windows_route_print(locale):
+    backend = WindowsBackend()
+    records = backend.parse_output(backend.list_routes(), read_lines("parsers", f"route_{locale}.txt"))
+    assert records[1] == RouteRecord("127.0.0.0", "255.0.0.0", "On-link", "127.0.0.1", 331)
+    assert len(records) == 3
+
+
+@pytest.mark.parametrize("locale", ["en", "ru"])
+def test_windows_arp(locale):
+    backend = WindowsBackend()
+    records = backend.parse_output(backend.list_neighbors(), read_lines("parsers", f"arp_{locale}.txt"))
+    assert [(record.ip, record.interface) for record in records] == [
+        ("192.168.1.1", "192.168.1.10"), ("192.168.1.255", "192.168.1.10"), ("10.0.0.1", "10.0.0.5")]
+
+
+@pytest.mark.parametrize("locale, wireless", [("en", "Wi-Fi"), ("ru", "Беспроводная сеть")])
+def test_windows_ipconfig(locale, wireless):
+    backend = WindowsBackend()
+    ethernet, wifi = backend.parse_output(backend.list_interfaces(), read_lines("backend", f"ipconfig_{locale}.txt"))
+    assert ethernet.name == "Ethernet"
+    assert ethernet.mac == "00:11:22:33:44:55"
+    assert ethernet.addresses == ["192.168.1.10/24", "fe80::1c2b:3a4d:5e6f:7a8b"]
+    assert ethernet.gateways == ["fe80::1", "192.168.1.1"]
+    assert ethernet.dns_servers == ["192.168.1.1", "8.8.8.8"]
+    assert ethernet.dhcp is True
+    assert ethernet.lease_obtained == datetime.datetime(2026, 10, 18, 10, 15, 30)
+    assert ethernet.lease_expires == datetime.datetime(2026, 10, 19, 22, 15, 30)
+    assert (wifi.name, wifi.state, wifi.mac) == (wireless, "down", "aa:bb:cc:dd:ee:ff")
+
+
+def many_adapters(count, locale="en"):
+    """Вывод ipconfig с count адаптерами: разделы записанного фикстура по кругу, с номером в имени,
+    своим MAC и адресом. Остальные строки разделов повторяются дословно"""
+    lines = read_lines("backend", f"ipconfig_{locale}.txt")
+    starts = [i for i, line in enumerate(lines) if line and not line[0].isspace()][1:]
+    preamble, sections = lines[:starts[0]], [lines[a:b] for a, b in zip(starts, starts[1:] + [len(lines)])]
+    output = list(preamble)
+    for i in range(count):
+        header, *body = sections[i % len(sections)]
+        output.append(f"{header[:-1]} {i}:")
+        mac = f"02-00-00-{i >> 16 & 255:02X}-{i >> 8 & 255:02X}-{i & 255:02X}"
+        output += [line.replace("00-11-22-33-44-55", mac).replace("AA-BB-CC-DD-EE-FF", mac)
+                   .replace("192.168.1.10(", f"10.{i >> 8 & 255}.{i & 255}.10(") for line in body]
+    return output
+
+
+@pytest.mark.parametrize("locale", ["en", "ru"])
+def test_windows_ipconfig_thousand_adapters(locale):
+    backend = WindowsBackend()
+    records = backend.parse_output(backend.list_interfaces(), many_adapters(1000, locale))
+    assert len(records) == 1000
+    assert [record.name.rsplit(" ", 1)[1] for record in records] == [str(i) for i in range(1000)]
+    assert len({record.mac for record in records}) == 1000
+    assert records[513].mac == "02:00:00:00:02:01"
+    assert records[514].addresses[0] == "10.2.2.10/24"
+    assert records[514].dns_servers == ["192.168.1.1", "8.8.8.8"]
+    assert records[515].state == "down"
+
+
+def test_route_commands(linux):
+    assert linux.add_route("10.0.0.0", "255.255.0.0", "192.0.2.1", 5).command == [
+        "ip", "route", "add", "10.0.0.0/16", "via", "192.0.2.1", "metric", "5"]
+    # Без маски добавляется маршрут узла
+    assert linux.add_route("10.0.0.7", "", None).command == ["ip", "route", "add", "10.0.0.7/32"]
+    assert linux.delete_route("fd00:1::", "64").command == ["ip", "route", "del", "fd00:1::/64"]
+
+
+@pytest.mark.parametrize("mask", [None, "", "  "])
+def test_delete_route_requires_mask(linux, mask):
+    with pytest.raises(ValueError):
+        linux.delete_route("10.0.0.0", mask)
+
+
+class RecordingBackend(LinuxBackend):
+    """Вместо ip -batch возвращает заданный ответ и запоминает переданные строки"""
+
+    def __init__(self, code, output):
+        super().__init__(NoKernel())
+        self.answer = (code, output)
+        self.input = None
+
+    def run(self, command, input=None):
+        self.input = input
+        return self.answer
+
+
+def test_apply_batch_reports_failed_line():
+    backend = RecordingBackend(1, "RTNETLINK answers: File exists\nCommand failed -:2\n")
+    operations = [Operation("route", "add", "10.1.0.0", "255.255.0.0", "192.0.2.1"),
+                  Operation("route", "add", "10.2.0.0", "255.255.0.0", "192.0.2.1"),
+                  Operation("route", "delete", "10.3.0.0", "255.255.0.0", None)]
+    assert backend.apply_batch(operations) == [(True, ""), (False, "RTNETLINK answers: File exists")]
+    assert backend.input.splitlines() == ["route add 10.1.0.0/16 via 192.0.2.1", "route add 10.2.0.0/16 via 192.0.2.1",
+                                          "route del 10.3.0.0/16"]
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from src.BatchMutator import BatchMutator, Operation, parse_operations, format_operation
+from src.Records import RouteRecord, NeighborRecord
+from tests.netns import NetnsBed, requires_netns
+
+
+def test_batch_is_validated_up_front():
+    operations, errors = parse_operations([
+        "route add 10.1.0.0 255.255.0.0 192.0.2.1 metric 5",
+        "# комментарий",
+        "route add 10.1.2.0 255.255.0.0 192.0.2.1",
+        "route add 10.2.0.0 255.255.0.0 192.0.2.999",
+        "arp change 192.0.2.7 02:00:00:00:00:07",
+        "arp add 192.0.2.7 02-00-00-00-00-07 if eth0",
+        "route delete 10.3.0.0 16",
+    ])
+    assert [line for line, _ in errors] == [3, 4, 5]
+    assert [format_operation(operation) for operation in operations] == [
+        "route add 10.1.0.0 255.255.0.0 192.0.2.1 metric 5",
+        "arp add 192.0.2.7 02:00:00:00:00:07 if eth0",
+        "route delete 10.3.0.0 16",
+    ]
+
+
+class LinuxNames:
+    name = "linux"
+
+
+def test_inverse_operations():
+    mutator = BatchMutator(LinuxNames())
+    routes = [RouteRecord("10.1.0.0", "255.255.0.0", "192.0.2.1", "eth0", 5)]
+    neighbors = [NeighborRecord("192.0.2.7", "02:00:00:00:00:07", "permanent", "eth0")]
+    change = Operation("route", "change", "10.1.0.0", "16", "192.0.2.9")
+    assert [format_operation(operation) for operation in mutator.inverse(change, routes, neighbors)] == [
+        "route delete 10.1.0.0 16", "route add 10.1.0.0 255.255.0.0 192.0.2.1 metric 5 if eth0"]
+    replace = Operation("arp", "add", "192.0.2.7", mac="02:00:00:00:00:08", interface="eth0")
+    assert mutator.inverse(replace, routes, neighbors)[0].mac == "02:00:00:00:00:07"
+    assert mutator.inverse(Operation("route", "add", "10.3.0.0", "16", "192.0.2.1"), routes, neighbors)[0].action \
+        == "delete"
+
+
+APPLY_SCRIPT = """
+import json, subprocess, sys
+from src.Backend import LinuxBackend
+from src.BatchMutator import BatchMutator, parse_operations
+
+def routes():
+    return sorted(subprocess.run(["ip", "route", "show"], capture_output=True, text=True).stdout.splitlines())
+
+before = routes()
+operations, _ = parse_operations(sys.argv[1:])
+results, rolled_back = BatchMutator(LinuxBackend()).apply(operations)
+print(json.dumps({"results": [result.ok for result in results], "rolled_back": [result.ok for result in rolled_back],
+                  "restored": routes() == before, "routes": routes()}))
+"""
+
+
+@pytest.fixture
+def namespace():
+    with NetnsBed("nlbm") as bed:
+        namespace = bed.namespace("batch")
+        bed.ip("link", "add", "lan0", "type", "veth", "peer", "name", "lan1", namespace=namespace)
+        bed.ip("addr", "add", "192.0.2.2/24", "dev", "lan0", namespace=namespace)
+        for link in ("lan0", "lan1"):
+            bed.ip("link", "set", link, "up", namespace=namespace)
+        bed.ip("route", "add", "10.3.0.0/16", "via", "192.0.2.1", namespace=namespace)
+        yield bed, namespace
+
+
+@requires_netns
+def test_batch_applies_in_one_pass(namespace):
+    bed, name = namespace
+    outcome = json.loads(bed.python(name, APPLY_SCRIPT, "route add 10.1.0.0 255.255.0.0 192.0.2.1",
+                                    "route change 10.3.0.0 16 192.0.2.5"))
+    assert outcome["results"] == [True, True] and outcome["rolled_back"] == []
+    assert [route.split() for route in outcome["routes"] if route.startswith("10.")] == [
+        "10.1.0.0/16 via 192.0.2.1 dev lan0".split(), "10.3.0.0/16 via 192.0.2.5 dev lan0".split()]
+
+
+@requires_netns
+def test_failed_batch_is_rolled_back(namespace):
+    bed, name = namespace
+    outcome = json.loads(bed.python(name, APPLY_SCRIPT, "route add 10.1.0.0 255.255.0.0 192.0.2.1",
+                                    "route delete 10.3.0.0 16",
+                                    "route add 10.2.0.0 255.255.0.0 198.51.100.1",
+                                    "route add 10.4.0.0 255.255.0.0 192.0.2.1"))
+    # Шлюз вне сетей интерфейсов: третья строка не выполняется, четвертая не запускается
+    assert outcome["results"] == [True, True, False, None]
+    assert outcome["rolled_back"] == [True, True]
+    assert outcome["restored"]
@@ -0,0 +1,43 @@
+import sys
+
+import pytest
+
+QtCore = pytest.importorskip("PyQt5.QtCore")
+
+from src.CommandThread import CommandThread
+
+PRODUCER = "import sys\nfor i in range(5000):\n    sys.stdout.write(f'строка {i}\\n')\n"
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+def run(app, thread):
+    batches, records = [], []
+    thread.lines_signal.connect(batches.append)
+    thread.records_signal.connect(records.extend)
+    thread.start()
+    assert thread.wait(10000)
+    app.processEvents()
+    return batches, records
+
+
+def test_output_arrives_in_batches(app):
+    thread = CommandThread([sys.executable, "-c", PRODUCER], encoding="utf-8",
+                           parser=lambda line: int(line.split()[1]) if line.endswith("0") else None)
+    batches, records = run(app, thread)
+    lines = [line for batch in batches for line in batch]
+    assert lines == [f"строка {i}" for i in range(5000)]
+    # Быстрый вывод уходит несколькими пачками, а не сигналом на строку
+    assert len(batches) < 50
+    assert records == list(range(0, 5000, 10))
+    assert thread.returncode == 0
+
+
+def test_size_budget_splits_batches(app):
+    thread = CommandThread([sys.executable, "-c", PRODUCER], flush_interval=60, flush_bytes=1024, encoding="utf-8")
+    batches, _ = run(app, thread)
+    assert sum(map(len, batches)) == 5000
+    assert all(sum(map(len, batch)) < 1024 + 20 for batch in batches)
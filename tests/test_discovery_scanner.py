@@ -0,0 +1,177 @@
+import asyncio
+import json
+import socket
+
+import pytest
+
+from src.DiscoveryScanner import DiscoveryScanner, RateController, arp_interface, checkpoint_key, MIN_RATE
+from src.Records import InterfaceRecord, NeighborRecord
+from tests.netns import NetnsBed, requires_netns
+
+
+def test_rate_backs_off_on_loss_and_grows_without():
+    controller = RateController(1000, minimum=100, maximum=1500, hold=1.0)
+    start = controller.window_start
+    controller.loss()
+    controller.adjust(start + 0.3)
+    assert controller.rate == 500
+    # Потери проб, отправленных еще со старым темпом, не снижают его повторно
+    controller.loss()
+    controller.window_sent = 1000
+    controller.adjust(start + 0.6)
+    assert controller.rate == 625
+    for step in range(10):
+        controller.window_sent = 1000
+        controller.adjust(start + 0.9 + step * 0.3)
+    assert controller.rate == 1500
+    # Без выбора темпа (упор в пробы в полете) он не растет
+    controller.rate = 1000
+    controller.window_sent = 1
+    controller.adjust(start + 10)
+    assert controller.rate == 1000
+
+
+def test_rate_does_not_fall_below_minimum():
+    controller = RateController(MIN_RATE, hold=0.0)
+    controller.loss()
+    controller.adjust(controller.window_start + 1)
+    assert controller.rate == MIN_RATE
+
+
+def test_arp_interface_requires_one_network():
+    interfaces = [InterfaceRecord("lo", "00:00:00:00:00:00", ["127.0.0.1/8"], None, "up", []),
+                  InterfaceRecord("eth0", "02:00:00:00:00:01", ["fe80::1/64", "192.0.2.10/24"], None, "up", [])]
+    assert arp_interface(["192.0.2.1", "192.0.2.254"], interfaces) == ("eth0", "02:00:00:00:00:01", "192.0.2.10")
+    assert arp_interface(["192.0.2.1", "198.51.100.1"], interfaces) is None
+    assert arp_interface(["127.0.0.2"], interfaces) is None
+    assert arp_interface(["fe80::2"], interfaces) is None
+
+
+@pytest.fixture
+def listener():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(64)
+    yield server.getsockname()[1]
+    server.close()
+
+
+def loopback(count):
+    return [f"127.0.0.{i}" for i in range(1, count + 1)]
+
+
+def test_tcp_scan_over_loopback(listener, tmp_path):
+    # Закрытые порты остальных адресов 127.0.0.0/8 отвечают RST - узел тоже найден
+    scanner = DiscoveryScanner(method="tcp", timeout=0.5, ports=(listener,), checkpoint=str(tmp_path / "scan.json"))
+    batches, progress = [], []
+    found = asyncio.run(scanner.scan(loopback(50), batches.append, progress.append))
+    assert sorted(record.ip for record in found) == sorted(loopback(50))
+    assert sorted(record.ip for batch in batches for record in batch) == sorted(loopback(50))
+    assert progress[-1].done == progress[-1].total == progress[-1].found == 50
+    assert progress[-1].method == "tcp"
+    assert not (tmp_path / "scan.json").exists()
+
+
+def test_scan_resumes_from_checkpoint(listener, tmp_path):
+    path = tmp_path / "scan.json"
+    targets = loopback(20)
+    earlier = NeighborRecord("127.0.0.3", "", "найден: tcp", None)
+    path.write_text(json.dumps({"key": checkpoint_key(targets, "tcp"), "watermark": 10, "found": [list(earlier)]}),
+                    encoding="utf-8")
+    scanner = DiscoveryScanner(method="tcp", timeout=0.5, ports=(listener,), checkpoint=str(path))
+    batches = []
+    found = asyncio.run(scanner.scan(targets, batches.append))
+    # Из контрольной точки - только найденный раньше узел, первые 10 адресов заново не проверяются
+    assert batches[0] == [earlier]
+    assert sorted(record.ip for record in found) == sorted(["127.0.0.3"] + targets[10:])
+    assert not path.exists()
+
+
+def test_other_scan_ignores_checkpoint(listener, tmp_path):
+    path = tmp_path / "scan.json"
+    path.write_text(json.dumps({"key": checkpoint_key(["127.0.0.1"], "icmp"), "watermark": 1, "found": []}),
+                    encoding="utf-8")
+    scanner = DiscoveryScanner(method="tcp", timeout=0.5, ports=(listener,), checkpoint=str(path))
+    assert [record.ip for record in asyncio.run(scanner.scan(["127.0.0.1"]))] == ["127.0.0.1"]
+
+
+def test_interrupted_scan_continues_after_restart(listener, tmp_path):
+    path = tmp_path / "scan.json"
+    targets = loopback(200)
+    scanner = DiscoveryScanner(method="tcp", timeout=0.5, rate=100, max_rate=100, ports=(listener,),
+                               checkpoint=str(path))
+
+    async def interrupted():
+        task = asyncio.ensure_future(scanner.scan(targets))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    asyncio.run(interrupted())
+    state = json.loads(path.read_text(encoding="utf-8"))
+    assert state["key"] == checkpoint_key(targets, "tcp")
+    assert 0 < state["watermark"] < len(targets)
+    assert sorted(ip for ip, *_ in state["found"]) == sorted(targets[:len(state["found"])])
+    assert len(state["found"]) >= state["watermark"]
+
+    scanner = DiscoveryScanner(method="tcp", timeout=0.5, ports=(listener,), checkpoint=str(path))
+    progress = []
+    found = asyncio.run(scanner.scan(targets, on_progress=progress.append))
+    assert sorted(record.ip for record in found) == sorted(targets)
+    # Повторно проверяются только адреса после отметки контрольной точки
+    assert progress[0].done >= state["watermark"]
+    assert not path.exists()
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        DiscoveryScanner(method="syn")
+
+
+# Сегмент /22: сканер в одном пространстве имен, узлы - адреса veth-интерфейса в другом
+SEGMENT = "10.9.0.0/22"
+SCANNER_ADDRESS = "10.9.3.254"
+HOSTS = ["10.9.0.1"] + [f"10.9.{i // 250}.{i % 250 + 2}" for i in range(0, 1000, 25)]
+
+SCAN_SCRIPT = """
+import asyncio, ipaddress, json, sys, time
+from src.Backend import LinuxBackend
+from src.DiscoveryScanner import DiscoveryScanner
+
+scanner = DiscoveryScanner(LinuxBackend(), sys.argv[1], timeout=0.5, checkpoint=None)
+targets = [str(address) for address in ipaddress.ip_network(sys.argv[2]).hosts()]
+progress = []
+started = time.perf_counter()
+found = asyncio.run(scanner.scan(targets, on_progress=progress.append))
+print(json.dumps({"elapsed": time.perf_counter() - started, "method": progress[-1].method,
+                  "done": progress[-1].done, "found": {record.ip: record.mac for record in found}}))
+"""
+
+
+@pytest.fixture(scope="module")
+def segment():
+    with NetnsBed("nlds") as bed:
+        scanner, hosts = bed.namespace("scanner"), bed.namespace("hosts")
+        _, right = bed.link(scanner, f"{SCANNER_ADDRESS}/22", hosts, f"{HOSTS[0]}/22")
+        for address in HOSTS[1:]:
+            bed.ip("addr", "add", f"{address}/22", "dev", right, namespace=hosts)
+        # ICMP без root - через датаграммный сокет
+        bed.sysctl(scanner, "net.ipv4.ping_group_range=0 2147483647")
+        yield bed, scanner
+
+
+@requires_netns
+@pytest.mark.parametrize("method", ["arp", "icmp", "tcp"])
+def test_segment_scan_finds_every_host(segment, method):
+    bed, scanner = segment
+    outcome = json.loads(bed.python(scanner, SCAN_SCRIPT, method, SEGMENT))
+    assert outcome["method"] == method
+    assert outcome["done"] == 1022
+    # ICMP и TCP находят и собственный адрес сканера; ARP-запрос к нему уходит в сеть без ответа
+    found = outcome["found"]
+    own = found.pop(SCANNER_ADDRESS, None)
+    assert (own is None) == (method == "arp")
+    assert sorted(found) == sorted(HOSTS)
+    # ARP дает MAC сразу, остальным методам его находит fill_macs в таблице соседей
+    assert len(set(found.values())) == 1 and all(found.values())
+    assert outcome["elapsed"] < 10
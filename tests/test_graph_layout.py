@@ -0,0 +1,70 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import src.GraphLayout as GraphLayoutModule
+from src.GraphLayout import GraphLayout, LEAF_SIZE, _repulsion
+
+
+def exact(pos):
+    delta = pos[:, None, :] - pos[None, :, :]
+    dist2 = np.einsum("ijk,ijk->ij", delta, delta) + 1e-9
+    return np.einsum("ij,ijk->ik", 1.0 / dist2, delta)
+
+
+def star(leaves):
+    return ["gw"] + [f"net{i}" for i in range(leaves)], [("gw", f"net{i}") for i in range(leaves)]
+
+
+def test_repulsion_follows_exact_direction():
+    pos = np.random.default_rng(0).uniform(-30, 30, (2000, 2))
+    approx, reference = _repulsion(pos, 1.0), exact(pos)
+    cosine = np.einsum("ij,ij->i", approx, reference) / np.linalg.norm(approx, axis=1) / np.linalg.norm(
+        reference, axis=1)
+    assert np.percentile(cosine, 5) > 0.95
+
+
+def test_cluster_is_subdivided(monkeypatch):
+    # Плотное скопление и один далекий узел: на верхнем уровне почти все узлы в одной ячейке
+    rng = np.random.default_rng(1)
+    pos = np.vstack([rng.normal(0, 0.01, (20000, 2)), [[1000.0, 1000.0]]])
+    sizes = []
+    exact_repulsion = GraphLayoutModule._exact_repulsion
+
+    def record(pos, rows, members, k2):
+        sizes.append(len(members))
+        return exact_repulsion(pos, rows, members, k2)
+    monkeypatch.setattr(GraphLayoutModule, "_exact_repulsion", record)
+    assert np.isfinite(_repulsion(pos, 1.0)).all()
+    assert max(sizes) <= LEAF_SIZE
+
+
+def test_coincident_nodes_do_not_recurse_forever():
+    pos = np.zeros((LEAF_SIZE * 4, 2))
+    assert np.isfinite(_repulsion(pos, 1.0, np.arange(0, len(pos), 3))).all()
+
+
+def test_star_layout_is_finite():
+    nodes, edges = star(3000)
+    positions = GraphLayout(iterations=5).layout(nodes, edges)
+    assert len(positions) == len(nodes)
+    assert np.isfinite(np.array(list(positions.values()))).all()
+
+
+def test_incremental_layout_keeps_distant_nodes():
+    layout = GraphLayout(iterations=10)
+    nodes, edges = star(200)
+    nodes += ["a", "b"]
+    edges.append(("a", "b"))
+    before = layout.layout(nodes, edges)
+    after = layout.layout(nodes + ["c"], edges + [("b", "c")])
+    assert after["net5"] == before["net5"]
+    assert after["gw"] == before["gw"]
+    assert "c" in after
+
+
+@pytest.mark.parametrize("mode", ["force", "hierarchical"])
+def test_tree_layout_places_every_node(mode):
+    nodes, edges = star(50)
+    positions = GraphLayout(iterations=5).layout(nodes, edges, mode=mode)
+    assert set(positions) == set(nodes)
@@ -0,0 +1,101 @@
+import os
+import time
+
+import pytest
+
+QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+
+from src.GraphView import GraphView, NodeItem, EdgeItem, MAX_PACKETS
+
+
+@pytest.fixture(scope="module")
+def app():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def view(app):
+    view = GraphView()
+    view.resize(800, 600)
+    yield view
+    view.clear()
+    view.deleteLater()
+
+
+def scene_counts(view):
+    items = view.graph_scene.items()
+    return (sum(isinstance(item, NodeItem) for item in items), sum(isinstance(item, EdgeItem) for item in items))
+
+
+def test_set_graph_creates_items(view):
+    view.set_graph(["gw", "a", "b", "lonely"], [("gw", "a"), ("gw", "b")])
+    assert scene_counts(view) == (4, 2)
+    assert set(view.nodes) == {"gw", "a", "b", "lonely"}
+    assert view.edges[("gw", "a")] in view.nodes["a"].edges
+    # Новый сосед ставится рядом с уже размещенным узлом
+    view.add_edge("gw", "c")
+    assert view.nodes["c"].pos() != view.nodes["gw"].pos()
+
+
+def test_incremental_update_keeps_unchanged_items(view):
+    view.set_graph(["gw", "a", "b"], [("gw", "a"), ("gw", "b")])
+    gw, edge = view.nodes["gw"], view.edges[("gw", "a")]
+    view.set_graph(["gw", "a", "c"], [("gw", "a"), ("a", "c")])
+    assert scene_counts(view) == (3, 2)
+    assert view.nodes["gw"] is gw and view.edges[("gw", "a")] is edge
+    assert "b" not in view.nodes and ("gw", "b") not in view.edges
+    assert view.edges[("a", "c")] in view.nodes["a"].edges
+
+
+def test_remove_edge_drops_orphan_nodes(view):
+    view.add_edge("gw", "a")
+    view.add_edge("a", "b")
+    view.remove_edge("a", "b")
+    assert set(view.nodes) == {"gw", "a"} and scene_counts(view) == (2, 1)
+    # Узел без ребер уходит вместе с последним ребром
+    view.remove_node("gw")
+    assert view.nodes == {} and scene_counts(view) == (0, 0)
+
+
+def test_moving_node_adjusts_edges(view):
+    edge = view.add_edge("gw", "a")
+    view.set_positions({"gw": (0, 0), "a": (100, 0)})
+    view.nodes["a"].setPos(0, 300)
+    assert edge.boundingRect().contains(0, 150)
+
+
+def test_packets_are_limited_and_finish(view):
+    view.set_positions({})
+    view.add_edge("gw", "a")
+    for _ in range(MAX_PACKETS + 10):
+        view.send_packet("gw", "a", duration=0.01)
+    view.send_packet("gw", "missing")
+    assert len(view.packets) == MAX_PACKETS and view.timer.isActive()
+    time.sleep(0.02)
+    view.advance_packets()
+    assert view.packets == [] and not view.timer.isActive()
+    assert scene_counts(view) == (2, 1)
+
+
+def test_ten_thousand_nodes_stay_responsive(view):
+    count = 10000
+    nodes = list(range(count))
+    # Дерево: у каждого узла родитель с меньшим номером, как у маршрутов через общие шлюзы
+    edges = [(node // 4, node) for node in nodes[1:]]
+    started = time.perf_counter()
+    view.set_graph(nodes, edges)
+    view.set_positions({node: (node % 100, node // 100) for node in nodes}, scale=60)
+    built = time.perf_counter() - started
+    assert scene_counts(view) == (count, count - 1)
+
+    # Мелкое изменение не трогает остальной граф
+    started = time.perf_counter()
+    view.set_graph(nodes + [count], edges[1:] + [(0, count)])
+    updated = time.perf_counter() - started
+    assert scene_counts(view) == (count + 1, count - 1)
+
+    started = time.perf_counter()
+    view.viewport().grab()
+    painted = time.perf_counter() - started
+    assert built < 5 and updated < 0.5 and painted < 2, (built, updated, painted)
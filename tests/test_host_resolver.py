@@ -0,0 +1,171 @@
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+import cli
+from src.HostResolver import HostResolver, MIN_TTL, RCODE_NXDOMAIN, build_query, parse_response, reverse_name
+
+RCODE_SERVFAIL = 2
+
+
+class StubDns:
+    """Сервер DNS на 127.0.0.1: отвечает на PTR из зоны {адрес: (имя, TTL)}, на остальное - NXDOMAIN.
+    mode="servfail" отвечает ошибкой сервера, mode="silent" молчит. Полученные имена запросов
+    копятся в queries"""
+
+    def __init__(self, zone, mode="answer", delay=0.0):
+        self.zone = {reverse_name(address): value for address, value in zone.items()}
+        self.mode = mode
+        self.delay = delay
+        self.queries = []
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.1)
+        self.address = self.sock.getsockname()
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        while self.running:
+            try:
+                data, client = self.sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            query_id, name, _, _, _ = parse_response(data)
+            self.queries.append(name)
+            if self.mode == "silent":
+                continue
+            time.sleep(self.delay)
+            self.sock.sendto(self.answer(data, query_id, name), client)
+
+    def answer(self, query, query_id, name):
+        question = query[12:]
+        if self.mode == "servfail":
+            return struct.pack("!HHHHHH", query_id, 0x8180 | RCODE_SERVFAIL, 1, 0, 0, 0) + question
+        if name not in self.zone:
+            return struct.pack("!HHHHHH", query_id, 0x8180 | RCODE_NXDOMAIN, 1, 0, 0, 0) + question
+        host, ttl = self.zone[name]
+        target = build_query(0, host)[12:-4]
+        record = struct.pack("!HHHIH", 0xC00C, 12, 1, ttl, len(target)) + target
+        return struct.pack("!HHHHHH", query_id, 0x8180, 1, 1, 0, 0) + question + record
+
+    def close(self):
+        self.running = False
+        self.thread.join()
+        self.sock.close()
+
+
+ZONE = {"192.0.2.1": ("gw.example", 600), "192.0.2.2": ("short.example", 5), "fd00::1": ("v6.example", 600)}
+
+
+@pytest.fixture
+def dns():
+    server = StubDns(ZONE)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def resolver_for():
+    resolvers = []
+
+    def make(*servers, **options):
+        options.setdefault("path", None)
+        options.setdefault("timeout", 0.3)
+        resolver = HostResolver(nameservers=[server.address for server in servers], **options)
+        resolvers.append(resolver)
+        return resolver
+    yield make
+    for resolver in resolvers:
+        resolver.close()
+
+
+def test_ptr_and_nxdomain(dns, resolver_for):
+    resolver = resolver_for(dns)
+    names = resolver.resolve(["192.0.2.1", "fd00::1", "192.0.2.99", "On-link"])
+    assert names == {"192.0.2.1": "gw.example", "fd00::1": "v6.example", "192.0.2.99": ""}
+    assert resolver.lookup("192.0.2.1") == "gw.example"
+    assert resolver.lookup("192.0.2.99") == ""
+    assert resolver.lookup("*") == ""
+
+
+def test_in_flight_queries_are_merged_and_cached(resolver_for):
+    slow = StubDns(ZONE, delay=0.2)
+    try:
+        # Заглушка отвечает по очереди, поэтому таймаут больше суммы задержек
+        resolver = resolver_for(slow, timeout=2.0)
+        resolver.request(["192.0.2.1"] * 20)
+        assert resolver.resolve(["192.0.2.1"] * 20 + ["192.0.2.99"] * 5) == {"192.0.2.1": "gw.example",
+                                                                              "192.0.2.99": ""}
+        # Отсутствие имени тоже кэшируется
+        resolver.resolve(["192.0.2.1", "192.0.2.99"])
+        assert sorted(slow.queries) == sorted([reverse_name("192.0.2.1"), reverse_name("192.0.2.99")])
+    finally:
+        slow.close()
+
+
+def test_short_ttl_is_raised_to_minimum(dns, resolver_for):
+    resolver = resolver_for(dns)
+    before = time.time()
+    resolver.resolve(["192.0.2.2", "192.0.2.1"])
+    assert before + MIN_TTL <= resolver.cache["192.0.2.2"][1] <= time.time() + MIN_TTL
+    assert resolver.cache["192.0.2.1"][1] >= before + 600
+
+
+@pytest.mark.parametrize("mode", ["servfail", "silent"])
+def test_failing_server_falls_back_to_next(dns, resolver_for, mode):
+    broken = StubDns(ZONE, mode=mode)
+    try:
+        assert resolver_for(broken, dns).resolve(["192.0.2.1"]) == {"192.0.2.1": "gw.example"}
+        assert broken.queries and dns.queries
+    finally:
+        broken.close()
+
+
+def test_listeners_receive_batches(dns, resolver_for):
+    resolver = resolver_for(dns)
+    batches = []
+    resolver.add_listener(batches.append)
+    resolver.request(["192.0.2.1", "192.0.2.99", "fd00::1"])
+    deadline = time.time() + 5
+    while sum(map(len, batches)) < 3 and time.time() < deadline:
+        time.sleep(0.05)
+    assert {address: name for batch in batches for address, name in batch.items()} == {
+        "192.0.2.1": "gw.example", "192.0.2.99": "", "fd00::1": "v6.example"}
+    assert len(batches) <= 2
+
+
+def test_lru_keeps_recent_entries(dns, resolver_for):
+    resolver = resolver_for(dns, cache_size=2)
+    resolver.resolve(["192.0.2.1", "192.0.2.2"])
+    assert resolver.lookup("192.0.2.1") == "gw.example"
+    resolver.resolve(["fd00::1"])
+    assert list(resolver.cache) == ["192.0.2.1", "fd00::1"]
+
+
+def test_warm_cache_survives_restart(dns, resolver_for, tmp_path):
+    path = str(tmp_path / "hostnames.json")
+    first = resolver_for(dns, path=path)
+    first.resolve(["192.0.2.1", "192.0.2.99"])
+    first.close()
+    silent = StubDns(ZONE, mode="silent")
+    try:
+        second = resolver_for(silent, path=path)
+        assert second.lookup("192.0.2.1") == "gw.example"
+        assert second.lookup("192.0.2.99") == ""
+        assert second.resolve(["192.0.2.1"]) == {"192.0.2.1": "gw.example"}
+        assert silent.queries == []
+    finally:
+        silent.close()
+
+
+def test_cli_resolve_with_nameserver(dns, capsys):
+    host, port = dns.address
+    assert cli.main(["resolve", "192.0.2.1", "192.0.2.99", "--nameserver", f"{host}:{port}", "--format", "csv"]) == 0
+    assert capsys.readouterr().out.splitlines() == ["address,name", "192.0.2.1,gw.example", "192.0.2.99,"]
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from src.Backend import LinuxBackend
+from src.KernelReader import KernelReader
+from src.Records import RouteRecord, NeighborRecord
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "kernel")
+
+
+@pytest.fixture
+def reader():
+    return KernelReader(os.path.join(FIXTURES, "proc"), os.path.join(FIXTURES, "sys"), netlink=False)
+
+
+def test_read_routes(reader):
+    assert reader.read_routes() == [
+        RouteRecord("0.0.0.0", "0.0.0.0", "192.0.2.1", "eth0", 100),
+        RouteRecord("192.0.2.0", "255.255.255.0", "On-link", "eth0", 0),
+        RouteRecord("10.0.0.0", "255.255.0.0", "On-link", "eth1", 0),
+        RouteRecord("10.0.128.0", "255.255.128.0", "10.0.0.2", "eth1", 20),
+    ]
+
+
+def test_read_routes6_keeps_main_table_only(reader):
+    # Локальные адреса, multicast ff00::/8 и заглушка reject на lo в ip -6 route не видны
+    assert reader.read_routes6() == [
+        RouteRecord("fd00::", "64", "On-link", "eth0", 256),
+        RouteRecord("fe80::", "64", "On-link", "eth0", 256),
+        RouteRecord("::", "0", "fd00::1", "eth0", 1024),
+    ]
+
+
+def test_list_routes_includes_both_families(reader):
+    backend = LinuxBackend(reader)
+    records = backend.collect(backend.list_routes())
+    assert len(records) == 7
+    assert RouteRecord("::", "0", "fd00::1", "eth0", 1024) in records
+
+
+def test_missing_ipv6_route_file(reader, tmp_path):
+    (tmp_path / "net").mkdir()
+    with open(os.path.join(FIXTURES, "proc", "net", "route")) as f:
+        (tmp_path / "net" / "route").write_text(f.read())
+    reader.proc_root = str(tmp_path)
+    assert len(reader.read_all_routes()) == 4
+
+
+def test_read_neighbors(reader):
+    assert reader.read_neighbors() == [
+        NeighborRecord("192.0.2.1", "02:fc:00:00:00:05", "reachable", "eth0"),
+        NeighborRecord("192.0.2.7", "", "incomplete", "eth0"),
+        NeighborRecord("10.0.0.9", "52:54:00:12:34:56", "permanent", "eth1"),
+    ]
+
+
+def test_read_interfaces(reader):
+    interfaces = {record.name: record for record in reader.read_interfaces()}
+    assert sorted(interfaces) == ["eth0", "lo"]
+    eth0 = interfaces["eth0"]
+    assert eth0.mac == "02:fc:00:00:00:01"
+    assert eth0.mtu == 1500
+    assert eth0.state == "up"
+    assert eth0.addresses == ["fd00::2/64", "fe80::fc:ff:fe00:1/64"]
+    assert eth0.gateways == ["192.0.2.1"]
+    assert interfaces["lo"].addresses == ["::1/128"]
@@ -0,0 +1,41 @@
+import math
+
+import pytest
+
+pytest.importorskip("PyQt5")
+np = pytest.importorskip("numpy")
+
+from src.LatencyChart import CHART_SPANS, MAX_SAMPLE_RATE, LatencyHistory, SampleRing, decimate
+
+
+def test_ring_holds_longest_span_at_max_rate():
+    span = max(seconds for _, seconds in CHART_SPANS)
+    ring = SampleRing()
+    for i in range(span * MAX_SAMPLE_RATE):
+        ring.append(i / MAX_SAMPLE_RATE, 1.0)
+    times, _ = ring.window(-1, span)
+    assert len(times) == span * MAX_SAMPLE_RATE
+
+
+def test_ring_wraps_in_time_order():
+    ring = SampleRing(capacity=8)
+    for i in range(20):
+        ring.append(float(i), None if i % 5 == 0 else float(i))
+    times, values = ring.window(0, 100)
+    assert times.tolist() == [float(i) for i in range(12, 20)]
+    assert math.isnan(values[3])
+
+
+def test_empty_history_window():
+    times, values = LatencyHistory().window("host", 0, 1)
+    assert len(times) == len(values) == 0
+
+
+def test_decimate_keeps_extremes_per_column():
+    times = np.array([0.0, 0.1, 0.2, 0.6, 0.7])
+    values = np.array([1.0, 9.0, np.nan, 3.0, 2.0], dtype=np.float32)
+    xs, mins, maxs, lost = decimate(times, values, 0.0, 1.0, 2)
+    assert xs.tolist() == [0, 1]
+    assert mins.tolist() == [1.0, 2.0]
+    assert maxs.tolist() == [9.0, 3.0]
+    assert lost.tolist() == [0]
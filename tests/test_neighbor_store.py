@@ -0,0 +1,87 @@
+from src.NeighborStore import NeighborStore, MAC_CONFLICT, IP_CONFLICT, Conflict, mac_key, format_conflict
+from src.Records import NeighborRecord
+
+GATEWAY_MAC = "00:00:0c:00:00:01"
+
+
+def neighbor(ip, mac, interface="eth0"):
+    return NeighborRecord(ip, mac, "dynamic", interface)
+
+
+def test_mac_key_skips_empty_and_group_addresses():
+    assert mac_key("00-00-0C-00-00-01") == GATEWAY_MAC
+    assert mac_key("") is None
+    assert mac_key("ff:ff:ff:ff:ff:ff") is None
+    assert mac_key("01:00:5e:00:00:fb") is None
+    assert mac_key("00:00:00:00:00:00") is None
+
+
+def test_indexes_by_ip_and_mac():
+    store = NeighborStore()
+    assert store.add([neighbor("192.0.2.1", GATEWAY_MAC), neighbor("192.0.2.2", "00:00:0c:00:00:02"),
+                      neighbor("192.0.2.3", ""), neighbor("", GATEWAY_MAC)]) == []
+    assert len(store) == 3 and "192.0.2.3" in store and store.get("192.0.2.9") is None
+    assert store.ips_for_mac("00-00-0C-00-00-01") == ["192.0.2.1"]
+    assert store.by_mac == {GATEWAY_MAC: "192.0.2.1", "00:00:0c:00:00:02": "192.0.2.2"}
+    assert store.remove(["192.0.2.2", "192.0.2.9"]) == [neighbor("192.0.2.2", "00:00:0c:00:00:02")]
+    assert store.ips_for_mac("00:00:0c:00:00:02") == []
+
+
+def test_mac_shared_by_several_ips_is_a_conflict():
+    store = NeighborStore()
+    store.add([neighbor("192.0.2.1", GATEWAY_MAC)])
+    conflicts = store.add([neighbor("192.0.2.66", GATEWAY_MAC), neighbor("192.0.2.67", GATEWAY_MAC)])
+    assert conflicts == [Conflict(MAC_CONFLICT, GATEWAY_MAC, ["192.0.2.1", "192.0.2.66", "192.0.2.67"])]
+    assert store.conflicts() == conflicts
+    assert format_conflict(conflicts[0]) == (f"Внимание: MAC {GATEWAY_MAC} у нескольких адресов: "
+                                             "192.0.2.1, 192.0.2.66, 192.0.2.67")
+
+
+def test_unlink_collapses_set_back_to_single_ip():
+    store = NeighborStore()
+    store.add([neighbor("192.0.2.1", GATEWAY_MAC), neighbor("192.0.2.66", GATEWAY_MAC),
+               neighbor("192.0.2.67", GATEWAY_MAC)])
+    store.remove(["192.0.2.66"])
+    assert store.by_mac[GATEWAY_MAC] == {"192.0.2.1", "192.0.2.67"}
+    store.remove(["192.0.2.67"])
+    assert store.by_mac[GATEWAY_MAC] == "192.0.2.1"
+    assert store.conflicts() == []
+    # Замена записи адреса отвязывает его от прежнего MAC
+    store.add([neighbor("192.0.2.66", GATEWAY_MAC)])
+    store.add([neighbor("192.0.2.66", "00:00:0c:00:00:66")])
+    assert store.by_mac[GATEWAY_MAC] == "192.0.2.1"
+
+
+def test_ip_changing_mac_is_remembered_across_snapshots():
+    store = NeighborStore()
+    store.add([neighbor("192.0.2.1", GATEWAY_MAC)])
+    store.clear()
+    conflicts = store.add([neighbor("192.0.2.1", "66:66:66:66:66:66")])
+    assert conflicts == [Conflict(IP_CONFLICT, "192.0.2.1", [GATEWAY_MAC, "66:66:66:66:66:66"])]
+    # Возврат к уже виденному MAC - не новый конфликт, но история остается
+    assert store.add([neighbor("192.0.2.1", GATEWAY_MAC)]) == []
+    assert store.conflicts() == conflicts
+    assert format_conflict(conflicts[0]).endswith(f"{GATEWAY_MAC} -> 66:66:66:66:66:66")
+    store.clear(history=True)
+    assert store.conflicts() == []
+
+
+def test_apply_diff():
+    store = NeighborStore()
+    old = neighbor("192.0.2.1", GATEWAY_MAC)
+    store.add([old, neighbor("192.0.2.2", "00:00:0c:00:00:02")])
+    new = old._replace(mac="00:00:0c:00:00:02")
+    conflicts = store.apply_diff([], [neighbor("192.0.2.2", "00:00:0c:00:00:02")], [(old, new)])
+    assert conflicts == [Conflict(IP_CONFLICT, "192.0.2.1", [GATEWAY_MAC, "00:00:0c:00:00:02"])]
+    assert store.records() == [new] and store.by_mac == {"00:00:0c:00:00:02": "192.0.2.1"}
+
+
+class Vendors:
+    def lookup_many(self, macs):
+        return ["Cisco" if mac.startswith("00:00:0c") else None for mac in macs]
+
+
+def test_rows_add_vendor_column():
+    records = [neighbor("192.0.2.1", GATEWAY_MAC), neighbor("192.0.2.3", "")]
+    assert NeighborStore(Vendors()).rows(records) == [tuple(records[0]) + ("Cisco",), tuple(records[1]) + (None,)]
+    assert NeighborStore().rows(records)[0][-1] is None
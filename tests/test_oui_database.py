@@ -0,0 +1,119 @@
+import pytest
+
+import cli
+from src.OuiDatabase import OuiDatabase, HEADER, MAGIC, build_database, mac_oui, parse_source
+
+IEEE_TXT = """OUI/MA-L                                                    Organization
+company_id                                                  Organization
+                                                            Address
+
+00-00-0C   (hex)\t\tCisco Systems, Inc
+00000C     (base 16)\t\tCisco Systems, Inc
+\t\t\t\t170 WEST TASMAN DRIVE
+
+3C-5A-B4   (hex)\t\tGoogle, Inc.
+3C5AB4     (base 16)\t\tGoogle, Inc.
+"""
+
+IEEE_CSV = """Registry,Assignment,Organization Name,Organization Address
+MA-L,00000C,"Cisco Systems, Inc",170 WEST TASMAN DRIVE San Jose CA US 95134
+MA-M,0055DA0,Some Block,Somewhere
+MA-L,ZZZZZZ,Broken,
+"""
+
+MANUF = """# Wireshark manuf
+00:00:0C\tCisco\tCisco Systems, Inc
+00:1B:C5:00:00:00/36\tConverg\tConverging Systems Inc.
+3C:5A:B4\tGoogle\tGoogle, Inc.
+"""
+
+NMAP = """00000C Cisco Systems
+3C5AB4 Google
+"""
+
+
+@pytest.mark.parametrize("text, expected", [
+    (IEEE_TXT, [(0x00000C, "Cisco Systems, Inc"), (0x00000C, "Cisco Systems, Inc"), (0x3C5AB4, "Google, Inc."),
+                (0x3C5AB4, "Google, Inc.")]),
+    (IEEE_CSV, [(0x00000C, "Cisco Systems, Inc")]),
+    (MANUF, [(0x00000C, "Cisco Systems, Inc"), (0x3C5AB4, "Google, Inc.")]),
+    (NMAP, [(0x00000C, "Cisco Systems"), (0x3C5AB4, "Google")]),
+])
+def test_parse_source_formats(text, expected):
+    assert list(parse_source(text.splitlines())) == expected
+
+
+@pytest.mark.parametrize("mac, oui", [
+    ("00:00:0c:12:34:56", 0x00000C),
+    ("3C-5A-B4-00-00-01", 0x3C5AB4),
+    ("3c5a.b400.0001", 0x3C5AB4),
+    ("00:00:0c", 0x00000C),
+    ("02:00:00:00:00:01", None),
+    ("da:a1:19:00:00:01", None),
+    ("00:0", None),
+    ("zz:zz:zz:00:00:00", None),
+])
+def test_mac_oui(mac, oui):
+    assert mac_oui(mac) == oui
+
+
+@pytest.fixture
+def database(tmp_path):
+    source = tmp_path / "manuf"
+    source.write_text(MANUF + "00:50:56\tVMware\tVMware, Inc.\n00:0C:29\tVMware\tVMware, Inc.\n", encoding="utf-8")
+    path = str(tmp_path / "oui.bin")
+    assert build_database(str(source), path) == 4
+    database = OuiDatabase(path)
+    yield database
+    database.close()
+
+
+def test_lookup_and_shared_names(database):
+    assert len(database) == 4
+    assert database.lookup("00:50:56:aa:bb:cc") == database.lookup("00-0C-29-00-00-01") == "VMware, Inc."
+    assert database.lookup("3c:5a:b4:00:00:01") == "Google, Inc."
+    assert database.lookup("00:00:0d:00:00:01") is None
+    assert database.lookup("") is None
+    assert database.lookup_many(["00:00:0c:00:00:01", "", "00:00:0c:ff:ff:ff", "02:00:00:00:00:01"]) == [
+        "Cisco Systems, Inc", None, "Cisco Systems, Inc", None]
+    # Одно название хранится в файле один раз
+    with open(database.path, "rb") as file:
+        assert file.read().count(b"VMware, Inc.") == 1
+
+
+def test_reload_sees_rebuilt_database(database, tmp_path):
+    assert database.lookup("00:00:0c:00:00:01") == "Cisco Systems, Inc"
+    source = tmp_path / "nmap"
+    source.write_text("00000C Cisco\n", encoding="utf-8")
+    build_database(str(source), database.path)
+    database.reload()
+    assert database.lookup("00:00:0c:00:00:01") == "Cisco"
+    assert len(database) == 1
+
+
+@pytest.mark.parametrize("content", [
+    b"",
+    b"OUI",
+    HEADER.pack(b"XXXX", 1) + bytes(16),
+    # Число записей больше, чем помещается в файле
+    HEADER.pack(MAGIC, 1000) + bytes(16),
+])
+def test_missing_or_corrupt_file_gives_no_vendors(tmp_path, content):
+    path = tmp_path / "oui.bin"
+    if content:
+        path.write_bytes(content)
+    database = OuiDatabase(str(path))
+    assert database.lookup("00:00:0c:00:00:01") is None
+    assert len(database) == 0
+    database.close()
+
+
+def test_cli_oui_build_and_lookup(tmp_path, capsys):
+    source = tmp_path / "nmap"
+    source.write_text(NMAP, encoding="utf-8")
+    path = str(tmp_path / "oui.bin")
+    assert cli.main(["oui", "build", str(source), "--database", path, "--format", "csv"]) == 0
+    assert cli.main(["oui", "lookup", "00:00:0c:01:02:03", "aa:bb:cc:00:00:00", "--database", path,
+                     "--format", "csv"]) == 0
+    assert capsys.readouterr().out.splitlines()[-3:] == ["mac,vendor", "00:00:0c:01:02:03,Cisco Systems",
+                                                         "aa:bb:cc:00:00:00,"]
@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from src.Parsers import parse_ping_line, parse_trace_line, parse_route_line, NeighborParser
+from src.Records import PingRecord, TraceRecord, RouteRecord, NeighborRecord
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "parsers")
+
+WINDOWS_TRACE = [
+    TraceRecord(1, ["192.168.1.1"], [1.0, 1.0, 1.0]),
+    TraceRecord(2, ["10.0.0.1"], [None, 12.0, 13.0]),
+    TraceRecord(3, ["100.64.0.1"], [14.0, None, 15.0]),
+    TraceRecord(4, [], [None, None, None]),
+    TraceRecord(5, ["93.184.216.34"], [20.0, 21.0, 22.0]),
+]
+WINDOWS_PING = [PingRecord("8.8.8.8", 32, 14.0, 117), PingRecord("8.8.8.8", 32, 1.0, 117),
+                PingRecord("8.8.8.8", 32, 15.0, 117)]
+WINDOWS_ARP = [NeighborRecord("192.168.1.1", "00:11:22:33:44:55", "dynamic", "192.168.1.10"),
+               NeighborRecord("192.168.1.255", "ff:ff:ff:ff:ff:ff", "static", "192.168.1.10"),
+               NeighborRecord("10.0.0.1", "aa:bb:cc:dd:ee:ff", "dynamic", "10.0.0.5")]
+WINDOWS_ROUTE = [RouteRecord("0.0.0.0", "0.0.0.0", "192.168.1.1", "192.168.1.10", 25),
+                 RouteRecord("127.0.0.0", "255.0.0.0", "On-link", "127.0.0.1", 331),
+                 RouteRecord("192.168.1.0", "255.255.255.0", "On-link", "192.168.1.10", 281)]
+
+CORPUS = {
+    "tracert_en.txt": WINDOWS_TRACE,
+    "tracert_ru.txt": WINDOWS_TRACE,
+    "traceroute_linux.txt": [
+        TraceRecord(1, ["192.168.1.1"], [0.412, 0.38, 0.371]),
+        TraceRecord(2, ["10.0.0.1"], [None, 12.1, 13.2]),
+        TraceRecord(3, ["100.64.0.1"], [14.0, None, 15.0]),
+        TraceRecord(4, [], [None, None, None]),
+        TraceRecord(5, ["93.184.216.34", "198.51.100.7"], [20.1, 21.2, 22.3]),
+    ],
+    "ping_en.txt": WINDOWS_PING,
+    "ping_ru.txt": WINDOWS_PING,
+    "ping_linux.txt": [PingRecord("8.8.8.8", 64, 14.2, 117), PingRecord("8.8.8.8", 64, 0.951, 117),
+                       PingRecord("8.8.8.8", 64, 15.0, 117)],
+    "arp_en.txt": WINDOWS_ARP,
+    "arp_ru.txt": WINDOWS_ARP,
+    "arp_linux.txt": [NeighborRecord("192.168.1.1", "00:11:22:33:44:55", "dynamic", "eth0"),
+                      NeighborRecord("192.168.1.20", "66:77:88:99:aa:bb", "permanent", "eth0"),
+                      NeighborRecord("192.168.1.30", "00:aa:bb:cc:dd:ee", "reachable", "eth0"),
+                      NeighborRecord("192.168.1.40", "", "failed", "eth0")],
+    "route_en.txt": WINDOWS_ROUTE,
+    "route_ru.txt": WINDOWS_ROUTE,
+    "route_linux.txt": [RouteRecord("0.0.0.0", "0.0.0.0", "192.168.1.1", "eth0", 100),
+                        RouteRecord("192.168.1.0", "255.255.255.0", "On-link", "eth0", 0),
+                        RouteRecord("0.0.0.0", "0.0.0.0", "192.168.1.1", "eth0", 100),
+                        RouteRecord("10.8.0.0", "255.255.255.0", "On-link", "tun0", 0)],
+}
+
+
+def line_parser(name):
+    """Парсер строк для файла корпуса по префиксу его имени"""
+    kind = name.split("_")[0]
+    if kind == "arp":
+        return NeighborParser()
+    return {"ping": parse_ping_line, "tracert": parse_trace_line, "traceroute": parse_trace_line,
+            "route": parse_route_line}[kind]
+
+
+def read_corpus(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+@pytest.mark.parametrize("name", sorted(CORPUS))
+def test_corpus(name):
+    parser = line_parser(name)
+    assert [record for record in map(parser, read_corpus(name)) if record is not None] == CORPUS[name]
+
+
+@pytest.mark.parametrize("line, rtts", [
+    ("  2     *       12 ms    13 ms  10.0.0.1", [None, 12.0, 13.0]),
+    ("  2    12 ms     *       13 ms  10.0.0.1", [12.0, None, 13.0]),
+    ("  2    12 ms    13 ms     *     10.0.0.1", [12.0, 13.0, None]),
+    (" 7  host-1.example (10.0.0.1)  1.5 ms !H * 2.5 ms", [1.5, None, 2.5]),
+])
+def test_trace_probes_keep_column_order(line, rtts):
+    assert parse_trace_line(line).rtts == rtts
+
+
+def test_corpus_covers_every_fixture():
+    assert sorted(name for name in os.listdir(FIXTURES) if name.endswith(".txt")) == sorted(CORPUS)
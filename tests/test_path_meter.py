@@ -0,0 +1,158 @@
+import asyncio
+import errno
+import json
+import math
+import socket
+import time
+
+import pytest
+
+from src.PathMeter import (PathMeter, MtuResult, BandwidthResult, LoadResult, MIN_MTU, DEFAULT_MTU, format_rate,
+                           format_measurement, percentile)
+from tests.netns import NetnsBed, requires_netns
+
+
+def icmp_available():
+    """Эхо-запросы без прав root (ping_group_range) или через сырой сокет"""
+    for kind in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+        try:
+            socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP).close()
+            return True
+        except OSError:
+            pass
+    return False
+
+
+requires_icmp = pytest.mark.skipif(not icmp_available(), reason="ICMP-сокеты недоступны")
+
+
+def test_format_rate_and_percentile():
+    assert format_rate(2.5e9) == "2.5 Гбит/с"
+    assert format_rate(120e6) == "120.0 Мбит/с"
+    assert format_rate(999) == "999 бит/с"
+    assert percentile([], 0.95) is None
+    assert percentile([5, 1, 3, 2, 4], 0.5) == 3
+    assert percentile(list(range(100)), 0.95) == 95
+
+
+def test_format_measurement():
+    assert format_measurement(MtuResult("vpn", "10.0.0.1", 1420, 3, None)) == ("MTU пути", "1420 байт", "проб: 3")
+    assert format_measurement(MtuResult("vpn", None, None, 0, "нет адреса"))[1:] == ("-", "нет адреса")
+    kind, value, details = format_measurement(BandwidthResult("vpn", "10.0.0.1", 95e6, 90e6, 99e6, 8, 1500, 12.5,
+                                                              None))
+    assert (kind, value) == ("Пропускная способность", "95.0 Мбит/с")
+    assert details == "от 90.0 Мбит/с до 99.0 Мбит/с, пачек 8, пакет 1500 байт, потери 12%"
+    assert format_measurement(BandwidthResult("vpn", "10.0.0.1", None, None, None, 8, 1500, 100.0,
+                                              "нет ответов"))[1:] == ("-", "нет ответов")
+    load = LoadResult("vpn", "10.0.0.1", 10.0, 12.0, 35.5, 60.0, 0.0, 2.0, 120e6, None)
+    assert format_measurement(load)[:2] == ("Задержка под нагрузкой", "+25.50 мс")
+    assert format_measurement(load._replace(loaded_rtt=None, error="обрыв"))[1:] == ("-", "обрыв")
+
+
+class FailingSocket:
+    """Сокет-заглушка: отправка в пачке всегда упирается в переполненную очередь, одиночные пробы
+    получают ответ сразу, а нагрузочный поток - ошибку load_error"""
+
+    family = socket.AF_INET
+
+    def __init__(self, load_error=None):
+        self.load_error = load_error
+        self.sends = 0
+
+    def path_mtu(self):
+        return None
+
+    def send(self, seq, size, wait=True):
+        self.sends += 1
+        if not wait:
+            raise OSError(self.load_error, "нагрузка")
+        if size > 100:
+            raise OSError(errno.ENOBUFS, "No buffer space available")
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(time.time())
+        return time.time(), future
+
+    def forget(self, seq):
+        pass
+
+    def close(self):
+        pass
+
+
+def meter_with(icmp):
+    meter = PathMeter(timeout=0.2)
+
+    async def open_socket(target):
+        return icmp, "192.0.2.1"
+    meter.open = open_socket
+    return meter
+
+
+def test_bandwidth_gives_up_when_every_send_fails():
+    icmp = FailingSocket()
+
+    async def scenario():
+        return await asyncio.wait_for(meter_with(icmp).bandwidth("192.0.2.1", trains=3, train_length=4), 5)
+    result = asyncio.run(scenario())
+    assert result.bandwidth is None and result.error == "нет ответов"
+    assert result.trains == 3 and icmp.sends == 12
+
+
+def test_load_error_is_reported():
+    result = asyncio.run(meter_with(FailingSocket(errno.EPERM)).latency_under_load(
+        "192.0.2.1", duration=0.2, interval=0.01, load=1e6))
+    assert result.idle_rtt is None and "нагрузка" in result.error
+
+
+@requires_icmp
+def test_loopback_bandwidth_and_load():
+    meter = PathMeter(timeout=0.5, retries=0)
+    bandwidth = asyncio.run(meter.bandwidth("127.0.0.1", trains=3, packet_size=DEFAULT_MTU))
+    assert bandwidth.error is None and bandwidth.loss == 0
+    assert bandwidth.low <= bandwidth.bandwidth <= bandwidth.high
+    load = asyncio.run(meter.latency_under_load("127.0.0.1", duration=0.3, interval=0.01, load=10e6))
+    assert load.error is None and load.load == 10e6
+    assert load.idle_rtt is not None and load.loaded_rtt is not None and load.idle_loss == 0
+    assert format_measurement(load)[0] == "Задержка под нагрузкой"
+
+
+MTU_SCRIPT = """
+import asyncio, json, sys
+from src.PathMeter import PathMeter
+
+result = asyncio.run(PathMeter(timeout=0.3, retries=0).path_mtu(sys.argv[1]))
+print(json.dumps(result._asdict()))
+"""
+BOTTLENECK = 1280
+
+
+@pytest.fixture
+def tunnel():
+    """Клиент - маршрутизатор - сервер; MTU второго звена меньше первого, как у туннеля на пути"""
+    with NetnsBed("nlpm") as bed:
+        client, router, server = bed.namespace("client"), bed.namespace("router"), bed.namespace("server")
+        bed.link(client, "10.10.1.1/24", router, "10.10.1.2/24")
+        bed.link(router, "10.10.2.1/24", server, "10.10.2.2/24", mtu=BOTTLENECK)
+        bed.ip("route", "add", "default", "via", "10.10.1.2", namespace=client)
+        bed.ip("route", "add", "default", "via", "10.10.2.1", namespace=server)
+        bed.sysctl(router, "net.ipv4.ip_forward=1")
+        yield bed, client, router
+
+
+@requires_netns
+def test_path_mtu_uses_fragmentation_needed(tunnel):
+    bed, client, _ = tunnel
+    result = json.loads(bed.python(client, MTU_SCRIPT, "10.10.2.2"))
+    # Проба 1500 байт получает «нужна фрагментация», следующая - сразу MTU узкого места
+    assert result["mtu"] == BOTTLENECK and result["probes"] <= 3
+
+
+@requires_netns
+def test_path_mtu_binary_search_through_blackhole(tunnel):
+    bed, client, router = tunnel
+    # Маршрутизатор не может отправить клиенту собственные ICMP, пересылаемые ответы сервера проходят
+    bed.ip("rule", "add", "iif", "lo", "to", "10.10.1.1", "blackhole", namespace=router)
+    result = json.loads(bed.python(client, MTU_SCRIPT, "10.10.2.2"))
+    assert result["mtu"] == BOTTLENECK
+    # Первая проба - MTU интерфейса, затем двоичный поиск по диапазону
+    assert result["probes"] <= 1 + math.ceil(math.log2(DEFAULT_MTU - MIN_MTU[socket.AF_INET] + 1))
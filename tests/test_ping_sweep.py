@@ -0,0 +1,63 @@
+import asyncio
+
+from src.PingSweep import PingSweep, expand_targets
+from src.ProbeEngine import ProbeResult
+
+
+class FakeEngine:
+    """Отвечает на каждую пробу через delay секунд и запоминает порядок проб"""
+
+    def __init__(self, delay=0.001):
+        self.delay = delay
+        self.probes = []
+
+    def resolver(self):
+        return None
+
+    async def probe(self, target, resolve=None):
+        self.probes.append(target)
+        await asyncio.sleep(self.delay)
+        return ProbeResult(target, target, len(self.probes), self.delay * 1000.0, 64, 56, "fake", None)
+
+
+def run_for(sweep, targets, count, interval, seconds):
+    async def main():
+        task = asyncio.ensure_future(sweep.run(targets, count, interval))
+        try:
+            await asyncio.wait_for(asyncio.shield(task), seconds)
+        except asyncio.TimeoutError:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    asyncio.run(main())
+
+
+def test_expand_targets():
+    assert list(expand_targets("10.0.0.0/30, host;10.0.0.9/32")) == ["10.0.0.1", "10.0.0.2", "host", "10.0.0.9"]
+
+
+def test_finite_count():
+    engine = FakeEngine()
+    sweep = PingSweep(engine, concurrency=3, rate=None)
+    run_for(sweep, [f"h{i}" for i in range(10)], 2, 0.01, 5)
+    assert sorted(engine.probes) == sorted([f"h{i}" for i in range(10)] * 2)
+    assert all(stats.sent == 2 and stats.received == 2 for stats in sweep.stats.values())
+
+
+def test_continuous_mode_cycles_all_targets():
+    # Узлов больше, чем воркеров: каждый должен опрашиваться по кругу
+    engine = FakeEngine()
+    sweep = PingSweep(engine, concurrency=2, rate=None)
+    targets = [f"h{i}" for i in range(8)]
+    run_for(sweep, targets, None, 0.05, 0.5)
+    assert sorted(sweep.stats) == targets
+    counts = [sweep.stats[target].sent for target in targets]
+    assert min(counts) >= 3
+    assert max(counts) - min(counts) <= 1
+
+
+def test_interval_is_kept_per_target():
+    engine = FakeEngine()
+    sweep = PingSweep(engine, concurrency=4, rate=None)
+    run_for(sweep, ["a", "b"], None, 0.1, 0.55)
+    # За 0.55 с с интервалом 0.1 с - не больше 6 проб на узел
+    assert all(3 <= stats.sent <= 6 for stats in sweep.stats.values())
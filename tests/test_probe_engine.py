@@ -0,0 +1,186 @@
+import asyncio
+import gc
+import json
+import socket
+
+import pytest
+
+from src.PingSweep import PingSweep
+from src.ProbeEngine import ProbeEngine, build_echo_request, icmp_checksum
+from tests.netns import NetnsBed, requires_netns
+
+
+class EchoResponder(asyncio.DatagramProtocol):
+    """Поддельный узел: возвращает каждую датаграмму отправителю"""
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.transport.sendto(data, addr)
+
+
+async def udp_responder():
+    transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+        EchoResponder, local_addr=("127.0.0.1", 0))
+    return transport, transport.get_extra_info("sockname")[1]
+
+
+def free_port(kind=socket.SOCK_DGRAM):
+    """Порт, на котором никто не слушает: ядро ответит port unreachable или RST"""
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_echo_request_checksum():
+    packet = build_echo_request(7, b"abcdef")
+    # Сумма пакета вместе с контрольной суммой дает ноль
+    assert icmp_checksum(packet) == 0
+    assert packet[:2] == b"\x08\x00" and packet[6:8] == b"\x00\x07"
+
+
+def test_udp_fake_responder():
+    async def scenario():
+        transport, port = await udp_responder()
+        try:
+            return await ProbeEngine(method="udp", udp_port=port).probe("127.0.0.1")
+        finally:
+            transport.close()
+    result = asyncio.run(scenario())
+    assert result.error is None and result.method == "udp" and result.rtt >= 0
+    assert result.size == 32
+
+
+def test_udp_closed_port_counts_as_reply():
+    result = asyncio.run(ProbeEngine(method="udp", udp_port=free_port()).probe("127.0.0.1"))
+    assert result.error is None and result.rtt is not None
+
+
+def test_udp_silent_host_times_out():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as silent:
+        silent.bind(("127.0.0.1", 0))
+        engine = ProbeEngine(method="udp", udp_port=silent.getsockname()[1], timeout=0.2)
+        result = asyncio.run(engine.probe("127.0.0.1"))
+    assert (result.rtt, result.error) == (None, "timeout")
+
+
+@pytest.mark.parametrize("listening", [True, False])
+def test_tcp_connect(listening):
+    async def scenario():
+        if not listening:
+            return await ProbeEngine(method="tcp", tcp_port=free_port(socket.SOCK_STREAM)).probe("127.0.0.1")
+        server = await asyncio.start_server(lambda reader, writer: writer.close(), "127.0.0.1", 0)
+        try:
+            port = server.sockets[0].getsockname()[1]
+            return await ProbeEngine(method="tcp", tcp_port=port).probe("127.0.0.1")
+        finally:
+            server.close()
+    result = asyncio.run(scenario())
+    # Отказ в соединении (RST) тоже означает, что узел ответил
+    assert result.error is None and result.method == "tcp"
+
+
+def test_unresolvable_target():
+    result = asyncio.run(ProbeEngine(method="udp").probe("host.invalid"))
+    assert result.address is None and result.error.startswith("resolve")
+
+
+def count_lookups(loop):
+    """Подменяет getaddrinfo цикла событий и возвращает список имен, которые разрешались"""
+    lookups = []
+    getaddrinfo = loop.getaddrinfo
+
+    async def counting(host, *args, **kwargs):
+        lookups.append(host)
+        return await getaddrinfo(host, *args, **kwargs)
+    loop.getaddrinfo = counting
+    return lookups
+
+
+def test_address_literals_skip_resolver():
+    async def scenario():
+        lookups = count_lookups(asyncio.get_running_loop())
+        engine = ProbeEngine()
+        resolved = [await engine.resolve(target) for target in ("192.0.2.1", "2001:db8::1", "fe80::1%lo")]
+        return resolved, lookups
+    resolved, lookups = asyncio.run(scenario())
+    assert resolved == [(socket.AF_INET, "192.0.2.1"), (socket.AF_INET6, "2001:db8::1"),
+                        (socket.AF_INET6, "fe80::1%lo")]
+    assert lookups == []
+
+
+def test_name_is_resolved_once_per_sweep():
+    async def scenario():
+        lookups = count_lookups(asyncio.get_running_loop())
+        transport, port = await udp_responder()
+        try:
+            engine = ProbeEngine(method="udp", udp_port=port)
+            await engine.ping_many(["localhost"] * 5, count=2, interval=0)
+            await PingSweep(engine, concurrency=4, rate=None).run(["localhost", "127.0.0.1"], count=3, interval=0)
+            await engine.ping_many(["host.invalid"] * 3, count=2, interval=0)
+        finally:
+            transport.close()
+        return lookups
+    assert asyncio.run(scenario()) == ["localhost", "localhost", "host.invalid"]
+
+
+def test_endless_ping_does_not_keep_results():
+    held = []
+
+    async def scenario():
+        transport, port = await udp_responder()
+        engine = ProbeEngine(method="udp", udp_port=port)
+
+        def callback(result):
+            # Результат не должен оставаться ни в одном списке движка
+            held.append(any(isinstance(referrer, list) for referrer in gc.get_referrers(result)))
+            if len(held) == 20:
+                task.cancel()
+        task = asyncio.ensure_future(engine.ping("127.0.0.1", count=None, interval=0, callback=callback))
+        try:
+            await asyncio.gather(task, return_exceptions=True)
+        finally:
+            transport.close()
+    asyncio.run(scenario())
+    assert held == [False] * 20
+
+
+def test_thousands_of_probes_on_one_loop():
+    # TCP: очередь приема поддельного узла не переполняется, как буфер UDP при пачке из тысяч датаграмм
+    async def scenario():
+        server = await asyncio.start_server(lambda reader, writer: writer.close(), "127.0.0.1", 0, backlog=4096)
+        try:
+            engine = ProbeEngine(method="tcp", tcp_port=server.sockets[0].getsockname()[1], timeout=5.0)
+            return await engine.ping_many(["127.0.0.1"] * 2000, count=1)
+        finally:
+            server.close()
+    results = [ping[0] for ping in asyncio.run(scenario())]
+    assert len(results) == 2000
+    assert all(result.error is None for result in results)
+
+
+ICMP_SCRIPT = """
+import asyncio, json
+from src.ProbeEngine import ProbeEngine
+
+async def main():
+    engine = ProbeEngine(method="icmp", timeout=1.0)
+    try:
+        return await asyncio.gather(*(engine.probe(target) for target in ("127.0.0.1", "::1") * 50))
+    finally:
+        engine.close()
+print(json.dumps([result._asdict() for result in asyncio.run(main())]))
+"""
+
+
+@requires_netns
+def test_icmp_loopback_in_namespace():
+    """ICMP без привилегий: в отдельном пространстве имен ping_group_range открыт для всех групп"""
+    with NetnsBed("nlpe") as bed:
+        namespace = bed.namespace("icmp")
+        bed.sysctl(namespace, "net.ipv4.ping_group_range=0 2147483647")
+        results = json.loads(bed.python(namespace, ICMP_SCRIPT))
+    assert len(results) == 100
+    assert all(result["error"] is None and result["method"] == "icmp" for result in results)
+    assert all(result["ttl"] == 64 for result in results if result["address"] == "127.0.0.1")
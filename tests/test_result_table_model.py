@@ -0,0 +1,76 @@
+import pytest
+
+QtCore = pytest.importorskip("PyQt5.QtCore")
+
+from src.Records import RouteRecord, route_key
+from src.ResultTableModel import ResultTableModel
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+@pytest.fixture
+def model(app):
+    return ResultTableModel(["IP", "MAC"], key_column=0)
+
+
+def test_append_rows_upserts_known_keys(model):
+    assert model.append_rows([("10.0.0.1", "a"), ("10.0.0.2", "b")]) == []
+    replaced = model.append_rows([("10.0.0.1", "c"), ("10.0.0.3", "d"), ("10.0.0.3", "e")])
+    assert replaced == [("10.0.0.1", "a"), ("10.0.0.3", "d")]
+    assert list(model.rows()) == [("10.0.0.1", "c"), ("10.0.0.2", "b"), ("10.0.0.3", "e")]
+
+
+def test_remove_after_duplicate_append_keeps_other_rows(model):
+    model.append_rows([("10.0.0.1", "a"), ("10.0.0.2", "b")])
+    model.append_rows([("10.0.0.1", "c")])
+    model.remove_keys(["10.0.0.1"])
+    assert list(model.rows()) == [("10.0.0.2", "b")]
+    assert model.index_by_key == {"10.0.0.2": 0}
+
+
+def test_append_rows_replaces_pending_row(model):
+    model.upsert_row(("10.0.0.1", "a"))
+    assert model.append_rows([("10.0.0.1", "b")]) == [("10.0.0.1", "a")]
+    model.flush()
+    assert list(model.rows()) == [("10.0.0.1", "b")]
+
+
+def test_apply_diff_returns_replaced_rows(model):
+    model.append_rows([("10.0.0.1", "a"), ("10.0.0.2", "b")])
+    replaced = model.apply_diff([("10.0.0.2", "c")], [("10.0.0.1", "a")], [])
+    assert replaced == [("10.0.0.2", "b")]
+    assert list(model.rows()) == [("10.0.0.2", "c")]
+
+
+def test_on_link_routes_on_different_interfaces_keep_own_rows(app):
+    model = ResultTableModel(RouteRecord._fields, key=route_key)
+    wired = RouteRecord("fe80::", "64", "On-link", "eth0", 256)
+    wireless = wired._replace(interface="wlan0")
+    assert model.append_rows([wired, wireless]) == []
+    assert model.apply_diff([wired._replace(metric=600)], [], []) == []
+    model.flush()
+    assert len(list(model.rows())) == 3
+
+
+def test_numeric_columns_are_arrays_and_keep_none(app):
+    model = ResultTableModel(["IP", "Байты", "Время"], typecodes={1: "q", 2: "d"})
+    model.append_rows([("10.0.0.1", 32, 1.5), ("10.0.0.2", None, None)])
+    assert [column.typecode for column in model.columns[1:]] == ["q", "d"]
+    assert list(model.rows()) == [("10.0.0.1", 32, 1.5), ("10.0.0.2", None, None)]
+    assert model.data(model.index(1, 2)) == ""
+    assert model.data(model.index(0, 1), ResultTableModel.SortRole) == 32
+    model.clear()
+    assert model.columns[2].typecode == "d" and model.rowCount() == 0
+
+
+def test_edit_of_key_column_is_rejected(app):
+    model = ResultTableModel(["IP", "MAC"], key_column=0, editable=True)
+    model.append_rows([("10.0.0.1", "a"), ("10.0.0.2", "b")])
+    assert not model.flags(model.index(0, 0)) & QtCore.Qt.ItemIsEditable
+    assert not model.setData(model.index(0, 0), "10.0.0.9")
+    assert model.setData(model.index(0, 1), "c")
+    assert model.find("10.0.0.1") == 0 and model.row(0) == ("10.0.0.1", "c")
+    assert model.remove_key("10.0.0.1") and list(model.rows()) == [("10.0.0.2", "b")]
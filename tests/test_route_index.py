@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+import cli
+from src.Backend import LinuxBackend
+from src.Records import RouteRecord, route_key, diff_snapshots
+from src.RouteIndex import RouteIndex, parse_address, route_from_input
+from tests.test_backend import NoKernel
+
+ROUTES = [RouteRecord("0.0.0.0", "0.0.0.0", "192.0.2.1", "eth0", 100),
+          RouteRecord("10.0.0.0", "255.0.0.0", "192.0.2.2", "eth0", 0),
+          RouteRecord("10.1.0.0", "255.255.0.0", "192.0.2.3", "eth0", 20),
+          RouteRecord("10.1.0.0", "255.255.0.0", "192.0.2.4", "eth1", 10),
+          RouteRecord("fd00::", "64", "On-link", "eth0", 256),
+          RouteRecord("::", "0", "fd00::1", "eth0", 1024)]
+
+
+@pytest.fixture
+def index():
+    return RouteIndex(ROUTES)
+
+
+@pytest.mark.parametrize("address, gateway", [
+    ("10.1.2.3", "192.0.2.4"),
+    ("10.2.0.1", "192.0.2.2"),
+    ("8.8.8.8", "192.0.2.1"),
+    ("fd00::5", "On-link"),
+    ("2001:db8::1", "fd00::1"),
+])
+def test_longest_prefix_with_metric_tie_break(index, address, gateway):
+    assert index.lookup(address).gateway == gateway
+
+
+@pytest.mark.parametrize("address", ["10.1", "10.0.0.1.2", "300.0.0.1", "10.0.0.0x1"])
+def test_short_ipv4_forms_are_rejected(address):
+    # inet_aton принял бы "10.1" как 10.0.0.1
+    with pytest.raises(OSError):
+        parse_address(address)
+
+
+def test_lookup_many_keeps_bad_addresses(index):
+    assert [(address, route and route.gateway) for address, route in
+            index.lookup_many(["10.1.0.1", " ", "10.1", "fd00::1"])] == [
+        ("10.1.0.1", "192.0.2.4"), ("10.1", None), ("fd00::1", "On-link")]
+
+
+def test_incremental_add_and_remove(index):
+    host = RouteRecord("10.1.2.3", "255.255.255.255", "192.0.2.9", "eth0", 0)
+    index.add(host)
+    assert index.lookup("10.1.2.3") == host
+    assert index.remove(host) and not index.remove(host)
+    assert [route.gateway for route in index.remove_prefix("10.1.0.0", "16")] == ["192.0.2.3", "192.0.2.4"]
+    assert index.lookup("10.1.2.3").gateway == "192.0.2.2"
+    assert len(index) == len(ROUTES) - 2
+
+
+def test_diff(index):
+    moved = RouteRecord("10.0.0.0", "255.0.0.0", "192.0.2.2", "eth1", 0)
+    added = RouteRecord("172.16.0.0", "12", "192.0.2.5", "eth0", 0)
+    other = RouteIndex([route for route in ROUTES if route.destination != "fd00::" and route.mask != "255.0.0.0"] +
+                       [moved, added])
+    # Маршрут на другом интерфейсе - другая запись
+    assert index.diff(other) == ([moved, added], [ROUTES[1], ROUTES[4]], [])
+
+
+def test_on_link_routes_on_different_interfaces_are_distinct():
+    wired = RouteRecord("fe80::", "64", "On-link", "eth0", 256)
+    wireless = wired._replace(interface="wlan0")
+    assert route_key(wired) != route_key(wireless)
+    assert len({route_key(route): route for route in (wired, wireless)}) == 2
+    assert RouteIndex([wired]).diff(RouteIndex([wired, wireless])) == ([wireless], [], [])
+    # Равноценные маршруты по умолчанию через один шлюз с разными метриками
+    default = RouteRecord("0.0.0.0", "0.0.0.0", "192.0.2.1", "eth0", 100)
+    assert diff_snapshots({route_key(default): default},
+                          {route_key(route): route for route in (default, default._replace(metric=600))}) == (
+        [default._replace(metric=600)], [], [])
+
+
+def test_route_from_input_defaults_to_host_route():
+    assert route_from_input("10.0.0.7", "", "", "").mask == "255.255.255.255"
+    assert RouteIndex([route_from_input("fd00::7", "", "", "")]).lookup("fd00::7") is not None
+
+
+class ListingBackend(LinuxBackend):
+    """Вместо вызова ip возвращает заранее заданную таблицу маршрутов"""
+
+    def __init__(self):
+        super().__init__(NoKernel())
+
+    def list_routes(self):
+        return None
+
+    def collect(self, spec):
+        return ROUTES
+
+
+def test_cli_lookup_from_file(tmp_path, capsys, monkeypatch):
+    monkeypatch.setattr(cli, "get_backend", ListingBackend)
+    destinations = tmp_path / "destinations.txt"
+    destinations.write_text("10.1.2.3\n# комментарий\nfd00::9\n", encoding="utf-8")
+    assert cli.main(["routes", "--lookup", f"@{destinations}", "8.8.8.8"]) == 0
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(row["address"], row["gateway"]) for row in rows] == [
+        ("10.1.2.3", "192.0.2.4"), ("fd00::9", "On-link"), ("8.8.8.8", "192.0.2.1")]
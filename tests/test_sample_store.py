@@ -0,0 +1,140 @@
+import sqlite3
+import time
+
+import pytest
+
+from src.SampleStore import SampleStore, MINUTE, HOUR, histogram_index, histogram_value, percentile
+
+
+@pytest.fixture
+def open_store(tmp_path):
+    stores = []
+
+    def make(**options):
+        store = SampleStore(str(tmp_path / "history.sqlite3"), **options)
+        stores.append(store)
+        return store
+    yield make
+    for store in stores:
+        store.close()
+
+
+# Начало позапрошлого часа: все минутные корзины замеров лежат внутри одного часа
+BASE = int(time.time()) // HOUR * HOUR - 2 * HOUR
+
+
+def test_histogram_buckets_are_five_percent_wide():
+    assert histogram_index(0.001) == 0
+    for rtt in (0.5, 12.3, 250.0):
+        assert abs(histogram_value(histogram_index(rtt)) / rtt - 1) < 0.05
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert percentile([], 50) is None
+
+
+def test_rollups_and_summary(open_store):
+    store = open_store()
+    for minute in range(3):
+        for second in range(0, 60, 10):
+            store.add("gw", None if second == 50 else 10.0 + minute, BASE + minute * MINUTE + second)
+    store.add("other", 1.0, BASE)
+    assert store.flush(5)
+    assert store.series() == ["gw", "other"]
+    rollups = store.rollups("gw", BASE, BASE + HOUR)
+    assert [(rollup.time, rollup.count, rollup.lost, rollup.avg) for rollup in rollups] == [
+        (BASE, 6, 1, 10.0), (BASE + MINUTE, 6, 1, 11.0), (BASE + 2 * MINUTE, 6, 1, 12.0)]
+    [hour] = store.rollups("gw", BASE, BASE + HOUR, HOUR)
+    assert (hour.count, hour.lost, hour.min, hour.max) == (18, 3, 10.0, 12.0)
+    summary = store.summary("gw", BASE, BASE + HOUR)
+    assert (summary.count, summary.lost, summary.min, summary.avg, summary.max) == (18, 3, 10.0, 11.0, 12.0)
+    assert summary.loss == pytest.approx(100 / 6)
+    assert len(store.samples("gw", BASE, BASE + MINUTE)) == 6
+    assert store.summary("missing", BASE, BASE + HOUR) is None
+
+
+def test_percentiles_exact_and_from_histograms(open_store):
+    store = open_store()
+    for i in range(1000):
+        store.add("gw", 1.0 + i / 10, BASE + i * 3)
+    assert store.flush(5)
+    values = [1.0 + i / 10 for i in range(1000)]
+    assert store.percentiles("gw", BASE, BASE + HOUR) == {q: pytest.approx(percentile(values, q))
+                                                         for q in (50, 90, 99)}
+    # Без сырых замеров за период перцентили считаются по гистограммам агрегатов
+    store.retention[None] = 60
+    estimated = store.percentiles("gw", BASE, BASE + HOUR)
+    for q, value in estimated.items():
+        assert value == pytest.approx(percentile(values, q), rel=0.05)
+
+
+def test_retention_prunes_raw_samples_and_rollups(open_store):
+    now = time.time()
+    store = open_store()
+    store.add("gw", 5.0, now - 3 * 86400)
+    store.add("gw", 6.0, now - 2 * HOUR)
+    store.add("gw", 7.0, now)
+    assert store.flush(5)
+    store.close()
+    # Очистка идет при запуске писателя, до первой пачки
+    store = open_store(retention={None: 86400, MINUTE: 86400, HOUR: 2 * 86400})
+    store.add("gw", 8.0, now)
+    assert store.flush(5)
+    assert [rtt for _, rtt in store.samples("gw", now - 7 * 86400, now + 1)] == [6.0, 7.0]
+    assert store.summary("gw", now - 7 * 86400, now + 1).count == 3
+    assert [rollup.count for rollup in store.rollups("gw", now - 7 * 86400, now + 1, HOUR)][-1] >= 2
+    assert store.rollups("gw", now - 7 * 86400, now - 2 * 86400, MINUTE) == []
+
+
+def test_max_bytes_drops_oldest_raw_samples(open_store):
+    now = int(time.time())
+    store = open_store()
+    # Час замеров одного ряда: файл занимают сырые замеры, агрегатов - десятки строк
+    for i in range(60000):
+        store.add("gw", 1.0 + i % 50, now - HOUR + i * 0.06)
+    assert store.flush(30)
+    size = store._size(store.connection)
+    store.close()
+    limit = size // 3
+    store = open_store(max_bytes=limit)
+    store.add("gw", 1.0, now)
+    assert store.flush(5)
+    assert store._size(store.connection) <= limit
+    kept = store.samples("gw", now - HOUR, now + 1)
+    # Отброшены самые старые замеры, новые и агрегаты остаются
+    assert 0 < len(kept) < 60000 / 3 and kept[-1][0] == now
+    assert kept[0][0] >= now - HOUR / 2
+    assert store.summary("gw", now - HOUR, now + 1).count == 60001
+
+
+def test_failed_batch_is_reported_and_writer_continues(open_store, capsys):
+    store = open_store()
+    write = store._write
+    calls = []
+
+    def failing_once(connection, batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database or disk is full")
+        write(connection, batch)
+    store._write = failing_once
+    store.add("gw", 1.0, BASE)
+    assert store.flush(5)
+    assert "disk is full" in store.error and "disk is full" in capsys.readouterr().err
+    store.add("gw", 2.0, BASE + 1)
+    assert store.flush(5)
+    assert store.samples("gw", BASE, BASE + MINUTE) == [(BASE + 1, 2.0)]
+    assert store._writer.is_alive()
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_dead_writer_stops_accepting_samples(open_store):
+    store = open_store()
+
+    def broken(connection, batch):
+        raise RuntimeError("сбой писателя")
+    store._write = broken
+    store.add("gw", 1.0, BASE)
+    store._writer.join(5)
+    assert not store._writer.is_alive()
+    store.add("gw", 2.0, BASE + 1)
+    assert store._queue.qsize() == 0
+    assert store.flush(1)
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модули, которые не должны загружаться при запуске: тяжелые библиотеки и вкладки,
+# которые main создает только при первом выборе
+HEAVY_MODULES = ["numpy", "networkx", "matplotlib", "pygame", "src.GraphLayout"]
+LAZY_TABS = ["src.TracertTab", "src.IpconfigTab", "src.RouteTab", "src.ArpTab"]
+
+# Модули без Qt, на которых стоят вкладки и консольный режим
+CORE_MODULES = ["cli", "src.Backend", "src.KernelReader", "src.Parsers", "src.PingSweep", "src.ProbeEngine",
+                "src.TraceEngine", "src.SampleStore", "src.HostResolver", "src.TopologyStore", "src.RouteIndex",
+                "src.DiscoveryScanner", "src.PathMeter", "src.NeighborStore", "src.OuiDatabase"]
+
+
+def loaded_modules(imports):
+    """Импортирует модули в чистом интерпретаторе и возвращает загруженные из списка подозрительных"""
+    watched = HEAVY_MODULES + LAZY_TABS
+    code = (f"import importlib, sys\n"
+            f"for name in {imports!r}:\n"
+            f"    importlib.import_module(name)\n"
+            f"print(' '.join(name for name in {watched!r} if name in sys.modules))")
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, text=True, check=False)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.split()
+
+
+def test_core_modules_do_not_load_heavy_dependencies():
+    assert loaded_modules(CORE_MODULES) == []
+
+
+def test_main_window_imports_stay_light():
+    pytest.importorskip("PyQt5")
+    assert loaded_modules(["main", "src.PingTab"]) == []
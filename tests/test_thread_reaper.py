@@ -0,0 +1,58 @@
+import threading
+import time
+
+import pytest
+
+QtCore = pytest.importorskip("PyQt5.QtCore")
+
+from src.ThreadReaper import ThreadReaper
+
+
+class SlowThread(QtCore.QThread):
+    result_signal = QtCore.pyqtSignal(int)
+
+    def __init__(self):
+        super().__init__()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        # Имитирует долгий снимок: остановка замечается только через 0.3 с
+        time.sleep(0.3)
+        if not self._stop_event.is_set():
+            self.result_signal.emit(1)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+def test_retire_does_not_block(app):
+    reaper = ThreadReaper()
+    thread = SlowThread()
+    results = []
+    thread.result_signal.connect(results.append)
+    thread.start()
+    reaper.track(thread)
+    started = time.perf_counter()
+    reaper.retire(thread, thread.result_signal)
+    assert time.perf_counter() - started < 0.1
+    assert thread in reaper.threads
+    thread.wait()
+    app.processEvents()
+    assert reaper.threads == set()
+    assert results == []
+
+
+def test_shutdown_joins_threads(app):
+    reaper = ThreadReaper()
+    threads = [SlowThread() for _ in range(3)]
+    for thread in threads:
+        thread.start()
+        reaper.track(thread)
+    reaper.shutdown()
+    assert not any(thread.isRunning() for thread in threads)
+    assert reaper.threads == set()
@@ -0,0 +1,29 @@
+import time
+
+import pytest
+
+pytest.importorskip("PyQt5")
+
+from src.DiscoveryThread import DiscoveryThread
+from src.PathMeterThread import PathMeterThread
+from src.ProbeThread import ProbeThread
+from src.TraceThread import TraceThread
+
+
+@pytest.mark.parametrize("make", [
+    lambda: ProbeThread(["127.0.0.1"], count=None),
+    lambda: TraceThread(["127.0.0.1"], rounds=None),
+    lambda: DiscoveryThread(None, ["127.0.0.1"]),
+    lambda: PathMeterThread("mtu", "127.0.0.1"),
+])
+def test_stop_before_run(make):
+    # stop() до того, как run() создал цикл и задачу, не должен теряться
+    thread = make()
+    finished = []
+    thread.finished_signal.connect(lambda: finished.append(True))
+    thread.stop()
+    started = time.perf_counter()
+    thread.run()
+    assert time.perf_counter() - started < 1.0
+    assert finished == [True]
+    assert thread._loop is None
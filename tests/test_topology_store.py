@@ -0,0 +1,107 @@
+from src.Records import RouteRecord, NeighborRecord, InterfaceRecord
+from src.TopologyStore import TopologyStore, LOCAL_NODE, LINK, ROUTE, HOP
+
+
+def only_local(store):
+    return len(store) == 1 and not store.edges and store.find(LOCAL_NODE) is not None
+
+
+def test_edge_refcount():
+    store = TopologyStore()
+    a, b = store.node("a", 3), store.node("b", 3)
+    store.connect(a, b, LINK)
+    store.connect(b, a, LINK)
+    assert len(store.edges) == 1
+    assert store.disconnect(a, b, LINK)
+    assert store.find("a") is not None
+    assert store.disconnect(a, b, LINK)
+    assert store.find("a") is None and store.find("b") is None
+    assert not store.disconnect(a, b, LINK)
+
+
+def test_routes_share_gateway_link():
+    store = TopologyStore()
+    first = RouteRecord("10.1.0.0", "255.255.0.0", "192.0.2.1", "eth0", 0)
+    second = RouteRecord("10.2.0.0", "255.255.0.0", "192.0.2.1", "eth0", 0)
+    store.add_routes([first, second])
+    assert set(store.neighbors("192.0.2.1")) == {"[eth0]", "10.1.0.0/16", "10.2.0.0/16"}
+    store.remove_routes([first])
+    assert store.find("10.1.0.0/16") is None
+    assert set(store.neighbors("[eth0]")) == {LOCAL_NODE, "192.0.2.1"}
+    store.remove_routes([second])
+    # Связь интерфейса со шлюзом уходит с последним маршрутом, за ней шлюз и интерфейс
+    assert only_local(store)
+
+
+def test_on_link_and_default_routes():
+    store = TopologyStore()
+    routes = [RouteRecord("0.0.0.0", "0.0.0.0", "192.0.2.1", "eth0", 100),
+              RouteRecord("192.0.2.0", "255.255.255.0", "On-link", "eth0", 0),
+              RouteRecord("::", "0", "fd00::1", "eth0", 1024),
+              RouteRecord("192.0.2.1", "255.255.255.255", "192.0.2.1", "eth0", 0)]
+    store.add_routes(routes)
+    assert ("192.0.2.1", "0.0.0.0/0") in store.snapshot({ROUTE})[1]
+    store.remove_routes(routes)
+    assert only_local(store)
+
+
+def test_remove_unknown_route_keeps_links():
+    store = TopologyStore()
+    route = RouteRecord("10.1.0.0", "255.255.0.0", "192.0.2.1", "eth0", 0)
+    store.add_routes([route])
+    store.remove_routes([route._replace(destination="10.9.0.0")])
+    store.remove_routes([route._replace(gateway="192.0.2.9")])
+    assert set(store.neighbors("192.0.2.1")) == {"[eth0]", "10.1.0.0/16"}
+
+
+def test_neighbors_and_interfaces():
+    store = TopologyStore()
+    store.add_interfaces([InterfaceRecord("eth0", None, ["192.0.2.2/24"], None, "up", [])])
+    neighbors = [NeighborRecord("192.0.2.1", "02:fc:00:00:00:05", "reachable", "eth0"),
+                 NeighborRecord("10.9.9.9", "02:fc:00:00:00:06", "reachable", "eth0")]
+    store.add_neighbors(neighbors)
+    assert store.neighbors("192.0.2.1") == ["192.0.2.0/24"]
+    assert store.neighbors("10.9.9.9") == ["[eth0]"]
+    assert store.mac("192.0.2.1") == "02:fc:00:00:00:05"
+    store.remove_neighbors(neighbors)
+    assert store.find("192.0.2.1") is None and store.find("10.9.9.9") is None
+    # Интерфейс и его сеть остаются, пока их держит описание интерфейса
+    assert set(store.neighbors("[eth0]")) == {LOCAL_NODE, "192.0.2.0/24"}
+
+
+def test_interfaces_readded_replace_networks():
+    store = TopologyStore()
+    store.add_interfaces([InterfaceRecord("eth0", None, ["192.0.2.2/24"], None, "up", [])])
+    store.add_interfaces([InterfaceRecord("eth0", None, ["198.51.100.2/24"], None, "up", [])])
+    assert store.find("192.0.2.0/24") is None
+    assert set(store.neighbors("[eth0]")) == {LOCAL_NODE, "198.51.100.0/24"}
+    route = RouteRecord("10.0.0.0", "255.0.0.0", "198.51.100.1", "eth0", 0)
+    store.add_routes([route])
+    store.remove_routes([route])
+    assert set(store.neighbors("[eth0]")) == {LOCAL_NODE, "198.51.100.0/24"}
+
+
+def test_pair_with_several_kinds_is_one_edge():
+    store = TopologyStore()
+    local, gateway = store.find(LOCAL_NODE), store.node("192.0.2.1", 3)
+    store.connect(local, gateway, LINK)
+    store.connect(local, gateway, HOP)
+    store.connect(local, gateway, ROUTE)
+    assert len(store.edges) == 3
+    assert store.snapshot()[1] == [(LOCAL_NODE, "192.0.2.1")]
+    assert store.snapshot({HOP})[1] == [(LOCAL_NODE, "192.0.2.1")]
+    assert store.neighbors(LOCAL_NODE) == ["192.0.2.1"]
+    store.disconnect(local, gateway, HOP)
+    store.disconnect(local, gateway, ROUTE)
+    assert store.neighbors("192.0.2.1") == [LOCAL_NODE]
+
+
+def test_released_ids_are_reused():
+    store = TopologyStore()
+    route = RouteRecord("10.1.0.0", "255.255.0.0", "192.0.2.1", "eth0", 0)
+    store.add_routes([route])
+    size = len(store.keys)
+    for _ in range(10):
+        store.remove_routes([route])
+        store.add_routes([route])
+    assert len(store.keys) == size
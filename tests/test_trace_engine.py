@@ -0,0 +1,70 @@
+import asyncio
+import socket
+
+import pytest
+
+from src.TraceEngine import (TraceEngine, _TraceSocket, probe_payload, parse_probe_payload,
+                             ICMP_TIME_EXCEEDED)
+from tests.netns import NetnsBed, requires_netns
+
+
+def test_probe_payload_roundtrip():
+    assert parse_probe_payload(probe_payload(70000, 7, 32)) == (70000 & 0xFFFF, 7)
+    # Обрезанная цитата (только заголовок UDP) и чужие данные не сопоставляются
+    assert parse_probe_payload(b"") is None
+    assert parse_probe_payload(b"xx\x00\x01\x02") is None
+
+
+def test_stale_error_is_not_credited_to_current_probe():
+    async def scenario():
+        probe = _TraceSocket(asyncio.get_running_loop(), socket.AF_INET, "127.0.0.1", 33434)
+        try:
+            _, current = probe.send(1, 3, 32)
+            # Опоздавший ответ на пробу прошлого раунда с тем же TTL
+            assert not probe.dispatch(probe_payload(0, 3, 32), "10.0.0.3", ICMP_TIME_EXCEEDED, 1.0)
+            assert not probe.dispatch(b"", "10.0.0.3", ICMP_TIME_EXCEEDED, 1.0)
+            assert not current.done()
+            assert probe.dispatch(probe_payload(1, 3, 32), "10.0.0.3", ICMP_TIME_EXCEEDED, 2.0)
+            assert current.result() == (2.0, "10.0.0.3", False)
+        finally:
+            probe.close()
+    asyncio.run(scenario())
+
+
+def test_single_flow_for_all_ttls():
+    async def scenario():
+        probe = _TraceSocket(asyncio.get_running_loop(), socket.AF_INET, "127.0.0.1", 33434)
+        try:
+            port = probe.sock.getsockname()[1]
+            for ttl in (1, 2, 3):
+                probe.send(0, ttl, 32)
+                assert probe.sock.getsockname()[1] == port
+        finally:
+            probe.close()
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def three_hops():
+    """основное пространство - r1 - r2 - цель: 10.201.1.2, 10.201.2.2, 10.201.3.2"""
+    with NetnsBed("nltr") as bed:
+        r1, r2, target = bed.namespace("r1"), bed.namespace("r2"), bed.namespace("dst")
+        bed.link(None, "10.201.1.1/24", r1, "10.201.1.2/24")
+        bed.link(r1, "10.201.2.1/24", r2, "10.201.2.2/24")
+        bed.link(r2, "10.201.3.1/24", target, "10.201.3.2/24")
+        for router in (r1, r2):
+            bed.sysctl(router, "net.ipv4.ip_forward=1")
+        bed.ip("route", "add", "10.201.2.0/23", "via", "10.201.1.2")
+        bed.ip("route", "add", "10.201.3.0/24", "via", "10.201.2.2", namespace=r1)
+        bed.ip("route", "add", "default", "via", "10.201.2.1", namespace=r2)
+        bed.ip("route", "add", "default", "via", "10.201.3.1", namespace=target)
+        yield "10.201.3.2"
+
+
+@requires_netns
+def test_trace_simulated_hops(three_hops):
+    engine = TraceEngine(max_hops=8, timeout=1.0)
+    hops = asyncio.run(engine.trace(three_hops, rounds=3, interval=0.05))
+    assert [sorted(hop.addresses) for hop in hops] == [["10.201.1.2"], ["10.201.2.2"], ["10.201.3.2"]]
+    assert hops[-1].reached
+    assert all(hop.received == 3 for hop in hops)